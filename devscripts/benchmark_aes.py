@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import argparse
+import time
+
+from yt_dlp import aes
+from yt_dlp.dependencies import Cryptodome
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Measure the throughput of the AES implementations')
+    parser.add_argument(
+        '-s', '--size', type=int, default=1024, help='size of the data in KiB (default: %(default)s)')
+    parser.add_argument(
+        '--reference-size', type=int, default=64, metavar='SIZE',
+        help='size of the data in KiB for the per-byte implementation, which is much slower (default: %(default)s)')
+    parser.add_argument(
+        '-k', '--key-size', type=int, default=16, choices=(16, 24, 32), help='key size in bytes (default: %(default)s)')
+    return parser.parse_args()
+
+
+def implementations():
+    yield 'cbc', 'reference', lambda data, key, iv: bytes(aes.aes_cbc_decrypt(list(data), list(key), list(iv)))
+    yield 'cbc', 'native', aes._cbc_decrypt_words
+    yield 'ctr', 'reference', lambda data, key, iv: bytes(aes.aes_ctr_decrypt(list(data), list(key), list(iv)))
+    yield 'ctr', 'native', aes._ctr_crypt_words
+    if Cryptodome.AES:
+        yield 'cbc', 'pycryptodome', lambda data, key, iv: Cryptodome.AES.new(
+            key, Cryptodome.AES.MODE_CBC, iv).decrypt(data)
+        yield 'ctr', 'pycryptodome', lambda data, key, iv: Cryptodome.AES.new(
+            key, Cryptodome.AES.MODE_CTR, nonce=b'', initial_value=iv).decrypt(data)
+
+
+def main():
+    args = parse_args()
+    key, iv = os.urandom(args.key_size), os.urandom(16)
+    data = os.urandom(args.size * 1024)
+    results = {}
+    print(f'{"mode":<6} {"implementation":<14} {"size":>10} {"throughput":>14}')
+    for mode, name, func in implementations():
+        sample = data[:args.reference_size * 1024] if name == 'reference' else data
+        start = time.perf_counter()
+        result = func(sample, key, iv)
+        elapsed = time.perf_counter() - start
+        if result[:1024] != results.setdefault(mode, result)[:1024]:
+            print(f'{mode} {name}: result differs from the reference implementation', file=sys.stderr)
+        print(f'{mode:<6} {name:<14} {len(sample) // 1024:>7}KiB {len(sample) / elapsed / 1024 ** 2:>9.2f}MiB/s')
+
+
+if __name__ == '__main__':
+    main()
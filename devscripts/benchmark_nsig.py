@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import argparse
+import re
+import time
+import urllib.request
+
+from test.helper import FakeYDL
+from test.test_youtube_signature import _NSIG_TESTS
+from yt_dlp.extractor import YoutubeIE
+from yt_dlp.jsinterp import JSInterpreter
+
+TESTDATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test', 'testdata', 'sigs')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Time solving the n challenge of the YouTube player test fixtures')
+    parser.add_argument(
+        'players', nargs='*', metavar='PLAYER', help='only benchmark players whose URL contains any of these')
+    parser.add_argument(
+        '-n', '--repeat', type=int, default=5, help='number of challenges to solve per player (default: %(default)s)')
+    return parser.parse_args()
+
+
+def load_player(url):
+    basename = 'player-{}.js'.format(re.sub(r'[/.-]', '_', re.match(r'.+/player/(.+)\.js$', url).group(1)))
+    fn = os.path.join(TESTDATA_DIR, basename)
+    if not os.path.exists(fn):
+        os.makedirs(TESTDATA_DIR, exist_ok=True)
+        urllib.request.urlretrieve(url, fn)
+    with open(fn, encoding='utf-8') as f:
+        return f.read()
+
+
+def solve(jscode, player_url, challenge, repeat, compiled):
+    ie = YoutubeIE(FakeYDL())
+    funcname = ie._extract_n_function_name(jscode, player_url=player_url)
+    jsi = JSInterpreter(jscode, compiled=compiled)
+    func = jsi.extract_function_from_code(*ie._fixup_n_function_code(*jsi.extract_function_code(funcname), jscode, player_url))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func([challenge])
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    args = parse_args()
+    totals = {False: 0, True: 0}
+    seen = set()
+    print(f'{"player":<40} {"interpreted":>12} {"compiled":>12} {"speedup":>8}')
+    for url, challenge, expected in _NSIG_TESTS:
+        if url in seen or (args.players and not any(p in url for p in args.players)):
+            continue
+        seen.add(url)
+        jscode = load_player(url)
+        timings = {}
+        for compiled in (False, True):
+            result, timings[compiled] = solve(jscode, url, challenge, args.repeat, compiled)
+            if result != expected:
+                print(f'{url}: got {result!r}, expected {expected!r} (compiled={compiled})', file=sys.stderr)
+            totals[compiled] += timings[compiled]
+        print(f'{url.split("/player/")[1][:40]:<40} {timings[False] * 1000:10.1f}ms {timings[True] * 1000:10.1f}ms '
+              f'{timings[False] / timings[True]:7.1f}x')
+    if seen:
+        print(f'{"total":<40} {totals[False] * 1000:10.1f}ms {totals[True] * 1000:10.1f}ms '
+              f'{totals[False] / totals[True]:7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -7,12 +7,23 @@
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
+import collections
+import re
+import string
 from inspect import getsource
 
+try:
+    import re._constants as sre_constants
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
 from devscripts.utils import get_filename_args, read_file, write_file
 from yt_dlp.extractor import import_extractors
 from yt_dlp.extractor.common import InfoExtractor, SearchInfoExtractor
 from yt_dlp.globals import extractors
+from yt_dlp.utils import variadic
 
 NO_ATTR = object()
 STATIC_CLASS_PROPERTIES = [
@@ -50,6 +61,7 @@ def main():
         *extra_ie_code(DummyInfoExtractor),
         '\nclass LazyLoadSearchExtractor(LazyLoadExtractor):\n    pass\n',
         *build_ies(list(extractors.value.values()), (InfoExtractor, SearchInfoExtractor), DummyInfoExtractor),
+        *build_url_index(list(extractors.value.values())),
     ))
 
     write_file(lazy_extractors_filename, f'{module_src}\n')
@@ -111,5 +123,190 @@ def build_lazy_ie(ie, name, attr_base):
     return s + '\n'.join(extra_ie_code(ie, attr_base))
 
 
+# Characters in URL tokens; see `yt_dlp.extractor.extractors.url_candidates`
+TOKEN_CHARS = frozenset(string.ascii_lowercase + string.digits)
+ANY = None  # Any character
+
+
+def is_separator(char):
+    # '' stands for the start/end of the URL. Non-ASCII characters may match ASCII ones case-insensitively
+    return char == '' or (char.isascii() and char.lower() not in TOKEN_CHARS)
+
+
+def union(*sets):
+    return ANY if ANY in sets else frozenset().union(*sets)
+
+
+class UrlTokens:
+    """Find sets of tokens that every URL matched by a regex must contain at least one of
+
+    A token is a maximal run of ASCII letters and digits of the lowercased URL.
+    Only sound results are returned; anything that can not be analysed yields nothing.
+    """
+
+    def __init__(self, pattern):
+        self.tree = sre_parse.parse(pattern)
+
+    def token_sets(self):
+        return list(self._sequence(list(self.tree), frozenset({''}), ANY))
+
+    def _charset(self, items):
+        chars = set()
+        for op, av in items:
+            if op is sre_constants.LITERAL:
+                chars.add(chr(av))
+            elif op is sre_constants.RANGE and av[1] - av[0] < 256:
+                chars.update(map(chr, range(av[0], av[1] + 1)))
+            elif op is sre_constants.CATEGORY and av in (
+                    sre_constants.CATEGORY_DIGIT, sre_constants.CATEGORY_UNI_DIGIT):
+                # Non-ASCII URLs are not looked up in the index
+                chars.update(string.digits)
+            elif op is sre_constants.CATEGORY and av in (
+                    sre_constants.CATEGORY_SPACE, sre_constants.CATEGORY_UNI_SPACE):
+                chars.update(string.whitespace)
+            elif op is sre_constants.CATEGORY and av in (
+                    sre_constants.CATEGORY_WORD, sre_constants.CATEGORY_UNI_WORD):
+                chars.update(string.ascii_letters + string.digits + '_')
+            else:
+                return ANY
+        return frozenset(chars)
+
+    def _info(self, item):
+        """Return (nullable, first chars, last chars) of an item"""
+        op, av = item
+        if op is sre_constants.LITERAL:
+            return False, frozenset({chr(av)}), frozenset({chr(av)})
+        elif op is sre_constants.IN:
+            chars = self._charset(av)
+            return False, chars, chars
+        elif op in (sre_constants.NOT_LITERAL, sre_constants.ANY):
+            return False, ANY, ANY
+        elif op is sre_constants.AT:
+            if av in (sre_constants.AT_BEGINNING, sre_constants.AT_BEGINNING_STRING):
+                return False, frozenset(), frozenset({'', '\n'})
+            elif av in (sre_constants.AT_END, sre_constants.AT_END_STRING):
+                return False, frozenset({'', '\n'}), frozenset()
+            return True, frozenset(), frozenset()
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            return True, frozenset(), frozenset()
+        elif op is sre_constants.SUBPATTERN:
+            return self._sequence_info(list(av[-1]))
+        elif op is getattr(sre_constants, 'ATOMIC_GROUP', NotImplemented):
+            return self._sequence_info(list(av))
+        elif op is sre_constants.BRANCH:
+            infos = [self._sequence_info(list(alt)) for alt in av[1]]
+            return any(i[0] for i in infos), union(*(i[1] for i in infos)), union(*(i[2] for i in infos))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT,
+                    getattr(sre_constants, 'POSSESSIVE_REPEAT', NotImplemented)):
+            nullable, first, last = self._sequence_info(list(av[2]))
+            return nullable or av[0] == 0, first, last
+        return True, ANY, ANY
+
+    def _sequence_info(self, items):
+        infos = [self._info(item) for item in items]
+        return all(i[0] for i in infos), self._context(infos, 1), self._context(infos[::-1], 2)
+
+    @staticmethod
+    def _context(infos, idx, outer=frozenset()):
+        """Characters that may appear at the edge of the sequence described by infos"""
+        chars = []
+        for info in infos:
+            chars.append(info[idx])
+            if not info[0]:
+                return union(*chars)
+        return union(*chars, outer)
+
+    def _sequence(self, items, before, after):
+        """Yield token sets for a sequence, given the characters that may precede and follow it"""
+        infos = [self._info(item) for item in items]
+        run = []
+        for i, (op, av) in enumerate(items):
+            if op is sre_constants.LITERAL:
+                run.append(chr(av).lower())
+                if i + 1 < len(items) and items[i + 1][0] is sre_constants.LITERAL:
+                    continue
+                start = i + 1 - len(run)
+                yield from self._literal_tokens(
+                    ''.join(run), self._context(infos[start - 1::-1] if start else [], 2, before),
+                    self._context(infos[i + 1:], 1, after))
+                run = []
+                continue
+
+            item_before = self._context(infos[i - 1::-1] if i else [], 2, before)
+            item_after = self._context(infos[i + 1:], 1, after)
+            if op is sre_constants.SUBPATTERN:
+                yield from self._sequence(list(av[-1]), item_before, item_after)
+            elif op is getattr(sre_constants, 'ATOMIC_GROUP', NotImplemented):
+                yield from self._sequence(list(av), item_before, item_after)
+            elif op is sre_constants.BRANCH:
+                tokens = set()
+                for alt in av[1]:
+                    alt_tokens = min(self._sequence(list(alt), item_before, item_after), key=len, default=None)
+                    if alt_tokens is None:
+                        break
+                    tokens.update(alt_tokens)
+                else:
+                    yield frozenset(tokens)
+            elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT,
+                        getattr(sre_constants, 'POSSESSIVE_REPEAT', NotImplemented)) and av[0] >= 1:
+                body = list(av[2])
+                _, first, last = self._sequence_info(body)
+                # Repetitions follow each other
+                yield from self._sequence(
+                    body, union(item_before, last) if av[1] > 1 else item_before,
+                    union(item_after, first) if av[1] > 1 else item_after)
+
+    @staticmethod
+    def _literal_tokens(text, before, after):
+        bounded_before = before is not ANY and all(map(is_separator, before))
+        bounded_after = after is not ANY and all(map(is_separator, after))
+        for mobj in re.finditer(r'[a-z0-9]+', text):
+            start, end = mobj.span()
+            if not (bounded_before if start == 0 else is_separator(text[start - 1])):
+                continue
+            if not (bounded_after if end == len(text) else is_separator(text[end])):
+                continue
+            yield frozenset({mobj.group()})
+
+
+def url_token_sets(ie):
+    """Return the candidate token sets of an extractor, or None if it can not be indexed"""
+    if ie._VALID_URL is False:
+        return []
+    candidates = None
+    for pattern in variadic(ie._VALID_URL):
+        token_sets = UrlTokens(pattern).token_sets()
+        if not token_sets:
+            return None
+        # Every regex must be covered; combine the alternatives of each regex
+        candidates = token_sets if candidates is None else [
+            a | b for a in candidates for b in token_sets][:64]
+    return candidates
+
+
+def build_url_index(ies):
+    """Build a lookup of URL tokens to the extractors whose _VALID_URL requires them
+
+    Extractors that can not be indexed are listed in _URL_FALLBACK and must always be tried.
+    """
+    token_sets = {ie.__name__: url_token_sets(ie) for ie in ies}
+    frequency = collections.Counter(
+        token for sets in token_sets.values() if sets for token in set().union(*sets))
+
+    index, fallback = collections.defaultdict(list), []
+    for name, sets in token_sets.items():
+        if sets is None:
+            fallback.append(name)
+            continue
+        if not sets:  # Never matches
+            continue
+        best = min(sets, key=lambda tokens: (sum(frequency[t] for t in tokens), len(tokens), -min(map(len, tokens))))
+        for token in best:
+            index[token].append(name)
+
+    yield f'\n_URL_FALLBACK = {tuple(fallback)!r}'
+    yield '_URL_INDEX = {%s}' % ', '.join(f'{token!r}: {tuple(names)!r}' for token, names in sorted(index.items()))
+
+
 if __name__ == '__main__':
     main()
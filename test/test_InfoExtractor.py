@@ -13,6 +13,7 @@
 
 from test.helper import FakeYDL, expect_dict, expect_value, http_server_port
 from yt_dlp.compat import compat_etree_fromstring
+from yt_dlp.downloader.hls import HlsFD
 from yt_dlp.extractor import YoutubeIE, get_info_extractor
 from yt_dlp.extractor.common import InfoExtractor
 from yt_dlp.utils import (
@@ -48,6 +49,12 @@ def do_GET(self):
             self.send_header('Content-Length', str(len(data)))
             self.end_headers()
             self.wfile.write(data)
+        elif self.path == '/vod.m3u8':
+            data = b'#EXTM3U\n#EXT-X-TARGETDURATION:10\n#EXTINF:10,\nseg0.ts\n#EXT-X-ENDLIST\n'
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
         else:
             assert False
 
@@ -2154,6 +2161,20 @@ def test_extract_m3u8_formats(self):
         self.assertTrue(formats)
         self.assertTrue(subtitles)
 
+    def test_extract_m3u8_formats_playlist_cache(self):
+        playlist_cache = HlsFD.playlist_cache(self.ydl)
+        master_url = f'http://127.0.0.1:{self.port}/bipbop.m3u8'
+        self.ie._extract_m3u8_formats_and_subtitles(master_url, None)
+        self.assertIsNone(playlist_cache.get(master_url))
+
+        # VOD media playlists are kept for the download
+        vod_url = f'http://127.0.0.1:{self.port}/vod.m3u8'
+        formats = self.ie._extract_m3u8_formats(vod_url, None)
+        self.assertEqual(formats[0]['url'], vod_url)
+        self.assertEqual(
+            [segment.url for segment in playlist_cache.get(vod_url).segments],
+            [f'http://127.0.0.1:{self.port}/seg0.ts'])
+
     def test_extract_m3u8_formats_warning(self):
         formats, subtitles = self.ie._extract_m3u8_formats_and_subtitles(
             f'http://127.0.0.1:{self.port}/fake.m3u8', None, fatal=False)
@@ -13,17 +13,28 @@
 
 import contextlib
 import copy
+import io
 import json
+import random
+import tempfile
+import threading
+import time
 
 from test.helper import FakeYDL, assertRegexpMatches, try_rm
 from yt_dlp import YoutubeDL
 from yt_dlp.extractor import YoutubeIE
 from yt_dlp.extractor.common import InfoExtractor
 from yt_dlp.postprocessor.common import PostProcessor
+from yt_dlp.postprocessor.merger import NativeMergerPP
 from yt_dlp.utils import (
+    DownloadCancelled,
+    ExistingVideoReached,
     ExtractorError,
+    FragmentList,
     LazyList,
+    MaxDownloadsReached,
     OnDemandPagedList,
+    PostProcessingError,
     int_or_none,
     match_filter_func,
 )
@@ -578,11 +589,12 @@ def test_format_filtering(self):
 
     @patch('yt_dlp.postprocessor.ffmpeg.FFmpegMergerPP.available', False)
     def test_default_format_spec_without_ffmpeg(self):
+        native = f'{NativeMergerPP.FORMAT_SPEC}/best/bestvideo+bestaudio'
         ydl = YDL({})
-        self.assertEqual(ydl._default_format_spec({}), 'best/bestvideo+bestaudio')
+        self.assertEqual(ydl._default_format_spec({}), native)
 
         ydl = YDL({'simulate': True})
-        self.assertEqual(ydl._default_format_spec({}), 'best/bestvideo+bestaudio')
+        self.assertEqual(ydl._default_format_spec({}), native)
 
         ydl = YDL({})
         self.assertEqual(ydl._default_format_spec({'is_live': True}), 'best/bestvideo+bestaudio')
@@ -594,9 +606,12 @@ def test_default_format_spec_without_ffmpeg(self):
         self.assertEqual(ydl._default_format_spec({}), 'best/bestvideo+bestaudio')
 
         ydl = YDL({})
-        self.assertEqual(ydl._default_format_spec({}), 'best/bestvideo+bestaudio')
+        self.assertEqual(ydl._default_format_spec({}), native)
         self.assertEqual(ydl._default_format_spec({'is_live': True}), 'best/bestvideo+bestaudio')
 
+        ydl = YDL({'native_merge': False})
+        self.assertEqual(ydl._default_format_spec({}), 'best/bestvideo+bestaudio')
+
     @patch('yt_dlp.postprocessor.ffmpeg.FFmpegMergerPP.available', True)
     @patch('yt_dlp.postprocessor.ffmpeg.FFmpegMergerPP.can_merge', lambda _: True)
     def test_default_format_spec_with_ffmpeg(self):
@@ -619,6 +634,31 @@ def test_default_format_spec_with_ffmpeg(self):
         self.assertEqual(ydl._default_format_spec({}), 'bestvideo*+bestaudio/best')
         self.assertEqual(ydl._default_format_spec({'is_live': True}), 'best/bestvideo+bestaudio')
 
+    def test_merger_selection(self):
+        class MergeYDL(FakeYDL):
+            def dl(self, name, info, subtitle=False, test=False):
+                return True, True
+
+            def post_process(self, filename, info, files_to_move=None):
+                self.mergers.extend(type(pp).__name__ for pp in info['__postprocessors'])
+                return info
+
+        def merger(available, params=None):
+            ydl = MergeYDL({'format': 'bv+ba', 'writeinfojson': False, 'ignoreerrors': True, **(params or {})})
+            ydl.mergers = []
+            with patch('yt_dlp.postprocessor.ffmpeg.FFmpegMergerPP.available', available):
+                ydl.process_ie_result(_make_result([
+                    {'format_id': 'v', 'ext': 'mp4', 'vcodec': 'avc1', 'acodec': 'none', 'url': TEST_URL},
+                    {'format_id': 'a', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a', 'url': TEST_URL},
+                ]))
+            return ydl.mergers
+
+        # The native merger is opt-in while ffmpeg is available
+        self.assertEqual(merger(True), ['FFmpegMergerPP'])
+        self.assertEqual(merger(True, {'native_merge': True}), ['NativeMergerPP'])
+        self.assertEqual(merger(False), ['NativeMergerPP'])
+        self.assertEqual(merger(False, {'native_merge': False}), [])
+
 
 class TestYoutubeDL(unittest.TestCase):
     def test_subtitles(self):
@@ -1362,6 +1402,33 @@ def _test():
         ydl.deprecated_feature = ydl.report_error
         test('test=value', [], headers=True, error_re=r'Passing cookies as a header is a potential security risk')
 
+    def test_infojson_fragment_list(self):
+        fragments = FragmentList([{'path': 'init.mp4'}], FragmentList.from_template('%(Number)d.m4s', 1, 1000))
+        info = _make_result([{
+            'url': 'http://127.0.0.1/manifest.mpd',
+            'format_id': 'dash',
+            'protocol': 'http_dash_segments',
+            'fragment_base_url': 'http://127.0.0.1/',
+            'fragments': fragments,
+        }])
+        ydl = FakeYDL()
+        sanitized = ydl.sanitize_info(ydl.process_ie_result(info, download=False), True)
+        serialized = json.dumps(sanitized)
+        self.assertLess(len(serialized), 2000)
+
+        loaded = ydl.process_ie_result(json.loads(serialized), download=False)
+        self.assertIsInstance(loaded['formats'][0]['fragments'], FragmentList)
+        self.assertEqual(loaded['formats'][0]['fragments'], fragments)
+
+    def test_outtmpl_fragment_list(self):
+        fragments = FragmentList([{'path': 'init.mp4'}], FragmentList.from_template('%(Number)d.m4s', 1, 2))
+        info = {'id': 'id', 'formats': [{'format_id': 'dash', 'fragments': fragments}]}
+        expected = [{'path': 'init.mp4'}, {'path': '1.m4s', 'duration': None}, {'path': '2.m4s', 'duration': None}]
+        ydl = FakeYDL()
+        self.assertEqual(json.loads(ydl.evaluate_outtmpl('%(formats.0.fragments)j', info)), expected)
+        self.assertEqual(json.loads(ydl.evaluate_outtmpl('%(formats)j', info))[0]['fragments'], expected)
+        self.assertEqual(repr(fragments), '<FragmentList of 3 fragments>')
+
     def test_infojson_cookies(self):
         TEST_FILE = 'test_infojson_cookies.info.json'
         TEST_URL = 'https://example.com/example.mp4'
@@ -1429,6 +1496,253 @@ def check_for_cookie_header(result):
         self.assertFalse(result.get('cookies'), msg='Cookies set in cookies field for wrong domain')
         self.assertFalse(ydl.cookiejar.get_cookie_header(fmt['url']), msg='Cookies set in cookiejar for wrong domain')
 
+    def test_concurrent_entries(self):
+        class ThreadedYDL(FakeYDL):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.processed, self.threads = [], set()
+
+            def process_info(self, info_dict):
+                # Finish entries out of order
+                time.sleep(random.random() / 50)
+                super().process_info(info_dict)
+                self.processed.append(info_dict['id'])
+                self.threads.add(threading.current_thread().name)
+
+        def process_playlist(ydl):
+            return ydl.process_ie_result({
+                '_type': 'playlist',
+                'id': 'test',
+                'extractor': 'test:playlist',
+                'extractor_key': 'test:playlist',
+                'webpage_url': 'http://example.com',
+                'entries': [{'id': str(i), 'title': str(i), 'url': TEST_URL} for i in range(1, 21)],
+            })
+
+        ydl = ThreadedYDL({'simulate': True, 'concurrent_entries': 4})
+        result = process_playlist(ydl)
+        self.assertEqual([e['id'] for e in result['entries']], [str(i) for i in range(1, 21)])
+        self.assertEqual([e['playlist_index'] for e in result['entries']], list(range(1, 21)))
+        self.assertEqual(sorted(ydl.processed, key=int), [str(i) for i in range(1, 21)])
+        self.assertTrue(all(name.startswith('yt-dlp-entry') for name in ydl.threads))
+
+        result = process_playlist(ThreadedYDL({'simulate': True, 'concurrent_entries': 4, 'playlistreverse': True}))
+        self.assertEqual([e['id'] for e in result['entries']], [str(i) for i in range(20, 0, -1)])
+
+        ydl = ThreadedYDL({'simulate': True, 'concurrent_entries': 4, 'max_downloads': 3})
+        with self.assertRaises(MaxDownloadsReached):
+            process_playlist(ydl)
+        self.assertEqual(ydl._num_downloads, 3)
+
+    def test_concurrent_entries_autonumber(self):
+        class ThreadedYDL(FakeYDL):
+            def prepare_filename(self, *args, **kwargs):
+                # Let other entries update the counters in the meantime
+                time.sleep(random.random() / 100)
+                return super().prepare_filename(*args, **kwargs)
+
+            def dl(self, name, info, subtitle=False, test=False):
+                # Fails if two entries are given the same filename
+                with open(name, 'x'):
+                    pass
+                return True, True
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ydl = ThreadedYDL({
+                'concurrent_entries': 4,
+                'paths': {'home': tmpdir},
+                'outtmpl': '%(autonumber)s-%(video_autonumber)s.%(ext)s',
+            })
+            ydl.process_ie_result({
+                '_type': 'playlist',
+                'id': 'test',
+                'extractor': 'test:playlist',
+                'extractor_key': 'test:playlist',
+                'webpage_url': 'http://example.com',
+                'entries': [{'id': str(i), 'title': str(i), 'url': TEST_URL} for i in range(1, 21)],
+            })
+            numbers = [
+                tuple(map(int, name[:-len('.mp4')].split('-')))
+                for name in os.listdir(tmpdir) if name.endswith('.mp4')]
+        self.assertEqual(sorted(autonumber for autonumber, _ in numbers), list(range(1, 21)))
+        self.assertEqual(sorted(video_autonumber for _, video_autonumber in numbers), list(range(1, 21)))
+
+    def test_concurrent_entries_break(self):
+        class ThreadedYDL(FakeYDL):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.processed = []
+
+            def process_info(self, info_dict):
+                try:
+                    super().process_info(info_dict)
+                finally:
+                    # Whether the entry has started its download
+                    if '__num_downloads' in info_dict:
+                        self.processed.append(info_dict['id'])
+
+        class EntryIE(InfoExtractor):
+            _VALID_URL = r'entry:(?P<id>\d+)'
+
+            def _real_extract(self, url):
+                video_id = self._match_id(url)
+                if video_id == '0':
+                    raise ExtractorError('Extraction failed', expected=True)
+                # The first entries finish in order and the later ones only after those stopped the download
+                time.sleep(0.2 if int(video_id) > 3 else int(video_id) / 50)
+                return {'id': video_id, 'title': video_id, 'url': TEST_URL}
+
+        def process_playlist(params):
+            ydl = ThreadedYDL({'simulate': True, 'concurrent_entries': 4, **params})
+            ydl.add_info_extractor(EntryIE(ydl))
+            # The ids are only known after extracting the entries
+            with self.assertRaises(DownloadCancelled) as cm:
+                ydl.process_ie_result({
+                    '_type': 'playlist',
+                    'id': 'test',
+                    'extractor': 'test:playlist',
+                    'extractor_key': 'test:playlist',
+                    'webpage_url': 'http://example.com',
+                    'entries': [{'_type': 'url', 'ie_key': EntryIE.ie_key(), 'url': f'entry:{i}'} for i in range(1, 21)],
+                })
+            return ydl, cm.exception
+
+        ydl, err = process_playlist({'download_archive': {'entry 3'}, 'break_on_existing': True})
+        self.assertIsInstance(err, ExistingVideoReached)
+        self.assertEqual(sorted(ydl.processed, key=int), ['1', '2'])
+
+        ydl, err = process_playlist({'max_downloads': 2})
+        self.assertIsInstance(err, MaxDownloadsReached)
+        self.assertEqual(sorted(ydl.processed, key=int), ['1', '2'])
+        self.assertEqual(ydl._num_downloads, 2)
+
+        # The entries after too many failures are not downloaded either
+        errors = []
+        ydl = ThreadedYDL({'simulate': True, 'concurrent_entries': 4, 'skip_playlist_after_errors': 1})
+        ydl.trouble = lambda message=None, *args, **kwargs: errors.append(message)
+        ydl.add_info_extractor(EntryIE(ydl))
+        ydl.process_ie_result({
+            '_type': 'playlist',
+            'id': 'test',
+            'extractor': 'test:playlist',
+            'extractor_key': 'test:playlist',
+            'webpage_url': 'http://example.com',
+            'entries': [{'_type': 'url', 'ie_key': EntryIE.ie_key(), 'url': f'entry:{i}'} for i in (0, *range(4, 20))],
+        })
+        self.assertEqual(ydl.processed, [])
+        self.assertEqual(len(errors), 2)
+        self.assertIn('Skipping the remaining entries', errors[1])
+
+    def test_concurrent_entries_output(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            ydl = YoutubeDL({'noprogress': True})
+        ydl.to_screen('main')
+        worker = threading.Thread(target=lambda: (
+            setattr(ydl._entry_worker, 'active', True), setattr(ydl._entry_worker, 'index', 2),
+            ydl.to_screen('worker')))
+        worker.start()
+        worker.join()
+        self.assertEqual(stdout.getvalue().splitlines(), ['main', '[item 3] worker'])
+
+    def test_background_postprocessing(self):
+        class PP(PostProcessor):
+            def __init__(self, ydl, events, when):
+                super().__init__(ydl)
+                self.events, self.when = events, when
+
+            def run(self, info):
+                if self.when == 'post_process':
+                    # Finish out of order
+                    time.sleep(random.random() / 50)
+                    if info['id'] == 'fail':
+                        raise PostProcessingError('failed')
+                self.events.append((self.when, info['id'], threading.current_thread().name))
+                return [], info
+
+        class BackgroundYDL(FakeYDL):
+            def dl(self, name, info, subtitle=False, test=False):
+                self.events.append(('download', info['id'], threading.current_thread().name))
+                with open(name, 'wb'):
+                    pass
+                return True, True
+
+        def process_playlist(ydl, ids):
+            return ydl.process_ie_result({
+                '_type': 'playlist',
+                'id': 'test',
+                'extractor': 'test:playlist',
+                'extractor_key': 'test:playlist',
+                'webpage_url': 'http://example.com',
+                'entries': [{'id': i, 'title': i, 'url': TEST_URL, 'ext': 'mp4'} for i in ids],
+            })
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            def make_ydl(params=None):
+                ydl = BackgroundYDL({
+                    'outtmpl': os.path.join(tmpdir, '%(id)s.%(ext)s'), 'writeinfojson': False, 'quiet': True,
+                    'download_archive': os.path.join(tmpdir, 'archive.txt'), 'background_postprocessing': 3,
+                    **(params or {}),
+                })
+                ydl.events = []
+                for when in ('post_process', 'after_move', 'after_video'):
+                    ydl.add_post_processor(PP(ydl, ydl.events, when), when)
+                return ydl
+
+            ids = [str(i) for i in range(1, 11)]
+            ydl = make_ydl()
+            process_playlist(ydl, ids)
+            ydl.close()
+            # Videos are post-processed in the background and finished in download order
+            self.assertEqual([i for event, i, _ in ydl.events if event == 'download'], ids)
+            self.assertEqual(sorted(i for event, i, _ in ydl.events if event == 'post_process'), sorted(ids))
+            self.assertEqual([i for event, i, _ in ydl.events if event == 'after_move'], ids)
+            self.assertEqual([i for event, i, _ in ydl.events if event == 'after_video'], ids)
+            self.assertTrue(all(
+                thread.startswith('yt-dlp-postprocess') for event, _, thread in ydl.events if event != 'download'))
+            with open(os.path.join(tmpdir, 'archive.txt'), encoding='utf-8') as f:
+                self.assertEqual(f.read().splitlines(), [f'test:playlist {i}' for i in ids])
+
+            # A failed video is not recorded, and the error is raised in the downloading thread
+            ydl = make_ydl()
+            with self.assertRaisesRegex(Exception, 'Postprocessing: failed'):
+                process_playlist(ydl, ['11', 'fail', '12'])
+            ydl.close()
+            with open(os.path.join(tmpdir, 'archive.txt'), encoding='utf-8') as f:
+                self.assertNotIn('fail', f.read())
+
+            # The playlist JSON is only updated once the entries are post-processed
+            ydl = make_ydl({
+                'writeinfojson': True, 'allow_playlist_files': True, 'clean_infojson': False,
+                'outtmpl': {
+                    'default': os.path.join(tmpdir, '%(id)s.%(ext)s'),
+                    'pl_infojson': os.path.join(tmpdir, 'pl'),
+                },
+            })
+            process_playlist(ydl, ['14', '15'])
+            ydl.close()
+            with open(os.path.join(tmpdir, 'pl.info.json'), encoding='utf-8') as f:
+                self.assertEqual(
+                    traverse_obj(json.load(f), ('entries', ..., 'requested_downloads', ..., 'filepath')),
+                    [os.path.join(tmpdir, f'{i}.mp4') for i in ('14', '15')])
+
+            # The JSON is only written once the video is post-processed
+            info_file = os.path.join(tmpdir, 'info.json')
+            with open(info_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'id': '13', 'title': '13', 'url': TEST_URL, 'ext': 'mp4',
+                    'extractor': 'test', 'extractor_key': 'test', 'webpage_url': 'http://example.com',
+                }, f)
+            ydl = make_ydl({'dump_single_json': True})
+            output = []
+            ydl.to_stdout = lambda message, *args, **kwargs: output.append(message)
+            ydl.download_with_info_file(info_file)
+            ydl.close()
+            self.assertEqual(len(output), 1)
+            self.assertEqual(
+                traverse_obj(json.loads(output[0]), ('requested_downloads', ..., 'filepath')),
+                [os.path.join(tmpdir, '13.mp4')])
+
     def test_load_plugins_compat(self):
         # Should try to reload plugins if they haven't already been loaded
         all_plugins_loaded.value = False
@@ -9,12 +9,17 @@
 
 
 import base64
+import random
 
 from yt_dlp.aes import (
+    _cbc_decrypt_words,
+    _gcm_decrypt_and_verify_words,
     aes_cbc_decrypt,
     aes_cbc_decrypt_bytes,
     aes_cbc_encrypt,
+    aes_cbc_encrypt_bytes,
     aes_ctr_decrypt,
+    aes_ctr_decrypt_bytes,
     aes_ctr_encrypt,
     aes_decrypt,
     aes_decrypt_text,
@@ -139,6 +144,36 @@ def test_key_expansion(self):
             0xE8, 0xA6, 0xC1, 0xE9, 0xC0, 0x4C, 0xE3, 0xF9, 0xE9, 0x3C, 0x9C, 0x3A, 0xD9, 0x58, 0x54, 0xF3,
             0xB4, 0x86, 0xCC, 0xDC, 0x74, 0xCA, 0x2F, 0x25, 0x9D, 0xF6, 0xB3, 0x1F, 0x44, 0xAE, 0xE7, 0xEC])
 
+    def test_native_bytes(self):
+        # The word-based implementation must match the per-byte one
+        rng = random.Random(42)
+        for key_size in (16, 24, 32):
+            key, iv = rng.randbytes(key_size), rng.randbytes(16)
+            for length in (0, 1, 15, 16, 17, 64, 1000):
+                data = rng.randbytes(length)
+                with self.subTest(key_size=key_size, length=length):
+                    self.assertEqual(
+                        _cbc_decrypt_words(data, key, iv), bytes(aes_cbc_decrypt(list(data), list(key), list(iv))))
+                    self.assertEqual(
+                        aes_ctr_decrypt_bytes(data, key, iv), bytes(aes_ctr_decrypt(list(data), list(key), list(iv))))
+                    for padding_mode in ('pkcs7', 'iso7816', 'whitespace', 'zero'):
+                        self.assertEqual(
+                            aes_cbc_encrypt_bytes(data, key, iv, padding_mode=padding_mode),
+                            bytes(aes_cbc_encrypt(list(data), list(key), list(iv), padding_mode=padding_mode)))
+
+    def test_native_gcm(self):
+        key = bytes(self.key)
+        for data, tag in (
+            (b'\x159Y\xcf5eud\x90\x9c\x85&]\x14\x1d\x0f.\x08\xb4T\xe4/\x17\xbd',
+             b'\xe8&I\x80rI\x07\x9d}YWuU@:e'),
+            (b'\x159Y\xcf5eud\x90\x9c\x85&]\x14\x1d\x0f', b'\x08\xb1\x9d!&\x98\xd0\xeaRq\x90\xe6;\xb5]\xd8'),
+        ):
+            decrypted = _gcm_decrypt_and_verify_words(data, key, tag, bytes(self.iv[:12]))
+            self.assertEqual(decrypted, bytes(aes_gcm_decrypt_and_verify(
+                list(data), self.key, list(tag), self.iv[:12])))
+            with self.assertRaises(ValueError):
+                _gcm_decrypt_and_verify_words(data, key, bytes(16), bytes(self.iv[:12]))
+
     def test_pad_block(self):
         block = [0x21, 0xA0, 0x43, 0xFF]
 
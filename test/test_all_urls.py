@@ -10,8 +10,9 @@
 
 import collections
 
-from test.helper import gettestcases
+from test.helper import FakeYDL, gettestcases
 from yt_dlp.extractor import FacebookIE, YoutubeIE, gen_extractors
+from yt_dlp.globals import LAZY_EXTRACTORS
 
 
 class TestAllURLsMatching(unittest.TestCase):
@@ -117,6 +118,17 @@ def test_no_duplicated_ie_names(self):
                 len(ie_list), 1,
                 f'Multiple extractors with the same IE_NAME "{ie_name}" ({", ".join(ie_list)})')
 
+    @unittest.skipUnless(LAZY_EXTRACTORS.value, 'Lazy extractors are not in use')
+    def test_url_index(self):
+        ydl = FakeYDL()
+        for tc in gettestcases(include_onlymatching=True):
+            url = tc['url']
+            with self.subTest(url=url):
+                self.assertEqual(
+                    next((key for key, ie in ydl._candidate_ies(url) if ie.suitable(url)), None),
+                    next((key for key, ie in ydl._ies.items() if ie.suitable(url)), None))
+        ydl.close()
+
 
 if __name__ == '__main__':
     unittest.main()
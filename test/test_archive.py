@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import shutil
+
+from test.helper import FakeYDL
+from yt_dlp.archive import (
+    IndexedDownloadArchive,
+    SQLiteDownloadArchive,
+    TextDownloadArchive,
+    load_download_archive,
+)
+from yt_dlp.dependencies import sqlite3
+from yt_dlp.utils import YoutubeDLError
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_DIR = os.path.join(TEST_DIR, 'testdata', 'archive_test')
+
+
+class TestDownloadArchive(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+        os.makedirs(ARCHIVE_DIR)
+        self.filename = os.path.join(ARCHIVE_DIR, 'archive.txt')
+
+    def tearDown(self):
+        if os.path.exists(ARCHIVE_DIR):
+            shutil.rmtree(ARCHIVE_DIR)
+
+    def _write(self, *lines):
+        with open(self.filename, 'a', encoding='utf-8') as f:
+            f.writelines(f'{line}\n' for line in lines)
+
+    def _read(self):
+        with open(self.filename, encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    def test_text(self):
+        self._write('youtube a', '', 'youtube b  ')
+        with TextDownloadArchive(FakeYDL(), self.filename) as archive:
+            self.assertEqual(len(archive), 2)
+            self.assertIn('youtube a', archive)
+            self.assertIn('youtube b', archive)
+            self.assertNotIn('youtube c', archive)
+            archive.add('youtube c')
+            self.assertIn('youtube c', archive)
+        self.assertEqual(self._read(), ['youtube a', '', 'youtube b  ', 'youtube c'])
+
+    def test_index(self):
+        ids = [f'youtube {i:011d}' for i in range(1000)]
+        self._write(*ids)
+        with IndexedDownloadArchive(FakeYDL(), self.filename) as archive:
+            self.assertTrue(os.path.exists(archive.index_filename))
+            self.assertEqual(len(archive), 1000)
+            for id_ in ids:
+                self.assertIn(id_, archive)
+            self.assertNotIn('youtube x', archive)
+            self.assertNotIn('vimeo 00000000000', archive)
+
+            archive.add('youtube x')
+            self.assertIn('youtube x', archive)
+            self.assertEqual(len(self._read()), 1000)  # batched
+        self.assertEqual(self._read()[-1], 'youtube x')
+
+        # Lines appended by other processes are picked up without rebuilding
+        self._write('youtube y')
+        with IndexedDownloadArchive(FakeYDL(), self.filename) as archive:
+            self.assertEqual(len(archive._tail), 2)
+            self.assertIn('youtube x', archive)
+            self.assertIn('youtube y', archive)
+            self.assertIn(ids[500], archive)
+
+    def test_index_rebuild(self):
+        self._write('youtube a', 'youtube b')
+        with IndexedDownloadArchive(FakeYDL(), self.filename) as archive:
+            self.assertIn('youtube a', archive)
+
+        # The text file is the source of truth; a rewritten file invalidates the index
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            f.write('youtube c\nyoutube d\n')
+        with IndexedDownloadArchive(FakeYDL(), self.filename) as archive:
+            self.assertEqual(len(archive._tail), 0)
+            self.assertNotIn('youtube a', archive)
+            self.assertIn('youtube c', archive)
+
+        # Large unindexed tails are folded into the index
+        self._write(*(f'youtube {i}' for i in range(IndexedDownloadArchive.MAX_TAIL_SIZE + 1)))
+        with IndexedDownloadArchive(FakeYDL(), self.filename) as archive:
+            self.assertEqual(len(archive._tail), 0)
+            self.assertEqual(len(archive), IndexedDownloadArchive.MAX_TAIL_SIZE + 3)
+            self.assertIn('youtube 0', archive)
+
+    def test_index_missing_file(self):
+        with IndexedDownloadArchive(FakeYDL(), self.filename) as archive:
+            self.assertEqual(len(archive), 0)
+            self.assertNotIn('youtube a', archive)
+            archive.add('youtube a')
+        self.assertEqual(self._read(), ['youtube a'])
+
+    @unittest.skipUnless(sqlite3, 'sqlite3 is not available')
+    def test_sqlite(self):
+        self._write('youtube a', 'youtube b')
+        with SQLiteDownloadArchive(FakeYDL(), self.filename) as archive:
+            self.assertTrue(archive)
+            self.assertEqual(len(archive), 2)
+            self.assertIn('youtube a', archive)
+            self.assertNotIn('youtube c', archive)
+
+            # IDs recorded by other processes are seen without reloading
+            with SQLiteDownloadArchive(FakeYDL(), self.filename) as other:
+                other.add('youtube c')
+            self.assertIn('youtube c', archive)
+
+            # Lines written to the text file directly are imported on startup
+            self._write('youtube d')
+            self.assertNotIn('youtube d', archive)
+        with SQLiteDownloadArchive(FakeYDL(), self.filename) as archive:
+            self.assertIn('youtube d', archive)
+        self.assertEqual(self._read(), ['youtube a', 'youtube b', 'youtube c', 'youtube d'])
+
+    @unittest.skipUnless(sqlite3, 'sqlite3 is not available')
+    def test_sqlite_claims(self):
+        first = SQLiteDownloadArchive(FakeYDL(), self.filename)
+        second = SQLiteDownloadArchive(FakeYDL(), self.filename)
+        try:
+            self.assertTrue(first.claim('youtube a'))
+            self.assertTrue(first.claim('youtube a'))
+            self.assertFalse(second.claim('youtube a'))
+            first.release('youtube a')
+            self.assertTrue(second.claim('youtube a'))
+            second.add('youtube a')
+            self.assertFalse(first.claim('youtube a'))
+
+            # Claims are released on close
+            self.assertTrue(first.claim('youtube b'))
+            first.close()
+            self.assertTrue(second.claim('youtube b'))
+
+            # Stale claims are taken over
+            self.assertTrue(first.claim('youtube c'))
+            self.assertFalse(second.claim('youtube c'))
+            second.CLAIM_TIMEOUT = -1
+            self.assertTrue(second.claim('youtube c'))
+        finally:
+            first.close()
+            second.close()
+
+    @unittest.skipUnless(sqlite3, 'sqlite3 is not available')
+    def test_sqlite_rewritten(self):
+        self._write('youtube a')
+        with SQLiteDownloadArchive(FakeYDL(), self.filename) as archive:
+            self.assertIn('youtube a', archive)
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            f.write('youtube b\n')
+        with SQLiteDownloadArchive(FakeYDL(), self.filename) as archive:
+            self.assertNotIn('youtube a', archive)
+            self.assertIn('youtube b', archive)
+
+    def test_load_download_archive(self):
+        ydl = FakeYDL()
+        for backend, expected in [
+            (None, TextDownloadArchive),
+            ('index', IndexedDownloadArchive),
+            (IndexedDownloadArchive, IndexedDownloadArchive),
+        ]:
+            with load_download_archive(ydl, self.filename, backend) as archive:
+                self.assertIsInstance(archive, expected)
+        with self.assertRaises(YoutubeDLError):
+            load_download_archive(ydl, self.filename, 'invalid')
+
+
+if __name__ == '__main__':
+    unittest.main()
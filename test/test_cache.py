@@ -9,9 +9,12 @@
 
 
 import shutil
+import time
 
 from test.helper import FakeYDL
-from yt_dlp.cache import Cache
+from yt_dlp.cache import Cache, CacheStore, FileCacheStore, SQLiteCacheStore
+from yt_dlp.dependencies import sqlite3
+from yt_dlp.utils import YoutubeDLError
 
 
 def _is_empty(d):
@@ -52,6 +55,149 @@ def test_cache(self):
         self.assertFalse(os.path.exists(self.test_dir))
         self.assertEqual(c.load('test_cache', 'k.'), None)
 
+    def test_prune(self):
+        ydl = FakeYDL({
+            'cachedir': self.test_dir,
+        })
+        c = Cache(ydl)
+        for i in range(5):
+            c.store('test_cache', f'k{i}', 'x' * 100)
+            fn = c._get_cache_fn('test_cache', f'k{i}', 'json')
+            os.utime(fn, (i, i))
+        size = os.path.getsize(fn)
+        # Loading an entry marks it as recently used
+        self.assertEqual(c.load('test_cache', 'k0'), 'x' * 100)
+        c.prune('test_cache', size * 3)
+        self.assertEqual(
+            [c.load('test_cache', f'k{i}') is not None for i in range(5)],
+            [True, False, False, True, True])
+        c.prune('test_cache', 0)
+        self.assertTrue(_is_empty(os.path.join(self.test_dir, 'test_cache')))
+
+    def test_memory(self):
+        c = Cache(FakeYDL({'cachedir': self.test_dir}))
+        c.store('test_cache', 'k', {'x': [1]})
+        data = c.load('test_cache', 'k')
+        self.assertEqual(data, {'x': [1]})
+        self.assertIn(('test_cache', 'k'), c._memory)
+
+        # Returned data can be modified without affecting the cache
+        data['x'].append(2)
+        self.assertEqual(c.load('test_cache', 'k'), {'x': [1]})
+
+        # Entries replaced by another process are reloaded
+        Cache(FakeYDL({'cachedir': self.test_dir})).store('test_cache', 'k', {'x': [3, 4]})
+        self.assertEqual(c.load('test_cache', 'k'), {'x': [3, 4]})
+        os.remove(c._get_cache_fn('test_cache', 'k', 'json'))
+        self.assertEqual(c.load('test_cache', 'k'), None)
+
+        for i in range(Cache.MEMORY_CACHE_SIZE + 1):
+            c.store('test_cache', f'k{i}', i)
+            c.load('test_cache', f'k{i}')
+        self.assertEqual(len(c._memory), Cache.MEMORY_CACHE_SIZE)
+        self.assertNotIn(('test_cache', 'k0'), c._memory)
+
+    def test_ttl(self):
+        c = Cache(FakeYDL({'cachedir': self.test_dir}))
+        c.store('test_cache', 'k', 'v', ttl=60)
+        self.assertEqual(c.load('test_cache', 'k'), 'v')
+        c.store('test_cache', 'k', 'v', ttl=-1)
+        self.assertEqual(c.load('test_cache', 'k', default='d'), 'd')
+        self.assertFalse(os.path.exists(c._get_cache_fn('test_cache', 'k', 'json')))
+
+        # Expired entries are pruned even when the cache is not full
+        c.store('test_cache', 'k1', 'v', ttl=60)
+        c.store('test_cache', 'k2', 'v', ttl=-1)
+        c.store('test_cache', 'k3', 'v')
+        c.prune('test_cache', Cache.MAX_SIZE)
+        self.assertEqual(
+            [os.path.exists(c._get_cache_fn('test_cache', f'k{i}', 'json')) for i in range(1, 4)],
+            [True, False, True])
+
+    def test_prune_interval(self):
+        c = Cache(FakeYDL({'cachedir': self.test_dir}))
+        pruned = []
+        c.prune = lambda section, max_size: pruned.append(section)
+        for i in range(Cache.PRUNE_INTERVAL * 2):
+            c.store('test_cache', 'k', i)
+            self.assertEqual(len(pruned), (i + 1) // Cache.PRUNE_INTERVAL)
+
+    def test_max_size(self):
+        c = Cache(FakeYDL({'cachedir': self.test_dir, 'cache_max_size': 1000}))
+        c.PRUNE_INTERVAL = 0
+        for i in range(5):
+            c.store(f'test_cache{i % 2}', f'k{i}', 'x' * 200)
+            os.utime(c._get_cache_fn(f'test_cache{i % 2}', f'k{i}', 'json'), (i, i))
+        c.store('test_cache', 'k', 'x' * 200)
+        self.assertEqual(
+            [c.load(f'test_cache{i % 2}', f'k{i}') is not None for i in range(5)],
+            [False, False, True, True, True])
+        self.assertEqual(c.load('test_cache', 'k'), 'x' * 200)
+
+    @unittest.skipUnless(sqlite3, 'sqlite3 is not available')
+    def test_sqlite(self):
+        ydl = FakeYDL({'cachedir': self.test_dir, 'cache_store': 'sqlite'})
+        c = Cache(ydl)
+        try:
+            self.assertIsInstance(c._store, SQLiteCacheStore)
+            obj = {'x': 1, 'y': ['ä', '\\a', True]}
+            self.assertEqual(c.load('test_cache', 'k.'), None)
+            c.store('test_cache', 'k.', obj)
+            self.assertEqual(c.load('test_cache', 'k.'), obj)
+            self.assertTrue(os.path.exists(os.path.join(self.test_dir, 'cache.sqlite3')))
+
+            other = Cache(ydl)
+            other.store('test_cache', 'k.', 'other')
+            other.close()
+            self.assertEqual(c.load('test_cache', 'k.'), 'other')
+
+            c.store('test_cache', 'k2', 'v', ttl=-1)
+            self.assertEqual(c.load('test_cache', 'k2'), None)
+
+            for i in range(5):
+                c.store('test_prune', f'k{i}', 'x' * 100)
+                c._store._execute('UPDATE entries SET used_at = ? WHERE key = ?', i, f'k{i}')
+            c.load('test_prune', 'k0')
+            c.prune('test_prune', c._store._execute('SELECT size FROM entries WHERE key = ?', 'k0')[0] * 3)
+            self.assertEqual(
+                [c.load('test_prune', f'k{i}') is not None for i in range(5)],
+                [True, False, False, True, True])
+        finally:
+            c.close()
+        c.remove()
+        self.assertFalse(os.path.exists(self.test_dir))
+
+    def test_store(self):
+        class MemoryCacheStore(CacheStore):
+            def __init__(self, cache):
+                super().__init__(cache)
+                self.entries = {}
+
+            def get(self, section, key):
+                return self.entries.get((section, key))
+
+            def stat(self, section, key):
+                return (self.entries.get((section, key)) or (None, None))[1]
+
+            def store(self, section, key, entry, expires_at=None):
+                self.entries[section, key] = entry, time.time()
+
+            def delete(self, section, key):
+                self.entries.pop((section, key), None)
+
+            def prune(self, max_size, section=None):
+                pass
+
+        c = Cache(FakeYDL({'cachedir': self.test_dir, 'cache_store': MemoryCacheStore}))
+        c.store('test_cache', 'k', 'v')
+        self.assertEqual(c.load('test_cache', 'k'), 'v')
+        self.assertEqual(list(c._store.entries), [('test_cache', 'k')])
+        self.assertFalse(os.path.exists(self.test_dir))
+
+        self.assertIsInstance(Cache(FakeYDL({'cachedir': self.test_dir}))._store, FileCacheStore)
+        with self.assertRaises(YoutubeDLError):
+            Cache(FakeYDL({'cache_store': 'invalid'}))
+
 
 if __name__ == '__main__':
     unittest.main()
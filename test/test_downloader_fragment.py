@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import functools
+import http.server
+import random
+import re
+import threading
+import time
+
+from test.helper import http_server_port, try_rm
+from yt_dlp import YoutubeDL
+from yt_dlp.downloader.dash import DashSegmentsFD
+from yt_dlp.downloader.fragment import _HostLimiter, _KeyStore
+from yt_dlp.utils._utils import _YDLLogger as FakeLogger
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FRAGMENT_COUNT = 20
+
+
+def fragment_content(stream, index):
+    return f'{stream}:{index:04d};'.encode() * 100
+
+
+class HTTPTestRequestHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        mobj = re.fullmatch(r'/(\w+)/(\d+)', self.path)
+        assert mobj
+        # Finish fragments out of order
+        time.sleep(random.random() / 50)
+        content = fragment_content(mobj.group(1), int(mobj.group(2)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class TestFragmentFD(unittest.TestCase):
+    def setUp(self):
+        self.httpd = http.server.ThreadingHTTPServer(
+            ('127.0.0.1', 0), HTTPTestRequestHandler)
+        self.port = http_server_port(self.httpd)
+        self.server_thread = threading.Thread(target=self.httpd.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _format(self, stream, filename=None):
+        return {
+            'protocol': 'http_dash_segments',
+            'filepath': filename,
+            'fragment_base_url': f'http://127.0.0.1:{self.port}/{stream}/',
+            'fragments': [{'path': str(i)} for i in range(FRAGMENT_COUNT)],
+        }
+
+    def _expected(self, stream):
+        return b''.join(fragment_content(stream, i) for i in range(FRAGMENT_COUNT))
+
+    def download(self, params, info_dict, filenames):
+        params = {'logger': FakeLogger(), 'noprogress': True, **params}
+        for filename in filenames:
+            try_rm(filename)
+        try:
+            with YoutubeDL(params) as ydl:
+                self.assertTrue(DashSegmentsFD(ydl, params).real_download(filenames[0], info_dict))
+            contents = []
+            for filename in filenames:
+                with open(filename, 'rb') as f:
+                    contents.append(f.read())
+            return contents
+        finally:
+            for filename in filenames:
+                try_rm(filename)
+
+    def test_download(self):
+        filename = os.path.join(TEST_DIR, 'test_fragments.mp4')
+        for params in ({}, {'concurrent_fragment_downloads': 4}, {
+            'concurrent_fragment_downloads': 4,
+            # Every fragment exceeds the buffer; fragments are downloaded in order
+            'fragment_buffer_size': 1,
+        }):
+            with self.subTest(params=params):
+                content, = self.download(params, self._format('video'), [filename])
+                self.assertEqual(content, self._expected('video'))
+
+    def test_keep_fragments(self):
+        filename = os.path.join(TEST_DIR, 'test_fragments.mp4')
+        frag_filenames = [f'{filename}.part-Frag{i}' for i in range(1, FRAGMENT_COUNT + 1)]
+        for workers in (1, 4):
+            with self.subTest(workers=workers):
+                try:
+                    content, = self.download({
+                        'concurrent_fragment_downloads': workers,
+                        'keep_fragments': True,
+                    }, self._format('video'), [filename])
+                    self.assertEqual(content, self._expected('video'))
+                    for i, frag_filename in enumerate(frag_filenames):
+                        with open(frag_filename, 'rb') as f:
+                            self.assertEqual(f.read(), fragment_content('video', i))
+                finally:
+                    for frag_filename in frag_filenames:
+                        try_rm(frag_filename)
+
+    def test_download_multiple(self):
+        filenames = [os.path.join(TEST_DIR, f'test_fragments.f{i}.mp4') for i in range(2)]
+        for workers in (1, 4):
+            with self.subTest(workers=workers):
+                contents = self.download({'concurrent_fragment_downloads': workers}, {
+                    'protocol': 'http_dash_segments',
+                    'requested_formats': [
+                        self._format('video', filenames[0]), self._format('audio', filenames[1])],
+                }, filenames)
+                self.assertEqual(contents, [self._expected('video'), self._expected('audio')])
+
+
+class TestKeyStore(unittest.TestCase):
+    def test_get(self):
+        store, calls, started = _KeyStore(), [], threading.Event()
+
+        def fetch():
+            calls.append(None)
+            started.set()
+            time.sleep(0.05)
+            return b'key'
+
+        threads = [threading.Thread(target=lambda: self.assertEqual(store.get('id', fetch), b'key'))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(store.get('id', fetch), b'key')
+        self.assertEqual(len(calls), 1)
+
+    def test_prefetch(self):
+        store, calls = _KeyStore(), []
+
+        def fetch(key):
+            calls.append(key)
+            if key == 'fail' and calls.count(key) == 1:
+                raise OSError('prefetch failed')
+            return key.encode()
+
+        store.prefetch({key: functools.partial(fetch, key) for key in ('a', 'b', 'fail')}, 2)
+        self.assertEqual(store.get('a', lambda: self.fail('should be prefetched')), b'a')
+        self.assertEqual(store.get('b', lambda: self.fail('should be prefetched')), b'b')
+        # A failed prefetch is retried when the key is needed
+        self.assertEqual(store.get('fail', functools.partial(fetch, 'fail')), b'fail')
+        self.assertEqual(sorted(calls), ['a', 'b', 'fail', 'fail'])
+
+        # Keys that are already known are not prefetched again
+        store.prefetch({'a': functools.partial(fetch, 'a')}, 2)
+        self.assertEqual(calls.count('a'), 1)
+
+        # Only the keys that are needed first are prefetched
+        store.MAX_PREFETCH = 2
+        store.prefetch({key: functools.partial(fetch, key) for key in ('a', 'd', 'e')}, 2)
+        self.assertEqual(store.get('d', lambda: self.fail('should be prefetched')), b'd')
+        self.assertEqual(store.get('e', lambda: b'fetched when needed'), b'fetched when needed')
+        self.assertNotIn('e', calls)
+
+        def fail():
+            raise OSError('fetch failed')
+
+        with self.assertRaisesRegex(OSError, 'fetch failed'):
+            store.get('c', fail)
+
+
+class TestHostLimiter(unittest.TestCase):
+    def test_limit(self):
+        limiter = _HostLimiter(8)
+        self.assertEqual(limiter.limit, 8)
+        limiter.acquire()
+        limiter.release(0, failed=True)
+        self.assertEqual(limiter.limit, 4)
+        limiter.acquire()
+        limiter.release(0, failed=True)
+        self.assertEqual(limiter.limit, 2)
+
+        # Grows while the throughput does not drop
+        for _ in range(2):
+            limiter.acquire()
+            limiter.release(1000)
+        self.assertEqual(limiter.limit, 3)
+
+        # Never drops below one
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release(0, failed=True)
+        self.assertEqual(limiter.limit, 1)
+
+    def test_acquire_blocks(self):
+        limiter = _HostLimiter(1)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=acquire, daemon=True)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        limiter.release(100)
+        self.assertTrue(acquired.wait(5))
+        limiter.release(100)
+        thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
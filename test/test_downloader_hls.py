@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import collections
+import http.server
+import re
+import struct
+import threading
+
+from test.helper import http_server_port, try_rm
+from yt_dlp import YoutubeDL
+from yt_dlp.aes import aes_cbc_encrypt_bytes
+from yt_dlp.downloader import get_suitable_downloader
+from yt_dlp.downloader.hls import HlsFD, HlsSegment, parse_m3u8_segments
+from yt_dlp.utils._utils import _YDLLogger as FakeLogger
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def segment_content(name):
+    return f'{name};'.encode() * 50
+
+
+def segment_key(index):
+    # The key rotates every 3 segments
+    return f'key{index // 3:013d}'.encode()
+
+
+def encrypted_playlist(count):
+    lines = ['#EXTM3U', '#EXT-X-TARGETDURATION:1', '#EXT-X-MEDIA-SEQUENCE:0']
+    for index in range(count):
+        if index % 3 == 0:
+            lines.append(f'#EXT-X-KEY:METHOD=AES-128,URI="key{index // 3}"')
+        lines.extend(['#EXTINF:1,', f'enc{index}.ts'])
+    lines.append('#EXT-X-ENDLIST')
+    return '\n'.join(lines).encode()
+
+
+class LivePlaylist:
+    """A live playlist whose window moves forward by `step` segments on every request"""
+
+    def __init__(self, first=10, window=4, last=19, step=1, discontinuity_at=None):
+        self.first, self.window, self.last, self.step = first, window, last, step
+        self.discontinuity_at = discontinuity_at
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def render(self):
+        with self.lock:
+            end = min(self.first + self.window - 1 + self.requests * self.step, self.last)
+            self.requests += 1
+        start = max(self.first, end - self.window + 1)
+        lines = ['#EXTM3U', '#EXT-X-TARGETDURATION:0.05', f'#EXT-X-MEDIA-SEQUENCE:{start}']
+        if self.discontinuity_at is not None:
+            lines.append(f'#EXT-X-DISCONTINUITY-SEQUENCE:{int(start > self.discontinuity_at)}')
+            if start <= self.discontinuity_at:
+                lines.append('#EXT-X-MAP:URI="init0.mp4"')
+            else:
+                lines.append('#EXT-X-MAP:URI="init1.mp4"')
+        for sequence in range(start, end + 1):
+            if sequence == self.discontinuity_at:
+                lines.extend(['#EXT-X-DISCONTINUITY', '#EXT-X-MAP:URI="init1.mp4"'])
+            lines.extend(['#EXTINF:0.05,', f'seg{sequence}.ts'])
+        if end == self.last:
+            lines.append('#EXT-X-ENDLIST')
+        return '\n'.join(lines).encode()
+
+
+class HTTPTestRequestHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/live.m3u8':
+            content = self.server.playlist.render()
+        elif self.path == '/encrypted.m3u8':
+            with self.server.lock:
+                self.server.key_requests['playlist'] += 1
+            content = encrypted_playlist(10)
+        elif mobj := re.fullmatch(r'/key(\d+)', self.path):
+            with self.server.lock:
+                self.server.key_requests[mobj.group(1)] += 1
+            content = segment_key(int(mobj.group(1)) * 3)
+        elif mobj := re.fullmatch(r'/enc(\d+)\.ts', self.path):
+            index = int(mobj.group(1))
+            content = aes_cbc_encrypt_bytes(
+                segment_content(f'seg{index}'), segment_key(index), struct.pack('>8xq', index))
+        elif mobj := re.fullmatch(r'/(\w+)\.(?:ts|mp4)', self.path):
+            content = segment_content(mobj.group(1))
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class TestLiveHlsFD(unittest.TestCase):
+    def setUp(self):
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), HTTPTestRequestHandler)
+        self.port = http_server_port(self.httpd)
+        self.server_thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.server_thread.start()
+        self.filename = os.path.join(TEST_DIR, 'test_live_hls.ts')
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        try_rm(self.filename)
+        try_rm(self.filename + '.part')
+        try_rm(self.filename + '.ytdl')
+
+    def download(self, playlist, params=None, **info):
+        self.httpd.playlist = playlist
+        params = {'logger': FakeLogger(), 'noprogress': True, **(params or {})}
+        with YoutubeDL(params) as ydl:
+            self.assertTrue(HlsFD(ydl, params).real_download(self.filename, {
+                'id': 'live',
+                'url': f'http://127.0.0.1:{self.port}/live.m3u8',
+                'ext': 'mp4',
+                'is_live': True,
+                **info,
+            }))
+        with open(self.filename, 'rb') as f:
+            return f.read()
+
+    def expected(self, *names):
+        return b''.join(segment_content(name) for name in names)
+
+    def test_live_edge(self):
+        for workers in (1, 4):
+            with self.subTest(workers=workers):
+                content = self.download(LivePlaylist(), {'concurrent_fragment_downloads': workers})
+                # Starts 3 segments before the end of the first playlist
+                self.assertEqual(content, self.expected(*(f'seg{i}' for i in range(11, 20))))
+
+    def test_from_start(self):
+        content = self.download(LivePlaylist(), is_from_start=True)
+        self.assertEqual(content, self.expected(*(f'seg{i}' for i in range(10, 20))))
+
+    def test_stalled_playlist(self):
+        # The playlist never changes and has no end
+        content = self.download(LivePlaylist(step=0, last=100))
+        self.assertEqual(content, self.expected('seg11', 'seg12', 'seg13'))
+
+    def test_dropped_segments(self):
+        # The window moves faster than it is polled; the recording continues after the gap
+        playlist = LivePlaylist(window=2, step=3, last=22)
+        content = self.download(playlist, is_from_start=True)
+        self.assertTrue(content.startswith(self.expected('seg10', 'seg11')))
+        self.assertTrue(content.endswith(self.expected('seg21', 'seg22')))
+
+    def test_discontinuity(self):
+        content = self.download(LivePlaylist(discontinuity_at=15), is_from_start=True)
+        self.assertEqual(content, self.expected(
+            'init0', *(f'seg{i}' for i in range(10, 15)), 'init1', *(f'seg{i}' for i in range(15, 20))))
+
+    def test_encrypted(self):
+        self.httpd.lock = threading.Lock()
+        for workers in (1, 4):
+            with self.subTest(workers=workers):
+                self.httpd.key_requests = collections.Counter()
+                params = {'logger': FakeLogger(), 'noprogress': True, 'concurrent_fragment_downloads': workers}
+                with YoutubeDL(params) as ydl:
+                    for _ in range(2):
+                        self.assertTrue(HlsFD(ydl, params).real_download(self.filename, {
+                            'id': f'encrypted{workers}',
+                            'url': f'http://127.0.0.1:{self.port}/encrypted.m3u8',
+                            'ext': 'mp4',
+                        }))
+                        with open(self.filename, 'rb') as f:
+                            self.assertEqual(f.read(), self.expected(*(f'seg{i}' for i in range(10))))
+                # The playlist and every key are fetched exactly once
+                self.assertEqual(self.httpd.key_requests, {'playlist': 1, **dict.fromkeys('0123', 1)})
+
+    def test_get_suitable_downloader(self):
+        info = {'url': 'http://127.0.0.1/live.m3u8', 'protocol': 'm3u8_native', 'is_live': True}
+        self.assertIs(get_suitable_downloader(info, {'external_downloader': {'default': 'native'}}), HlsFD)
+        self.assertIs(get_suitable_downloader(info, {'hls_prefer_native': True}), HlsFD)
+
+
+class TestParseM3u8Segments(unittest.TestCase):
+    def test_parse(self):
+        playlist = '''#EXTM3U
+#EXT-X-TARGETDURATION:10
+#EXT-X-MEDIA-SEQUENCE:5
+#EXT-X-MAP:URI="init.mp4",BYTERANGE="100@0"
+#EXT-X-KEY:METHOD=AES-128,URI="key",IV=0x1
+#EXTINF:10,
+#EXT-X-BYTERANGE:200@100
+media.mp4
+#EXTINF:10,
+#EXT-X-BYTERANGE:300
+media.mp4
+#UPLYNK-SEGMENT:abc,00000000,ad
+#EXTINF:10,
+ad.ts
+#UPLYNK-SEGMENT:abc,00000000,segment
+#EXT-X-DISCONTINUITY
+#EXT-X-KEY:METHOD=NONE
+#EXTINF:10,
+https://cdn.example.com/last.ts
+#EXT-X-ENDLIST
+'''
+        key = {'METHOD': 'AES-128', 'URI': 'https://example.com/hls/key', 'IV': '0x1'}
+        self.assertEqual(list(parse_m3u8_segments(playlist, 'https://example.com/hls/index.m3u8')), [
+            HlsSegment('https://example.com/hls/init.mp4', True, 5, 5, (0, 100), None, 0, False),
+            HlsSegment('https://example.com/hls/media.mp4', False, 5, 6, (100, 300), key, 0, False),
+            HlsSegment('https://example.com/hls/media.mp4', False, 6, 7, (300, 600), key, 0, False),
+            HlsSegment('https://example.com/hls/ad.ts', False, 7, 8, None, key, 0, True),
+            HlsSegment('https://cdn.example.com/last.ts', False, 8, 8, None, {'METHOD': 'NONE'}, 1, False),
+        ])
+        # Lines may also be streamed
+        self.assertEqual(
+            len(list(parse_m3u8_segments(iter(playlist.splitlines()), 'https://example.com/hls/index.m3u8'))), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,8 +9,10 @@
 
 
 import http.server
+import json
 import re
 import threading
+import time
 
 from test.helper import http_server_port, try_rm
 from yt_dlp import YoutubeDL
@@ -21,6 +23,8 @@
 
 
 TEST_SIZE = 10 * 1024
+SEGMENTED_SIZE = 256 * 1024
+SEGMENTED_CONTENT = bytes(i % 251 for i in range(SEGMENTED_SIZE))
 
 
 class HTTPTestRequestHandler(http.server.BaseHTTPRequestHandler):
@@ -54,8 +58,31 @@ def serve(self, range=True, content_length=True):
         self.end_headers()
         self.wfile.write(b'#' * size)
 
+    def serve_segmented(self):
+        start, end = 0, SEGMENTED_SIZE - 1
+        mobj = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range') or '')
+        if mobj:
+            start, end = int(mobj.group(1)), int(mobj.group(2) or end)
+            self.server.requested_ranges.append(start)
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{SEGMENTED_SIZE}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        try:
+            for pos in range(start, end + 1, 8192):
+                self.wfile.write(SEGMENTED_CONTENT[pos:min(pos + 8192, end + 1)])
+                # The start of the file is served slowly, so that the other segments finish early
+                time.sleep(0.01 if pos < SEGMENTED_SIZE // 4 else 0.001)
+        except OSError:  # The client stops reading when segments are split
+            pass
+
     def do_GET(self):
-        if self.path == '/regular':
+        if self.path == '/segmented':
+            self.serve_segmented()
+        elif self.path == '/regular':
             self.serve()
         elif self.path == '/no-content-length':
             self.serve(content_length=False)
@@ -101,5 +128,121 @@ def test_chunked(self):
         })
 
 
+class SmallSegmentsFD(HttpFD):
+    MIN_SEGMENT_SIZE = 16 * 1024
+
+
+class TestSegmentedHttpFD(unittest.TestCase):
+    def setUp(self):
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), HTTPTestRequestHandler)
+        self.httpd.requested_ranges = []
+        self.port = http_server_port(self.httpd)
+        self.server_thread = threading.Thread(target=self.httpd.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        self.filename = os.path.join(TEST_DIR, 'testfile_segmented.mp4')
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        for filename in (self.filename, f'{self.filename}.part', f'{self.filename}.ytdl'):
+            try_rm(filename)
+
+    def download(self, params=None):
+        params = {'logger': FakeLogger(), 'http_connections': 4, 'noprogress': True, **(params or {})}
+        with YoutubeDL(params) as ydl:
+            self.assertTrue(SmallSegmentsFD(ydl, params).real_download(self.filename, {
+                'url': f'http://127.0.0.1:{self.port}/segmented',
+            }))
+        with open(self.filename, 'rb') as f:
+            return f.read()
+
+    def test_segmented(self):
+        self.assertEqual(self.download(), SEGMENTED_CONTENT)
+        # Finished connections take over part of the slow first segment
+        self.assertGreater(len(self.httpd.requested_ranges), 4)
+        self.assertFalse(os.path.exists(f'{self.filename}.ytdl'))
+
+    def test_block_size(self):
+        sizes = []
+
+        class RecordingFD(SmallSegmentsFD):
+            SEGMENT_BLOCK_SIZE = 4 * 1024
+
+            def _read_buffer(self, size):
+                sizes.append(size)
+                return super()._read_buffer(size)
+
+        params = {'logger': FakeLogger(), 'http_connections': 4, 'noprogress': True, 'buffersize': 1024}
+        with YoutubeDL(params) as ydl:
+            self.assertTrue(RecordingFD(ydl, params).real_download(self.filename, {
+                'url': f'http://127.0.0.1:{self.port}/segmented',
+            }))
+        with open(self.filename, 'rb') as f:
+            self.assertEqual(f.read(), SEGMENTED_CONTENT)
+        # The buffer size is only a lower bound, and a block never spans a split of the segment
+        self.assertGreaterEqual(min(sizes[:4]), RecordingFD.SEGMENT_BLOCK_SIZE)
+        self.assertLessEqual(max(sizes), RecordingFD.MIN_SEGMENT_SIZE)
+
+    def test_resume(self):
+        done = SEGMENTED_SIZE // 2
+        with open(f'{self.filename}.part', 'wb') as f:
+            f.write(SEGMENTED_CONTENT[:done])
+            f.truncate(SEGMENTED_SIZE)
+        with open(f'{self.filename}.ytdl', 'w') as f:
+            json.dump({'downloader': {'content_len': SEGMENTED_SIZE, 'http_segments': [[done, SEGMENTED_SIZE]]}}, f)
+        self.assertEqual(self.download(), SEGMENTED_CONTENT)
+        self.assertEqual(min(self.httpd.requested_ranges), done)
+
+    def test_resume_single_connection(self):
+        done = SEGMENTED_SIZE // 4
+        with open(f'{self.filename}.part', 'wb') as f:
+            f.write(SEGMENTED_CONTENT[:done])
+        self.assertEqual(self.download(), SEGMENTED_CONTENT)
+        # The first request starts a byte early, in case the file is complete
+        self.assertEqual(min(self.httpd.requested_ranges), done - 1)
+
+    def test_full_size_without_state(self):
+        # A preallocated file whose state was lost is not complete
+        with open(f'{self.filename}.part', 'wb') as f:
+            f.truncate(SEGMENTED_SIZE)
+        self.assertEqual(self.download(), SEGMENTED_CONTENT)
+        self.assertEqual(min(self.httpd.requested_ranges), 0)
+
+    def test_fallback(self):
+        # A resume state can not be used by a single connection download
+        with open(f'{self.filename}.part', 'wb') as f:
+            f.truncate(SEGMENTED_SIZE)
+        with open(f'{self.filename}.ytdl', 'w') as f:
+            json.dump({'downloader': {'content_len': SEGMENTED_SIZE, 'http_segments': [[0, SEGMENTED_SIZE]]}}, f)
+        self.assertEqual(self.download({'http_connections': 1}), SEGMENTED_CONTENT)
+        self.assertFalse(os.path.exists(f'{self.filename}.ytdl'))
+
+    def test_progress_hooks(self):
+        for delta in (None, 0.1):
+            with self.subTest(progress_hooks_delta=delta):
+                statuses, reports = [], []
+                params = {
+                    'logger': FakeLogger(), 'http_connections': 1, 'buffersize': 1024, 'noresizebuffer': True,
+                    **({} if delta is None else {'progress_hooks_delta': delta}),
+                }
+                with YoutubeDL(params) as ydl:
+                    fd = HttpFD(ydl, params)
+                    fd._report_progress_status = lambda s, *args, **kwargs: reports.append(s['status'])
+                    fd.add_progress_hook(lambda s: statuses.append(s['status']))
+                    self.assertTrue(fd.real_download(self.filename, {'url': f'http://127.0.0.1:{self.port}/segmented'}))
+                try_rm(self.filename)
+
+                self.assertEqual(statuses[-1], 'finished')
+                if delta is None:
+                    self.assertGreaterEqual(statuses.count('downloading'), SEGMENTED_SIZE // 1024)
+                else:
+                    # Updates are coalesced to 10 per second
+                    self.assertLess(statuses.count('downloading'), 20)
+                # The progress printed on the console is always coalesced
+                self.assertIn('downloading', reports)
+                self.assertLess(reports.count('downloading'), 20)
+
+
 if __name__ == '__main__':
     unittest.main()
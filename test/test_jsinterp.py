@@ -20,11 +20,13 @@ class TestJSInterpreter(unittest.TestCase):
     def _test(self, jsi_or_code, expected, func='f', args=()):
         if isinstance(jsi_or_code, str):
             jsi_or_code = JSInterpreter(jsi_or_code)
-        got = jsi_or_code.call_function(func, *args)
-        if expected is NaN:
-            self.assertTrue(math.isnan(got), f'{got} is not NaN')
-        else:
-            self.assertEqual(got, expected)
+        # The compiled backend must behave exactly like the interpreter
+        for jsi in (jsi_or_code, JSInterpreter(jsi_or_code.code, compiled=True)):
+            got = jsi.call_function(func, *args)
+            if expected is NaN:
+                self.assertTrue(math.isnan(got), f'{got} is not NaN')
+            else:
+                self.assertEqual(got, expected)
 
     def test_basic(self):
         jsi = JSInterpreter('function f(){;}')
@@ -541,6 +543,32 @@ def test_undefined_varnames(self):
         self._test(jsi, [JS_Undefined, JS_Undefined])
         self.assertEqual(jsi._undefined_varnames, {'b'})
 
+        jsi = JSInterpreter('function f(){ var a; return [a, b]; }', compiled=True)
+        self._test(jsi, [JS_Undefined, JS_Undefined])
+        self.assertEqual(jsi._undefined_varnames, {'b'})
+
+    def test_compiled(self):
+        # Resembles the n parameter challenge of the YouTube player
+        code = '''
+            var g=function(a){var b=a.split(""),c=[function(d,e){e=(e%d.length+d.length)%d.length;d.splice(0,1,d.splice(e,1,d[0])[0])},
+            -1234,b,function(d){d.reverse()},function(d,e){d.push(e)},
+            function(d,e){e=(e%d.length+d.length)%d.length;var f=d[0];d[0]=d[e];d[e]=f},
+            function(d,e){for(var f=64,h=[];++f-h.length-32;){switch(f){case 58:f=96;continue;case 91:f=44;break;case 65:f=47;continue;case 46:f=153;case 123:f-=58;default:h.push(String.fromCharCode(f))}}d.forEach(function(l,m,n){this.push(n[m]=h[(h.indexOf(l)-h.indexOf(this[m])+m-32+f--)%h.length])},e.split(""))},
+            "abcdefgh",function(d,e){e=(e%d.length+d.length)%d.length;d.splice(e,1)},null,
+            function(d,e){for(e=(e%d.length+d.length)%d.length;e--;)d.unshift(d.pop())}];
+            c[9]=c;try{c[3](c[2]),c[0](c[2],7),c[5](c[2],-3),c[6](c[2],c[7]),c[4](c[9],c[1]),c[10](c[2],5),c[8](c[2],12),c[3](c[2]),c[6](c[2],"xyzw"),c[5](c[2],40),c[10](c[2],-9),c[0](c[2],3)}catch(d){return"enhanced_except_"+a}return b.join("")};
+        '''
+        interpreted = JSInterpreter(code).extract_function('g')
+        jsi = JSInterpreter(code, compiled=True)
+        compiled = jsi.extract_function('g')
+        for arg in ('abc', 'AbCdEfGhIjKlMn'):
+            self.assertEqual(compiled([arg]), interpreted([arg]))
+
+        # Statements are only parsed once
+        num_compiled = len(jsi._compiled)
+        compiled(['AbCdEfGhIjKlMn'])
+        self.assertEqual(len(jsi._compiled), num_compiled)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import io
+import struct
+import tempfile
+
+from test.helper import FakeYDL
+from yt_dlp.postprocessor.merger import (
+    NativeMergerPP,
+    UnsupportedMergeError,
+    _child,
+    _element,
+    _encode_uint,
+    _find_box,
+    _ID,
+    _iter_boxes,
+    _parse_boxes,
+    _parse_elements,
+    merge_files,
+)
+from yt_dlp.utils import PostProcessingError
+
+
+def box(box_type, *children):
+    payload = b''.join(children)
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def full_box(box_type, version, flags, payload):
+    return box(box_type, struct.pack('>B3s', version, flags.to_bytes(3, 'big')), payload)
+
+
+def mp4_moov(track_id, timescale, duration, media_timescale, stbl=b'', fragmented=False):
+    mvhd = struct.pack('>IIII', 0, 0, timescale, duration) + bytes(76) + struct.pack('>I', track_id + 1)
+    tkhd = struct.pack('>IIIII', 0, 0, track_id, 0, duration) + bytes(60)
+    elst = struct.pack('>IIiI', 1, duration, 0, 0x10000)
+    mdhd = struct.pack('>IIII', 0, 0, media_timescale, duration * media_timescale // timescale) + bytes(4)
+    return box(
+        b'moov',
+        full_box(b'mvhd', 0, 0, mvhd),
+        box(b'trak',
+            full_box(b'tkhd', 0, 3, tkhd),
+            box(b'edts', full_box(b'elst', 0, 0, elst)),
+            box(b'mdia', full_box(b'mdhd', 0, 0, mdhd), box(b'minf', box(b'stbl', stbl)))),
+        box(b'mvex', full_box(b'trex', 0, 0, struct.pack('>IIIII', track_id, 1, 0, 0, 0))) if fragmented else b'')
+
+
+def fragmented_mp4(track_id, timescale, media_timescale, fragments):
+    data = box(b'ftyp', b'iso5', bytes(4)) + mp4_moov(
+        track_id, timescale, 10 * timescale, media_timescale, fragmented=True)
+    for sequence, (time, payload) in enumerate(fragments, 1):
+        offset = len(data)
+        moof = box(
+            b'moof',
+            full_box(b'mfhd', 0, 0, struct.pack('>I', sequence)),
+            box(b'traf',
+                # base-data-offset-present
+                full_box(b'tfhd', 0, 1, struct.pack('>IQ', track_id, offset)),
+                full_box(b'tfdt', 1, 0, struct.pack('>Q', time))))
+        data += moof + box(b'mdat', payload)
+    return data
+
+
+def progressive_mp4(track_id, timescale, chunks):
+    ftyp = box(b'ftyp', b'isom', bytes(4))
+    mdat = box(b'mdat', b''.join(chunks))
+    offsets, position = [], len(ftyp) + 8
+    for chunk in chunks:
+        offsets.append(position)
+        position += len(chunk)
+    stco = full_box(b'stco', 0, 0, struct.pack(f'>I{len(offsets)}I', len(offsets), *offsets))
+    return ftyp + mdat + mp4_moov(track_id, timescale, 10 * timescale, timescale, stbl=stco)
+
+
+def webm_block(track_number, relative, keyframe, payload):
+    return _element(_ID.SIMPLE_BLOCK, bytes([0x80 | track_number]) + struct.pack(
+        '>hB', relative, 0x80 if keyframe else 0) + payload)
+
+
+def webm(track_type, track_number, clusters, duration=10000.0, checksums=False):
+    # Checksums of the master elements, and padding
+    extra = _element(_ID.CRC32, bytes(4)) + _element(_ID.VOID, bytes(2)) if checksums else b''
+    header = _element(_ID.EBML, _element(_ID.DOC_TYPE, b'webm') + _element(_ID.DOC_TYPE_VERSION, b'\x04'))
+    segment = [
+        _element(_ID.INFO, extra + _element(_ID.TIMESTAMP_SCALE, _encode_uint(1000000))
+                 + _element(_ID.DURATION, struct.pack('>f', duration))),
+        _element(_ID.TRACKS, _element(_ID.TRACK_ENTRY, (
+            _element(_ID.TRACK_NUMBER, _encode_uint(track_number))
+            + _element(_ID.TRACK_UID, b'\x01')
+            + _element(_ID.TRACK_TYPE, _encode_uint(track_type))))),
+    ]
+    for timestamp, blocks in clusters:
+        segment.append(_element(_ID.CLUSTER, extra + _element(_ID.TIMESTAMP, _encode_uint(timestamp)) + b''.join(
+            webm_block(track_number, *b) for b in blocks)))
+    # A Segment of unknown size, as written by live muxers
+    return header + _ID.SEGMENT.to_bytes(4, 'big') + b'\x01\xff\xff\xff\xff\xff\xff\xff' + b''.join(segment)
+
+
+class TestNativeMerger(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = self._tmpdir.name
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def merge(self, video, audio, ext):
+        paths = []
+        for name, data in (('video', video), ('audio', audio)):
+            paths.append(os.path.join(self.tmpdir, name))
+            with open(paths[-1], 'wb') as f:
+                f.write(data)
+        out_path = os.path.join(self.tmpdir, f'out.{ext}')
+        merge_files(*paths, out_path, ext)
+        with open(out_path, 'rb') as f:
+            return f.read()
+
+    def test_fragmented_mp4(self):
+        video = fragmented_mp4(1, 1000, 90000, [(0, b'v0'), (180000, b'v1'), (360000, b'v2')])
+        audio = fragmented_mp4(1, 44100, 48000, [(0, b'a0'), (72000, b'a1'), (144000, b'a2')])
+        boxes = _parse_boxes(self.merge(video, audio, 'mp4'))
+
+        self.assertEqual([b[0] for b in boxes[:2]], [b'ftyp', b'moov'])
+        moov = boxes[1][1]
+        traks = [content for box_type, content in moov if box_type == b'trak']
+        self.assertEqual([struct.unpack_from('>I', _find_box(t, b'tkhd'), 12)[0] for t in traks], [1, 2])
+        # The audio durations are converted to the timescale of the video
+        self.assertEqual(struct.unpack_from('>I', _find_box(traks[1], b'tkhd'), 20)[0], 10000)
+        self.assertEqual(struct.unpack_from('>I', _find_box(traks[1], b'edts', b'elst'), 8)[0], 10000)
+        self.assertEqual(
+            [struct.unpack_from('>I', content, 4)[0] for _, content in _find_box(moov, b'mvex')], [1, 2])
+        self.assertEqual(struct.unpack_from('>I', _find_box(moov, b'mvhd'), 96)[0], 3)
+
+        data = self.merge(video, audio, 'mp4')
+        fragments = []
+        for box_type, offset, header_size, size in _iter_boxes(io.BytesIO(data)):
+            content = data[offset + header_size:offset + size]
+            if box_type == b'moof':
+                moof = _parse_boxes(content)
+                sequence = struct.unpack_from('>I', _find_box(moof, b'mfhd'), 4)[0]
+                track_id, base_offset = struct.unpack_from('>IQ', _find_box(moof, b'traf', b'tfhd'), 4)
+                # The base data offset still points to the start of the moof
+                self.assertEqual(base_offset, offset)
+                fragments.append((sequence, track_id))
+            elif box_type == b'mdat':
+                fragments.append(content)
+        self.assertEqual(fragments, [
+            (1, 1), b'v0', (2, 2), b'a0', (3, 2), b'a1', (4, 1), b'v1', (5, 2), b'a2', (6, 1), b'v2'])
+
+    def test_progressive_mp4(self):
+        video = progressive_mp4(1, 1000, [b'video0', b'video1'])
+        audio = progressive_mp4(1, 1000, [b'audio0', b'audio1', b'audio2'])
+        data = self.merge(video, audio, 'mp4')
+        boxes = _parse_boxes(data)
+        self.assertEqual([b[0] for b in boxes], [b'ftyp', b'moov', b'mdat'])
+
+        chunks = []
+        for box_type, content in boxes[1][1]:
+            if box_type != b'trak':
+                continue
+            stco = _find_box(content, b'mdia', b'minf', b'stbl', b'stco')
+            count = struct.unpack_from('>I', stco, 4)[0]
+            chunks.append([data[offset:offset + 6] for offset in struct.unpack_from(f'>{count}I', stco, 8)])
+        self.assertEqual(chunks, [[b'video0', b'video1'], [b'audio0', b'audio1', b'audio2']])
+
+    def test_unsupported_mp4(self):
+        video = fragmented_mp4(1, 1000, 90000, [(0, b'v0')])
+        audio = progressive_mp4(1, 1000, [b'audio0'])
+        with self.assertRaises(UnsupportedMergeError):
+            self.merge(video, audio, 'mp4')
+
+        def mp4(mvhd):
+            return box(b'ftyp', b'isom', bytes(4)) + box(
+                b'moov', mvhd, box(b'trak', full_box(b'tkhd', 0, 3, bytes(80)), box(b'mdia', full_box(
+                    b'mdhd', 0, 0, bytes(20)))))
+
+        # Malformed boxes are not merged, whatever the error of the parser
+        for mvhd in (full_box(b'mvhd', 0, 0, bytes(8)), full_box(b'mvhd', 2, 0, bytes(96)), box(b'mvhd')):
+            with self.assertRaises(UnsupportedMergeError):
+                self.merge(mp4(mvhd), audio, 'mp4')
+
+    def test_webm(self):
+        video = webm(1, 1, [(0, [(0, True, b'v0'), (40, False, b'v1')]), (1000, [(0, True, b'v2')])])
+        audio = webm(2, 1, [(0, [(0, True, b'a0')]), (500, [(0, True, b'a1')]), (1000, [(0, True, b'a2')])],
+                     duration=10500.0)
+        data = self.merge(video, audio, 'mkv')
+        segment_start = data.index(_ID.SEGMENT.to_bytes(4, 'big')) + 12
+        ebml = _parse_elements(_child(_parse_elements(data[:segment_start - 12]), _ID.EBML))
+        self.assertEqual(_child(ebml, _ID.DOC_TYPE), b'matroska')
+
+        segment = _parse_elements(data[segment_start:])
+        self.assertEqual(
+            struct.unpack('>Q', data[segment_start - 8:segment_start])[0] & ((1 << 56) - 1), len(data) - segment_start)
+        tracks = [_parse_elements(payload) for _, payload in _parse_elements(_child(segment, _ID.TRACKS))]
+        self.assertEqual([(_child(t, _ID.TRACK_NUMBER), _child(t, _ID.TRACK_TYPE)) for t in tracks], [
+            (b'\x01', b'\x01'), (b'\x02', b'\x02')])
+        self.assertNotEqual(_child(tracks[0], _ID.TRACK_UID), _child(tracks[1], _ID.TRACK_UID))
+
+        clusters = []
+        positions = {}
+        position = 0
+        for element_id, payload in segment:
+            positions.setdefault(element_id, position)
+            if element_id == _ID.CLUSTER:
+                children = _parse_elements(payload)
+                clusters.append((position, [
+                    block[0] & 0x7f for child_id, block in children if child_id == _ID.SIMPLE_BLOCK]))
+            position += len(_element(element_id, payload))
+        self.assertEqual([tracks for _, tracks in clusters], [[1, 1], [2], [2], [1], [2]])
+
+        for seek in _parse_elements(_child(segment, _ID.SEEK_HEAD)):
+            seek = _parse_elements(seek[1])
+            element_id = int.from_bytes(_child(seek, _ID.SEEK_ID), 'big')
+            self.assertEqual(int.from_bytes(_child(seek, _ID.SEEK_POSITION), 'big'), positions[element_id])
+
+        # Only the video clusters that start with a keyframe are indexed
+        cues = []
+        for _, cue in _parse_elements(_child(segment, _ID.CUES)):
+            cue = _parse_elements(cue)
+            track_positions = _parse_elements(_child(cue, _ID.CUE_TRACK_POSITIONS))
+            cues.append((
+                int.from_bytes(_child(cue, _ID.CUE_TIME), 'big'),
+                int.from_bytes(_child(track_positions, _ID.CUE_CLUSTER_POSITION), 'big')))
+        self.assertEqual(cues, [(0, clusters[0][0]), (1000, clusters[3][0])])
+
+    def test_webm_checksums(self):
+        video = webm(1, 1, [(0, [(0, True, b'v0')])], checksums=True)
+        audio = webm(2, 1, [(0, [(0, True, b'a0')])], checksums=True)
+        data = self.merge(video, audio, 'webm')
+        segment_start = data.index(_ID.SEGMENT.to_bytes(4, 'big')) + 12
+        segment = _parse_elements(data[segment_start:])
+        # The checksums would not match the modified elements
+        self.assertEqual(_child(segment, _ID.INFO), (
+            _element(_ID.TIMESTAMP_SCALE, _encode_uint(1000000)) + _element(_ID.DURATION, struct.pack('>d', 10000.0))))
+        self.assertEqual([payload for element_id, payload in segment if element_id == _ID.CLUSTER], [
+            _element(_ID.TIMESTAMP, b'\x00') + webm_block(track_number, 0, True, data)
+            for track_number, data in ((1, b'v0'), (2, b'a0'))])
+
+    def test_webm_unsupported(self):
+        video = webm(1, 1, [(0, [(0, True, b'v0')])])
+        with self.assertRaises(UnsupportedMergeError):
+            self.merge(video, video, 'webm')
+
+    def test_can_merge_formats(self):
+        def info(ext, video_ext, audio_ext, protocol='https'):
+            return {'ext': ext, 'requested_formats': [
+                {'ext': video_ext, 'vcodec': 'avc1', 'acodec': 'none', 'protocol': protocol},
+                {'ext': audio_ext, 'vcodec': 'none', 'acodec': 'mp4a', 'protocol': protocol},
+            ]}
+
+        self.assertTrue(NativeMergerPP.can_merge_formats(info('mp4', 'mp4', 'm4a')))
+        self.assertTrue(NativeMergerPP.can_merge_formats(info('webm', 'webm', 'webm')))
+        self.assertTrue(NativeMergerPP.can_merge_formats(info('mkv', 'webm', 'webm')))
+        self.assertFalse(NativeMergerPP.can_merge_formats(info('mkv', 'mp4', 'm4a')))
+        self.assertFalse(NativeMergerPP.can_merge_formats(info('mp4', 'mp4', 'webm')))
+        self.assertFalse(NativeMergerPP.can_merge_formats(info('mp4', 'mp4', 'm4a', 'm3u8_native')))
+        self.assertFalse(NativeMergerPP.can_merge_formats({'ext': 'mp4', 'requested_formats': [
+            {'ext': 'mp4', 'vcodec': 'avc1', 'acodec': 'mp4a'}, {'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a'}]}))
+
+    def test_run(self):
+        video_path, audio_path = os.path.join(self.tmpdir, 'v.f1.mp4'), os.path.join(self.tmpdir, 'a.f2.m4a')
+        with open(video_path, 'wb') as f:
+            f.write(progressive_mp4(1, 1000, [b'video0']))
+        with open(audio_path, 'wb') as f:
+            f.write(progressive_mp4(1, 1000, [b'audio0']))
+        info = {
+            'filepath': os.path.join(self.tmpdir, 'out.mp4'),
+            'ext': 'mp4',
+            'requested_formats': [
+                {'filepath': video_path, 'vcodec': 'avc1', 'acodec': 'none'},
+                {'filepath': audio_path, 'vcodec': 'none', 'acodec': 'mp4a'},
+            ],
+            '__files_to_merge': [video_path, audio_path],
+        }
+        pp = NativeMergerPP(FakeYDL())
+        self.assertEqual(pp.run(info), ([video_path, audio_path], info))
+        self.assertTrue(os.path.exists(info['filepath']))
+
+        # Without ffmpeg, files that can not be merged natively are an error
+        with open(audio_path, 'wb') as f:
+            f.write(b'invalid')
+        pp._downloader.params['ffmpeg_location'] = os.path.join(self.tmpdir, 'missing')
+        with self.assertRaises(PostProcessingError):
+            pp.run(info)
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir, 'out.temp.mp4')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,7 +6,7 @@
 
 import pytest
 
-from yt_dlp.networking.common import Features, DEFAULT_TIMEOUT
+from yt_dlp.networking.common import Features, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -267,6 +267,20 @@ def do_GET(self):
             self.send_header('Set-Cookie', 'test=ytdlp; path=/')
             self.end_headers()
             self.finish()
+        elif self.path.startswith('/client_port'):
+            payload = str(self.client_address[1]).encode()
+            self.send_response(200)
+            if self.path == '/client_port_chunked':
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                self.wfile.write(b'%x\r\n%s\r\n0\r\n\r\n' % (len(payload), payload))
+                return
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            if self.path == '/client_port_close':
+                # Close the connection without telling the client
+                self.close_connection = True
         else:
             self._status(404)
 
@@ -676,6 +690,29 @@ def test_read(self, handler):
             assert res.read().decode().endswith('\n\n')
             assert res.read() == b''
 
+    def test_readinto(self, handler):
+        with handler() as rh:
+            res = validate_and_send(
+                rh, Request(f'http://127.0.0.1:{self.http_port}/headers'))
+            buffer = bytearray(4)
+            assert res.readinto(buffer) == 4
+            assert buffer == b'Host'
+            view = memoryview(bytearray(1024))
+            data = b''
+            while size := res.readinto(view):
+                data += view[:size]
+            assert data.decode().endswith('\n\n')
+            assert res.readinto(view) == 0
+
+            # Decoded content
+            res = validate_and_send(
+                rh, Request(
+                    f'http://127.0.0.1:{self.http_port}/content-encoding',
+                    headers={'ytdl-encoding': 'gzip'}))
+            buffer = bytearray(1024)
+            size = res.readinto(buffer)
+            assert buffer[:size] == b'<html><video src="/vid.mp4" /></html>'
+
     def test_request_disable_proxy(self, handler):
         for proxy_proto in handler._SUPPORTED_PROXY_SCHEMES or ['http']:
             # Given the handler is configured with a proxy
@@ -928,6 +965,66 @@ def test_httplib_validation_errors(self, handler, req, match, version_check):
                 validate_and_send(rh, req)
             assert not isinstance(exc_info.value, TransportError)
 
+    @pytest.mark.parametrize('scheme', ['http', 'https'])
+    def test_connection_reuse(self, handler, scheme):
+        url = f'{scheme}://127.0.0.1:{getattr(self, f"{scheme}_port")}'
+        with handler(verify=False) as rh:
+            def client_port(path='/client_port', read=True):
+                with validate_and_send(rh, Request(f'{url}{path}')) as res:
+                    return res.read() if read else None
+
+            port = client_port()
+            assert client_port() == port
+            assert client_port('/client_port_chunked') == port
+            assert validate_and_send(rh, HEADRequest(f'{url}/method')).status == 200
+            assert client_port() == port
+
+            # A response that is closed before it is read leaves its connection unusable
+            client_port(read=False)
+            assert client_port() != port
+
+            # The server closes the connection once the response has been sent
+            port = client_port('/client_port_close')
+            assert client_port() != port
+
+            stats = rh._pool.stats
+            assert stats['requests'] == 9
+            assert stats['connections'] == 3
+            assert stats['reused'] == 6
+            assert stats['dropped'] == 1
+            if scheme == 'https':
+                # New connections resume the TLS session of the previous ones
+                assert stats['resumed'] == 2
+
+    def test_connection_dropped_retry(self, handler, monkeypatch):
+        # Reuse the connections closed by the server, as if they were closed just after being checked
+        monkeypatch.setattr('yt_dlp.networking._urllib._is_connection_dropped', lambda sock: False)
+        url = f'http://127.0.0.1:{self.http_port}'
+        with handler() as rh:
+            validate_and_send(rh, Request(f'{url}/client_port_close')).read()
+            with pytest.raises(TransportError):
+                validate_and_send(rh, Request(f'{url}/method', data=b'data', method='POST'))
+
+            validate_and_send(rh, Request(f'{url}/client_port_close')).read()
+            assert validate_and_send(rh, Request(f'{url}/client_port')).status == 200
+            assert rh._pool.stats['dropped'] == 1
+
+    def test_connection_pool_size(self, handler):
+        url = f'http://127.0.0.1:{self.http_port}/client_port'
+        with handler(pool_size=2) as rh:
+            def client_ports():
+                responses = [validate_and_send(rh, Request(url)) for _ in range(3)]
+                ports = [res.read() for res in responses]
+                for res in responses:
+                    res.close()
+                return set(ports)
+
+            ports = client_ports()
+            assert len(ports) == 3
+            # Only two of the connections were kept alive
+            assert len(client_ports() & ports) == 2
+            assert rh._pool.stats['connections'] == 4
+
 
 @pytest.mark.parametrize('handler', ['Requests'], indirect=True)
 class TestRequestsRequestHandler(TestRequestHandlerBase):
@@ -1012,6 +1109,18 @@ def mock_close(*args, **kwargs):
         rh.close()
         assert called
 
+    def test_pool_stats(self, handler):
+        url = f'http://127.0.0.1:{self.http_port}/client_port'
+        rh = handler()
+        ports = set()
+        for _ in range(3):
+            with validate_and_send(rh, Request(url)) as res:
+                ports.add(res.read())
+        rh.close()
+        assert len(ports) == 1
+        assert rh._pool_stats['requests'] == 3
+        assert rh._pool_stats['connections'] == 1
+
 
 @pytest.mark.parametrize('handler', ['CurlCFFI'], indirect=True)
 class TestCurlCFFIRequestHandler(TestRequestHandlerBase):
@@ -1177,6 +1286,19 @@ def close(self):
         assert res4.closed
         assert res4._buffer == b''
 
+        # readinto should copy across chunks
+        res5 = CurlCFFIResponseReader(FakeResponse())
+        buffer = bytearray(4)
+        assert res5.readinto(buffer) == 4
+        assert buffer == b'foob'
+        assert res5.bytes_read == 6
+        assert res5._buffer == b'ar'
+        assert res5.readinto(buffer) == 3
+        assert buffer[:3] == b'arz'
+        assert res5.bytes_read == 7
+        assert res5.closed
+        assert res5.readinto(buffer) == 0
+
 
 def run_validation(handler, error, req, **handler_kwargs):
     with handler(**handler_kwargs) as rh:
@@ -1796,6 +1918,7 @@ def test_build_handler_params(self):
             'compat_opts': ['no-certifi'],
             'nocheckcertificate': True,
             'legacyserverconnect': True,
+            'concurrent_fragment_downloads': 16,
         }) as ydl:
             rh = self.build_handler(ydl)
             assert rh.headers.get('test') == 'testtest'
@@ -1807,6 +1930,10 @@ def test_build_handler_params(self):
             assert rh.prefer_system_certs is True
             assert rh.verify is False
             assert rh.legacy_ssl_support is True
+            assert rh.pool_size == 16
+
+        with FakeYDL({'concurrent_fragment_downloads': 4}) as ydl:
+            assert self.build_handler(ydl).pool_size == DEFAULT_POOL_SIZE
 
     @pytest.mark.parametrize('ydl_params', [
         {'client_certificate': 'fakecert.crt'},
@@ -2032,6 +2159,15 @@ def test_compat(self):
             assert res.info() is res.headers
             assert res.getheader('test') == res.get_header('test')
 
+    def test_readinto(self):
+        res = Response(io.BytesIO(b'foobar'), url='test://', headers={})
+        buffer = bytearray(4)
+        assert res.readinto(buffer) == 4
+        assert buffer == b'foob'
+        assert res.readinto(memoryview(buffer)[1:]) == 2
+        assert buffer == b'farb'
+        assert res.readinto(buffer) == 0
+
 
 class TestImpersonateTarget:
     @pytest.mark.parametrize('target_str,expected', [
@@ -9,17 +9,26 @@
 
 
 import subprocess
+import tempfile
 
 from yt_dlp import YoutubeDL
 from yt_dlp.utils import shell_quote
+from yt_dlp.utils._utils import _YDLLogger as FakeLogger
 from yt_dlp.postprocessor import (
+    EmbedThumbnailPP,
     ExecPP,
+    FFmpegEmbedSubtitlePP,
+    FFmpegMetadataPP,
+    FFmpegPostProcessor,
+    FFmpegSplitChaptersPP,
     FFmpegThumbnailsConvertorPP,
+    FFmpegVideoRemuxerPP,
     MetadataFromFieldPP,
     MetadataParserPP,
     ModifyChaptersPP,
     SponsorBlockPP,
 )
+from yt_dlp.postprocessor.ffmpeg import FFmpegFusedPP, FFmpegPostProcessorError
 
 
 class TestMetadataFromField(unittest.TestCase):
@@ -87,6 +96,289 @@ def test_parse_cmd(self):
         self.assertEqual(pp.parse_cmd('echo %(filepath)q', info), cmd)
 
 
+class TestFFmpegFusedPP(unittest.TestCase):
+    STREAMS = [
+        {'codec_type': 'video'},
+        {'codec_type': 'audio'},
+        {'codec_type': 'subtitle'},
+        {'codec_type': 'data'},
+        {'codec_type': 'attachment', 'tags': {'mimetype': 'application/json'}},
+    ]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.ydl = YoutubeDL({'logger': FakeLogger()})
+        self.commands = []
+        self.info = {
+            'id': 'test', 'title': 'Test', 'ext': 'webm',
+            'filepath': self._touch('video.webm'),
+            'requested_subtitles': {'en': {'ext': 'vtt', 'filepath': self._touch('video.en.vtt')}},
+            'infojson_filename': self._touch('video.info.json'),
+        }
+
+    def tearDown(self):
+        self.ydl.close()
+        self.tmpdir.cleanup()
+
+    def _touch(self, name):
+        path = os.path.join(self.tmpdir.name, name)
+        open(path, 'wb').close()
+        return path
+
+    def _record(self, pp):
+        def run_ffmpeg_multiple_files(input_paths, out_path, opts, **kwargs):
+            self.commands.append(([os.path.basename(path) for path in input_paths], os.path.basename(out_path), [
+                os.path.basename(opt) if opt.startswith('file:') else opt for opt in opts]))
+            open(out_path, 'wb').close()
+
+        pp.run_ffmpeg_multiple_files = run_ffmpeg_multiple_files
+        pp.get_metadata_object = lambda path: {'streams': self.STREAMS}
+        return pp
+
+    def _pps(self):
+        return [
+            FFmpegVideoRemuxerPP(self.ydl, 'mkv'),
+            FFmpegEmbedSubtitlePP(self.ydl),
+            FFmpegMetadataPP(self.ydl, add_metadata=False, add_chapters=False, add_infojson=True),
+        ]
+
+    def test_separate(self):
+        info = self.info
+        for pp in self._pps():
+            _, info = self._record(pp).run(info)
+        self.assertEqual(info['filepath'], os.path.join(self.tmpdir.name, 'video.mkv'))
+        self.assertEqual(self.commands, [
+            (['video.webm'], 'video.mkv', ['-map', '0', '-dn', '-ignore_unknown', '-c', 'copy']),
+            (['video.mkv', 'video.en.vtt'], 'video.temp.mkv', [
+                '-map', '0', '-dn', '-ignore_unknown', '-c', 'copy',
+                '-map', '-0:s', '-map', '1:0', '-metadata:s:s:0', 'language=eng']),
+            # The data stream is not copied, so the attachment is the 4th stream
+            (['video.mkv'], 'video.temp.mkv', [
+                '-map', '0', '-dn', '-ignore_unknown', '-c', 'copy', '-map', '-0:4', '-attach', 'video.info.json',
+                '-metadata:s:3', 'mimetype=application/json', '-metadata:s:3', 'filename=info.json']),
+        ])
+
+    def test_fused(self):
+        pps = FFmpegFusedPP.fuse(self.ydl, self._pps())
+        self.assertEqual(len(pps), 1)
+        files_to_delete, info = self._record(pps[0]).run(self.info)
+        self.assertEqual(info['filepath'], os.path.join(self.tmpdir.name, 'video.mkv'))
+        self.assertEqual(info['ext'], 'mkv')
+        self.assertEqual(files_to_delete, [self.info['filepath'], *(
+            sub['filepath'] for sub in self.info['requested_subtitles'].values())])
+        # The old subtitles are replaced by the new ones
+        self.assertEqual(self.commands, [
+            (['video.webm', 'video.en.vtt'], 'video.mkv', [
+                '-map', '0', '-dn', '-ignore_unknown', '-c', 'copy',
+                '-map', '-0:s', '-map', '1:0', '-metadata:s:s:0', 'language=eng', '-map', '-0:4',
+                '-attach', 'video.info.json',
+                '-metadata:s:3', 'mimetype=application/json', '-metadata:s:3', 'filename=info.json']),
+        ])
+        self.assertTrue(os.path.exists(info['filepath']))
+
+    def test_replace_attachments(self):
+        self.STREAMS = [
+            {'codec_type': 'video'},
+            {'codec_type': 'audio'},
+            {'codec_type': 'data'},
+            {'codec_type': 'attachment', 'tags': {'mimetype': 'application/json'}},
+            {'codec_type': 'attachment', 'tags': {'mimetype': 'image/jpeg'}},
+        ]
+        info = {
+            **self.info, 'ext': 'mkv', 'filepath': self._touch('video.mkv'), 'requested_subtitles': None,
+            'thumbnails': [{'filepath': self._touch('video.jpg')}],
+        }
+        pps = FFmpegFusedPP.fuse(self.ydl, [
+            FFmpegMetadataPP(self.ydl, add_metadata=False, add_chapters=False, add_infojson=True),
+            EmbedThumbnailPP(self.ydl, already_have_thumbnail=True),
+        ])
+        self._record(pps[0]).run(info)
+        # Both old attachments are dropped, so the new ones follow the video and audio
+        self.assertEqual(self.commands, [
+            (['video.mkv'], 'video.temp.mkv', [
+                '-map', '0', '-dn', '-ignore_unknown', '-c', 'copy',
+                '-map', '-0:3', '-attach', 'video.info.json', '-map', '-0:4', '-attach', 'video.jpg',
+                '-metadata:s:2', 'mimetype=application/json', '-metadata:s:2', 'filename=info.json',
+                '-metadata:s:3', 'mimetype=image/jpeg', '-metadata:s:3', 'filename=cover.jpg']),
+        ])
+
+    def test_fuse(self):
+        remux, subtitle, metadata = self._pps()
+        exec_pp = ExecPP(self.ydl, 'echo')
+        pps = FFmpegFusedPP.fuse(self.ydl, [remux, exec_pp, subtitle, metadata])
+        self.assertEqual(pps[:2], [remux, exec_pp])
+        self.assertIsInstance(pps[2], FFmpegFusedPP)
+        self.assertEqual(pps[2].postprocessors, [subtitle, metadata])
+
+        # Postprocessors with their own arguments run separately
+        self.ydl.params['postprocessor_args'] = {'metadata+ffmpeg': ['-v', 'quiet']}
+        self.assertEqual(FFmpegFusedPP.fuse(self.ydl, [subtitle, metadata]), [subtitle, metadata])
+
+    def test_not_plannable(self):
+        # The remux can only be planned first, so the plan is run before it
+        remux, subtitle, metadata = self._pps()
+        fused = self._record(FFmpegFusedPP(self.ydl, [subtitle, remux, metadata]))
+        _, info = fused.run(self.info)
+        self.assertEqual(info['filepath'], os.path.join(self.tmpdir.name, 'video.mkv'))
+        self.assertEqual([(inputs, out) for inputs, out, _ in self.commands], [
+            (['video.webm', 'video.en.vtt'], 'video.temp.webm'),
+            (['video.webm'], 'video.mkv'),
+        ])
+
+
+FAKE_EXECUTABLE = '''#!/bin/sh
+echo "$@" >> "$0.log"
+case "$1" in
+    -bsfs) echo "$(basename "$0") version 6.0 Copyright"; echo setts ;;
+    -show_streams) printf 'codec_name=aac\\ncodec_type=audio\\n' ;;
+    *) echo '{"format": {"duration": "12.5"}, "streams": [{"codec_type": "audio", "codec_name": "aac"}]}' ;;
+esac
+'''
+
+
+@unittest.skipIf(os.name == 'nt', 'the fake executables are shell scripts')
+class TestFFmpegCaches(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = self._tmpdir.name
+        for prog in ('ffmpeg', 'ffprobe'):
+            path = os.path.join(self.tmpdir, prog)
+            with open(path, 'w') as f:
+                f.write(FAKE_EXECUTABLE)
+            os.chmod(path, 0o755)
+        self.media = os.path.join(self.tmpdir, 'media.mp4')
+        with open(self.media, 'wb') as f:
+            f.write(b'media')
+
+    def tearDown(self):
+        for cache in (FFmpegPostProcessor._version_cache, FFmpegPostProcessor._features_cache):
+            for prog in ('ffmpeg', 'ffprobe'):
+                cache.pop(os.path.join(self.tmpdir, prog), None)
+        self._tmpdir.cleanup()
+
+    def runs(self, prog):
+        try:
+            with open(os.path.join(self.tmpdir, f'{prog}.log')) as f:
+                return f.read().splitlines()
+        except FileNotFoundError:
+            return []
+
+    def new_pp(self):
+        ydl = YoutubeDL({
+            'logger': FakeLogger(),
+            'ffmpeg_location': self.tmpdir,
+            'cachedir': os.path.join(self.tmpdir, 'cache'),
+        })
+        return FFmpegPostProcessor(ydl)
+
+    def test_capabilities_cache(self):
+        pp = self.new_pp()
+        self.assertEqual(pp._versions, {'ffmpeg': '6.0', 'ffprobe': '6.0'})
+        self.assertTrue(pp._features['setts'])
+        self.assertEqual(self.runs('ffmpeg'), ['-bsfs'])
+
+        # A new process would only find the persistent cache
+        for cache in (FFmpegPostProcessor._version_cache, FFmpegPostProcessor._features_cache):
+            cache.pop(os.path.join(self.tmpdir, 'ffmpeg'), None)
+        pp = self.new_pp()
+        self.assertEqual(pp._versions, {'ffmpeg': '6.0', 'ffprobe': '6.0'})
+        self.assertTrue(pp._features['setts'])
+        self.assertEqual(self.runs('ffmpeg'), ['-bsfs'])
+
+        # Replacing the executable invalidates the cache
+        FFmpegPostProcessor._version_cache.pop(os.path.join(self.tmpdir, 'ffmpeg'))
+        stat = os.stat(os.path.join(self.tmpdir, 'ffmpeg'))
+        os.utime(os.path.join(self.tmpdir, 'ffmpeg'), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(self.new_pp()._versions['ffmpeg'], '6.0')
+        self.assertEqual(self.runs('ffmpeg'), ['-bsfs', '-bsfs'])
+
+    def test_probe_cache(self):
+        pp = self.new_pp()
+        self.assertEqual(pp._get_real_video_duration(self.media), 12.5)
+        # The result is shared by other postprocessors
+        self.assertEqual(FFmpegMetadataPP(pp._downloader).get_metadata_object(self.media)['format']['duration'], '12.5')
+        self.assertEqual(len([run for run in self.runs('ffprobe') if run != '-bsfs']), 1)
+        self.assertEqual(pp.get_audio_codec(self.media), 'aac')
+        self.assertEqual(len([run for run in self.runs('ffprobe') if run != '-bsfs']), 2)
+
+        with open(self.media, 'ab') as f:
+            f.write(b'changed')
+        pp.get_metadata_object(self.media)
+        self.assertEqual(len([run for run in self.runs('ffprobe') if run != '-bsfs']), 3)
+
+
+class TestFFmpegSplitChaptersPP(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.ydl = YoutubeDL({
+            'logger': FakeLogger(),
+            'outtmpl': {'chapter': os.path.join(self.tmpdir.name, '%(section_number)d.%(ext)s')},
+            'postprocessor_args': {'splitchapters+ffmpeg': ['-metadata', 'comment=split']},
+        })
+        self.commands = []
+        self.info = {
+            'id': 'test', 'title': 'Test', 'ext': 'mp4',
+            'filepath': os.path.join(self.tmpdir.name, 'video.mp4'),
+            'chapters': [
+                {'start_time': 0, 'end_time': 10, 'title': 'a'},
+                {'start_time': 10, 'end_time': 25, 'title': 'b'},
+                {'start_time': 25, 'end_time': 30, 'title': 'c'},
+            ],
+        }
+
+    def tearDown(self):
+        self.ydl.close()
+        self.tmpdir.cleanup()
+
+    def _run(self, **kwargs):
+        pp = FFmpegSplitChaptersPP(self.ydl, **kwargs)
+        pp.basename, pp._version = 'ffmpeg', '6.0'
+
+        def real_run_ffmpeg(input_path_opts, output_path_opts):
+            self.commands.append((
+                [(os.path.basename(path), list(opts)) for path, opts in input_path_opts],
+                [(os.path.basename(path), list(opts)) for path, opts in output_path_opts]))
+
+        pp.real_run_ffmpeg = real_run_ffmpeg
+        _, info = pp.run(self.info)
+        self.assertEqual(
+            [os.path.basename(chapter['filepath']) for chapter in info['chapters']], ['1.mp4', '2.mp4', '3.mp4'])
+        return pp
+
+    def test_separate(self):
+        copy_opts = ['-map', '0', '-dn', '-ignore_unknown', '-c', 'copy']
+        expected = [
+            ([('video.mp4', ['-ss', '0', '-t', '10'])], [('1.mp4', copy_opts)]),
+            ([('video.mp4', ['-ss', '10', '-t', '15'])], [('2.mp4', copy_opts)]),
+            ([('video.mp4', ['-ss', '25', '-t', '5'])], [('3.mp4', copy_opts)]),
+        ]
+        self._run()
+        self.assertEqual(self.commands, expected)
+
+        self.commands = []
+        self._run(jobs=3)
+        self.assertCountEqual(self.commands, expected)
+
+    def test_single_pass(self):
+        copy_opts = ['-map', '0', '-dn', '-ignore_unknown', '-c', 'copy']
+        self._run(single_pass=True)
+        self.assertEqual(self.commands, [([('video.mp4', [])], [
+            ('1.mp4', [*copy_opts, '-ss', '0', '-t', '10']),
+            # real_run_ffmpeg adds the postprocessor args of the first output
+            ('2.mp4', [*copy_opts, '-ss', '10', '-t', '15', '-metadata', 'comment=split']),
+            ('3.mp4', [*copy_opts, '-ss', '25', '-t', '5', '-metadata', 'comment=split']),
+        ])])
+
+        self.commands = []
+        FFmpegSplitChaptersPP.SINGLE_PASS_BATCH_SIZE, batch_size = 2, FFmpegSplitChaptersPP.SINGLE_PASS_BATCH_SIZE
+        try:
+            self._run(single_pass=True, jobs=2)
+        finally:
+            FFmpegSplitChaptersPP.SINGLE_PASS_BATCH_SIZE = batch_size
+        self.assertCountEqual([[path for path, _ in outputs] for _, outputs in self.commands], [
+            ['1.mp4', '2.mp4'], ['3.mp4']])
+
+
 class TestModifyChaptersPP(unittest.TestCase):
     def setUp(self):
         self._pp = ModifyChaptersPP(YoutubeDL())
@@ -573,6 +865,82 @@ def test_remove_marked_arrange_sponsors_SmallestSponsorInTheOverlapGetsNamed(sel
                 '[SponsorBlock]: Sponsor', 'c',
             ]), [])
 
+    def test_cut_bsf(self):
+        cuts = [self._chapter(1, 2), self._chapter(10, 20)]
+        self.assertEqual(
+            self._pp._cut_bsf(cuts, 1.5),
+            r'noise=drop=gte(pts*tb\,2.500000)*lt(pts*tb\,3.500000)+gte(pts*tb\,11.500000)*lt(pts*tb\,21.500000),'
+            r'setts=ts=TS-(gte(PTS*TB\,3.500000)*1.000000+gte(PTS*TB\,21.500000)*10.000000)/TB')
+
+    def test_cut_files(self):
+        commands = []
+
+        def real_run_ffmpeg(input_path_opts, output_path_opts):
+            commands.append((
+                [(path, list(opts)) for path, opts in input_path_opts],
+                [(path, list(opts)) for path, opts in output_path_opts]))
+
+        self._pp.real_run_ffmpeg = real_run_ffmpeg
+        self._pp.get_metadata_object = lambda path: {'format': {'start_time': '1.5'}}
+        cuts = [self._chapter(1, 2)]
+        self.assertEqual(
+            self._pp.cut_files(['video.mp4', 'video.en.vtt'], cuts, 'video.mp4.keyframes'),
+            [('video.mp4', 'video.temp.mp4'), ('video.en.vtt', 'video.en.temp.vtt')])
+        self.assertEqual(commands, [(
+            [('video.mp4.keyframes', []), ('video.en.vtt', [])],
+            [('video.temp.mp4', [
+                '-map', '0', '-dn', '-ignore_unknown', '-c', 'copy', '-c:s', 'mov_text',
+                '-map_chapters', '-1', '-bsf', self._pp._cut_bsf(cuts, 1.5)]),
+             ('video.en.temp.vtt', [
+                 '-map', '1', '-dn', '-ignore_unknown', '-c', 'copy',
+                 '-map_chapters', '-1', '-bsf', self._pp._cut_bsf(cuts)])],
+        )])
+
+    def test_run_single_pass(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for force_keyframes, fails in ((False, False), (True, False), (True, True)):
+                calls = []
+
+                def cut_files(filenames, cuts, keyframe_file):
+                    calls.append(('cut_files', keyframe_file))
+                    if fails:
+                        raise FFmpegPostProcessorError('error')
+                    return [(filenames[0], self._touch(tmpdir, 'video.temp.mp4'))]
+
+                def remove_chapters(filename, cuts, concat_opts, force_keyframes, *, keyframe_file=None):
+                    calls.append(('remove_chapters', keyframe_file))
+                    return self._touch(tmpdir, 'video.temp.mp4')
+
+                pp = ModifyChaptersPP(YoutubeDL({'logger': FakeLogger()}), remove_ranges=[(10, 20)],
+                                      force_keyframes=force_keyframes)
+                pp._can_cut_in_one_pass = lambda: True
+                pp._get_real_video_duration = lambda filename: 30
+                pp.force_keyframes = lambda filename, timestamps: calls.append('force_keyframes') or self._touch(
+                    tmpdir, 'video.keyframes.temp.mp4')
+                pp.cut_files, pp.remove_chapters = cut_files, remove_chapters
+                pp.run({'filepath': self._touch(tmpdir, 'video.mp4'), 'title': 'video', 'duration': 30})
+                keyframe_file = os.path.join(tmpdir, 'video.keyframes.temp.mp4')
+                # The packets of the video can only be dropped cleanly at keyframes,
+                # and the video is not re-encoded again when the single pass fails
+                self.assertEqual(calls, [('remove_chapters', None)] if not force_keyframes else [
+                    'force_keyframes', ('cut_files', keyframe_file),
+                    *([('remove_chapters', keyframe_file)] if fails else [])])
+                self.assertFalse(os.path.exists(keyframe_file))
+
+    @staticmethod
+    def _touch(tmpdir, name):
+        path = os.path.join(tmpdir, name)
+        open(path, 'wb').close()
+        return path
+
+    def test_can_cut_in_one_pass(self):
+        self._pp.basename, self._pp._version, self._pp._features = 'ffmpeg', '6.0', {'setts': True}
+        self.assertTrue(self._pp._can_cut_in_one_pass())
+        self._pp._version = '5.0'
+        self.assertFalse(self._pp._can_cut_in_one_pass())
+        self._pp._version, self._pp._features = '6.0', {}
+        self.assertFalse(self._pp._can_cut_in_one_pass())
+
     def test_make_concat_opts_CommonCase(self):
         sponsor_chapters = [self._chapter(1, 2, 's1'), self._chapter(10, 20, 's2')]
         expected = '''ffconcat version 1.0
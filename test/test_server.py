@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import contextlib
+import io
+import json
+import socket
+import tempfile
+import threading
+
+from yt_dlp.extractor.common import InfoExtractor
+from yt_dlp.server import BatchServer
+from yt_dlp.utils import ExtractorError
+from yt_dlp.utils._utils import _YDLLogger as FakeLogger
+from yt_dlp.YoutubeDL import YoutubeDL
+
+
+class _TestIE(InfoExtractor):
+    _VALID_URL = r'test:(?P<id>\w+)'
+    instances = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _TestIE.instances += 1
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        if video_id == 'fail':
+            raise ExtractorError('Extraction failed', expected=True)
+        return {
+            'id': video_id,
+            'title': f'Video {video_id}',
+            'formats': [
+                {'format_id': 'low', 'url': f'http://127.0.0.1/{video_id}/low.mp4', 'height': 240},
+                {'format_id': 'high', 'url': f'http://127.0.0.1/{video_id}/high.mp4', 'height': 720},
+            ],
+        }
+
+
+class TestBatchServer(unittest.TestCase):
+    def setUp(self):
+        self.ydl = YoutubeDL({'logger': FakeLogger(), 'ignoreconfig': True}, auto_init=False)
+        self.ydl.add_info_extractor(_TestIE())
+        self.server = BatchServer(self.ydl, ['--ignore-config'])
+
+    def tearDown(self):
+        self.ydl.close()
+
+    def _handle(self, **job):
+        return self.server.handle(json.dumps(job))
+
+    def test_extract(self):
+        response = self._handle(id=1, url='test:abc')
+        self.assertEqual(response['id'], 1)
+        self.assertEqual(response['status'], 'ok')
+        self.assertEqual(response['result']['id'], 'abc')
+        self.assertEqual(response['result']['format_id'], 'high')
+
+        response = self._handle(id=2, urls=['test:a', 'test:b'])
+        self.assertEqual([info['id'] for info in response['result']], ['a', 'b'])
+
+        self.assertEqual(self._handle(id=3, action='ping')['result'], 'pong')
+
+    def test_overrides(self):
+        for job in ({'params': {'format': 'worst'}}, {'args': ['-f', 'worst']}):
+            with self.subTest(job=job):
+                response = self._handle(id=1, url='test:abc', **job)
+                self.assertEqual(response['result']['format_id'], 'low')
+                # Overrides do not leak into the next job
+                self.assertNotIn('format', self.ydl.params)
+                self.assertEqual(self._handle(id=2, url='test:abc')['result']['format_id'], 'high')
+
+        outtmpl = dict(self.ydl.params['outtmpl'])
+        self._handle(id=3, url='test:abc', params={'outtmpl': '%(id)s.%(ext)s'})
+        self.assertEqual(self.ydl.params['outtmpl'], outtmpl)
+
+    def test_errors(self):
+        for line, error in (
+            ('{', 'Invalid JSON'),
+            ('[]', 'Job must be a JSON object'),
+            ('{"action": "invalid", "url": "test:a"}', 'Unknown action'),
+            ('{"id": 5}', 'Job has no URL'),
+            ('{"url": "test:a", "params": {"postprocessors": []}}', 'can not be changed per job'),
+            ('{"url": "test:a", "args": ["--invalid-option"]}', 'Invalid arguments'),
+            ('{"url": "test:fail"}', 'Extraction failed'),
+            ('{"url": "test:a", "params": {"format": "best["}}', ''),
+        ):
+            with self.subTest(line=line):
+                response = self.server.handle(line)
+                self.assertEqual(response['status'], 'error')
+                self.assertIn(error, response['error'])
+        self.assertEqual(self.server.handle('{"id": 5}')['id'], 5)
+        # The server keeps working after failed jobs
+        self.assertEqual(self._handle(url='test:abc')['status'], 'ok')
+
+    def test_reuse(self):
+        _TestIE.instances = 0
+        director = self.ydl._request_director
+        for i in range(3):
+            self._handle(id=i, url=f'test:v{i}')
+        self.assertEqual(_TestIE.instances, 0)
+        self.assertIs(self.ydl._request_director, director)
+
+        # Network params rebuild the request handlers for the job only
+        self._handle(id=4, url='test:abc', params={'socket_timeout': 5})
+        self.assertIsNot(self.ydl._request_director, director)
+
+    def test_serve(self):
+        infile = io.StringIO('{"id": 1, "url": "test:a"}\n\n{"id": 2, "url": "test:fail"}\n')
+        outfile = io.StringIO()
+        self.server.serve(infile, outfile)
+        responses = [json.loads(line) for line in outfile.getvalue().splitlines()]
+        self.assertEqual([(r['id'], r['status']) for r in responses], [(1, 'ok'), (2, 'error')])
+
+    def test_serve_stdout(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            ydl = YoutubeDL({'ignoreconfig': True, 'noprogress': True}, auto_init=False)
+            ydl.add_info_extractor(_TestIE())
+            server = BatchServer(ydl, ['--ignore-config'])
+            server.serve(io.StringIO(
+                '{"id": 1, "action": "download", "url": "test:a", "args": ["--print", "id"]}\n'
+                '{"id": 2, "action": "download", "url": "test:a", "params": {"outtmpl": "-"}}\n'), sys.stdout)
+            ydl.close()
+        # Only the responses are written to stdout
+        responses = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([(r['id'], r['status']) for r in responses], [(1, 'ok'), (2, 'error')])
+        self.assertIn('stdout', responses[1]['error'])
+        self.assertIn('a', stderr.getvalue().splitlines())
+        self.assertIs(ydl._out_files.out, stdout)
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'unix sockets are not available')
+    def test_serve_socket(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'server.sock')
+            thread = threading.Thread(target=self.server.serve_socket, args=(path,), daemon=True)
+            thread.start()
+            for _ in range(100):
+                if os.path.exists(path):
+                    break
+                threading.Event().wait(0.05)
+
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(path)
+                with sock.makefile('rw', encoding='utf-8') as f:
+                    f.write('{"id": 1, "url": "test:a"}\n')
+                    f.flush()
+                    response = json.loads(f.readline())
+            self.assertEqual(response['status'], 'ok')
+            self.assertEqual(response['result']['id'], 'a')
+            self.server.shutdown()
+            thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
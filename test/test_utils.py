@@ -27,6 +27,7 @@
     Config,
     DateRange,
     ExtractorError,
+    FragmentList,
     InAdvancePagedList,
     LazyList,
     NO_DEFAULT,
@@ -1958,6 +1959,38 @@ def test(ll, idx, val, cache):
         ll = reversed(ll)
         test(ll, -15, 14, range(15))
 
+    def test_FragmentList(self):
+        fragments = FragmentList.from_timeline(
+            'seg-%(Time)d-%(Number)03d.m4s', 1, [{'t': 100, 'd': 10, 'r': 2}, {'d': 5}], 10, bandwidth=1000)
+        expected = [
+            {'path': 'seg-100-001.m4s', 'duration': 1.0},
+            {'path': 'seg-110-002.m4s', 'duration': 1.0},
+            {'path': 'seg-120-003.m4s', 'duration': 1.0},
+            {'path': 'seg-130-004.m4s', 'duration': 0.5},
+        ]
+        self.assertEqual(fragments, expected)
+        self.assertEqual(len(fragments), 4)
+        self.assertEqual(fragments[-1], expected[-1])
+        self.assertEqual(fragments[1:3], expected[1:3])
+        with self.assertRaises(IndexError):
+            fragments[4]
+
+        self.assertEqual(
+            FragmentList.from_template('https://cdn.example.com/%(Bandwidth)d/%(Number)d.ts', 5, 2, duration=2.0, bandwidth=8),
+            [{'url': 'https://cdn.example.com/8/5.ts', 'duration': 2.0}, {'url': 'https://cdn.example.com/8/6.ts', 'duration': 2.0}])
+        self.assertEqual(
+            FragmentList.from_urls(['a.ts', 'https://cdn.example.com/b.ts'], timeline=[{'d': 3, 'r': 1}], timescale=1),
+            [{'path': 'a.ts', 'duration': 3.0}, {'url': 'https://cdn.example.com/b.ts', 'duration': 3.0}])
+        self.assertEqual(FragmentList.from_urls(['a.ts']), [{'path': 'a.ts'}])
+        self.assertFalse(FragmentList.from_template('%(Number)d', 1, 0))
+
+        # Concatenation and serialization
+        combined = FragmentList([{'path': 'init.mp4'}], fragments, FragmentList.from_urls(['last.m4s']))
+        self.assertEqual(combined, [{'path': 'init.mp4'}, *expected, {'path': 'last.m4s'}])
+        serialized = json.loads(json.dumps(combined.to_json()))
+        self.assertEqual(serialized['_type'], 'fragment_list')
+        self.assertEqual(FragmentList.from_json(serialized), combined)
+
     def test_format_bytes(self):
         self.assertEqual(format_bytes(0), '0.00B')
         self.assertEqual(format_bytes(1000), '1000.00B')
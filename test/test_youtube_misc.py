@@ -8,8 +8,15 @@
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
+import shutil
+
+from test.helper import FakeYDL
 from yt_dlp.extractor import YoutubeIE
 
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(TEST_DIR, 'testdata', 'youtube_cache_test')
+PLAYER_URL = 'https://www.youtube.com/s/player/4c3f79c5/player_ias.vflset/en_US/base.js'
+
 
 class TestYoutubeMisc(unittest.TestCase):
     def test_youtube_extract(self):
@@ -22,5 +29,56 @@ def test_youtube_extract(self):
         assertExtractId('BaW_jenozKc', 'BaW_jenozKc')
 
 
+
+class TestYoutubePlayerCache(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+
+    def tearDown(self):
+        if os.path.exists(CACHE_DIR):
+            shutil.rmtree(CACHE_DIR)
+
+    def _make_ie(self):
+        ie = YoutubeIE(FakeYDL({'cachedir': CACHE_DIR}))
+        ie.downloads = []
+
+        def download_webpage(url, *args, **kwargs):
+            ie.downloads.append(url)
+            return 'var player = "code";'
+
+        ie._download_webpage = download_webpage
+        return ie
+
+    def test_player_js(self):
+        ie = self._make_ie()
+        self.assertEqual(ie._load_player('id', PLAYER_URL), 'var player = "code";')
+        self.assertEqual(ie._load_player('id', PLAYER_URL), 'var player = "code";')
+        self.assertEqual(ie.downloads, [PLAYER_URL])
+
+        # Other processes load the player from the filesystem cache
+        ie = self._make_ie()
+        self.assertEqual(ie._load_player('id', PLAYER_URL), 'var player = "code";')
+        self.assertEqual(ie.downloads, [])
+
+    def test_nsig_results(self):
+        ie = self._make_ie()
+        ie._extract_n_function_code = lambda *args: self.fail('nsig function should not be needed')
+        ie._store_nsig_result(PLAYER_URL, 'abc', 'xyz')
+        self.assertEqual(ie._decrypt_nsig('abc', 'id', PLAYER_URL), 'xyz')
+        # The results are only written to the filesystem once they are flushed
+        self.assertEqual(self._make_ie()._load_nsig_results(PLAYER_URL), {})
+        ie._flush_nsig_results()
+
+        ie = self._make_ie()
+        ie._extract_n_function_code = lambda *args: self.fail('nsig function should not be needed')
+        self.assertEqual(ie._decrypt_nsig('abc', 'id', PLAYER_URL), 'xyz')
+
+        ie._NSIG_RESULTS_CACHE_SIZE = 2
+        ie._store_nsig_result(PLAYER_URL, 'def', 'uvw')
+        ie._store_nsig_result(PLAYER_URL, 'ghi', 'rst')
+        ie._flush_nsig_results()
+        self.assertEqual(self._make_ie()._load_nsig_results(PLAYER_URL), {'def': 'uvw', 'ghi': 'rst'})
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -449,14 +449,18 @@ def signature(jscode, sig_input, player_url):
     return func(src_sig)
 
 
-def n_sig(jscode, sig_input, player_url):
+def n_sig(jscode, sig_input, player_url, compiled=False):
     ie = YoutubeIE(FakeYDL())
     funcname = ie._extract_n_function_name(jscode, player_url=player_url)
-    jsi = JSInterpreter(jscode)
+    jsi = JSInterpreter(jscode, compiled=compiled)
     func = jsi.extract_function_from_code(*ie._fixup_n_function_code(*jsi.extract_function_code(funcname), jscode, player_url))
     return func([sig_input])
 
 
+def compiled_n_sig(jscode, sig_input, player_url):
+    return n_sig(jscode, sig_input, player_url, compiled=True)
+
+
 make_sig_test = t_factory(
     'signature', signature,
     re.compile(r'''(?x)
@@ -469,8 +473,11 @@ def n_sig(jscode, sig_input, player_url):
 
 make_nsig_test = t_factory(
     'nsig', n_sig, re.compile(r'.+/player/(?P<id>[a-zA-Z0-9_/.-]+)\.js$'))
+make_compiled_nsig_test = t_factory(
+    'compiled_nsig', compiled_n_sig, re.compile(r'.+/player/(?P<id>[a-zA-Z0-9_/.-]+)\.js$'))
 for test_spec in _NSIG_TESTS:
     make_nsig_test(*test_spec)
+    make_compiled_nsig_test(*test_spec)
 
 
 if __name__ == '__main__':
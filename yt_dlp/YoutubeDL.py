@@ -1,4 +1,5 @@
 import collections
+import concurrent.futures
 import contextlib
 import copy
 import datetime as dt
@@ -19,11 +20,13 @@
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 import tokenize
 import traceback
 import unicodedata
 
+from .archive import DownloadArchive, load_download_archive
 from .cache import Cache
 from .compat import urllib  # isort: split
 from .compat import urllib_req_to_req
@@ -45,7 +48,7 @@
 )
 from .minicurses import format_text
 from .networking import HEADRequest, Request, RequestDirector
-from .networking.common import _REQUEST_HANDLERS, _RH_PREFERENCES
+from .networking.common import DEFAULT_POOL_SIZE, _REQUEST_HANDLERS, _RH_PREFERENCES
 from .networking.exceptions import (
     HTTPError,
     NoSupportingHandlers,
@@ -67,8 +70,10 @@
     FFmpegPostProcessor,
     FFmpegVideoConvertorPP,
     MoveFilesAfterDownloadPP,
+    NativeMergerPP,
     get_postprocessor,
 )
+from .postprocessor.ffmpeg import FFmpegFusedPP
 from .postprocessor.ffmpeg import resolve_mapping as resolve_recode_mapping
 from .update import (
     REPOSITORY,
@@ -96,6 +101,7 @@
     ExistingVideoReached,
     ExtractorError,
     FormatSorter,
+    FragmentList,
     GeoRestrictedError,
     ISO3166Utils,
     LazyList,
@@ -133,7 +139,6 @@
     iri_to_uri,
     is_path_like,
     join_nonempty,
-    locked_file,
     make_archive_id,
     make_dir,
     number_of_digits,
@@ -290,6 +295,9 @@ class YoutubeDL:
     playlist_items:    Specific indices of playlist to download.
     playlistrandom:    Download playlist items in random order.
     lazy_playlist:     Process playlist entries as they are received.
+    concurrent_entries: Number of playlist entries to extract and download
+                       concurrently (default 1). The entries are still
+                       returned in playlist order
     matchtitle:        Download only matching titles.
     rejecttitle:       Reject downloads for matching titles.
     logger:            A class having a `debug`, `warning` and `error` function where
@@ -326,6 +334,12 @@ class YoutubeDL:
     skip_download:     Skip the actual download of the video file
     cachedir:          Location of the cache files in the filesystem.
                        False to disable filesystem cache.
+    cache_store:       How to store the cache entries. One of "file" (default;
+                       one JSON file per entry) or "sqlite" (a single database
+                       "cache.sqlite3" in the cache directory). A subclass of
+                       yt_dlp.cache.CacheStore can also be given
+    cache_max_size:    Maximum size of the cache in bytes (default 512MiB).
+                       The least recently used entries are removed first
     noplaylist:        Download single video instead of a playlist if in doubt.
     age_limit:         An integer representing the user's age in years.
                        Unsuitable videos for the given age are skipped.
@@ -340,6 +354,14 @@ class YoutubeDL:
                        downloaded. None for no limit.
     download_archive:  A set, or the name of a file where all downloads are recorded.
                        Videos already present in the file are not downloaded again.
+    download_archive_backend: How to store the download archive file. One of
+                       "text" (default; the file is loaded into memory),
+                       "index" (a sorted index of hashed IDs is kept in
+                       "<file>.idx" and memory-mapped) or "sqlite" (the IDs
+                       are kept in the database "<file>.sqlite3", which can be
+                       shared by concurrent processes; videos are claimed
+                       before they are downloaded). A subclass of
+                       yt_dlp.archive.DownloadArchive can also be given
     break_on_existing: Stop the download process after attempting to download a
                        file that is in the archive.
     break_per_url:     Whether break_on_reject and break_on_existing
@@ -412,6 +434,8 @@ class YoutubeDL:
 
                        Progress hooks are guaranteed to be called at least once
                        (with status "finished") if the download is successful.
+                       Updates with status "downloading" can be limited to one
+                       every progress_hooks_delta seconds (see downloader/common.py)
     postprocessor_hooks:  A list of functions that get called on postprocessing
                        progress, with a dictionary with the entries
                        * status: One of "started", "processing", or "finished".
@@ -422,6 +446,10 @@ class YoutubeDL:
                        Progress hooks are guaranteed to be called at least twice
                        (with status "started" and "finished") if the processing is successful.
     merge_output_format: "/" separated list of extensions to use when merging formats.
+    native_merge:      Whether to merge mp4+m4a and webm+webm formats without
+                       ffmpeg when possible. By default (None), they are only
+                       merged natively, and preferred over a single file, when
+                       ffmpeg is not available
     final_ext:         Expected final extension; used to detect when the file was
                        already downloaded and converted
     fixup:             Automatically correct known faults of the file.
@@ -510,7 +538,8 @@ class YoutubeDL:
     nopart, updatetime, buffersize, ratelimit, throttledratelimit, min_filesize,
     max_filesize, test, noresizebuffer, retries, file_access_retries, fragment_retries,
     continuedl, xattr_set_filesize, hls_use_mpegts, http_chunk_size,
-    external_downloader_args, concurrent_fragment_downloads, progress_delta.
+    external_downloader_args, concurrent_fragment_downloads, fragment_buffer_size,
+    http_connections, progress_delta, progress_hooks_delta.
 
     The following options are used by the post processors:
     ffmpeg_location:   Location of the ffmpeg/avconv binary; either the path
@@ -522,6 +551,16 @@ class YoutubeDL:
                        Use 'default' as the name for arguments to passed to all PP
                        For compatibility with youtube-dl, a single list of args
                        can also be used
+    fuse_postprocessors: Run consecutive ffmpeg postprocessors that only copy
+                       streams (remux, subtitles, metadata, thumbnails) as a
+                       single ffmpeg invocation (default: True)
+    background_postprocessing: Number of videos that may be post-processed in
+                       the background while the next ones are downloaded
+                       (default 0). The files are moved and the "after_move"
+                       and "after_video" postprocessors are run in download
+                       order. Videos still being post-processed are waited for
+                       by download(), before the "playlist" postprocessors
+                       and on close()
 
     The following options are used by the extractors:
     extractor_retries: Number of times to retry for known errors (default: 3)
@@ -651,6 +690,11 @@ def __init__(self, params=None, auto_init=True):
         self._num_videos = 0
         self._playlist_level = 0
         self._playlist_urls = set()
+        self._state_lock = threading.RLock()
+        self._output_lock = threading.RLock()
+        self._entry_worker = threading.local()
+        self._background_pp = threading.local()
+        self._pp_executor, self._pp_jobs = None, []
         self.cache = Cache(self)
         self.__header_cookies = []
 
@@ -831,21 +875,11 @@ def check_deprecated(param, option, suggestion):
 
         def preload_download_archive(fn):
             """Preload the archive, if any is specified"""
-            archive = set()
             if fn is None:
-                return archive
+                return set()
             elif not is_path_like(fn):
                 return fn
-
-            self.write_debug(f'Loading archive file {fn!r}')
-            try:
-                with locked_file(fn, 'r', encoding='utf-8') as archive_file:
-                    for line in archive_file:
-                        archive.add(line.strip())
-            except OSError as ioe:
-                if ioe.errno != errno.ENOENT:
-                    raise
-            return archive
+            return load_download_archive(self, fn, self.params.get('download_archive_backend'))
 
         self.archive = preload_download_archive(self.params.get('download_archive'))
 
@@ -868,10 +902,37 @@ def add_info_extractor(self, ie):
         """Add an InfoExtractor object to the end of the list."""
         ie_key = ie.ie_key()
         self._ies[ie_key] = ie
+        self.__dict__.pop('_ie_dispatch', None)
         if not isinstance(ie, type):
             self._ies_instances[ie_key] = ie
             ie.set_downloader(self)
 
+    @functools.cached_property
+    def _ie_dispatch(self):
+        """Split the extractors into those covered by the URL index and those that must always be tried"""
+        from .extractor.extractors import is_url_indexed
+
+        indexed, fallback = {}, []
+        for pos, (ie_key, ie) in enumerate(self._ies.items()):
+            if is_url_indexed(ie):
+                indexed[(ie if isinstance(ie, type) else type(ie)).__name__] = (pos, ie_key)
+            else:
+                fallback.append((pos, ie_key))
+        return indexed, fallback
+
+    def _candidate_ies(self, url):
+        """Return the (ie_key, ie) pairs that may be suitable for the URL, in order"""
+        if not LAZY_EXTRACTORS.value:
+            return self._ies.items()
+        from .extractor.extractors import url_candidates
+
+        names = url_candidates(url)
+        if names is None:
+            return self._ies.items()
+        indexed, fallback = self._ie_dispatch
+        return [(key, self._ies[key]) for _, key in sorted(
+            [*fallback, *(indexed[name] for name in names if name in indexed)])]
+
     def get_info_extractor(self, ie_key):
         """
         Get an instance of an IE with name ie_key, it will try to get one from
@@ -946,7 +1007,8 @@ def _write_string(self, message, out=None, only_once=False):
             if message in self._printed_messages:
                 return
             self._printed_messages.add(message)
-        write_string(message, out=out, encoding=self.params.get('encoding'))
+        with self._output_lock:
+            write_string(message, out=out, encoding=self.params.get('encoding'))
 
     def to_stdout(self, message, skip_eol=False, quiet=None):
         """Print message to stdout"""
@@ -966,7 +1028,7 @@ def to_screen(self, message, skip_eol=False, quiet=None, only_once=False):
         if (self.params.get('quiet') if quiet is None else quiet) and not self.params.get('verbose'):
             return
         self._write_string(
-            '{}{}'.format(self._bidi_workaround(message), ('' if skip_eol else '\n')),
+            '{}{}'.format(self._bidi_workaround(self._prefix_entry_output(message)), ('' if skip_eol else '\n')),
             self._out_files.screen, only_once=only_once)
 
     def to_stderr(self, message, only_once=False):
@@ -975,7 +1037,8 @@ def to_stderr(self, message, only_once=False):
         if self.params.get('logger'):
             self.params['logger'].error(message)
         else:
-            self._write_string(f'{self._bidi_workaround(message)}\n', self._out_files.error, only_once=only_once)
+            message = self._bidi_workaround(self._prefix_entry_output(message))
+            self._write_string(f'{message}\n', self._out_files.error, only_once=only_once)
 
     def _send_console_code(self, code):
         if not supports_terminal_sequences(self._out_files.console):
@@ -1015,12 +1078,22 @@ def save_cookies(self):
             self.cookiejar.save()
 
     def __exit__(self, *args):
+        if args[0] and issubclass(args[0], KeyboardInterrupt):
+            # Do not start post-processing more videos
+            for job in self._pp_jobs:
+                job.cancel()
         self.restore_console_title()
         self.to_console_title(progress_state=_ProgressState.HIDDEN)
         self.close()
 
     def close(self):
+        if self._pp_executor:
+            self._pp_executor.shutdown()
+            self._pp_executor, self._pp_jobs = None, []
         self.save_cookies()
+        if isinstance(self.archive, DownloadArchive):
+            self.archive.close()
+        self.cache.close()
         if '_request_director' in self.__dict__:
             self._request_director.close()
             del self._request_director
@@ -1235,8 +1308,10 @@ def prepare_outtmpl(self, outtmpl, info_dict, sanitize=False):
             formatSeconds(info_dict['duration'], '-' if sanitize else ':')
             if info_dict.get('duration', None) is not None
             else None)
-        info_dict['autonumber'] = int(self.params.get('autonumber_start', 1) - 1 + self._num_downloads)
-        info_dict['video_autonumber'] = self._num_videos
+        # Concurrent entries keep the counters they were assigned
+        info_dict['autonumber'] = int(self.params.get('autonumber_start', 1) - 1 + info_dict.get(
+            '__num_downloads', self._num_downloads))
+        info_dict['video_autonumber'] = info_dict.get('__num_videos', self._num_videos)
         if info_dict.get('resolution') is None:
             info_dict['resolution'] = self.format_resolution(info_dict, default=None)
 
@@ -1360,7 +1435,7 @@ def sanitize(key, value):
                 return filename_sanitizer(key, value, restricted=self.params.get('restrictfilenames'))
 
         def _dumpjson_default(obj):
-            if isinstance(obj, (set, LazyList)):
+            if isinstance(obj, (set, LazyList, FragmentList)):
                 return list(obj)
             return repr(obj)
 
@@ -1571,8 +1646,9 @@ def check_filter():
             if ret is NO_DEFAULT:
                 while True:
                     filename = self._format_screen(self.prepare_filename(info_dict), self.Styles.FILENAME)
-                    reply = input(self._format_screen(
-                        f'Download "{filename}"? (Y/n): ', self.Styles.EMPHASIS)).lower().strip()
+                    with self._output_lock:  # Do not interleave with concurrent entries
+                        reply = input(self._format_screen(
+                            f'Download "{filename}"? (Y/n): ', self.Styles.EMPHASIS)).lower().strip()
                     if reply in {'y', ''}:
                         return None
                     elif reply == 'n':
@@ -1632,11 +1708,11 @@ def extract_info(self, url, download=True, ie_key=None, extra_info=None,
             ie_key = 'Generic'
 
         if ie_key:
-            ies = {ie_key: self._ies[ie_key]} if ie_key in self._ies else {}
+            ies = [(ie_key, self._ies[ie_key])] if ie_key in self._ies else []
         else:
-            ies = self._ies
+            ies = self._candidate_ies(url)
 
-        for key, ie in ies.items():
+        for key, ie in ies:
             if not ie.suitable(url):
                 continue
 
@@ -1942,16 +2018,18 @@ def process_ie_result(self, ie_result, download=True, extra_info=None):
                         ie_result.get('title')) or ie_result.get('id'))
                 return
 
-            self._playlist_level += 1
-            self._playlist_urls.add(webpage_url)
+            with self._state_lock:
+                self._playlist_level += 1
+                self._playlist_urls.add(webpage_url)
             self._fill_common_fields(ie_result, False)
             self._sanitize_thumbnails(ie_result)
             try:
                 return self.__process_playlist(ie_result, download)
             finally:
-                self._playlist_level -= 1
-                if not self._playlist_level:
-                    self._playlist_urls.clear()
+                with self._state_lock:
+                    self._playlist_level -= 1
+                    if not self._playlist_level:
+                        self._playlist_urls.clear()
         elif result_type == 'compat_list':
             self.report_warning(
                 'Extractor {} returned a compat_list result. '
@@ -2069,44 +2147,80 @@ def __process_playlist(self, ie_result, download):
 
         failures = 0
         max_failures = self.params.get('skip_playlist_after_errors') or float('inf')
-        for i, (playlist_index, entry) in enumerate(entries):
-            if lazy:
-                resolved_entries.append((playlist_index, entry))
-            if not entry:
-                continue
-
-            entry['__x_forwarded_for_ip'] = ie_result.get('__x_forwarded_for_ip')
-            if not lazy and 'playlist-index' in self.params['compat_opts']:
-                playlist_index = ie_result['requested_entries'][i]
-
-            entry_copy = collections.ChainMap(entry, {
-                **common_info,
-                'n_entries': int_or_none(n_entries),
-                'playlist_index': playlist_index,
-                'playlist_autonumber': i + 1,
-            })
-
-            if self._match_entry(entry_copy, incomplete=True) is not None:
-                # For compatabilty with youtube-dl. See https://github.com/yt-dlp/yt-dlp/issues/4369
-                resolved_entries[i] = (playlist_index, NO_DEFAULT)
-                continue
-
-            self.to_screen(
-                f'[download] Downloading item {self._format_screen(i + 1, self.Styles.ID)} '
-                f'of {self._format_screen(n_entries, self.Styles.EMPHASIS)}')
 
-            entry_result = self.__process_iterable_entry(entry, download, collections.ChainMap({
-                'playlist_index': playlist_index,
-                'playlist_autonumber': i + 1,
-            }, extra))
+        def finish_entry(i, playlist_index, entry_result):
+            nonlocal failures
             if not entry_result:
                 failures += 1
             if failures >= max_failures:
                 self.report_error(
                     f'Skipping the remaining entries in playlist "{title}" since {failures} items failed extraction')
-                break
+                return False
             if keep_resolved_entries:
                 resolved_entries[i] = (playlist_index, entry_result)
+            return True
+
+        workers = self._concurrent_entries()
+        executor = workers > 1 and concurrent.futures.ThreadPoolExecutor(
+            workers, thread_name_prefix='yt-dlp-entry')
+        # Results are consumed in playlist order; the window only bounds how far ahead the workers may go
+        pending = collections.deque()
+        # Index of the first entry that stopped the download. Later entries must not start theirs
+        cancelled_at = [float('inf')]
+        try:
+            for i, (playlist_index, entry) in enumerate(entries):
+                if cancelled_at[0] < i:
+                    # The exception is raised when the pending results reach that entry
+                    break
+                if lazy:
+                    resolved_entries.append((playlist_index, entry))
+                if not entry:
+                    continue
+
+                entry['__x_forwarded_for_ip'] = ie_result.get('__x_forwarded_for_ip')
+                if not lazy and 'playlist-index' in self.params['compat_opts']:
+                    playlist_index = ie_result['requested_entries'][i]
+
+                entry_copy = collections.ChainMap(entry, {
+                    **common_info,
+                    'n_entries': int_or_none(n_entries),
+                    'playlist_index': playlist_index,
+                    'playlist_autonumber': i + 1,
+                })
+
+                if self._match_entry(entry_copy, incomplete=True) is not None:
+                    # For compatabilty with youtube-dl. See https://github.com/yt-dlp/yt-dlp/issues/4369
+                    resolved_entries[i] = (playlist_index, NO_DEFAULT)
+                    continue
+
+                self.to_screen(
+                    f'[download] Downloading item {self._format_screen(i + 1, self.Styles.ID)} '
+                    f'of {self._format_screen(n_entries, self.Styles.EMPHASIS)}')
+
+                args = (entry, download, collections.ChainMap({
+                    'playlist_index': playlist_index,
+                    'playlist_autonumber': i + 1,
+                }, extra))
+                if not executor:
+                    if not finish_entry(i, playlist_index, self.__process_iterable_entry(*args)):
+                        break
+                    continue
+
+                pending.append((i, playlist_index, executor.submit(
+                    self.__process_entry_in_worker, cancelled_at, i, *args)))
+                if len(pending) >= 2 * workers and not finish_entry(*pending[0][:2], pending.popleft()[2].result()):
+                    break
+            while pending and failures < max_failures:
+                finish_entry(*pending[0][:2], pending.popleft()[2].result())
+        finally:
+            if executor:
+                # The results of the entries that are still pending are not needed anymore.
+                # Those that are not running yet are cancelled, and the others do not start their download
+                with self._state_lock:
+                    cancelled_at[0] = -1
+                for *_, future in pending:
+                    future.cancel()
+                executor.shutdown(wait=True, cancel_futures=True)
 
         # Update with processed data
         ie_result['entries'] = [e for _, e in resolved_entries if e is not NO_DEFAULT]
@@ -2115,6 +2229,10 @@ def __process_playlist(self, ie_result, download):
             # Do not set for full playlist
             ie_result.pop('requested_entries')
 
+        if self._background_postprocessing():
+            # The entries are only final once they are post-processed
+            self._wait_for_postprocessing()
+
         # Write the updated info to json
         if _infojson_written is True and self._write_info_json(
                 'updated playlist', ie_result,
@@ -2130,6 +2248,38 @@ def __process_iterable_entry(self, entry, download, extra_info):
         return self.process_ie_result(
             entry, download=download, extra_info=extra_info)
 
+    def __process_entry_in_worker(self, cancelled_at, index, *args):
+        self._entry_worker.active = True
+        self._entry_worker.index, self._entry_worker.cancelled_at = index, cancelled_at
+        try:
+            return self.__process_iterable_entry(*args)
+        except DownloadCancelled:
+            with self._state_lock:
+                cancelled_at[0] = min(cancelled_at[0], index)
+            raise
+
+    def _prefix_entry_output(self, message):
+        """Tell apart the output of the playlist entries that are processed concurrently"""
+        worker = self._entry_worker
+        if getattr(worker, 'active', False):
+            return f'[item {worker.index + 1}] {message}'
+        return message
+
+    def _check_entry_cancelled(self):
+        """Do not start downloading a concurrent entry that comes after one which stopped the download"""
+        worker = self._entry_worker
+        if getattr(worker, 'active', False) and worker.index > worker.cancelled_at[0]:
+            raise DownloadCancelled('An earlier entry stopped the download')
+
+    def _concurrent_entries(self):
+        """Number of playlist entries that may be processed concurrently"""
+        if getattr(self._entry_worker, 'active', False):
+            # Entries of nested playlists are processed by the worker running the outer entry
+            return 1
+        if self.params.get('format') == '-':
+            return 1
+        return max(self.params.get('concurrent_entries') or 1, 1)
+
     def _build_format_filter(self, filter_spec):
         " Returns a function to filter the formats according to the filter_spec "
 
@@ -2253,18 +2403,22 @@ def can_merge():
             merger = FFmpegMergerPP(self)
             return merger.available and merger.can_merge()
 
+        native_spec = ''
         if not prefer_best and not can_merge():
             prefer_best = True
+            if self.params.get('native_merge') is not False:
+                # Only the formats that can be merged without ffmpeg are preferred over the best single file
+                native_spec = f'{NativeMergerPP.FORMAT_SPEC}/'
             formats = self._get_formats(info_dict)
             evaluate_formats = lambda spec: self._select_formats(formats, self.build_format_selector(spec))
-            if evaluate_formats('b/bv+ba') != evaluate_formats('bv*+ba/b'):
+            if evaluate_formats(f'{native_spec}b/bv+ba') != evaluate_formats('bv*+ba/b'):
                 self.report_warning('ffmpeg not found. The downloaded format may not be the best available. '
                                     'Installing ffmpeg is strongly recommended: https://github.com/yt-dlp/yt-dlp#dependencies')
 
         compat = (self.params.get('allow_multiple_audio_streams')
                   or 'format-spec' in self.params['compat_opts'])
 
-        return ('best/bestvideo+bestaudio' if prefer_best
+        return (f'{native_spec}best/bestvideo+bestaudio' if prefer_best
                 else 'bestvideo+bestaudio/best' if compat
                 else 'bestvideo*+bestaudio/best')
 
@@ -2769,7 +2923,9 @@ def sort_formats(self, info_dict):
 
     def process_video_result(self, info_dict, download=True):
         assert info_dict.get('_type', 'video') == 'video'
-        self._num_videos += 1
+        with self._state_lock:
+            self._num_videos += 1
+            info_dict['__num_videos'] = self._num_videos
 
         if 'id' not in info_dict:
             raise ExtractorError('Missing "id" field in extractor result', ie=info_dict['extractor'])
@@ -2899,6 +3055,9 @@ def is_wellformed(f):
         for fmt in formats:
             sanitize_string_field(fmt, 'format_id')
             sanitize_numeric_fields(fmt)
+            if isinstance(fmt.get('fragments'), dict):
+                # Loaded from an info JSON
+                fmt['fragments'] = FragmentList.from_json(fmt['fragments'])
             fmt['url'] = sanitize_url(fmt['url'])
             FormatSorter._fill_sorting_fields(fmt)
             if fmt['ext'] in ('aac', 'opus', 'mp3', 'flac', 'vorbis'):
@@ -3031,58 +3190,175 @@ def is_wellformed(f):
         requested_ranges = tuple(self.params.get('download_ranges', lambda *_: [{}])(info_dict, self))
         best_format, downloaded_formats = formats_to_download[-1], []
         if download:
-            if best_format and requested_ranges:
-                def to_screen(*msg):
-                    self.to_screen(f'[info] {info_dict["id"]}: {" ".join(", ".join(variadic(m)) for m in msg)}')
-
-                to_screen(f'Downloading {len(formats_to_download)} format(s):',
-                          (f['format_id'] for f in formats_to_download))
-                if requested_ranges != ({}, ):
-                    to_screen(f'Downloading {len(requested_ranges)} time ranges:',
-                              (f'{c["start_time"]:.1f}-{c["end_time"]:.1f}' for c in requested_ranges))
-            max_downloads_reached = False
-
-            for fmt, chapter in itertools.product(formats_to_download, requested_ranges):
-                new_info = self._copy_infodict(info_dict)
-                new_info.update(fmt)
-                offset, duration = info_dict.get('section_start') or 0, info_dict.get('duration') or float('inf')
-                end_time = offset + min(chapter.get('end_time', duration), duration)
-                # duration may not be accurate. So allow deviations <1sec
-                if end_time == float('inf') or end_time > offset + duration + 1:
-                    end_time = None
-                if chapter or offset:
-                    new_info.update({
-                        'section_start': offset + chapter.get('start_time', 0),
-                        'section_end': end_time,
-                        'section_title': chapter.get('title'),
-                        'section_number': chapter.get('index'),
-                    })
-                downloaded_formats.append(new_info)
-                try:
-                    self.process_info(new_info)
-                except MaxDownloadsReached:
-                    max_downloads_reached = True
-                self._raise_pending_errors(new_info)
+            if not self._claim_download_archive(info_dict):
+                return info_dict
+            background = self._background_postprocessing() > 0
+            # Filled by process_info with the post-processing of each format
+            self._background_pp.deferred = deferred = [] if background else None
+            try:
+                if best_format and requested_ranges:
+                    def to_screen(*msg):
+                        self.to_screen(f'[info] {info_dict["id"]}: {" ".join(", ".join(variadic(m)) for m in msg)}')
+
+                    to_screen(f'Downloading {len(formats_to_download)} format(s):',
+                              (f['format_id'] for f in formats_to_download))
+                    if requested_ranges != ({}, ):
+                        to_screen(f'Downloading {len(requested_ranges)} time ranges:',
+                                  (f'{c["start_time"]:.1f}-{c["end_time"]:.1f}' for c in requested_ranges))
+                max_downloads_reached = False
+
+                for fmt, chapter in itertools.product(formats_to_download, requested_ranges):
+                    new_info = self._copy_infodict(info_dict)
+                    new_info.update(fmt)
+                    offset, duration = info_dict.get('section_start') or 0, info_dict.get('duration') or float('inf')
+                    end_time = offset + min(chapter.get('end_time', duration), duration)
+                    # duration may not be accurate. So allow deviations <1sec
+                    if end_time == float('inf') or end_time > offset + duration + 1:
+                        end_time = None
+                    if chapter or offset:
+                        new_info.update({
+                            'section_start': offset + chapter.get('start_time', 0),
+                            'section_end': end_time,
+                            'section_title': chapter.get('title'),
+                            'section_number': chapter.get('index'),
+                        })
+                    downloaded_formats.append(new_info)
+                    try:
+                        self.process_info(new_info)
+                    except MaxDownloadsReached:
+                        max_downloads_reached = True
+                    self._raise_pending_errors(new_info)
+                    if max_downloads_reached:
+                        break
+            except Exception:
+                if not background:
+                    self._release_download_archive(info_dict)
+                    raise
+                # The formats that were downloaded are still post-processed, but the video is not recorded
+                self._submit_postprocessing(functools.partial(
+                    self._finish_downloads_in_background, info_dict, downloaded_formats, deferred, complete=False))
+                raise
+            except BaseException:
+                self._release_download_archive(info_dict)
+                raise
+            finally:
+                self._background_pp.deferred = None
+
+            if background:
+                # The background job owns info_dict from now on, and updates it with the best format once done
+                self._submit_postprocessing(functools.partial(
+                    self._finish_downloads_in_background, info_dict, downloaded_formats, deferred,
+                    best_format=best_format))
+                if max_downloads_reached:
+                    raise MaxDownloadsReached
+                return info_dict
+            info_dict = self._finish_downloads(info_dict, downloaded_formats)
+            if max_downloads_reached:
+                raise MaxDownloadsReached
+
+        # We update the info dict with the selected best quality format (backwards compatibility)
+        info_dict.update(best_format)
+        return info_dict
+
+    def _finish_downloads(self, info_dict, downloaded_formats):
+        """Record a video whose formats were downloaded and post-processed, and run the after_video postprocessors"""
+        try:
+            for new_info in downloaded_formats:
                 # Remove copied info
                 for key, val in tuple(new_info.items()):
                     if info_dict.get(key) == val:
                         new_info.pop(key)
-                if max_downloads_reached:
-                    break
 
             write_archive = {f.get('__write_download_archive', False) for f in downloaded_formats}
             assert write_archive.issubset({True, False, 'ignore'})
             if True in write_archive and False not in write_archive:
                 self.record_download_archive(info_dict)
+        finally:
+            self._release_download_archive(info_dict)
 
-            info_dict['requested_downloads'] = downloaded_formats
-            info_dict = self.run_all_pps('after_video', info_dict)
-            if max_downloads_reached:
-                raise MaxDownloadsReached
+        info_dict['requested_downloads'] = downloaded_formats
+        return self.run_all_pps('after_video', info_dict)
 
-        # We update the info dict with the selected best quality format (backwards compatibility)
-        info_dict.update(best_format)
-        return info_dict
+    def _finish_downloads_in_background(
+            self, info_dict, downloaded_formats, postprocess, complete=True, best_format=None):
+        """Post-process the downloaded formats of a video in the background, then finish it up"""
+        try:
+            for func in postprocess:
+                func()
+            self._wait_for_previous_postprocessing()
+        except BaseException:
+            self._release_download_archive(info_dict)
+            raise
+        if not complete:
+            self._release_download_archive(info_dict)
+            return
+        new_info = self._finish_downloads(info_dict, downloaded_formats)
+        if new_info is not info_dict:
+            info_dict.clear()
+            info_dict.update(new_info)
+        # As process_video_result does after finishing in the foreground
+        info_dict.update(best_format or {})
+
+    def _background_postprocessing(self):
+        """Number of videos that may be post-processed in the background while the next ones are downloaded"""
+        if self.params.get('simulate') or getattr(self._background_pp, 'worker', False):
+            return 0
+        return max(self.params.get('background_postprocessing') or 0, 0)
+
+    def _submit_postprocessing(self, func):
+        """Call func in the background; blocks while too many videos are waiting to be post-processed"""
+        with self._state_lock:
+            if not self._pp_executor:
+                self._pp_workers = self._background_postprocessing()
+                self._pp_executor = concurrent.futures.ThreadPoolExecutor(
+                    self._pp_workers, thread_name_prefix='yt-dlp-postprocess')
+            previous = self._pp_jobs[-1] if self._pp_jobs else None
+            self._pp_jobs.append(self._pp_executor.submit(self.__run_postprocessing, previous, func))
+            oldest = self._pp_jobs[0] if len(self._pp_jobs) > self._pp_workers else None
+        if oldest:
+            self.__collect_postprocessing(oldest)
+
+    def __run_postprocessing(self, previous, func):
+        self._background_pp.worker, self._background_pp.previous = True, previous
+        try:
+            func()
+        finally:
+            self._background_pp.worker, self._background_pp.previous = False, None
+
+    def _wait_for_previous_postprocessing(self):
+        """In a background job, wait until the videos that were downloaded before are done with"""
+        previous = getattr(self._background_pp, 'previous', None)
+        if previous:
+            concurrent.futures.wait([previous])
+            self._background_pp.previous = None
+
+    def __collect_postprocessing(self, future):
+        try:
+            future.result()
+        except concurrent.futures.CancelledError:
+            pass
+        except BaseException:
+            # Abort like the download would have if the video was post-processed in the foreground
+            with self._state_lock:
+                for job in self._pp_jobs:
+                    job.cancel()
+            raise
+        finally:
+            with self._state_lock:
+                with contextlib.suppress(ValueError):
+                    self._pp_jobs.remove(future)
+
+    def _wait_for_postprocessing(self):
+        """Wait for the videos being post-processed in the background, re-raising their errors"""
+        while True:
+            with self._state_lock:
+                if not self._pp_jobs:
+                    executor, self._pp_executor = self._pp_executor, None
+                    break
+                future = self._pp_jobs[0]
+            self.__collect_postprocessing(future)
+        if executor:
+            executor.shutdown()
 
     def process_subtitles(self, video_id, normal_subtitles, automatic_captions):
         """Select the requested subtitles and their format"""
@@ -3286,7 +3562,13 @@ def replace_info_dict(new_info):
 
         new_info, _ = self.pre_process(info_dict, 'video')
         replace_info_dict(new_info)
-        self._num_downloads += 1
+        with self._state_lock:
+            self._check_entry_cancelled()
+            # Concurrent entries may get here after another one reached the limit
+            if self._num_downloads >= float(self.params.get('max_downloads') or 'inf'):
+                raise MaxDownloadsReached
+            self._num_downloads += 1
+            info_dict['__num_downloads'] = self._num_downloads
 
         # info_dict['_filename'] needs to be set for backward compatibility
         info_dict['_filename'] = full_filename = self.prepare_filename(info_dict, warn=True)
@@ -3465,6 +3747,12 @@ def correct_ext(filename, ext=new_ext):
                     info_dict['requested_formats'] = list(map(dict, info_dict['requested_formats']))
 
                     merger = FFmpegMergerPP(self)
+                    native_merge = self.params.get('native_merge')
+                    if native_merge is None:
+                        # The native merger is opt-in while ffmpeg is available
+                        native_merge = not merger.available
+                    if native_merge and NativeMergerPP.can_merge_formats(info_dict):
+                        merger = NativeMergerPP(self)
                     downloaded = []
                     if dl_filename is not None:
                         self.report_file_already_downloaded(dl_filename)
@@ -3605,29 +3893,45 @@ def ffmpeg_fixup(cndn, msg, cls):
                     ffmpeg_fixup(downloader == 'web_socket_fragment', 'Malformed duration detected', FFmpegFixupDurationPP)
 
                 fixup()
-                try:
-                    replace_info_dict(self.post_process(dl_filename, info_dict, files_to_move))
-                except PostProcessingError as err:
-                    self.report_error(f'Postprocessing: {err}')
+                postprocess = functools.partial(self._post_process_download, info_dict, dl_filename, files_to_move)
+                deferred = getattr(self._background_pp, 'deferred', None)
+                if deferred is not None:
+                    deferred.append(postprocess)
+                elif not postprocess():
                     return
-                try:
-                    for ph in self._post_hooks:
-                        ph(info_dict['filepath'])
-                except Exception as err:
-                    self.report_error(f'post hooks: {err}')
-                    return
-                info_dict['__write_download_archive'] = True
 
         assert info_dict is original_infodict  # Make sure the info_dict was modified in-place
         if self.params.get('force_write_download_archive'):
             info_dict['__write_download_archive'] = True
         check_max_downloads()
 
+    def _post_process_download(self, info_dict, filename, files_to_move):
+        """Post-process a downloaded file, modifying info_dict in-place; returns whether it succeeded"""
+        try:
+            new_info = self.post_process(filename, info_dict, files_to_move)
+        except PostProcessingError as err:
+            self.report_error(f'Postprocessing: {err}')
+            return False
+        if new_info != info_dict:
+            info_dict.clear()
+            info_dict.update(new_info)
+        try:
+            for ph in self._post_hooks:
+                ph(info_dict['filepath'])
+        except Exception as err:
+            self.report_error(f'post hooks: {err}')
+            return False
+        info_dict['__write_download_archive'] = True
+        return True
+
     def __download_wrapper(self, func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             try:
                 res = func(*args, **kwargs)
+                if self.params.get('dump_single_json', False):
+                    # The info is only final once the videos are post-processed
+                    self._wait_for_postprocessing()
             except CookieLoadError:
                 raise
             except UnavailableVideoError as e:
@@ -3657,6 +3961,7 @@ def download(self, url_list):
             self.__download_wrapper(self.extract_info)(
                 url, force_generic_extractor=self.params.get('force_generic_extractor', False))
 
+        self._wait_for_postprocessing()
         return self._download_retcode
 
     def download_with_info_file(self, info_filename):
@@ -3679,6 +3984,7 @@ def download_with_info_file(self, info_filename):
                 self.download([webpage_url])
             except ExtractorError as e:
                 self.report_error(e)
+        self._wait_for_postprocessing()
         return self._download_retcode
 
     @staticmethod
@@ -3707,6 +4013,8 @@ def sanitize_info(info_dict, remove_private_keys=False):
         def filter_fn(obj):
             if isinstance(obj, dict):
                 return {k: filter_fn(v) for k, v in obj.items() if not reject(k, v)}
+            elif isinstance(obj, FragmentList):
+                return filter_fn(obj.to_json())
             elif isinstance(obj, (list, tuple, set, LazyList)):
                 return list(map(filter_fn, obj))
             elif isinstance(obj, ImpersonateTarget):
@@ -3773,7 +4081,10 @@ def run_pp(self, pp, infodict):
     def run_all_pps(self, key, info, *, additional_pps=None):
         if key != 'video':
             self._forceprint(key, info)
-        for pp in (additional_pps or []) + self._pps[key]:
+        pps = (additional_pps or []) + self._pps[key]
+        if self.params.get('fuse_postprocessors', True):
+            pps = FFmpegFusedPP.fuse(self, pps)
+        for pp in pps:
             info = self.run_pp(pp, info)
         return info
 
@@ -3793,6 +4104,8 @@ def post_process(self, filename, info, files_to_move=None):
         info['filepath'] = filename
         info['__files_to_move'] = files_to_move or {}
         info = self.run_all_pps('post_process', info, additional_pps=info.get('__postprocessors'))
+        # Keep the files being moved and "after_move" in download order
+        self._wait_for_previous_postprocessing()
         info = self.run_pp(MoveFilesAfterDownloadPP(self), info)
         del info['__files_to_move']
         return self.run_all_pps('after_move', info)
@@ -3809,7 +4122,7 @@ def _make_archive_id(self, info_dict):
             if not url:
                 return
             # Try to find matching extractor for the URL and take its ie_key
-            for ie_key, ie in self._ies.items():
+            for ie_key, ie in self._candidate_ies(url):
                 if ie.suitable(url):
                     extractor = ie_key
                     break
@@ -3823,7 +4136,32 @@ def in_download_archive(self, info_dict):
 
         vid_ids = [self._make_archive_id(info_dict)]
         vid_ids.extend(info_dict.get('_old_archive_ids') or [])
-        return any(id_ in self.archive for id_ in vid_ids)
+        with self._state_lock:
+            return any(id_ in self.archive for id_ in vid_ids)
+
+    def _claim_download_archive(self, info_dict):
+        """Claim the video in a shared archive before downloading it; returns False if it must be skipped"""
+        if not isinstance(self.archive, DownloadArchive):
+            return True
+        vid_id = self._make_archive_id(info_dict)
+        if not vid_id or self.archive.claim(vid_id):
+            return True
+        if self.in_download_archive(info_dict):
+            self.to_screen(f'[download] {self._format_screen(info_dict["id"], self.Styles.ID)}: '
+                           'has already been recorded in the archive')
+            if self.params.get('break_on_existing', False):
+                raise ExistingVideoReached
+        else:
+            self.to_screen(f'[download] {self._format_screen(info_dict["id"], self.Styles.ID)}: '
+                           'is being downloaded by another process')
+        return False
+
+    def _release_download_archive(self, info_dict):
+        if not isinstance(self.archive, DownloadArchive):
+            return
+        vid_id = self._make_archive_id(info_dict)
+        if vid_id:
+            self.archive.release(vid_id)
 
     def record_download_archive(self, info_dict):
         fn = self.params.get('download_archive')
@@ -3833,10 +4171,8 @@ def record_download_archive(self, info_dict):
         assert vid_id
 
         self.write_debug(f'Adding to archive: {vid_id}')
-        if is_path_like(fn):
-            with locked_file(fn, 'a', encoding='utf-8') as archive_file:
-                archive_file.write(vid_id + '\n')
-        self.archive.add(vid_id)
+        with self._state_lock:
+            self.archive.add(vid_id)
 
     @staticmethod
     def format_resolution(format, default='unknown'):
@@ -4299,6 +4635,8 @@ def build_request_director(self, handlers, preferences=None):
                     'legacy_ssl_support': 'legacyserverconnect',
                     'enable_file_urls': 'enable_file_urls',
                     'impersonate': 'impersonate',
+                    # Keep a connection alive for each fragment worker
+                    'pool_size': ('concurrent_fragment_downloads', {lambda n: max(n, DEFAULT_POOL_SIZE)}),
                     'client_cert': {
                         'client_certificate': 'client_certificate',
                         'client_certificate_key': 'client_certificate_key',
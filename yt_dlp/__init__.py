@@ -212,6 +212,10 @@ def validate_minmax(min_val, max_val, min_name, max_name=None):
     validate_positive('autonumber start', opts.autonumber_start)
     validate_positive('autonumber size', opts.autonumber_size, True)
     validate_positive('concurrent fragments', opts.concurrent_fragment_downloads, True)
+    validate_positive('concurrent entries', opts.concurrent_entries, True)
+    validate_positive('background postprocessing', opts.background_postprocessing)
+    validate_positive('split chapters jobs', opts.split_chapters_jobs, True)
+    validate_positive('HTTP connections', opts.http_connections, True)
     validate_positive('playlist start', opts.playliststart, True)
     if opts.playlistend != -1:
         validate_minmax(opts.playliststart, opts.playlistend, 'playlist start', 'playlist end')
@@ -732,6 +736,8 @@ def get_postprocessors(opts):
         yield {
             'key': 'FFmpegSplitChapters',
             'force_keyframes': opts.force_keyframes_at_cuts,
+            'single_pass': opts.split_chapters_single_pass,
+            'jobs': opts.split_chapters_jobs,
         }
     # XAttrMetadataPP should be run after post-processors that may change file contents
     if opts.xattrs:
@@ -858,9 +864,11 @@ def parse_options(argv=None):
         'skip_unavailable_fragments': opts.skip_unavailable_fragments,
         'keep_fragments': opts.keep_fragments,
         'concurrent_fragment_downloads': opts.concurrent_fragment_downloads,
+        'concurrent_entries': opts.concurrent_entries,
         'buffersize': opts.buffersize,
         'noresizebuffer': opts.noresizebuffer,
         'http_chunk_size': opts.http_chunk_size,
+        'http_connections': opts.http_connections,
         'continuedl': opts.continue_dl,
         'noprogress': opts.quiet if opts.noprogress is None else opts.noprogress,
         'progress_with_newline': opts.progress_with_newline,
@@ -914,6 +922,7 @@ def parse_options(argv=None):
         'youtube_print_sig_code': opts.youtube_print_sig_code,
         'age_limit': opts.age_limit,
         'download_archive': opts.download_archive,
+        'download_archive_backend': opts.download_archive_backend,
         'break_on_existing': opts.break_on_existing,
         'break_on_reject': opts.break_on_reject,
         'break_per_url': opts.break_per_url,
@@ -942,6 +951,7 @@ def parse_options(argv=None):
         'wait_for_video': opts.wait_for_video,
         'mark_watched': opts.mark_watched,
         'merge_output_format': opts.merge_output_format,
+        'native_merge': opts.native_merge,
         'final_ext': final_ext,
         'postprocessors': postprocessors,
         'fixup': opts.fixup,
@@ -966,6 +976,8 @@ def parse_options(argv=None):
         'hls_split_discontinuity': opts.hls_split_discontinuity,
         'external_downloader_args': opts.external_downloader_args,
         'postprocessor_args': opts.postprocessor_args,
+        'fuse_postprocessors': opts.fuse_postprocessors,
+        'background_postprocessing': opts.background_postprocessing,
         'cn_verification_proxy': opts.cn_verification_proxy,
         'geo_verification_proxy': opts.geo_verification_proxy,
         'geo_bypass': opts.geo_bypass,
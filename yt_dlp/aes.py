@@ -1,4 +1,6 @@
 import base64
+import functools
+import struct
 from math import ceil
 
 from .compat import compat_ord
@@ -16,15 +18,24 @@ def aes_gcm_decrypt_and_verify_bytes(data, key, tag, nonce):
 else:
     def aes_cbc_decrypt_bytes(data, key, iv):
         """ Decrypt bytes with AES-CBC using native implementation since pycryptodome is unavailable """
-        return bytes(aes_cbc_decrypt(*map(list, (data, key, iv))))
+        return _cbc_decrypt_words(bytes(data), bytes(key), bytes(iv))
 
     def aes_gcm_decrypt_and_verify_bytes(data, key, tag, nonce):
         """ Decrypt bytes with AES-GCM using native implementation since pycryptodome is unavailable """
-        return bytes(aes_gcm_decrypt_and_verify(*map(list, (data, key, tag, nonce))))
+        return _gcm_decrypt_and_verify_words(bytes(data), bytes(key), bytes(tag), bytes(nonce))
 
 
-def aes_cbc_encrypt_bytes(data, key, iv, **kwargs):
-    return bytes(aes_cbc_encrypt(*map(list, (data, key, iv)), **kwargs))
+def aes_cbc_encrypt_bytes(data, key, iv, *, padding_mode='pkcs7'):
+    data = bytes(data)
+    full_length = len(data) - len(data) % BLOCK_SIZE_BYTES
+    if full_length != len(data):
+        data = data[:full_length] + bytes(pad_block(list(data[full_length:]), padding_mode))
+    return _cbc_encrypt_words(data, bytes(key), bytes(iv))
+
+
+def aes_ctr_decrypt_bytes(data, key, iv):
+    """ Decrypt (or encrypt) bytes with AES-CTR; iv is the 16-byte initial counter block """
+    return _ctr_crypt_words(bytes(data), bytes(key), bytes(iv))
 
 
 BLOCK_SIZE_BYTES = 16
@@ -308,8 +319,8 @@ def aes_decrypt_text(data, password, key_size_bytes):
     nonce = data[:NONCE_LENGTH_BYTES]
     cipher = data[NONCE_LENGTH_BYTES:]
 
-    decrypted_data = aes_ctr_decrypt(cipher, key, nonce + [0] * (BLOCK_SIZE_BYTES - NONCE_LENGTH_BYTES))
-    return bytes(decrypted_data)
+    return aes_ctr_decrypt_bytes(
+        bytes(cipher), bytes(key), bytes(nonce + [0] * (BLOCK_SIZE_BYTES - NONCE_LENGTH_BYTES)))
 
 
 RCON = (0x8d, 0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80, 0x1b, 0x36)
@@ -531,12 +542,214 @@ def ghash(subkey, data):
     return last_y
 
 
+# The functions below implement the same cipher on bytes, using 32-bit words and precomputed
+# T-tables that combine SubBytes, ShiftRows and MixColumns (FIPS 197, 5.2.1). They are used
+# when pycryptodome is unavailable and are much faster than the per-byte implementation above
+def _xtime(x):
+    x <<= 1
+    return x ^ 0x11B if x & 0x100 else x
+
+
+@functools.cache
+def _t_tables():
+    def gmul(a, b):
+        product = 0
+        while b:
+            if b & 1:
+                product ^= a
+            a, b = _xtime(a), b >> 1
+        return product
+
+    def rotations(table):
+        return [table, *([(w >> n) | (w << (32 - n)) & 0xFFFFFFFF for w in table] for n in (8, 16, 24))]
+
+    te = rotations([
+        (gmul(s, 2) << 24) | (s << 16) | (s << 8) | gmul(s, 3) for s in SBOX])
+    td = rotations([
+        (gmul(s, 14) << 24) | (gmul(s, 9) << 16) | (gmul(s, 13) << 8) | gmul(s, 11) for s in SBOX_INV])
+    # Last round tables, without MixColumns
+    te_last = [[s << n for s in SBOX] for n in (24, 16, 8, 0)]
+    td_last = [[s << n for s in SBOX_INV] for n in (24, 16, 8, 0)]
+    return te, td, te_last, td_last
+
+
+@functools.lru_cache(maxsize=32)
+def _block_cipher(key):
+    """
+    Return functions to encrypt and decrypt one block given as four 32-bit words
+
+    @param {bytes} key  16/24/32-Byte cipher key
+    """
+    (te0, te1, te2, te3), (td0, td1, td2, td3), (sl0, sl1, sl2, sl3), (il0, il1, il2, il3) = _t_tables()
+    expanded_key = bytes(key_expansion(list(key)))
+    ek = struct.unpack(f'>{len(expanded_key) // 4}I', expanded_key)
+    rounds = len(ek) // 4 - 1
+
+    # Equivalent inverse cipher: the inner round keys go through InvMixColumns (FIPS 197, 5.3.5)
+    dk = list(ek[-4:])
+    for i in range(rounds - 1, 0, -1):
+        dk.extend(
+            td0[SBOX[w >> 24]] ^ td1[SBOX[(w >> 16) & 255]] ^ td2[SBOX[(w >> 8) & 255]] ^ td3[SBOX[w & 255]]
+            for w in ek[i * 4: i * 4 + 4])
+    dk.extend(ek[:4])
+
+    enc_first, *enc_inner, enc_last = (ek[i: i + 4] for i in range(0, len(ek), 4))
+    dec_first, *dec_inner, dec_last = (dk[i: i + 4] for i in range(0, len(dk), 4))
+
+    def encrypt(s0, s1, s2, s3):
+        k0, k1, k2, k3 = enc_first
+        s0, s1, s2, s3 = s0 ^ k0, s1 ^ k1, s2 ^ k2, s3 ^ k3
+        for k0, k1, k2, k3 in enc_inner:
+            s0, s1, s2, s3 = (
+                te0[s0 >> 24] ^ te1[(s1 >> 16) & 255] ^ te2[(s2 >> 8) & 255] ^ te3[s3 & 255] ^ k0,
+                te0[s1 >> 24] ^ te1[(s2 >> 16) & 255] ^ te2[(s3 >> 8) & 255] ^ te3[s0 & 255] ^ k1,
+                te0[s2 >> 24] ^ te1[(s3 >> 16) & 255] ^ te2[(s0 >> 8) & 255] ^ te3[s1 & 255] ^ k2,
+                te0[s3 >> 24] ^ te1[(s0 >> 16) & 255] ^ te2[(s1 >> 8) & 255] ^ te3[s2 & 255] ^ k3)
+        k0, k1, k2, k3 = enc_last
+        return (
+            sl0[s0 >> 24] ^ sl1[(s1 >> 16) & 255] ^ sl2[(s2 >> 8) & 255] ^ sl3[s3 & 255] ^ k0,
+            sl0[s1 >> 24] ^ sl1[(s2 >> 16) & 255] ^ sl2[(s3 >> 8) & 255] ^ sl3[s0 & 255] ^ k1,
+            sl0[s2 >> 24] ^ sl1[(s3 >> 16) & 255] ^ sl2[(s0 >> 8) & 255] ^ sl3[s1 & 255] ^ k2,
+            sl0[s3 >> 24] ^ sl1[(s0 >> 16) & 255] ^ sl2[(s1 >> 8) & 255] ^ sl3[s2 & 255] ^ k3)
+
+    def decrypt(s0, s1, s2, s3):
+        k0, k1, k2, k3 = dec_first
+        s0, s1, s2, s3 = s0 ^ k0, s1 ^ k1, s2 ^ k2, s3 ^ k3
+        for k0, k1, k2, k3 in dec_inner:
+            s0, s1, s2, s3 = (
+                td0[s0 >> 24] ^ td1[(s3 >> 16) & 255] ^ td2[(s2 >> 8) & 255] ^ td3[s1 & 255] ^ k0,
+                td0[s1 >> 24] ^ td1[(s0 >> 16) & 255] ^ td2[(s3 >> 8) & 255] ^ td3[s2 & 255] ^ k1,
+                td0[s2 >> 24] ^ td1[(s1 >> 16) & 255] ^ td2[(s0 >> 8) & 255] ^ td3[s3 & 255] ^ k2,
+                td0[s3 >> 24] ^ td1[(s2 >> 16) & 255] ^ td2[(s1 >> 8) & 255] ^ td3[s0 & 255] ^ k3)
+        k0, k1, k2, k3 = dec_last
+        return (
+            il0[s0 >> 24] ^ il1[(s3 >> 16) & 255] ^ il2[(s2 >> 8) & 255] ^ il3[s1 & 255] ^ k0,
+            il0[s1 >> 24] ^ il1[(s0 >> 16) & 255] ^ il2[(s3 >> 8) & 255] ^ il3[s2 & 255] ^ k1,
+            il0[s2 >> 24] ^ il1[(s1 >> 16) & 255] ^ il2[(s0 >> 8) & 255] ^ il3[s3 & 255] ^ k2,
+            il0[s3 >> 24] ^ il1[(s2 >> 16) & 255] ^ il2[(s1 >> 8) & 255] ^ il3[s0 & 255] ^ k3)
+
+    return encrypt, decrypt
+
+
+def _to_words(data):
+    """Unpack bytes (zero-padded to the block size) into 32-bit big-endian words"""
+    data = memoryview(data)
+    if len(data) % BLOCK_SIZE_BYTES:
+        data = bytes(data) + bytes(BLOCK_SIZE_BYTES - len(data) % BLOCK_SIZE_BYTES)
+    return struct.unpack(f'>{len(data) // 4}I', data)
+
+
+def _from_words(words, length=None):
+    return struct.pack(f'>{len(words)}I', *words)[:length]
+
+
+def _iter_blocks(words):
+    it = iter(words)
+    return zip(it, it, it, it)
+
+
+def _cbc_decrypt_words(data, key, iv):
+    decrypt = _block_cipher(key)[1]
+    decrypted = []
+    p0, p1, p2, p3 = _to_words(iv)
+    for c0, c1, c2, c3 in _iter_blocks(_to_words(data)):
+        d0, d1, d2, d3 = decrypt(c0, c1, c2, c3)
+        decrypted += (d0 ^ p0, d1 ^ p1, d2 ^ p2, d3 ^ p3)
+        p0, p1, p2, p3 = c0, c1, c2, c3
+    return _from_words(decrypted, len(data))
+
+
+def _cbc_encrypt_words(data, key, iv):
+    encrypt = _block_cipher(key)[0]
+    encrypted = []
+    c0, c1, c2, c3 = _to_words(iv)
+    for m0, m1, m2, m3 in _iter_blocks(_to_words(data)):
+        c0, c1, c2, c3 = encrypt(m0 ^ c0, m1 ^ c1, m2 ^ c2, m3 ^ c3)
+        encrypted += (c0, c1, c2, c3)
+    return _from_words(encrypted)
+
+
+def _ctr_keystream(encrypt, counter, block_count):
+    keystream = []
+    for _ in range(block_count):
+        keystream += encrypt(
+            counter >> 96, (counter >> 64) & 0xFFFFFFFF, (counter >> 32) & 0xFFFFFFFF, counter & 0xFFFFFFFF)
+        counter = (counter + 1) & ((1 << 128) - 1)
+    return _from_words(keystream)
+
+
+def _ctr_crypt_words(data, key, iv):
+    if not data:
+        return b''
+    keystream = _ctr_keystream(
+        _block_cipher(key)[0], int.from_bytes(iv, 'big'), ceil(len(data) / BLOCK_SIZE_BYTES))
+    return (int.from_bytes(data, 'big') ^ int.from_bytes(keystream[:len(data)], 'big')).to_bytes(len(data), 'big')
+
+
+@functools.lru_cache(maxsize=32)
+def _ghash_tables(hash_subkey):
+    """
+    Tables of the products of the hash subkey with every byte value at every position of a block,
+    so that a multiplication takes 16 lookups; bit 127 of a block int is the coefficient of x^0
+    """
+    products = []  # products[n] = hash subkey * (1 << n)
+    v = hash_subkey
+    for _ in range(128):
+        products.append(v)
+        v = (v >> 1) ^ (0xE1 << 120) if v & 1 else v >> 1
+    products.reverse()
+
+    tables = []
+    for position in range(16):
+        table = [0] * 256
+        for value in range(1, 256):
+            low_bit = value & -value
+            table[value] = table[value ^ low_bit] ^ products[position * 8 + low_bit.bit_length() - 1]
+        tables.append(table)
+    return tables
+
+
+def _ghash_words(hash_subkey, data):
+    tables = _ghash_tables(hash_subkey)
+    y = 0
+    for w0, w1, w2, w3 in _iter_blocks(_to_words(data)):
+        x = y ^ (w0 << 96 | w1 << 64 | w2 << 32 | w3)
+        y = 0
+        for table in tables:
+            y ^= table[x & 255]
+            x >>= 8
+    return y
+
+
+def _gcm_decrypt_and_verify_words(data, key, tag, nonce):
+    encrypt = _block_cipher(key)[0]
+    h0, h1, h2, h3 = encrypt(0, 0, 0, 0)
+    hash_subkey = h0 << 96 | h1 << 64 | h2 << 32 | h3
+
+    if len(nonce) == 12:
+        j0 = int.from_bytes(nonce + b'\x00\x00\x00\x01', 'big')
+    else:
+        j0 = _ghash_words(hash_subkey, _pad_zeros(nonce) + (8 * len(nonce)).to_bytes(16, 'big'))
+
+    decrypted_data = _ctr_crypt_words(data, key, ((j0 + 1) & ((1 << 128) - 1)).to_bytes(16, 'big'))
+    s_tag = _ghash_words(hash_subkey, _pad_zeros(data) + (len(data) * 8).to_bytes(16, 'big'))
+    if tag != _ctr_crypt_words(s_tag.to_bytes(16, 'big'), key, j0.to_bytes(16, 'big')):
+        raise ValueError('Mismatching authentication tag')
+
+    return decrypted_data
+
+
+def _pad_zeros(data):
+    return bytes(data) + bytes(-len(data) % BLOCK_SIZE_BYTES)
+
+
 __all__ = [
     'aes_cbc_decrypt',
     'aes_cbc_decrypt_bytes',
     'aes_cbc_encrypt',
     'aes_cbc_encrypt_bytes',
     'aes_ctr_decrypt',
+    'aes_ctr_decrypt_bytes',
     'aes_ctr_encrypt',
     'aes_decrypt',
     'aes_decrypt_text',
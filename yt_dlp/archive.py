@@ -0,0 +1,462 @@
+import bisect
+import contextlib
+import errno
+import hashlib
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+import uuid
+
+from .dependencies import sqlite3
+from .utils import YoutubeDLError, locked_file
+
+
+class DownloadArchive:
+    """
+    Base class for download archive backends
+
+    An archive is a set-like collection of archive IDs (see utils.make_archive_id).
+    The on-disk text format (one ID per line) is the interchange format;
+    every backend must be able to read from and write to it.
+
+    Subclasses must define __contains__, __len__ and add
+    and may override flush and close.
+    """
+    BACKEND_NAME = None
+
+    # Size of the text archive's tail used to detect that it was rewritten
+    _CHECK_SIZE = 4096
+
+    def __init__(self, ydl, filename):
+        self._ydl = ydl
+        self.filename = filename
+
+    def __contains__(self, archive_id):
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def __len__(self):
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def add(self, archive_id):
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def claim(self, archive_id):
+        """
+        Reserve an ID before downloading it
+
+        Returns False if the ID is already recorded or is being downloaded by someone else.
+        Backends that are shared between processes should do this atomically
+        """
+        return archive_id not in self
+
+    def release(self, archive_id):
+        """Give up a claim on an ID that was not recorded"""
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _read_lines(self, offset=0):
+        """Yield the stripped, non-empty lines of the text archive starting from a byte offset"""
+        try:
+            with locked_file(self.filename, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    line = line.strip().decode('utf-8', 'replace')
+                    if line:
+                        yield line
+        except OSError as ioe:
+            if ioe.errno != errno.ENOENT:
+                raise
+
+    def _text_size(self):
+        try:
+            return os.path.getsize(self.filename)
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _check_digest(data):
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def _text_check(self, size):
+        """Digest of the bytes immediately before `size`; used to detect a rewritten text file"""
+        start = max(size - self._CHECK_SIZE, 0)
+        try:
+            with open(self.filename, 'rb') as f:
+                f.seek(start)
+                data = f.read(size - start)
+        except FileNotFoundError:
+            data = b''
+        if len(data) != size - start:
+            return None
+        return self._check_digest(data)
+
+    def _append_lines(self, lines):
+        if not lines:
+            return
+        with locked_file(self.filename, 'a', encoding='utf-8') as archive_file:
+            archive_file.write(''.join(f'{line}\n' for line in lines))
+
+
+class TextDownloadArchive(DownloadArchive):
+    """Plain text archive, loaded into memory on startup"""
+    BACKEND_NAME = 'text'
+
+    def __init__(self, ydl, filename):
+        super().__init__(ydl, filename)
+        self._ydl.write_debug(f'Loading archive file {filename!r}')
+        self._ids = set(self._read_lines())
+
+    def __contains__(self, archive_id):
+        return archive_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, archive_id):
+        self._append_lines([archive_id])
+        self._ids.add(archive_id)
+
+
+class _DigestView:
+    """Read-only sequence of the fixed-width digests stored in an index buffer"""
+
+    def __init__(self, buf, offset, size):
+        self._buf, self._offset, self._size = buf, offset, size
+        self._len = (len(buf) - offset) // size
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, idx):
+        start = self._offset + idx * self._size
+        return self._buf[start:start + self._size]
+
+
+class IndexedDownloadArchive(DownloadArchive):
+    """
+    Text archive with a sorted, memory-mapped index of hashed IDs
+
+    The index is stored next to the archive as "<archive>.idx" and records
+    how much of the text file it covers. Lines appended to the text file
+    after that (e.g. by other tools or older versions) are read into memory
+    on startup, and the index is rebuilt once that tail grows too large.
+    Lookups are a binary search over the mapped index, so memory usage and
+    startup time do not depend on the size of the archive.
+
+    New entries are appended to the text file in batches of BATCH_SIZE
+    or at least every FLUSH_INTERVAL seconds, and when the archive is closed
+    """
+    BACKEND_NAME = 'index'
+
+    _MAGIC = b'YTDLAIX1'
+    # magic, indexed size of the text file, digest of the last indexed bytes
+    _HEADER = struct.Struct('>8sQ16s')
+    _DIGEST_SIZE = 8
+
+    BATCH_SIZE = 100
+    FLUSH_INTERVAL = 10
+    # Rebuild the index when the unindexed tail has more entries than this
+    MAX_TAIL_SIZE = 10000
+
+    def __init__(self, ydl, filename):
+        super().__init__(ydl, filename)
+        self.index_filename = f'{filename}.idx'
+        self._index_file = self._mmap = None
+        self._digests = ()
+        self._tail, self._pending = set(), []
+        self._last_flush = time.monotonic()
+        self._load()
+
+    @classmethod
+    def _digest(cls, archive_id):
+        return hashlib.blake2b(archive_id.encode(), digest_size=cls._DIGEST_SIZE).digest()
+
+    def _read_header(self):
+        try:
+            with open(self.index_filename, 'rb') as f:
+                header = f.read(self._HEADER.size)
+        except FileNotFoundError:
+            return None
+        if len(header) != self._HEADER.size:
+            return None
+        magic, size, check = self._HEADER.unpack(header)
+        if magic != self._MAGIC or size > self._text_size() or check != self._text_check(size):
+            return None
+        return size
+
+    def _load(self):
+        indexed_size = self._read_header()
+        if indexed_size is None:
+            self._ydl.write_debug(f'Building archive index {self.index_filename!r}')
+            indexed_size = self.rebuild()
+        self._open_index()
+        self._tail = set(self._read_lines(indexed_size))
+        if len(self._tail) > max(self.MAX_TAIL_SIZE, len(self._digests) // 10):
+            self._ydl.write_debug(f'Updating archive index {self.index_filename!r}')
+            self.rebuild()
+            self._open_index()
+            self._tail.clear()
+        self._ydl.write_debug(
+            f'Loaded archive index {self.index_filename!r} with {len(self._digests)} entries '
+            f'({len(self._tail)} unindexed)')
+
+    def _open_index(self):
+        self._close_index()
+        self._index_file = open(self.index_filename, 'rb')
+        buf = None
+        if os.fstat(self._index_file.fileno()).st_size > self._HEADER.size:
+            try:
+                buf = self._mmap = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):  # mmap is not supported by all filesystems
+                buf = self._index_file.read()
+        self._digests = _DigestView(buf, self._HEADER.size, self._DIGEST_SIZE) if buf else ()
+
+    def _close_index(self):
+        self._digests = ()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+
+    def rebuild(self):
+        """Rewrite the index from the text archive; returns the number of bytes indexed"""
+        self.flush()
+        try:
+            with locked_file(self.filename, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b''
+        size, check = len(data), self._check_digest(data[-self._CHECK_SIZE:])
+        digests = sorted({
+            self._digest(line.decode('utf-8', 'replace'))
+            for line in map(bytes.strip, data.splitlines()) if line})
+        del data
+
+        temp_filename = f'{self.index_filename}.part'
+        with open(temp_filename, 'wb') as f:
+            f.write(self._HEADER.pack(self._MAGIC, size, check))
+            f.write(b''.join(digests))
+        self._close_index()
+        os.replace(temp_filename, self.index_filename)
+        return size
+
+    def __contains__(self, archive_id):
+        if archive_id in self._tail:
+            return True
+        if self._index_file is None:
+            self._open_index()
+        digest = self._digest(archive_id)
+        idx = bisect.bisect_left(self._digests, digest)
+        return idx < len(self._digests) and self._digests[idx] == digest
+
+    def __len__(self):
+        return len(self._digests) + len(self._tail)
+
+    def add(self, archive_id):
+        if archive_id in self._tail:
+            return
+        self._tail.add(archive_id)
+        self._pending.append(archive_id)
+        if len(self._pending) >= self.BATCH_SIZE or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        self._last_flush = time.monotonic()
+        self._append_lines(pending)
+
+    def close(self):
+        super().close()
+        self._close_index()
+
+
+class SQLiteDownloadArchive(DownloadArchive):
+    """
+    Text archive backed by a shared SQLite database
+
+    The database is stored next to the archive as "<archive>.sqlite3" and is
+    queried on every lookup, so IDs recorded by other processes are seen
+    immediately. Before downloading, a process atomically claims the ID;
+    other processes skip claimed IDs until the claim is released or goes stale.
+    A claim is stale when it is older than CLAIM_TIMEOUT seconds, or when its
+    owner was a process on the same host that is no longer running.
+
+    The text file is still appended to and remains the source of truth;
+    lines written to it by other tools are imported on startup.
+    The database must not be placed on a network filesystem
+    """
+    BACKEND_NAME = 'sqlite'
+
+    CLAIM_TIMEOUT = 6 * 60 * 60
+    BUSY_TIMEOUT = 60
+
+    def __init__(self, ydl, filename):
+        if not sqlite3:
+            raise YoutubeDLError(
+                'The "sqlite" download archive backend requires sqlite3 support. '
+                'Please use a Python interpreter compiled with sqlite3 support')
+        super().__init__(ydl, filename)
+        self.database_filename = f'{filename}.sqlite3'
+        self._host, self._pid = socket.gethostname(), os.getpid()
+        self._owner = f'{self._host}:{self._pid}:{uuid.uuid4().hex}'
+        self._claims = set()
+        self._lock = threading.Lock()
+        self._conn = None
+        with self._transaction() as cursor:
+            cursor.execute('CREATE TABLE IF NOT EXISTS archive (id TEXT PRIMARY KEY) WITHOUT ROWID')
+            cursor.execute(
+                'CREATE TABLE IF NOT EXISTS claims '
+                '(id TEXT PRIMARY KEY, owner TEXT, host TEXT, pid INTEGER, claimed_at REAL)')
+            cursor.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)')
+            self._import_text(cursor)
+
+    @property
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(
+                self.database_filename, timeout=self.BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        return self._conn
+
+    def _query(self, sql, *args):
+        with self._lock:
+            return self._connection.execute(sql, args).fetchone()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute('ROLLBACK')
+                raise
+            cursor.execute('COMMIT')
+
+    def _import_text(self, cursor):
+        """Import lines that were written to the text archive since the last import"""
+        meta = dict(cursor.execute('SELECT key, value FROM meta').fetchall())
+        offset = meta.get('text_size') or 0
+        if offset > self._text_size() or meta.get('text_check') != self._text_check(offset):
+            if offset:
+                self._ydl.write_debug(f'Archive file {self.filename!r} was rewritten; re-importing it')
+            cursor.execute('DELETE FROM archive')
+            offset = 0
+
+        try:
+            with locked_file(self.filename, 'rb') as f:
+                f.seek(offset)
+                cursor.executemany('INSERT OR IGNORE INTO archive VALUES (?)', (
+                    (line,) for line in (
+                        line.strip().decode('utf-8', 'replace') for line in f) if line))
+                imported = f.tell() - offset
+                offset = f.tell()
+        except FileNotFoundError:
+            imported = 0
+
+        cursor.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', (
+            ('text_size', offset), ('text_check', self._text_check(offset))))
+        self._ydl.write_debug(
+            f'Loaded archive database {self.database_filename!r} (imported {imported} bytes from {self.filename!r})')
+
+    def __contains__(self, archive_id):
+        return self._query('SELECT 1 FROM archive WHERE id = ?', archive_id) is not None
+
+    def __len__(self):
+        return self._query('SELECT COUNT(*) FROM archive')[0]
+
+    def __bool__(self):
+        return self._query('SELECT 1 FROM archive LIMIT 1') is not None
+
+    def _is_stale(self, host, pid, claimed_at):
+        if time.time() - claimed_at > self.CLAIM_TIMEOUT:
+            return True
+        if host != self._host or pid == self._pid or os.name == 'nt':
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except OSError:  # e.g. PermissionError; the process exists
+            pass
+        return False
+
+    def claim(self, archive_id):
+        with self._transaction() as cursor:
+            if cursor.execute('SELECT 1 FROM archive WHERE id = ?', (archive_id,)).fetchone():
+                return False
+            claim = cursor.execute(
+                'SELECT owner, host, pid, claimed_at FROM claims WHERE id = ?', (archive_id,)).fetchone()
+            if claim and claim[0] != self._owner:
+                if not self._is_stale(*claim[1:]):
+                    return False
+                self._ydl.write_debug(f'Taking over stale archive claim on {archive_id} from {claim[0]}')
+            cursor.execute(
+                'INSERT OR REPLACE INTO claims VALUES (?, ?, ?, ?, ?)',
+                (archive_id, self._owner, self._host, self._pid, time.time()))
+        self._claims.add(archive_id)
+        return True
+
+    def release(self, archive_id):
+        if archive_id not in self._claims:
+            return
+        with self._transaction() as cursor:
+            cursor.execute('DELETE FROM claims WHERE id = ? AND owner = ?', (archive_id, self._owner))
+        self._claims.discard(archive_id)
+
+    def add(self, archive_id):
+        with self._transaction() as cursor:
+            cursor.execute('INSERT OR IGNORE INTO archive VALUES (?)', (archive_id,))
+            cursor.execute('DELETE FROM claims WHERE id = ? AND owner = ?', (archive_id, self._owner))
+            # Appending inside the transaction serializes writers of the text file
+            self._append_lines([archive_id])
+        self._claims.discard(archive_id)
+
+    def close(self):
+        for archive_id in list(self._claims):
+            self.release(archive_id)
+        super().close()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_ARCHIVE_BACKENDS = {
+    klass.BACKEND_NAME: klass
+    for klass in (TextDownloadArchive, IndexedDownloadArchive, SQLiteDownloadArchive)
+}
+
+
+def load_download_archive(ydl, filename, backend=None):
+    """
+    Open the archive file `filename` with the given backend
+
+    @param backend  Name of a registered backend or a DownloadArchive subclass.
+                    Defaults to "text"
+    """
+    if isinstance(backend, type) and issubclass(backend, DownloadArchive):
+        return backend(ydl, filename)
+    klass = _ARCHIVE_BACKENDS.get(backend or 'text')
+    if klass is None:
+        raise YoutubeDLError(
+            f'Invalid download archive backend {backend!r}; choose one of {", ".join(_ARCHIVE_BACKENDS)}')
+    return klass(ydl, filename)
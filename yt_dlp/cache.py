@@ -1,18 +1,265 @@
+import collections
 import contextlib
+import copy
 import json
 import os
+import random
 import re
 import shutil
+import threading
+import time
 import traceback
 import urllib.parse
 
-from .utils import expand_path, traverse_obj, version_tuple, write_json_file
+from .dependencies import sqlite3
+from .utils import YoutubeDLError, expand_path, traverse_obj, version_tuple, write_json_file
 from .version import __version__
 
 
+class CacheStore:
+    """
+    Base class for the storage backends of the cache
+
+    A store maps (section, key) to a JSON-serializable entry. It must be safe to use
+    from several processes at once; readers must never see a partially written entry.
+
+    Every stored entry has a token that changes whenever the entry is replaced.
+    It lets the in-memory cache check whether its copy is still current
+    without reading the whole entry.
+
+    Subclasses must define get, stat, store, delete and prune
+    and may override describe and close.
+    """
+    STORE_NAME = None
+
+    def __init__(self, cache):
+        self._cache = cache
+        self._ydl = cache._ydl
+
+    def get(self, section, key):
+        """@returns (entry, token), or None if there is no valid entry"""
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def stat(self, section, key):
+        """@returns the token of the current entry, or None if there is none"""
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def store(self, section, key, entry, expires_at=None):
+        """Replace the entry atomically; expires_at is the UNIX timestamp after which it may be evicted"""
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def delete(self, section, key):
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def prune(self, max_size, section=None):
+        """
+        Evict the expired entries (of a section), then the least recently used ones
+        until they take at most max_size bytes
+        """
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def describe(self, section, key):
+        return f'{section}.{key}'
+
+    def close(self):
+        pass
+
+
+class FileCacheStore(CacheStore):
+    """
+    Stores every entry in its own JSON file, <cachedir>/<section>/<key>.json
+
+    Files are replaced atomically and their modification time tracks when they were last used
+    """
+    STORE_NAME = 'file'
+
+    def describe(self, section, key):
+        return self._cache._get_cache_fn(section, key, 'json')
+
+    @staticmethod
+    def _token(stat):
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def get(self, section, key):
+        cache_fn = self.describe(section, key)
+        with contextlib.suppress(OSError):
+            try:
+                with open(cache_fn, encoding='utf-8') as cachef:
+                    entry = json.load(cachef)
+                    # The modification time tracks recent use for prune
+                    with contextlib.suppress(OSError):
+                        os.utime(cachef.fileno() if os.utime in os.supports_fd else cache_fn)
+                    # NB: Use the file that was actually read; it may have been replaced meanwhile
+                    return entry, self._token(os.fstat(cachef.fileno()))
+            except ValueError:
+                try:
+                    file_size = os.path.getsize(cache_fn)
+                except OSError as oe:
+                    file_size = str(oe)
+                self._ydl.report_warning(f'Cache retrieval from {cache_fn} failed ({file_size})')
+
+    def stat(self, section, key):
+        with contextlib.suppress(OSError):
+            return self._token(os.stat(self.describe(section, key)))
+
+    def store(self, section, key, entry, expires_at=None):
+        cache_fn = self.describe(section, key)
+        os.makedirs(os.path.dirname(cache_fn), exist_ok=True)
+        write_json_file(entry, cache_fn)
+
+    def delete(self, section, key):
+        with contextlib.suppress(OSError):
+            os.remove(self.describe(section, key))
+
+    @staticmethod
+    def _expires_at(path):
+        # The expiry is the last key of an entry, so only the end of the file is read
+        with open(path, 'rb') as f:
+            f.seek(max(os.fstat(f.fileno()).st_size - 64, 0))
+            mobj = re.search(rb'"expires_at":\s*([0-9.eE+-]+)\s*}\s*$', f.read())
+        return mobj and float(mobj.group(1))
+
+    def _scan(self, directory, depth):
+        with contextlib.suppress(OSError), os.scandir(directory) as it:
+            for entry in it:
+                with contextlib.suppress(OSError):
+                    if depth and entry.is_dir():
+                        yield from self._scan(entry.path, depth - 1)
+                    elif not depth and entry.is_file() and entry.name.endswith('.json'):
+                        stat = entry.stat()
+                        yield stat.st_mtime, stat.st_size, entry.path
+
+    def prune(self, max_size, section=None):
+        if section:
+            entries = list(self._scan(os.path.dirname(self.describe(section, 'x')), 0))
+        else:
+            entries = list(self._scan(self._cache._get_root_dir(), 1))
+
+        now = time.time()
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= max_size:
+                with contextlib.suppress(OSError, ValueError):
+                    if (self._expires_at(path) or now) >= now:
+                        continue
+            self._ydl.write_debug(
+                f'Removing {os.path.basename(path)} from cache section {os.path.basename(os.path.dirname(path))}')
+            with contextlib.suppress(OSError):
+                os.remove(path)
+                total_size -= size
+
+
+class SQLiteCacheStore(CacheStore):
+    """
+    Stores all entries in the database <cachedir>/cache.sqlite3
+
+    The database must not be placed on a network filesystem
+    """
+    STORE_NAME = 'sqlite'
+
+    BUSY_TIMEOUT = 60
+
+    def __init__(self, cache):
+        if not sqlite3:
+            raise YoutubeDLError(
+                'The "sqlite" cache store requires sqlite3 support. '
+                'Please use a Python interpreter compiled with sqlite3 support')
+        super().__init__(cache)
+        self.database_filename = os.path.join(cache._get_root_dir(), 'cache.sqlite3')
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.database_filename), exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.database_filename, timeout=self.BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries (section TEXT, key TEXT, value TEXT, size INTEGER, '
+                'expires_at REAL, used_at REAL, token INTEGER, PRIMARY KEY (section, key)) WITHOUT ROWID')
+        return self._conn
+
+    def _execute(self, sql, *args):
+        with self._lock:
+            return self._connection.execute(sql, args).fetchone()
+
+    def describe(self, section, key):
+        return f'{self.database_filename}:{section}.{key}'
+
+    def get(self, section, key):
+        row = self._execute('SELECT value, token FROM entries WHERE section = ? AND key = ?', section, key)
+        if not row:
+            return None
+        self._execute('UPDATE entries SET used_at = ? WHERE section = ? AND key = ?', time.time(), section, key)
+        try:
+            return json.loads(row[0]), row[1]
+        except ValueError:
+            self._ydl.report_warning(f'Cache retrieval from {self.describe(section, key)} failed')
+
+    def stat(self, section, key):
+        row = self._execute('SELECT token FROM entries WHERE section = ? AND key = ?', section, key)
+        return row and row[0]
+
+    def store(self, section, key, entry, expires_at=None):
+        value = json.dumps(entry, ensure_ascii=False)
+        self._execute(
+            'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+            section, key, value, len(value.encode()), expires_at, time.time(), random.getrandbits(63))
+
+    def delete(self, section, key):
+        self._execute('DELETE FROM entries WHERE section = ? AND key = ?', section, key)
+
+    def prune(self, max_size, section=None):
+        where, args = ('section = ?', (section,)) if section else ('1', ())
+        with self._lock:
+            self._connection.execute(f'DELETE FROM entries WHERE {where} AND expires_at < ?', (*args, time.time()))
+            # Keep the most recently used entries that fit into max_size
+            self._connection.execute(f'''
+                DELETE FROM entries WHERE {where} AND (section, key) IN (
+                    SELECT section, key FROM (
+                        SELECT section, key, SUM(size) OVER (ORDER BY used_at DESC, section, key) AS total
+                        FROM entries WHERE {where}
+                    ) WHERE total > ?
+                )''', (*args, *args, max_size))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_CACHE_STORES = {
+    klass.STORE_NAME: klass
+    for klass in (FileCacheStore, SQLiteCacheStore)
+}
+
+
 class Cache:
+    # Number of entries kept in memory
+    MEMORY_CACHE_SIZE = 100
+    # Default bound of the total size of the cache
+    MAX_SIZE = 512 * 1024 * 1024
+    # Number of stores after which the cache size is enforced again
+    PRUNE_INTERVAL = 100
+
     def __init__(self, ydl):
         self._ydl = ydl
+        store = ydl.params.get('cache_store') or 'file'
+        if isinstance(store, type) and issubclass(store, CacheStore):
+            self._store_class = store
+        elif store in _CACHE_STORES:
+            self._store_class = _CACHE_STORES[store]
+        else:
+            raise YoutubeDLError(f'Invalid cache store {store!r}; choose one of {", ".join(_CACHE_STORES)}')
+        self._store_instance = None
+        # (section, key) -> (token, entry); in least recently used order
+        self._memory = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._stores_since_prune = 0
 
     def _get_root_dir(self):
         res = self._ydl.params.get('cachedir')
@@ -30,20 +277,51 @@ def _get_cache_fn(self, section, key, dtype):
     def enabled(self):
         return self._ydl.params.get('cachedir') is not False
 
-    def store(self, section, key, data, dtype='json'):
+    @property
+    def _store(self):
+        with self._lock:
+            if self._store_instance is None:
+                self._store_instance = self._store_class(self)
+            return self._store_instance
+
+    def _remember(self, section, key, token, entry):
+        with self._lock:
+            if token is None:
+                self._memory.pop((section, key), None)
+                return
+            self._memory[section, key] = token, entry
+            self._memory.move_to_end((section, key))
+            while len(self._memory) > self.MEMORY_CACHE_SIZE:
+                self._memory.popitem(last=False)
+
+    def store(self, section, key, data, dtype='json', *, ttl=None):
+        """
+        Store data in the cache
+
+        @param ttl  Number of seconds after which the entry expires
+        """
         assert dtype in ('json',)
 
         if not self.enabled:
             return
 
-        fn = self._get_cache_fn(section, key, dtype)
+        entry = {'yt-dlp_version': __version__, 'data': data}
+        expires_at = None
+        if ttl is not None:
+            expires_at = entry['expires_at'] = time.time() + ttl
+        self._remember(section, key, None, None)
         try:
-            os.makedirs(os.path.dirname(fn), exist_ok=True)
             self._ydl.write_debug(f'Saving {section}.{key} to cache')
-            write_json_file({'yt-dlp_version': __version__, 'data': data}, fn)
+            self._store.store(section, key, entry, expires_at)
         except Exception:
             tb = traceback.format_exc()
-            self._ydl.report_warning(f'Writing cache to {fn!r} failed: {tb}')
+            self._ydl.report_warning(f'Writing cache to {self._store.describe(section, key)!r} failed: {tb}')
+            return
+
+        self._stores_since_prune += 1
+        if self._stores_since_prune >= self.PRUNE_INTERVAL:
+            self._stores_since_prune = 0
+            self.prune(None, self._ydl.params.get('cache_max_size') or self.MAX_SIZE)
 
     def _validate(self, data, min_ver):
         version = traverse_obj(data, 'yt-dlp_version')
@@ -59,21 +337,63 @@ def load(self, section, key, dtype='json', default=None, *, min_ver=None):
         if not self.enabled:
             return default
 
-        cache_fn = self._get_cache_fn(section, key, dtype)
-        with contextlib.suppress(OSError):
-            try:
-                with open(cache_fn, encoding='utf-8') as cachef:
-                    self._ydl.write_debug(f'Loading {section}.{key} from cache')
-                    return self._validate(json.load(cachef), min_ver)
-            except (ValueError, KeyError):
-                try:
-                    file_size = os.path.getsize(cache_fn)
-                except OSError as oe:
-                    file_size = str(oe)
-                self._ydl.report_warning(f'Cache retrieval from {cache_fn} failed ({file_size})')
+        try:
+            with self._lock:
+                token, entry = self._memory.get((section, key), (None, None))
+            # Entries may have been replaced by other processes
+            if token is None or token != self._store.stat(section, key):
+                entry, token = self._store.get(section, key) or (None, None)
+                self._remember(section, key, token, entry)
+                if token is None:
+                    return default
+                self._ydl.write_debug(f'Loading {section}.{key} from cache')
+            else:
+                self._remember(section, key, token, entry)
+        except Exception:
+            tb = traceback.format_exc()
+            self._ydl.report_warning(f'Reading cache from {self._store.describe(section, key)!r} failed: {tb}')
+            return default
 
+        expires_at = traverse_obj(entry, ('expires_at', {float}))
+        if expires_at is not None and expires_at < time.time():
+            self._ydl.write_debug(f'Discarding expired cache entry {section}.{key}')
+            self.delete(section, key)
+            return default
+
+        try:
+            # NB: Callers may modify the returned data
+            return copy.deepcopy(self._validate(entry, min_ver))
+        except KeyError:
+            self._ydl.report_warning(f'Cache retrieval from {self._store.describe(section, key)} failed')
         return default
 
+    def delete(self, section, key):
+        if not self.enabled:
+            return
+        self._remember(section, key, None, None)
+        with contextlib.suppress(Exception):
+            self._store.delete(section, key)
+
+    def prune(self, section, max_size):
+        """
+        Remove the expired entries of a section (or the whole cache),
+        then the least recently used ones until it takes at most max_size bytes
+        """
+        if not self.enabled:
+            return
+        try:
+            self._store.prune(max_size, section)
+        except Exception:
+            tb = traceback.format_exc()
+            self._ydl.report_warning(f'Pruning cache failed: {tb}')
+
+    def close(self):
+        with self._lock:
+            self._memory.clear()
+            if self._store_instance is not None:
+                self._store_instance.close()
+                self._store_instance = None
+
     def remove(self):
         if not self.enabled:
             self._ydl.to_screen('Cache is disabled (Did you combine --no-cache-dir and --rm-cache-dir?)')
@@ -83,6 +403,7 @@ def remove(self):
         if not any((term in cachedir) for term in ('cache', 'tmp')):
             raise Exception(f'Not removing directory {cachedir} - this does not look like a cache dir')
 
+        self.close()
         self._ydl.to_screen(
             f'Removing cache dir {cachedir} .', skip_eol=True)
         if os.path.exists(cachedir):
@@ -109,8 +109,11 @@ def _get_suitable_downloader(info_dict, protocol, params, default):
             return FFmpegFD
 
     if protocol in ('m3u8', 'm3u8_native'):
-        if info_dict.get('is_live'):
-            return FFmpegFD
+        if info_dict.get('is_live') and (external_downloader or '').lower() != 'native':
+            # Prefer ffmpeg for livestreams, but they can be recorded natively when it is not installed
+            if params.get('hls_prefer_native') is not True and FFmpegFD.available():
+                return FFmpegFD
+            return HlsFD
         elif (external_downloader or '').lower() == 'native':
             return HlsFD
         elif protocol == 'm3u8_native' and get_suitable_downloader(
@@ -32,6 +32,7 @@
     try_call,
 )
 from ..utils._utils import _ProgressState
+from ..utils.progress import ProgressThrottle
 
 
 class FileDownloader:
@@ -64,6 +65,10 @@ class FileDownloader:
     max_filesize:       Skip files larger than this size
     xattr_set_filesize: Set ytdl.filesize user xattribute with expected size.
     progress_delta:     The minimum time between progress output, in seconds
+    progress_hooks_delta:  The minimum time between progress hook calls for
+                        the same download with status "downloading", in seconds;
+                        other statuses are always delivered. By default, the hooks
+                        are called on every update
     external_downloader_args:  A dictionary of downloader keys (in lower case)
                         and a list of additional command-line arguments for the
                         executable. Use 'default' as the name for arguments to be
@@ -73,6 +78,9 @@ class FileDownloader:
     http_chunk_size:    Size of a chunk for chunk-based HTTP downloading. May be
                         useful for bypassing bandwidth throttling imposed by
                         a webserver (experimental)
+    http_connections:   Number of parallel connections for downloading a single
+                        file over HTTP. Each connection downloads a separate range
+                        of the file; http_chunk_size is ignored
     progress_template:  See YoutubeDL.py
     retry_sleep_functions: See YoutubeDL.py
 
@@ -80,6 +88,8 @@ class FileDownloader:
     """
 
     _TEST_FILE_SIZE = 10241
+    # Minimum time between the progress lines printed for the same download
+    _PROGRESS_REPORT_DELTA = 0.1
     params = None
 
     def __init__(self, ydl, params):
@@ -89,6 +99,8 @@ def __init__(self, ydl, params):
         self.params = params
         self._prepare_multiline_status()
         self.add_progress_hook(self.report_progress)
+        self._progress_throttle = ProgressThrottle(self.params.get('progress_hooks_delta'))
+        self._report_throttle = ProgressThrottle(self._PROGRESS_REPORT_DELTA)
         if self.params.get('progress_delta'):
             self._progress_delta_lock = threading.Lock()
             self._progress_delta_time = time.monotonic()
@@ -323,6 +335,8 @@ def _report_progress_status(self, s, default_template):
                 continue
             s[name] = self._format_progress(s[name], style)
         s['_default_template'] = default_template % s
+        if isinstance(self._multiline, QuietMultilinePrinter) and not self.ydl.params.get('consoletitle'):
+            return  # Nothing would be shown
 
         progress_dict = s.copy()
         progress_dict.pop('info_dict')
@@ -368,7 +382,11 @@ def with_fields(*tups, default=''):
                 with_fields(('speed', 'at %(_speed_str)s')),
                 delim=' '))
 
+        key = s.get('ctx_id'), s.get('progress_idx')
         if s['status'] != 'downloading':
+            self._report_throttle.reset(key)
+            return
+        elif not self._report_throttle.consume(key):
             return
 
         if update_delta := self.params.get('progress_delta'):
@@ -473,7 +491,22 @@ def real_download(self, filename, info_dict):
         """Real download process. Redefine in subclasses."""
         raise NotImplementedError('This method must be implemented by subclasses')
 
+    def _progress_due(self, ctx_id=None, progress_idx=None):
+        """Whether a "downloading" progress update would be delivered now; lets callers skip building it"""
+        key = ctx_id, progress_idx
+        if not self._progress_throttle.due(key):
+            return False
+        # Without any other hook, the update is only printed
+        return len(self._progress_hooks) > 1 or self._report_throttle.due(key)
+
     def _hook_progress(self, status, info_dict):
+        # Updates while downloading are coalesced; the other statuses are always delivered
+        key = status.get('ctx_id'), status.get('progress_idx')
+        if status.get('status') == 'downloading':
+            if not self._progress_throttle.consume(key):
+                return
+        else:
+            self._progress_throttle.reset(key)
         # Ideally we want to make a copy of the dict, but that is too slow
         status['info_dict'] = info_dict
         # youtube-dl passes the same status object to all the hooks.
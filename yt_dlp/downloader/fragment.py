@@ -1,27 +1,179 @@
+import collections
 import concurrent.futures
 import contextlib
+import functools
+import io
+import itertools
 import json
-import math
 import os
 import struct
+import threading
 import time
+import urllib.parse
+import weakref
 
 from .common import FileDownloader
 from .http import HttpFD
 from ..aes import aes_cbc_decrypt_bytes, unpad_pkcs7
 from ..networking import Request
 from ..networking.exceptions import HTTPError, IncompleteRead
-from ..utils import DownloadError, RetryManager, traverse_obj
+from ..utils import DownloadError, RetryManager, timeconvert, traverse_obj
 from ..utils.networking import HTTPHeaderDict
 from ..utils.progress import ProgressCalculator
 
 
 class HttpQuietDownloader(HttpFD):
+    def __init__(self, ydl, params):
+        super().__init__(ydl, params)
+        self._fragment_buffers = threading.local()
+
     def to_screen(self, *args, **kargs):
         pass
 
     to_console_title = to_screen
 
+    def download_to_buffer(self, info_dict):
+        """Download into memory instead of a file; returns the content or None on failure"""
+        self._fragment_buffers.current = buffer = io.BytesIO()
+        try:
+            success, _ = self.download('-', info_dict)
+        finally:
+            self._fragment_buffers.current = None
+        return buffer.getvalue() if success else None
+
+    def sanitize_open(self, filename, open_mode):
+        buffer = getattr(self._fragment_buffers, 'current', None)
+        if filename != '-' or buffer is None:
+            return super().sanitize_open(filename, open_mode)
+        if 'w' in open_mode:
+            buffer.seek(0)
+            buffer.truncate()
+        return buffer, filename
+
+    def try_utime(self, filename, last_modified_hdr):
+        if filename != '-' or getattr(self._fragment_buffers, 'current', None) is None:
+            return super().try_utime(filename, last_modified_hdr)
+        # There is no file to update, but the time is used for the merged file
+        return (timeconvert(last_modified_hdr) or None) if last_modified_hdr else None
+
+
+def _wait_any(futures):
+    """Wait until at least one of the futures is done and return the done ones"""
+    while True:
+        # Waiting without a timeout blocks KeyboardInterrupt on Windows
+        done, _ = concurrent.futures.wait(
+            futures, timeout=0.1 if os.name == 'nt' else None,
+            return_when=concurrent.futures.FIRST_COMPLETED)
+        if done:
+            return done
+
+
+class _HostLimiter:
+    """
+    Adaptive limit of the concurrent fragment downloads from one host
+
+    The limit is halved whenever a fragment had to be retried. After every
+    `limit` successful fragments, the throughput of that round is compared
+    with the previous one: the limit grows by one unless the throughput
+    dropped noticeably, in which case it shrinks by one
+    """
+
+    def __init__(self, maximum):
+        self.limit = self.maximum = maximum
+        self._active = 0
+        self._cond = threading.Condition()
+        self._last_rate = 0
+        self._start_round()
+
+    def _start_round(self):
+        self._round_bytes = self._round_count = 0
+        self._round_start = time.monotonic()
+
+    def acquire(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+
+    def release(self, size, failed=False):
+        with self._cond:
+            self._active -= 1
+            if failed:
+                self.limit = max(self.limit // 2, 1)
+                self._last_rate = 0
+                self._start_round()
+            else:
+                self._round_bytes += size
+                self._round_count += 1
+                if self._round_count >= self.limit:
+                    rate = self._round_bytes / max(time.monotonic() - self._round_start, 0.001)
+                    if rate >= self._last_rate * 0.9:
+                        self.limit = min(self.limit + 1, self.maximum)
+                    else:
+                        self.limit = max(self.limit - 1, 1)
+                    self._last_rate = rate
+                    self._start_round()
+            self._cond.notify_all()
+
+
+class _KeyStore:
+    """
+    Decryption keys shared by the fragment downloads of one YoutubeDL instance
+
+    Keys are identified by (video id, key URL). Every key is fetched once, however
+    many threads need it at the same time; a failed prefetch is retried by the
+    first thread that needs the key, so that its error is reported as usual
+    """
+
+    MAX_KEYS = 4096
+    # Only the keys needed first are prefetched, so that they are not evicted
+    # by the later ones before they are used, nor evict the keys of other downloads
+    MAX_PREFETCH = MAX_KEYS // 4
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = collections.OrderedDict()
+
+    def _claim(self, key_id):
+        """Return the future of a key and whether the caller has to fetch it"""
+        with self._lock:
+            future = self._keys.get(key_id)
+            if future is not None and not (future.done() and future.exception() is not None):
+                self._keys.move_to_end(key_id)
+                return future, False
+            future = self._keys[key_id] = concurrent.futures.Future()
+            while len(self._keys) > self.MAX_KEYS:
+                self._keys.popitem(last=False)
+            return future, True
+
+    @staticmethod
+    def _fetch(future, fetch):
+        try:
+            future.set_result(fetch())
+        except BaseException as e:
+            future.set_exception(e)
+
+    def get(self, key_id, fetch):
+        future, owner = self._claim(key_id)
+        if not owner and future.exception() is not None:
+            future, owner = self._claim(key_id)
+        if owner:
+            self._fetch(future, fetch)
+        return future.result()
+
+    def prefetch(self, fetches, max_workers):
+        """Fetch the first MAX_PREFETCH keys of {key_id: fetch} that are not known yet in the background"""
+        pending = []
+        for key_id, fetch in itertools.islice(fetches.items(), self.MAX_PREFETCH):
+            future, owner = self._claim(key_id)
+            if owner:
+                pending.append((future, fetch))
+        if not pending:
+            return
+        pool = concurrent.futures.ThreadPoolExecutor(min(len(pending), max_workers))
+        for future, fetch in pending:
+            pool.submit(self._fetch, future, fetch)
+        pool.shutdown(wait=False)
+
 
 class FragmentFD(FileDownloader):
     """
@@ -34,8 +186,12 @@ class FragmentFD(FileDownloader):
     skip_unavailable_fragments:
                         Skip unavailable fragments (DASH and hlsnative only)
     keep_fragments:     Keep downloaded fragments on disk after downloading is
-                        finished
+                        finished. Otherwise, fragments are downloaded into
+                        memory and are never written to disk individually
     concurrent_fragment_downloads:  The number of threads to use for native hls and dash downloads
+    fragment_buffer_size:  Maximum size in bytes of the fragments that are held
+                        in memory while waiting to be appended in order
+                        (concurrent downloads only). Default is 64MiB
     _no_ytdl_file:      Don't use .ytdl file
 
     For each incomplete fragment download yt-dlp keeps on disk a special
@@ -59,6 +215,12 @@ class FragmentFD(FileDownloader):
     This feature is experimental and file format may change in future.
     """
 
+    _FRAGMENT_BUFFER_SIZE = 64 * 1024 * 1024
+    _KEY_PREFETCH_THREADS = 4
+    _host_limiters_lock = threading.Lock()
+    _key_stores_lock = threading.Lock()
+    _key_stores = weakref.WeakKeyDictionary()
+
     def report_retry_fragment(self, err, frag_index, count, retries):
         self.deprecation_warning('yt_dlp.downloader.FragmentFD.report_retry_fragment is deprecated. '
                                  'Use yt_dlp.downloader.FileDownloader.report_retry instead')
@@ -109,13 +271,24 @@ def _write_ytdl_file(self, ctx):
             frag_index_stream.close()
 
     def _download_fragment(self, ctx, frag_url, info_dict, headers=None, request_data=None):
-        fragment_filename = '%s-Frag%d' % (ctx['tmpfilename'], ctx['fragment_index'])
         fragment_info_dict = {
             'url': frag_url,
             'http_headers': headers or info_dict.get('http_headers'),
             'request_data': request_data,
             'ctx_id': ctx.get('ctx_id'),
         }
+        if not self.params.get('keep_fragments', False):
+            # Resuming is only possible at fragment granularity (see .ytdl file)
+            ctx['frag_resume_len'] = 0
+            frag_content = ctx['dl'].download_to_buffer(fragment_info_dict)
+            if frag_content is None:
+                return False
+            if fragment_info_dict.get('filetime'):
+                ctx['fragment_filetime'] = fragment_info_dict.get('filetime')
+            ctx['fragment_content'] = frag_content
+            return True
+
+        fragment_filename = '%s-Frag%d' % (ctx['tmpfilename'], ctx['fragment_index'])
         frag_resume_len = 0
         if ctx['dl'].params.get('continuedl', True):
             frag_resume_len = self.filesize_or_none(self.temp_name(fragment_filename))
@@ -130,6 +303,8 @@ def _download_fragment(self, ctx, frag_url, info_dict, headers=None, request_dat
         return True
 
     def _read_fragment(self, ctx):
+        if 'fragment_content' in ctx:
+            return ctx.pop('fragment_content')
         if not ctx.get('fragment_filename_sanitized'):
             return None
         try:
@@ -150,9 +325,9 @@ def _append_fragment(self, ctx, frag_content):
         finally:
             if self.__do_ytdl_file(ctx):
                 self._write_ytdl_file(ctx)
-            if not self.params.get('keep_fragments', False):
-                self.try_remove(ctx['fragment_filename_sanitized'])
-            del ctx['fragment_filename_sanitized']
+            frag_filename = ctx.pop('fragment_filename_sanitized', None)
+            if frag_filename and not self.params.get('keep_fragments', False):
+                self.try_remove(frag_filename)
 
     def _prepare_frag_download(self, ctx):
         if not ctx.setdefault('live', False):
@@ -171,6 +346,7 @@ def _prepare_frag_download(self, ctx):
             'sleep_interval': 0,
             'max_sleep_interval': 0,
             'sleep_interval_subtitles': 0,
+            'http_connections': 1,
         })
         tmpfilename = self.temp_name(ctx['filename'])
         open_mode = 'wb'
@@ -338,14 +514,43 @@ def _prepare_external_frag_download(self, ctx):
             'fragment_index': 0,
         })
 
-    def decrypter(self, info_dict):
-        _key_cache = {}
-
-        def _get_key(url):
-            if url not in _key_cache:
-                _key_cache[url] = self.ydl.urlopen(self._prepare_url(info_dict, url)).read()
-            return _key_cache[url]
+    def _get_host_limiter(self, url, maximum):
+        host = urllib.parse.urlparse(url).netloc
+        with self._host_limiters_lock:
+            limiters = self.__dict__.setdefault('_host_limiters', {})
+            if host not in limiters:
+                limiters[host] = _HostLimiter(maximum)
+            return limiters[host]
+
+    @property
+    def _key_store(self):
+        with self._key_stores_lock:
+            if self.ydl not in self._key_stores:
+                self._key_stores[self.ydl] = _KeyStore()
+            return self._key_stores[self.ydl]
+
+    def _key_fetches(self, info_dict, fragments):
+        """Return {key_id: fetch} for the keys needed to decrypt the fragments"""
+        fetches = {}
+        for fragment in fragments:
+            decrypt_info = (fragment or {}).get('decrypt_info')
+            if not decrypt_info or decrypt_info['METHOD'] != 'AES-128' or decrypt_info.get('KEY'):
+                continue
+            url = self._prepare_url(info_dict, traverse_obj(info_dict, ('hls_aes', 'uri')) or decrypt_info['URI'])
+            key_id = (info_dict.get('id'), url.url if isinstance(url, Request) else url)
+            if key_id not in fetches:
+                fetches[key_id] = functools.partial(self._fetch_key, url)
+        return fetches
+
+    def _fetch_key(self, url):
+        with self.ydl.urlopen(url) as response:
+            return response.read()
+
+    def prefetch_keys(self, info_dict, fragments):
+        """Start fetching the decryption keys of the fragments in the background"""
+        self._key_store.prefetch(self._key_fetches(info_dict, fragments), self._KEY_PREFETCH_THREADS)
 
+    def decrypter(self, info_dict):
         def decrypt_fragment(fragment, frag_content):
             if frag_content is None:
                 return
@@ -353,8 +558,9 @@ def decrypt_fragment(fragment, frag_content):
             if not decrypt_info or decrypt_info['METHOD'] != 'AES-128':
                 return frag_content
             iv = decrypt_info.get('IV') or struct.pack('>8xq', fragment['media_sequence'])
-            decrypt_info['KEY'] = (decrypt_info.get('KEY')
-                                   or _get_key(traverse_obj(info_dict, ('hls_aes', 'uri')) or decrypt_info['URI']))
+            if not decrypt_info.get('KEY'):
+                (key_id, fetch), = self._key_fetches(info_dict, [fragment]).items()
+                decrypt_info['KEY'] = self._key_store.get(key_id, fetch)
             # Don't decrypt the content in tests since the data is explicitly truncated and it's not to a valid block
             # size (see https://github.com/ytdl-org/youtube-dl/pull/27660). Tests only care that the correct data downloaded,
             # not what it decrypts to.
@@ -385,7 +591,7 @@ def thread_func(idx, ctx, fragments, info_dict, tpe):
                 ctx, fragments, info_dict, **kwargs, tpe=tpe, interrupt_trigger=interrupt_trigger)
 
         class FTPE(concurrent.futures.ThreadPoolExecutor):
-            # has to stop this or it's going to wait on the worker thread itself
+            # The pool is shared by all the streams and is shut down once they are all done
             def __exit__(self, exc_type, exc_val, exc_tb):
                 pass
 
@@ -408,18 +614,21 @@ def interrupt_trigger_iter(fg):
                     break
                 yield f
 
-        spins = []
-        for idx, (ctx, fragments, info_dict) in enumerate(args):
-            tpe = FTPE(math.ceil(max_workers / max_progress))
-            job = tpe.submit(thread_func, idx, ctx, interrupt_trigger_iter(fragments), info_dict, tpe)
-            spins.append((tpe, job))
+        # The fragments of all the streams share one pool of workers,
+        # so that the workers of a stream that is done are used by the others
+        tpe = FTPE(max(max_workers, max_progress))
+        with concurrent.futures.ThreadPoolExecutor(max_progress) as drivers:
+            spins = [
+                drivers.submit(thread_func, idx, ctx, interrupt_trigger_iter(fragments), info_dict, tpe)
+                for idx, (ctx, fragments, info_dict) in enumerate(args)]
 
-        result = True
-        for tpe, job in spins:
+            result = True
             try:
-                result = result and future_result(job)
-            except KeyboardInterrupt:
-                interrupt_trigger[0] = False
+                for job in spins:
+                    try:
+                        result = result and future_result(job)
+                    except KeyboardInterrupt:
+                        interrupt_trigger[0] = False
             finally:
                 tpe.shutdown(wait=True)
         if not interrupt_trigger[0] and not is_live:
@@ -482,29 +691,67 @@ def append_fragment(frag_content, frag_index, ctx):
 
         decrypt_fragment = self.decrypter(info_dict)
 
-        max_workers = math.ceil(
-            self.params.get('concurrent_fragment_downloads', 1) / ctx.get('max_progress', 1))
-        if max_workers > 1:
+        max_workers = self.params.get('concurrent_fragment_downloads', 1)
+        if max_workers > 1 or tpe is not None:
             def _download_fragment(fragment):
                 ctx_copy = ctx.copy()
-                download_fragment(fragment, ctx_copy)
-                return fragment, fragment['frag_index'], ctx_copy.get('fragment_filename_sanitized')
+                limiter = self._get_host_limiter(fragment['url'], max_workers)
+                limiter.acquire()
+                frag_content = None
+                try:
+                    download_fragment(fragment, ctx_copy)
+                    frag_content = self._read_fragment(ctx_copy)
+                finally:
+                    limiter.release(
+                        len(frag_content or b''), failed=frag_content is None or ctx_copy.get('last_error') is not None)
+                # Decrypt in the worker, while the other fragments are downloading
+                return fragment, ctx_copy.get('fragment_filename_sanitized'), decrypt_fragment(fragment, frag_content)
+
+            # Fragments are submitted lazily, within a bounded window, and the ones that finish
+            # out of order are kept in memory (up to buffer_size bytes) until they can be appended
+            window = 2 * max_workers
+            buffer_size = (self.params.get('fragment_buffer_size') or self._FRAGMENT_BUFFER_SIZE) // ctx.get('max_progress', 1)
+            fragments = iter(fragments)
+            in_flight, finished, buffered_bytes = {}, {}, 0
+            next_seq = append_seq = 0
 
             with tpe or concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
                 try:
-                    for fragment, frag_index, frag_filename in pool.map(_download_fragment, fragments):
-                        ctx.update({
-                            'fragment_filename_sanitized': frag_filename,
-                            'fragment_index': frag_index,
-                        })
-                        if not append_fragment(decrypt_fragment(fragment, self._read_fragment(ctx)), frag_index, ctx):
-                            return False
+                    while True:
+                        while fragments and len(in_flight) + len(finished) < window and buffered_bytes < buffer_size:
+                            fragment = next(fragments, None)
+                            if fragment is None:
+                                fragments = None
+                                break
+                            in_flight[pool.submit(_download_fragment, fragment)] = next_seq
+                            next_seq += 1
+                        if not in_flight:
+                            break
+
+                        done = _wait_any(in_flight)
+                        for future in done:
+                            finished[in_flight.pop(future)] = result = future.result()
+                            buffered_bytes += len(result[2] or b'')
+
+                        while append_seq in finished:
+                            fragment, frag_filename, frag_content = finished.pop(append_seq)
+                            append_seq += 1
+                            buffered_bytes -= len(frag_content or b'')
+                            ctx.update({
+                                'fragment_filename_sanitized': frag_filename,
+                                'fragment_index': fragment['frag_index'],
+                            })
+                            if not append_fragment(frag_content, fragment['frag_index'], ctx):
+                                return False
                 except KeyboardInterrupt:
                     self._finish_multiline_status()
                     self.report_error(
                         'Interrupted by user. Waiting for all threads to shutdown...', is_error=False, tb=False)
                     pool.shutdown(wait=False)
                     raise
+                finally:
+                    for future in in_flight:
+                        future.cancel()
         else:
             for fragment in fragments:
                 if not interrupt_trigger[0]:
@@ -1,15 +1,23 @@
 import binascii
+import collections
+import functools
 import io
 import re
+import threading
+import time
 import urllib.parse
+import weakref
 
 from . import get_suitable_downloader
 from .external import FFmpegFD
 from .fragment import FragmentFD
 from .. import webvtt
 from ..dependencies import Cryptodome
+from ..networking.exceptions import HTTPError, TransportError
 from ..utils import (
+    RetryManager,
     bug_reports_message,
+    float_or_none,
     parse_m3u8_attributes,
     remove_start,
     traverse_obj,
@@ -18,16 +26,164 @@
 )
 from ..utils._utils import _request_dump_filename
 
+HlsSegment = collections.namedtuple('HlsSegment', (
+    'url',
+    'is_init',
+    # Media sequence number of the segment, or of the one that follows an init segment
+    'sequence',
+    # Counts init segments too; used as the IV when the key does not declare one
+    'media_sequence',
+    # (start, end) or None
+    'byte_range',
+    # Attributes of the EXT-X-KEY that applies to the segment, with an absolute URI, or None
+    'key',
+    'discontinuity',
+    'is_ad',
+))
+
+
+def _is_ad_fragment_start(line):
+    return ((line.startswith('#ANVATO-SEGMENT-INFO') and 'type=ad' in line)
+            or (line.startswith('#UPLYNK-SEGMENT') and line.endswith(',ad')))
+
+
+def _is_ad_fragment_end(line):
+    return ((line.startswith('#ANVATO-SEGMENT-INFO') and 'type=master' in line)
+            or (line.startswith('#UPLYNK-SEGMENT') and line.endswith(',segment')))
+
+
+def parse_m3u8_segments(lines, base_url):
+    """
+    Yield the HlsSegment of a media playlist in a single pass
+    @param lines    The playlist, or an iterable of its lines
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    media_sequence = sequence = 0
+    key = None
+    byte_range = None
+    byte_range_offset = 0
+    discontinuity = 0
+    is_ad = False
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith('#'):
+            yield HlsSegment(
+                urljoin(base_url, line), False, sequence, media_sequence, byte_range, key, discontinuity, is_ad)
+            sequence += 1
+            if not is_ad:
+                media_sequence += 1
+            # The byte range only applies to the segment that follows it
+            if byte_range:
+                byte_range_offset = byte_range[1]
+                byte_range = None
+        elif line.startswith('#EXT-X-MAP'):
+            map_info = parse_m3u8_attributes(line[11:])
+            map_byte_range = None
+            if map_info.get('BYTERANGE'):
+                length, _, start = map_info['BYTERANGE'].partition('@')
+                map_byte_range = (int(start or 0), int(start or 0) + int(length))
+            yield HlsSegment(
+                urljoin(base_url, map_info.get('URI')), True, sequence, media_sequence,
+                map_byte_range, key, discontinuity, False)
+            media_sequence += 1
+        elif line.startswith('#EXT-X-KEY'):
+            key = parse_m3u8_attributes(line[11:])
+            if key.get('URI'):
+                key['URI'] = urljoin(base_url, key['URI'])
+        elif line.startswith('#EXT-X-MEDIA-SEQUENCE'):
+            media_sequence = sequence = int(line[22:])
+        elif line.startswith('#EXT-X-BYTERANGE'):
+            length, _, start = line[17:].partition('@')
+            start = int(start) if start else byte_range_offset
+            byte_range = (start, start + int(length))
+        elif _is_ad_fragment_start(line):
+            is_ad = True
+        elif _is_ad_fragment_end(line):
+            is_ad = False
+        elif line.startswith('#EXT-X-DISCONTINUITY'):
+            discontinuity += 1
+
+
+class MediaPlaylist:
+    """A media playlist, whose segments are parsed on first use"""
+
+    def __init__(self, url, document):
+        self.url, self.document = url, document
+        self.created = time.monotonic()
+
+    @property
+    def is_vod(self):
+        return '#EXT-X-ENDLIST' in self.document
+
+    @functools.cached_property
+    def segments(self):
+        return tuple(parse_m3u8_segments(self.document, self.url))
+
+    @property
+    def discontinuity_count(self):
+        return sum(line.startswith('#EXT-X-DISCONTINUITY') for line in self.document.splitlines())
+
+
+class _MediaPlaylistCache:
+    """
+    The VOD media playlists that were downloaded by a YoutubeDL instance, by URL, so that
+    a playlist is only downloaded and parsed once by the extraction and the downloads
+    """
+
+    MAX_PLAYLISTS = 32
+    # Segment URLs may expire; do not reuse playlists for longer than this, in seconds
+    MAX_AGE = 600
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._playlists = collections.OrderedDict()
+
+    def get(self, url):
+        with self._lock:
+            playlist = self._playlists.get(url)
+            if playlist and time.monotonic() - playlist.created > self.MAX_AGE:
+                del self._playlists[url]
+                return None
+            return playlist
+
+    def add(self, url, playlist):
+        """Cache the playlist under url (as well as its own URL) if it is a VOD playlist"""
+        if not playlist.is_vod:
+            return playlist
+        with self._lock:
+            for key in {url, playlist.url}:
+                self._playlists[key] = playlist
+                self._playlists.move_to_end(key)
+            while len(self._playlists) > self.MAX_PLAYLISTS:
+                self._playlists.popitem(last=False)
+        return playlist
+
 
 class HlsFD(FragmentFD):
     """
     Download segments in a m3u8 manifest. External downloaders can take over
     the fragment downloads by supporting the 'm3u8_frag_urls' protocol and
     re-defining 'supports_manifest' function
+
+    Live media playlists are reloaded every target duration and their new segments
+    are downloaded until the playlist ends or stops being updated
     """
 
     FD_NAME = 'hlsnative'
 
+    _playlist_caches_lock = threading.Lock()
+    _playlist_caches = weakref.WeakKeyDictionary()
+
+    # Used when a live playlist does not declare its target duration
+    LIVE_TARGET_DURATION = 10
+    # Number of segments before the end of a live playlist that the recording starts at
+    LIVE_EDGE_SEGMENTS = 3
+    # Number of target durations without new segments after which a live stream is considered over
+    LIVE_IDLE_TIMEOUT = 3
+
     @staticmethod
     def _has_drm(manifest):  # TODO: https://github.com/yt-dlp/yt-dlp/pull/5039
         return bool(re.search('|'.join((
@@ -64,19 +220,30 @@ def can_download(cls, manifest, info_dict, allow_unplayable_formats=False):
             ]
 
         def check_results():
-            yield not info_dict.get('is_live')
             for feature in UNSUPPORTED_FEATURES:
                 yield not re.search(feature, manifest)
             if not allow_unplayable_formats:
                 yield not cls._has_drm(manifest)
         return all(check_results())
 
+    @classmethod
+    def playlist_cache(cls, ydl):
+        """Return the cache of the VOD media playlists of a YoutubeDL instance"""
+        with cls._playlist_caches_lock:
+            if ydl not in cls._playlist_caches:
+                cls._playlist_caches[ydl] = _MediaPlaylistCache()
+            return cls._playlist_caches[ydl]
+
     def real_download(self, filename, info_dict):
         man_url = info_dict['url']
 
         s = info_dict.get('hls_media_playlist_data')
         if s:
             self.to_screen(f'[{self.FD_NAME}] Using m3u8 manifest from extracted info')
+            playlist = MediaPlaylist(man_url, s)
+        elif playlist := self.playlist_cache(self.ydl).get(man_url):
+            self.to_screen(f'[{self.FD_NAME}] Using cached m3u8 manifest')
+            man_url, s = playlist.url, playlist.document
         else:
             self.to_screen(f'[{self.FD_NAME}] Downloading m3u8 manifest')
             urlh = self.ydl.urlopen(self._prepare_url(info_dict, man_url))
@@ -90,6 +257,7 @@ def real_download(self, filename, info_dict):
                 with open(dump_filename, 'wb') as outf:
                     outf.write(s_bytes)
             s = s_bytes.decode('utf-8', 'ignore')
+            playlist = self.playlist_cache(self.ydl).add(info_dict['url'], MediaPlaylist(man_url, s))
 
         can_download, message = self.can_download(s, info_dict, self.params.get('allow_unplayable_formats')), None
         if can_download:
@@ -106,11 +274,7 @@ def real_download(self, filename, info_dict):
                 if has_ffmpeg and ffmpeg_can_dl:
                     can_download = False
                 else:
-                    message += '; decryption will be performed natively, but will be extremely slow'
-            elif info_dict.get('extractor_key') == 'Generic' and re.search(r'(?m)#EXT-X-MEDIA-SEQUENCE:(?!0$)', s):
-                install_ffmpeg = '' if has_ffmpeg else 'install ffmpeg and '
-                message = ('Live HLS streams are not supported by the native downloader. If this is a livestream, '
-                           f'please {install_ffmpeg}add "--downloader ffmpeg --hls-use-mpegts" to your command')
+                    message += '; decryption will be performed natively, but will be slow'
         if not can_download:
             if self._has_drm(s) and not self.params.get('allow_unplayable_formats'):
                 if info_dict.get('has_drm') and self.params.get('test'):
@@ -127,9 +291,20 @@ def real_download(self, filename, info_dict):
         elif message:
             self.report_warning(message)
 
+        live = False
+        if '#EXT-X-ENDLIST' not in s:
+            if info_dict.get('is_live'):
+                live = 'is_from_start' if info_dict.get('is_from_start') else True
+            elif info_dict.get('extractor_key') == 'Generic' and re.search(r'(?m)#EXT-X-MEDIA-SEQUENCE:(?!0$)', s):
+                # Possibly a livestream; keep what is already available and follow the playlist
+                live = 'is_from_start'
+        if live:
+            self.to_screen(f'[{self.FD_NAME}] Following the live playlist until the stream ends')
+
         is_webvtt = info_dict['ext'] == 'vtt'
-        if is_webvtt:
-            real_downloader = None  # Packing the fragments is not currently supported for external downloader
+        if is_webvtt or live:
+            # Packing the fragments or following a live playlist is not currently supported for external downloader
+            real_downloader = None
         else:
             real_downloader = get_suitable_downloader(
                 info_dict, self.params, None, protocol='m3u8_frag_urls', to_stdout=(filename == '-'))
@@ -138,39 +313,17 @@ def real_download(self, filename, info_dict):
         if real_downloader:
             self.to_screen(f'[{self.FD_NAME}] Fragment downloads will be delegated to {real_downloader.get_basename()}')
 
-        def is_ad_fragment_start(s):
-            return ((s.startswith('#ANVATO-SEGMENT-INFO') and 'type=ad' in s)
-                    or (s.startswith('#UPLYNK-SEGMENT') and s.endswith(',ad')))
-
-        def is_ad_fragment_end(s):
-            return ((s.startswith('#ANVATO-SEGMENT-INFO') and 'type=master' in s)
-                    or (s.startswith('#UPLYNK-SEGMENT') and s.endswith(',segment')))
-
-        fragments = []
-
-        media_frags = 0
-        ad_frags = 0
-        ad_frag_next = False
-        for line in s.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith('#'):
-                if is_ad_fragment_start(line):
-                    ad_frag_next = True
-                elif is_ad_fragment_end(line):
-                    ad_frag_next = False
-                continue
-            if ad_frag_next:
-                ad_frags += 1
-                continue
-            media_frags += 1
-
         ctx = {
             'filename': filename,
-            'total_frags': media_frags,
-            'ad_frags': ad_frags,
+            'live': live,
         }
+        if live:
+            ctx['total_frags'] = None
+        else:
+            ctx.update({
+                'total_frags': sum(not segment.is_init and not segment.is_ad for segment in playlist.segments),
+                'ad_frags': sum(segment.is_ad for segment in playlist.segments),
+            })
 
         if real_downloader:
             self._prepare_external_frag_download(ctx)
@@ -186,9 +339,6 @@ def is_ad_fragment_end(s):
         extra_key_query = None
         if extra_param_to_key_url := info_dict.get('extra_param_to_key_url'):
             extra_key_query = urllib.parse.parse_qs(extra_param_to_key_url)
-        i = 0
-        media_sequence = 0
-        decrypt_info = {'METHOD': 'NONE'}
         external_aes_key = traverse_obj(info_dict, ('hls_aes', 'key'))
         if external_aes_key:
             external_aes_key = binascii.unhexlify(remove_start(external_aes_key, '0x'))
@@ -196,111 +346,168 @@ def is_ad_fragment_end(s):
         external_aes_iv = traverse_obj(info_dict, ('hls_aes', 'iv'))
         if external_aes_iv:
             external_aes_iv = binascii.unhexlify(remove_start(external_aes_iv, '0x').zfill(32))
-        byte_range = {}
-        byte_range_offset = 0
-        discontinuity_count = 0
-        frag_index = 0
-        ad_frag_next = False
-        for line in s.splitlines():
-            line = line.strip()
-            if line:
-                if not line.startswith('#'):
-                    if format_index is not None and discontinuity_count != format_index:
-                        continue
-                    if ad_frag_next:
+
+        no_encryption = {'METHOD': 'NONE'}
+        decrypt_infos = {}
+
+        def get_decrypt_info(key):
+            if key is None:
+                return no_encryption
+            # Fragments with the same key share its decrypt_info
+            key_id = tuple(key.items())
+            if key_id not in decrypt_infos:
+                decrypt_info = decrypt_infos[key_id] = dict(key)
+                if decrypt_info['METHOD'] == 'AES-128':
+                    if external_aes_iv:
+                        decrypt_info['IV'] = external_aes_iv
+                    elif 'IV' in decrypt_info:
+                        decrypt_info['IV'] = binascii.unhexlify(decrypt_info['IV'][2:].zfill(32))
+                    if external_aes_key:
+                        decrypt_info['KEY'] = external_aes_key
+                    elif extra_key_query or extra_segment_query:
+                        # Fall back to extra_segment_query to key for backwards compat
+                        decrypt_info['URI'] = update_url_query(
+                            decrypt_info['URI'], extra_key_query or extra_segment_query)
+            return decrypt_infos[key_id]
+
+        def parse_fragments(segments):
+            """
+            Yield (sequence, is_init, fragment) for the HlsSegment of a media playlist, where
+            fragment is None for media segments that are not to be downloaded
+            """
+            # The fragments of other formats do not count towards the media sequence
+            skipped = 0
+            for segment in segments:
+                if format_index is not None and segment.discontinuity != format_index:
+                    if not segment.is_ad:
+                        skipped += 1
+                    if not segment.is_init:
+                        yield segment.sequence, False, None
+                    continue
+                elif segment.is_ad:
+                    yield segment.sequence, False, None
+                    continue
+                frag_url = segment.url
+                if extra_segment_query:
+                    frag_url = update_url_query(frag_url, extra_segment_query)
+                yield segment.sequence, segment.is_init, {
+                    'url': frag_url,
+                    'decrypt_info': get_decrypt_info(segment.key),
+                    'byte_range': {'start': segment.byte_range[0], 'end': segment.byte_range[1]}
+                    if segment.byte_range else {},
+                    'media_sequence': segment.media_sequence - skipped,
+                }
+
+        def reload_playlist(url):
+            for retry in RetryManager(self.params.get('fragment_retries'), self.report_retry, fatal=False):
+                try:
+                    with self.ydl.urlopen(self._prepare_url(info_dict, url)) as urlh:
+                        return urlh.url, urlh.read().decode('utf-8', 'ignore')
+                except HTTPError as err:
+                    err.close()
+                    if err.status in (404, 410):
+                        self.to_screen(f'[{self.FD_NAME}] The live playlist is gone; assuming the stream has ended')
+                        return None
+                    retry.error = err
+                except TransportError as err:
+                    retry.error = err
+            return None
+
+        def live_fragments(s, man_url):
+            # Segments are identified by their media sequence number, which keeps increasing across
+            # reloads and discontinuities. The media sequence of every fragment that may not have been
+            # appended yet is kept in the extra state so that a download from the start can be resumed
+            frag_index = ctx['fragment_index']
+            sequences = extra_state.setdefault('hls_live_sequences', [])
+            next_sequence = next((seq + 1 for index, seq in sequences if index == frag_index), None)
+            last_init = extra_state.get('hls_live_init')
+            last_update = time.monotonic()
+            while True:
+                reloaded = time.monotonic()
+                mobj = re.search(r'#EXT-X-TARGETDURATION:([\d.]+)', s)
+                target_duration = float_or_none(mobj and mobj.group(1)) or self.LIVE_TARGET_DURATION
+                segments = list(parse_fragments(parse_m3u8_segments(s, man_url)))
+                media_sequences = [seq for seq, is_init, _ in segments if not is_init]
+                if media_sequences:
+                    first, last = media_sequences[0], media_sequences[-1]
+                    if next_sequence is None:
+                        next_sequence = first if ctx['live'] == 'is_from_start' else max(
+                            first, last - self.LIVE_EDGE_SEGMENTS + 1)
+                    elif next_sequence < first:
+                        self.report_warning(
+                            f'{first - next_sequence} fragments dropped out of the live playlist before '
+                            'they could be downloaded; the recording will have a gap')
+                        next_sequence = first
+                self.prefetch_keys(info_dict, [fragment for seq, _, fragment in segments if seq >= next_sequence])
+
+                has_new_segments, init = False, None
+                for sequence, is_init, fragment in segments:
+                    if is_init:
+                        init = fragment
                         continue
-                    frag_index += 1
-                    if frag_index <= ctx['fragment_index']:
+                    elif sequence < next_sequence:
                         continue
-                    frag_url = urljoin(man_url, line)
-                    if extra_segment_query:
-                        frag_url = update_url_query(frag_url, extra_segment_query)
-
-                    fragments.append({
-                        'frag_index': frag_index,
-                        'url': frag_url,
-                        'decrypt_info': decrypt_info,
-                        'byte_range': byte_range,
-                        'media_sequence': media_sequence,
-                    })
-                    media_sequence += 1
-
-                    # If the byte_range is truthy, reset it after appending a fragment that uses it
-                    if byte_range:
-                        byte_range_offset = byte_range['end']
-                        byte_range = {}
-
-                elif line.startswith('#EXT-X-MAP'):
-                    if format_index is not None and discontinuity_count != format_index:
+                    next_sequence = sequence + 1
+                    has_new_segments = True
+                    if not fragment:
                         continue
+                    # Init segments are repeated on every reload; only download them when they change,
+                    # as they do across some discontinuities
+                    init_id = init and [init['url'], init['byte_range'].get('start')]
+                    if init and init_id != last_init:
+                        frag_index += 1
+                        last_init = extra_state['hls_live_init'] = init_id
+                        yield {**init, 'frag_index': frag_index}
+                    frag_index += 1
+                    sequences[:] = [pair for pair in sequences if pair[0] >= ctx['fragment_index']] + [[frag_index, sequence]]
+                    yield {**fragment, 'frag_index': frag_index}
+
+                if '#EXT-X-ENDLIST' in s:
+                    return
+                now = time.monotonic()
+                if has_new_segments:
+                    last_update = now
+                elif now - last_update > self.LIVE_IDLE_TIMEOUT * target_duration:
+                    self.to_screen(
+                        f'[{self.FD_NAME}] The live playlist has not been updated for {now - last_update:.0f}s; '
+                        'assuming the stream has ended')
+                    return
+                # Wait for the target duration before reloading, or half of it if nothing changed (RFC 8216, 6.3.4)
+                try:
+                    time.sleep(max(0, reloaded + target_duration / (1 if has_new_segments else 2) - time.monotonic()))
+                except KeyboardInterrupt:
+                    self.to_screen(f'[{self.FD_NAME}] Interrupted by user; stopping the recording')
+                    return
+                playlist = reload_playlist(man_url)
+                if not playlist:
+                    return
+                man_url, s = playlist
+
+        if live:
+            fragments = live_fragments(s, man_url)
+        else:
+            fragments = []
+            frag_index = 0
+            for _, is_init, fragment in parse_fragments(playlist.segments):
+                if is_init:
                     if frag_index > 0:
                         self.report_error(
                             'Initialization fragment found after media fragments, unable to download')
                         return False
-                    frag_index += 1
-                    map_info = parse_m3u8_attributes(line[11:])
-                    frag_url = urljoin(man_url, map_info.get('URI'))
-                    if extra_segment_query:
-                        frag_url = update_url_query(frag_url, extra_segment_query)
-
-                    map_byte_range = {}
-
-                    if map_info.get('BYTERANGE'):
-                        splitted_byte_range = map_info.get('BYTERANGE').split('@')
-                        sub_range_start = int(splitted_byte_range[1]) if len(splitted_byte_range) == 2 else 0
-                        map_byte_range = {
-                            'start': sub_range_start,
-                            'end': sub_range_start + int(splitted_byte_range[0]),
-                        }
-
-                    fragments.append({
-                        'frag_index': frag_index,
-                        'url': frag_url,
-                        'decrypt_info': decrypt_info,
-                        'byte_range': map_byte_range,
-                        'media_sequence': media_sequence,
-                    })
-                    media_sequence += 1
-
-                elif line.startswith('#EXT-X-KEY'):
-                    decrypt_url = decrypt_info.get('URI')
-                    decrypt_info = parse_m3u8_attributes(line[11:])
-                    if decrypt_info['METHOD'] == 'AES-128':
-                        if external_aes_iv:
-                            decrypt_info['IV'] = external_aes_iv
-                        elif 'IV' in decrypt_info:
-                            decrypt_info['IV'] = binascii.unhexlify(decrypt_info['IV'][2:].zfill(32))
-                        if external_aes_key:
-                            decrypt_info['KEY'] = external_aes_key
-                        else:
-                            decrypt_info['URI'] = urljoin(man_url, decrypt_info['URI'])
-                            if extra_key_query or extra_segment_query:
-                                # Fall back to extra_segment_query to key for backwards compat
-                                decrypt_info['URI'] = update_url_query(
-                                    decrypt_info['URI'], extra_key_query or extra_segment_query)
-                            if decrypt_url != decrypt_info['URI']:
-                                decrypt_info['KEY'] = None
-
-                elif line.startswith('#EXT-X-MEDIA-SEQUENCE'):
-                    media_sequence = int(line[22:])
-                elif line.startswith('#EXT-X-BYTERANGE'):
-                    splitted_byte_range = line[17:].split('@')
-                    sub_range_start = int(splitted_byte_range[1]) if len(splitted_byte_range) == 2 else byte_range_offset
-                    byte_range = {
-                        'start': sub_range_start,
-                        'end': sub_range_start + int(splitted_byte_range[0]),
-                    }
-                elif is_ad_fragment_start(line):
-                    ad_frag_next = True
-                elif is_ad_fragment_end(line):
-                    ad_frag_next = False
-                elif line.startswith('#EXT-X-DISCONTINUITY'):
-                    discontinuity_count += 1
-                i += 1
+                elif not fragment:
+                    continue
+                frag_index += 1
+                if not is_init and frag_index <= ctx['fragment_index']:
+                    continue
+                fragments.append({'frag_index': frag_index, **fragment})
 
         # We only download the first fragment during the test
         if self.params.get('test', False):
-            fragments = [fragments[0] if fragments else None]
+            fragments = [next(iter(fragments), None)]
+
+        if not live:
+            # Fetch all the keys up front instead of one by one as the fragments are appended
+            self.prefetch_keys(info_dict, fragments)
 
         if real_downloader:
             info_dict['fragments'] = fragments
@@ -400,7 +607,7 @@ def fin_fragments():
 
                 return output.getvalue().encode()
 
-            if len(fragments) == 1:
+            if not live and len(fragments) == 1:
                 self.download_and_append_fragments(ctx, fragments, info_dict)
             else:
                 self.download_and_append_fragments(
@@ -1,5 +1,8 @@
+import concurrent.futures
+import json
 import os
 import random
+import threading
 import time
 
 from .common import FileDownloader
@@ -23,7 +26,36 @@
 from ..utils.networking import HTTPHeaderDict
 
 
+class _Segment:
+    """A byte range [pos, end) of a segmented download that is yet to be written"""
+
+    def __init__(self, pos, end):
+        self.pos, self.end = pos, end
+
+    @property
+    def remaining(self):
+        return max(self.end - self.pos, 0)
+
+
 class HttpFD(FileDownloader):
+    # Segments are not split below this size
+    MIN_SEGMENT_SIZE = 1024 * 1024
+    # Minimum size of the blocks read by each connection of a segmented download
+    SEGMENT_BLOCK_SIZE = 64 * 1024
+    # Minimum time between writes of the resume state, in seconds
+    STATE_INTERVAL = 1
+
+    def __init__(self, ydl, params):
+        super().__init__(ydl, params)
+        self._read_buffers = threading.local()
+
+    def _read_buffer(self, size):
+        """Return a view of size bytes into a buffer that is reused by the current thread"""
+        buffer = getattr(self._read_buffers, 'buffer', None)
+        if buffer is None or len(buffer) < size:
+            buffer = self._read_buffers.buffer = memoryview(bytearray(size))
+        return buffer[:size]
+
     def real_download(self, filename, info_dict):
         url = info_dict['url']
         request_data = info_dict.get('request_data', None)
@@ -56,13 +88,25 @@ class DownloadContext(dict):
         ctx.block_size = self.params.get('buffersize', 1024)
         ctx.start_time = time.time()
 
+        connections = self.params.get('http_connections') or 1
+        if (connections > 1 and not is_test and request_data is None and ctx.tmpfilename != '-'
+                and 'Range' not in headers and not info_dict.get('is_live')):
+            success = self._download_segmented(ctx, info_dict, headers, request_extensions, connections)
+            if success is not None:
+                return success
+
         # parse given Range
         req_start, req_end, _ = parse_http_range(headers.get('Range'))
 
-        if self.params.get('continuedl', True):
+        if self.params.get('continuedl', True) and ctx.tmpfilename != '-':
             # Establish possible resume length
             if os.path.isfile(ctx.tmpfilename):
                 ctx.resume_len = os.path.getsize(ctx.tmpfilename)
+            if ctx.resume_len and os.path.isfile(self.ytdl_filename(ctx.filename)):
+                # Left by a segmented download; the file is preallocated, so its size is meaningless
+                self.report_unable_to_resume()
+                ctx.resume_len = 0
+                self.try_remove(self.ytdl_filename(ctx.filename))
 
         ctx.is_resume = ctx.resume_len > 0
 
@@ -251,7 +295,9 @@ def retry(e):
             while True:
                 try:
                     # Download and write
-                    data_block = ctx.data.read(block_size if not is_test else min(block_size, data_len - byte_counter))
+                    # Read into a reused buffer and write from it without copying
+                    buffer = self._read_buffer(block_size if not is_test else min(block_size, data_len - byte_counter))
+                    data_block = buffer[:ctx.data.readinto(buffer)]
                 except TransportError as err:
                     retry(err)
 
@@ -301,22 +347,24 @@ def retry(e):
 
                 # Progress message
                 speed = self.calc_speed(start, now, byte_counter - ctx.resume_len)
-                if ctx.data_len is None:
-                    eta = None
-                else:
-                    eta = self.calc_eta(start, time.time(), ctx.data_len - ctx.resume_len, byte_counter - ctx.resume_len)
-
-                self._hook_progress({
-                    'status': 'downloading',
-                    'downloaded_bytes': byte_counter,
-                    'total_bytes': ctx.data_len,
-                    'tmpfilename': ctx.tmpfilename,
-                    'filename': ctx.filename,
-                    'eta': eta,
-                    'speed': speed,
-                    'elapsed': now - ctx.start_time,
-                    'ctx_id': info_dict.get('ctx_id'),
-                }, info_dict)
+                if self._progress_due(info_dict.get('ctx_id')):
+                    if ctx.data_len is None:
+                        eta = None
+                    else:
+                        eta = self.calc_eta(
+                            start, time.time(), ctx.data_len - ctx.resume_len, byte_counter - ctx.resume_len)
+
+                    self._hook_progress({
+                        'status': 'downloading',
+                        'downloaded_bytes': byte_counter,
+                        'total_bytes': ctx.data_len,
+                        'tmpfilename': ctx.tmpfilename,
+                        'filename': ctx.filename,
+                        'eta': eta,
+                        'speed': speed,
+                        'elapsed': now - ctx.start_time,
+                        'ctx_id': info_dict.get('ctx_id'),
+                    }, info_dict)
 
                 if data_len is not None and byte_counter == data_len:
                     break
@@ -383,3 +431,247 @@ def retry(e):
                 close_stream()
                 raise
         return False
+
+    def _open_range(self, url, headers, request_extensions, start):
+        """Request the file from start onwards; returns (response, total size) or None if not served as a range"""
+        request = Request(url, None, headers, extensions=request_extensions)
+        request.headers['Range'] = f'bytes={start}-'
+        response = self.ydl.urlopen(request)
+        range_start, _, total = parse_http_range(response.headers.get('Content-Range'))
+        if response.status != 206 or range_start != start or not total or response.headers.get('Content-encoding'):
+            response.close()
+            return None
+        return response, total
+
+    def _read_segments_state(self, filename, content_len):
+        try:
+            with open(self.ytdl_filename(filename), encoding='utf-8') as f:
+                state = json.load(f)['downloader']
+            if state['content_len'] != content_len:
+                return None
+            return [_Segment(pos, end) for pos, end in state['http_segments']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_segments_state(self, filename, content_len, segments):
+        with open(self.ytdl_filename(filename), 'w', encoding='utf-8') as f:
+            json.dump({'downloader': {
+                'content_len': content_len,
+                'http_segments': [[seg.pos, seg.end] for seg in segments if seg.remaining],
+            }}, f)
+
+    def _download_segmented(self, ctx, info_dict, headers, request_extensions, connections):
+        """Download the file over several connections, each writing its own range of a preallocated file
+
+        Returns None if the server does not support it and the download should be done normally.
+        Resume state is kept in the .ytdl file.
+        """
+        url = info_dict['url']
+        file_size, segments = 0, None
+        if self.params.get('continuedl', True) and os.path.isfile(ctx.tmpfilename):
+            file_size = os.path.getsize(ctx.tmpfilename)
+            segments = self._read_segments_state(ctx.filename, file_size)
+
+        if segments:
+            start = min((seg.pos for seg in segments if seg.remaining), default=0)
+        else:
+            # Without a state, the file may also have been preallocated by a segmented download.
+            # Start a byte early so that the request succeeds even if the file has the full size
+            start = max(file_size - 1, 0)
+        try:
+            response, content_len = self._open_range(url, headers, request_extensions, start) or (None, None)
+        except (HTTPError, TransportError):
+            response = None
+        if response is None:
+            return None
+
+        def split(pos, end):
+            size = max(-(-(end - pos) // connections), 1)
+            return [_Segment(p, min(p + size, end)) for p in range(pos, end, size)]
+
+        if segments is not None and content_len != file_size:
+            # The file has changed on the server
+            self.report_unable_to_resume()
+            file_size, segments = 0, None
+        elif segments is None and file_size:
+            if file_size >= content_len:
+                # Its contents are unknown, since a preallocated file also has the full size
+                self.report_unable_to_resume()
+                file_size = 0
+            else:
+                # Partially downloaded over a single connection
+                segments = split(start, content_len)
+        if segments is None and content_len < 2 * self.MIN_SEGMENT_SIZE:
+            response.close()
+            return None
+
+        min_data_len = self.params.get('min_filesize')
+        max_data_len = self.params.get('max_filesize')
+        if min_data_len is not None and content_len < min_data_len:
+            response.close()
+            self.to_screen(
+                f'\r[download] File is smaller than min-filesize ({content_len} bytes < {min_data_len} bytes). Aborting.')
+            return False
+        if max_data_len is not None and content_len > max_data_len:
+            response.close()
+            self.to_screen(
+                f'\r[download] File is larger than max-filesize ({content_len} bytes > {max_data_len} bytes). Aborting.')
+            return False
+
+        if segments is None:
+            segments = split(0, content_len)
+        else:
+            self.report_resuming_byte(content_len - sum(seg.remaining for seg in segments))
+        if not any(seg.pos == start for seg in segments):
+            response.close()
+            response = None
+
+        try:
+            stream, ctx.tmpfilename = self.sanitize_open(ctx.tmpfilename, 'r+b' if file_size else 'wb')
+            with stream:
+                ctx.filename = self.undo_temp_name(ctx.tmpfilename)
+                # The state is written first, so that a preallocated file is never left without one
+                self._write_segments_state(ctx.filename, content_len, segments)
+                # Preallocate the file, so that every connection can write at its offset
+                stream.truncate(content_len)
+        except OSError as err:
+            if response:
+                response.close()
+            self.report_error(f'unable to open for writing: {err}')
+            return False
+        self.report_destination(ctx.filename)
+        if self.params.get('xattr_set_filesize', False):
+            try:
+                write_xattr(ctx.tmpfilename, 'user.ytdl.filesize', str(content_len).encode())
+            except (XAttrUnavailableError, XAttrMetadataError) as err:
+                self.report_error(f'unable to set filesize xattr: {err}')
+
+        lock, stop = threading.Lock(), threading.Event()
+        resume_len = content_len - sum(seg.remaining for seg in segments)
+        downloaded = resume_len
+        start_time = time.time()
+        last_modified = response and response.headers.get('last-modified')
+
+        def download_segment(segment, response=None):
+            nonlocal downloaded, last_modified
+            block_size = min(max(ctx.block_size, self.SEGMENT_BLOCK_SIZE), self.MIN_SEGMENT_SIZE)
+            # Every connection writes its own range through its own handle. The file is deliberately
+            # not locked, since the connections would otherwise exclude each other
+            out = open(ctx.tmpfilename, 'r+b')
+            try:
+                for retry in RetryManager(self.params.get('retries'), self.report_retry):
+                    try:
+                        if response is None:
+                            response, _ = self._open_range(url, headers, request_extensions, segment.pos) or (None, None)
+                            if response is None:
+                                raise ContentTooShortError(segment.pos, content_len)
+                            last_modified = last_modified or response.headers.get('last-modified')
+                        out.seek(segment.pos)
+                        while not stop.is_set():
+                            with lock:
+                                remaining = segment.remaining
+                            if not remaining:
+                                return True
+                            before = time.time()
+                            buffer = self._read_buffer(min(block_size, remaining))
+                            data_block = buffer[:response.readinto(buffer)]
+                            if not data_block:
+                                raise ContentTooShortError(segment.pos, segment.end)
+                            # A block is at most MIN_SEGMENT_SIZE, so a split while reading never moves
+                            # the end of the segment before the end of the block
+                            out.write(data_block)
+                            with lock:
+                                segment.pos += len(data_block)
+                                downloaded += len(data_block)
+                            after = time.time()
+                            self.slow_down(start_time, after, downloaded - resume_len)
+                            if not self.params.get('noresizebuffer', False):
+                                block_size = min(max(
+                                    self.best_block_size(after - before, len(data_block)),
+                                    self.SEGMENT_BLOCK_SIZE), self.MIN_SEGMENT_SIZE)
+                        return False
+                    except (TransportError, HTTPError, ContentTooShortError) as err:
+                        if isinstance(err, CertificateVerifyError) or (
+                                isinstance(err, HTTPError) and not 500 <= err.status < 600):
+                            raise
+                        retry.error = err
+                    finally:
+                        if response is not None:
+                            response.close()
+                            response = None
+                return False
+            finally:
+                out.close()
+
+        def split_segment():
+            """Split the largest remaining segment in two, returning the new one"""
+            with lock:
+                largest = max(segments, key=lambda seg: seg.remaining)
+                if largest.remaining < 2 * self.MIN_SEGMENT_SIZE:
+                    return None
+                new = _Segment(largest.pos + largest.remaining // 2, largest.end)
+                largest.end = new.pos
+                segments.append(new)
+                return new
+
+        def report_progress():
+            now = time.time()
+            self._hook_progress({
+                'status': 'downloading',
+                'downloaded_bytes': downloaded,
+                'total_bytes': content_len,
+                'tmpfilename': ctx.tmpfilename,
+                'filename': ctx.filename,
+                'eta': self.calc_eta(start_time, now, content_len - resume_len, downloaded - resume_len),
+                'speed': self.calc_speed(start_time, now, downloaded - resume_len),
+                'elapsed': now - ctx.start_time,
+                'ctx_id': info_dict.get('ctx_id'),
+            }, info_dict)
+
+        success = False
+        executor = concurrent.futures.ThreadPoolExecutor(connections, thread_name_prefix='yt-dlp-http')
+        try:
+            futures = set()
+            for segment in segments:
+                if segment.remaining:
+                    # The response of the initial request is used for the segment it starts
+                    reuse = response is not None and segment.pos == start
+                    futures.add(executor.submit(download_segment, segment, response if reuse else None))
+                    response = None if reuse else response
+            last_state = time.monotonic()
+            while futures:
+                done, futures = concurrent.futures.wait(
+                    futures, timeout=0.1, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    if not future.result():
+                        stop.set()
+                        return False
+                    # Rebalance: the idle connection takes over half of the largest remaining segment
+                    segment = split_segment()
+                    if segment:
+                        futures.add(executor.submit(download_segment, segment))
+                report_progress()
+                if time.monotonic() - last_state >= self.STATE_INTERVAL:
+                    with lock:
+                        self._write_segments_state(ctx.filename, content_len, segments)
+                    last_state = time.monotonic()
+            success = True
+        finally:
+            stop.set()
+            executor.shutdown(wait=True)
+            if not success:
+                self._write_segments_state(ctx.filename, content_len, segments)
+
+        self.try_remove(self.ytdl_filename(ctx.filename))
+        self.try_rename(ctx.tmpfilename, ctx.filename)
+        if self.params.get('updatetime'):
+            info_dict['filetime'] = self.try_utime(ctx.filename, last_modified)
+        self._hook_progress({
+            'downloaded_bytes': content_len,
+            'total_bytes': content_len,
+            'filename': ctx.filename,
+            'status': 'finished',
+            'elapsed': time.time() - ctx.start_time,
+            'ctx_id': info_dict.get('ctx_id'),
+        }, info_dict)
+        return True
@@ -29,7 +29,7 @@
 )
 from ..cookies import LenientSimpleCookie
 from ..downloader.f4m import get_base_url, remove_encrypted_media
-from ..downloader.hls import HlsFD
+from ..downloader.hls import HlsFD, MediaPlaylist
 from ..globals import plugin_ies_overrides
 from ..networking import HEADRequest, Request
 from ..networking.exceptions import (
@@ -44,6 +44,7 @@
     NO_DEFAULT,
     ExtractorError,
     FormatSorter,
+    FragmentList,
     GeoRestrictedError,
     GeoUtils,
     ISO639Utils,
@@ -192,7 +193,9 @@ class InfoExtractor:
                                  Base URL for fragments. Each fragment's path
                                  value (if present) will be relative to
                                  this URL.
-                    * fragments  A list of fragments of a fragmented media.
+                    * fragments  A list of fragments of a fragmented media, or
+                                 a FragmentList for long lists of fragments that
+                                 follow a template.
                                  Each fragment entry must contain either an url
                                  or a path. If an url is present it should be
                                  considered by a client. Otherwise both path and
@@ -534,6 +537,8 @@ class InfoExtractor:
     Subclasses may also override suitable() if necessary, but ensure the function
     signature is preserved and that this function imports everything it needs
     (except other extractors), so that lazy_extractors works correctly.
+    suitable() must not accept URLs that do not match _VALID_URL, since the URL
+    index of lazy_extractors is built from _VALID_URL alone.
 
     Subclasses can define a list of _EMBED_REGEX, which will be searched for in
     the HTML of Generic webpages. It may also override _extract_embed_urls
@@ -2206,6 +2211,8 @@ def _extract_m3u8_formats_and_subtitles(
                 fatal=fatal, prefix=prefix, data=data)
         if content is False:
             return [], {}
+        # A VOD media playlist is reused by the download instead of being downloaded again
+        HlsFD.playlist_cache(self._downloader).add(response.url, MediaPlaylist(response.url, content))
 
         return self._parse_m3u8_formats_and_subtitles(
             content, response.url, ext=ext, entry_protocol=entry_protocol,
@@ -2226,15 +2233,20 @@ def format_url(url):
 
         if self.get_param('hls_split_discontinuity', False):
             def _extract_m3u8_playlist_indices(manifest_url=None, m3u8_doc=None):
-                if not m3u8_doc:
-                    if not manifest_url:
-                        return []
-                    m3u8_doc = self._download_webpage(
+                if m3u8_doc:
+                    return range(1 + MediaPlaylist(m3u8_url, m3u8_doc).discontinuity_count)
+                if not manifest_url:
+                    return []
+                playlist_cache = HlsFD.playlist_cache(self._downloader)
+                playlist = playlist_cache.get(manifest_url)
+                if not playlist:
+                    res = self._download_webpage_handle(
                         manifest_url, video_id, fatal=fatal, data=data, headers=headers,
                         note=False, errnote='Failed to download m3u8 playlist information')
-                    if m3u8_doc is False:
+                    if res is False:
                         return []
-                return range(1 + sum(line.startswith('#EXT-X-DISCONTINUITY') for line in m3u8_doc.splitlines()))
+                    playlist = playlist_cache.add(manifest_url, MediaPlaylist(res[1].url, res[0]))
+                return range(1 + playlist.discontinuity_count)
 
         else:
             def _extract_m3u8_playlist_indices(*args, **kwargs):
@@ -2848,7 +2860,8 @@ def _merge_mpd_periods(self, periods):
                 if format_key not in formats:
                     formats[format_key] = f
                 elif 'fragments' in f:
-                    formats[format_key].setdefault('fragments', []).extend(f['fragments'])
+                    formats[format_key]['fragments'] = FragmentList(
+                        formats[format_key].get('fragments') or [], f['fragments'])
 
             if subtitles and period['subtitles']:
                 self.report_warning(bug_reports_message(
@@ -3086,7 +3099,6 @@ def location_key(location):
                     if 'segment_urls' not in representation_ms_info and 'media' in representation_ms_info:
 
                         media_template = prepare_template('media', ('Number', 'Bandwidth', 'Time'))
-                        media_location_key = location_key(media_template)
 
                         # As per [1, 5.3.9.4.4, Table 16, page 55] $Number$ and $Time$
                         # can't be used at the same time
@@ -3095,78 +3107,32 @@ def location_key(location):
                             if 'total_number' not in representation_ms_info and 'segment_duration' in representation_ms_info:
                                 segment_duration = float_or_none(representation_ms_info['segment_duration'], representation_ms_info['timescale'])
                                 representation_ms_info['total_number'] = math.ceil(float_or_none(period_duration, segment_duration, default=0))
-                            representation_ms_info['fragments'] = [{
-                                media_location_key: media_template % {
-                                    'Number': segment_number,
-                                    'Bandwidth': bandwidth,
-                                },
-                                'duration': segment_duration,
-                            } for segment_number in range(
-                                representation_ms_info['start_number'],
-                                representation_ms_info['total_number'] + representation_ms_info['start_number'])]
+                            representation_ms_info['fragments'] = FragmentList.from_template(
+                                media_template, representation_ms_info['start_number'],
+                                representation_ms_info['total_number'], duration=segment_duration, bandwidth=bandwidth)
                         else:
                             # $Number*$ or $Time$ in media template with S list available
                             # Example $Number*$: http://www.svtplay.se/klipp/9023742/stopptid-om-bjorn-borg
                             # Example $Time$: https://play.arkena.com/embed/avp/v2/player/media/b41dda37-d8e7-4d3f-b1b5-9a9db578bdfe/1/129411
-                            representation_ms_info['fragments'] = []
-                            segment_time = 0
-                            segment_d = None
-                            segment_number = representation_ms_info['start_number']
-
-                            def add_segment_url():
-                                segment_url = media_template % {
-                                    'Time': segment_time,
-                                    'Bandwidth': bandwidth,
-                                    'Number': segment_number,
-                                }
-                                representation_ms_info['fragments'].append({
-                                    media_location_key: segment_url,
-                                    'duration': float_or_none(segment_d, representation_ms_info['timescale']),
-                                })
-
-                            for s in representation_ms_info['s']:
-                                segment_time = s.get('t') or segment_time
-                                segment_d = s['d']
-                                add_segment_url()
-                                segment_number += 1
-                                for _ in range(s.get('r', 0)):
-                                    segment_time += segment_d
-                                    add_segment_url()
-                                    segment_number += 1
-                                segment_time += segment_d
+                            representation_ms_info['fragments'] = FragmentList.from_timeline(
+                                media_template, representation_ms_info['start_number'], representation_ms_info['s'],
+                                representation_ms_info['timescale'], bandwidth=bandwidth)
                     elif 'segment_urls' in representation_ms_info and 's' in representation_ms_info:
                         # No media template,
                         # e.g. https://www.youtube.com/watch?v=iXZV5uAYMJI
                         # or any YouTube dashsegments video
-                        fragments = []
-                        segment_index = 0
-                        timescale = representation_ms_info['timescale']
-                        for s in representation_ms_info['s']:
-                            duration = float_or_none(s['d'], timescale)
-                            for _ in range(s.get('r', 0) + 1):
-                                segment_uri = representation_ms_info['segment_urls'][segment_index]
-                                fragments.append({
-                                    location_key(segment_uri): segment_uri,
-                                    'duration': duration,
-                                })
-                                segment_index += 1
-                        representation_ms_info['fragments'] = fragments
+                        representation_ms_info['fragments'] = FragmentList.from_urls(
+                            representation_ms_info['segment_urls'], timeline=representation_ms_info['s'],
+                            timescale=representation_ms_info['timescale'])
                     elif 'segment_urls' in representation_ms_info:
                         # Segment URLs with no SegmentTimeline
                         # E.g. https://www.seznam.cz/zpravy/clanek/cesko-zasahne-vitr-o-sile-vichrice-muze-byt-i-zivotu-nebezpecny-39091
                         # https://github.com/ytdl-org/youtube-dl/pull/14844
-                        fragments = []
                         segment_duration = float_or_none(
                             representation_ms_info['segment_duration'],
                             representation_ms_info['timescale']) if 'segment_duration' in representation_ms_info else None
-                        for segment_url in representation_ms_info['segment_urls']:
-                            fragment = {
-                                location_key(segment_url): segment_url,
-                            }
-                            if segment_duration:
-                                fragment['duration'] = segment_duration
-                            fragments.append(fragment)
-                        representation_ms_info['fragments'] = fragments
+                        representation_ms_info['fragments'] = FragmentList.from_urls(
+                            representation_ms_info['segment_urls'], duration=segment_duration)
                     # If there is a fragments key available then we correctly recognized fragmented media.
                     # Otherwise we will assume unfragmented media with direct access. Technically, such
                     # assumption is not necessarily correct since we may simply have no support for
@@ -3176,15 +3142,15 @@ def add_segment_url():
                             # NB: mpd_url may be empty when MPD manifest is parsed from a string
                             'url': mpd_url or base_url,
                             'fragment_base_url': base_url,
-                            'fragments': [],
+                            'fragments': representation_ms_info['fragments'],
                             'protocol': 'http_dash_segments' if mime_type != 'image/jpeg' else 'mhtml',
                         })
                         if 'initialization_url' in representation_ms_info:
                             initialization_url = representation_ms_info['initialization_url']
                             if not f.get('url'):
                                 f['url'] = initialization_url
-                            f['fragments'].append({location_key(initialization_url): initialization_url})
-                        f['fragments'].extend(representation_ms_info['fragments'])
+                            f['fragments'] = FragmentList(
+                                [{location_key(initialization_url): initialization_url}], f['fragments'])
                         if not period_duration:
                             period_duration = try_get(
                                 representation_ms_info,
@@ -1,10 +1,13 @@
+import contextlib
 import inspect
 import os
+import re
 
 from ..globals import LAZY_EXTRACTORS
 from ..globals import extractors as _extractors_context
 
 _CLASS_LOOKUP = None
+_URL_INDEX = _URL_FALLBACK = None
 if os.environ.get('YTDLP_NO_LAZY_EXTRACTORS'):
     LAZY_EXTRACTORS.value = False
 else:
@@ -13,6 +16,9 @@
         LAZY_EXTRACTORS.value = True
     except ImportError:
         LAZY_EXTRACTORS.value = None
+    else:
+        with contextlib.suppress(ImportError):
+            from .lazy_extractors import _URL_FALLBACK, _URL_INDEX
 
 if not _CLASS_LOOKUP:
     from . import _extractors
@@ -30,6 +36,32 @@
     _current.setdefault(name, ie)
 
 
+def url_candidates(url):
+    """Return the names of the indexed extractor classes that may be suitable for the URL
+
+    Extractors for which is_url_indexed() is False must always be tried as well.
+    Returns None if the candidates are not known, in which case every extractor must be tried.
+    """
+    if _URL_INDEX is None or not url.isascii():
+        return None
+    candidates = set()
+    for token in re.split(r'[^a-z0-9]+', url.lower()):
+        candidates.update(_URL_INDEX.get(token, ()))
+    return candidates
+
+
+def is_url_indexed(ie):
+    """Whether url_candidates() accounts for this extractor class or instance"""
+    if _URL_INDEX is None:
+        return False
+    name = (ie if isinstance(ie, type) else type(ie)).__name__
+    klass = _CLASS_LOOKUP.get(name)
+    if name in _URL_FALLBACK or klass is None:
+        return False
+    # Plugins may replace or subclass extractors
+    return ie is klass or type(ie) is klass.__dict__.get('_real_class')
+
+
 def __getattr__(name):
     value = _CLASS_LOOKUP.get(name)
     if not value:
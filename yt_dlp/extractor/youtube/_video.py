@@ -1810,6 +1810,9 @@ class YoutubeIE(YoutubeBaseInfoExtractor):
     _INVERSE_PLAYER_JS_VARIANT_MAP = {v: k for k, v in _PLAYER_JS_VARIANT_MAP.items()}
     _NSIG_FUNC_CACHE_ID = 'nsig func'
     _DUMMY_STRING = 'dlp_wins'
+    # Limits of the player data persisted in the filesystem cache
+    _PLAYER_JS_CACHE_SIZE = 32 * 1024 * 1024
+    _NSIG_RESULTS_CACHE_SIZE = 1000
 
     @classmethod
     def suitable(cls, url):
@@ -1824,6 +1827,8 @@ def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._code_cache = {}
         self._player_cache = {}
+        # Cache IDs of the nsig results that are yet to be written to the filesystem cache
+        self._unsaved_nsig_results = set()
         self._pot_director = None
 
     def _real_initialize(self):
@@ -2061,10 +2066,15 @@ def _extract_player_info(cls, player_url):
     def _load_player(self, video_id, player_url, fatal=True):
         player_js_key = self._player_js_cache_key(player_url)
         if player_js_key not in self._code_cache:
-            code = self._download_webpage(
-                player_url, video_id, fatal=fatal,
-                note=f'Downloading player {player_js_key}',
-                errnote=f'Download of {player_js_key} failed')
+            code = self.cache.load('youtube-player', player_js_key, min_ver='2025.07.21')
+            if not code:
+                code = self._download_webpage(
+                    player_url, video_id, fatal=fatal,
+                    note=f'Downloading player {player_js_key}',
+                    errnote=f'Download of {player_js_key} failed')
+                if code:
+                    self.cache.store('youtube-player', player_js_key, code)
+                    self.cache.prune('youtube-player', self._PLAYER_JS_CACHE_SIZE)
             if code:
                 self._code_cache[player_js_key] = code
         return self._code_cache.get(player_js_key)
@@ -2192,6 +2202,26 @@ def _store_player_data_to_cache(self, name, player_url, data):
             self.cache.store(*cache_id, data)
             self._player_cache[cache_id] = data
 
+    def _load_nsig_results(self, player_url):
+        cache_id = ('youtube-nsig-results', self._player_js_cache_key(player_url))
+        if cache_id not in self._player_cache:
+            self._player_cache[cache_id] = self.cache.load(*cache_id, min_ver='2025.07.21') or {}
+        return self._player_cache[cache_id]
+
+    def _store_nsig_result(self, player_url, s, result):
+        """Keep the result in memory; it is written to the filesystem by _flush_nsig_results"""
+        self._load_nsig_results(player_url)[s] = result
+        self._unsaved_nsig_results.add(('youtube-nsig-results', self._player_js_cache_key(player_url)))
+
+    def _flush_nsig_results(self):
+        while self._unsaved_nsig_results:
+            cache_id = self._unsaved_nsig_results.pop()
+            # Merge with the results stored by other processes meanwhile, and keep only the most recent ones
+            stored = self.cache.load(*cache_id, min_ver='2025.07.21') or {}
+            stored.update(self._player_cache[cache_id])
+            results = self._player_cache[cache_id] = dict(list(stored.items())[-self._NSIG_RESULTS_CACHE_SIZE:])
+            self.cache.store(*cache_id, results)
+
     def _decrypt_signature(self, s, video_id, player_url):
         """Turn the encrypted s field into a working signature"""
         extract_sig = self._cached(
@@ -2206,6 +2236,10 @@ def _decrypt_nsig(self, s, video_id, player_url):
             raise ExtractorError('Cannot decrypt nsig without player_url')
         player_url = urljoin('https://www.youtube.com', player_url)
 
+        if not self.get_param('youtube_print_sig_code') and (ret := self._load_nsig_results(player_url).get(s)):
+            self.write_debug(f'Decrypted nsig {s} => {ret} (from cache)')
+            return ret
+
         try:
             jsi, player_id, func_code = self._extract_n_function_code(video_id, player_url)
         except ExtractorError as e:
@@ -2234,6 +2268,7 @@ def _decrypt_nsig(self, s, video_id, player_url):
         self.write_debug(f'Decrypted nsig {s} => {ret}')
         # Only cache nsig func JS code to disk if successful, and only once
         self._store_player_data_to_cache('nsig', player_url, func_code)
+        self._store_nsig_result(player_url, s, ret)
         return ret
 
     def _extract_n_function_name(self, jscode, player_url=None):
@@ -2378,7 +2413,7 @@ def _extract_n_function_code(self, video_id, player_url):
         player_id = self._extract_player_info(player_url)
         func_code = self._load_player_data_from_cache('nsig', player_url)
         jscode = func_code or self._load_player(video_id, player_url)
-        jsi = JSInterpreter(jscode)
+        jsi = JSInterpreter(jscode, compiled=True)
 
         if func_code:
             return jsi, player_id, func_code
@@ -3751,7 +3786,12 @@ def _list_formats(self, video_id, microformats, video_details, player_responses,
                        else 'not_live' if False in (is_live, live_content)
                        else None)
         streaming_data = traverse_obj(player_responses, (..., 'streamingData'))
-        *formats, subtitles = self._extract_formats_and_subtitles(streaming_data, video_id, player_url, live_status, duration)
+        try:
+            *formats, subtitles = self._extract_formats_and_subtitles(
+                streaming_data, video_id, player_url, live_status, duration)
+        finally:
+            # The n challenges of all the formats are stored at once
+            self._flush_nsig_results()
         if all(f.get('has_drm') for f in formats):
             # If there are no formats that definitely don't have DRM, all have DRM
             for f in formats:
@@ -190,6 +190,36 @@ def js_number_to_string(val: float, radix: int = 10):
 _QUOTES = '\'"/'
 _NESTED_BRACKETS = r'[^[\]]+(?:\[[^[\]]+(?:\[[^\]]+\])?\])?'
 
+_STATEMENT_RE = r'(?P<var>(?:var|const|let)\s)|return(?:\s+|(?=["\'])|$)|(?P<throw>throw\s+)'
+_CONTROL_RE = r'''(?x)
+    (?P<try>try)\s*\{|
+    (?P<if>if)\s*\(|
+    (?P<switch>switch)\s*\(|
+    (?P<for>for)\s*\(
+'''
+_ASSIGNMENT_RE = fr'''(?x)
+    (?P<out>{_NAME_RE})(?:\[(?P<index>{_NESTED_BRACKETS})\])?\s*
+    (?P<op>{"|".join(map(re.escape, set(_OPERATORS) - _COMP_OPERATORS))})?
+    =(?!=)(?P<expr>.*)$
+'''
+_INCREMENT_RE = rf'''(?x)
+    (?P<pre_sign>\+\+|--)(?P<var1>{_NAME_RE})|
+    (?P<var2>{_NAME_RE})(?P<post_sign>\+\+|--)
+'''
+_EXPRESSION_RE = fr'''(?x)
+    (?P<return>
+        (?!if|return|true|false|null|undefined|NaN)(?P<name>{_NAME_RE})$
+    )|(?P<attribute>
+        (?P<var>{_NAME_RE})(?:
+            (?P<nullish>\?)?\.(?P<member>[^(]+)|
+            \[(?P<member2>{_NESTED_BRACKETS})\]
+        )\s*
+    )|(?P<indexing>
+        (?P<in>{_NAME_RE})\[(?P<idx>.+)\]$
+    )|(?P<function>
+        (?P<fname>{_NAME_RE})\((?P<args>.*)\)$
+    )'''
+
 
 class JS_Undefined:
     pass
@@ -276,10 +306,15 @@ class JSInterpreter:
         'y': 4096,  # Perform a "sticky" search that matches starting at the current position in the target string
     }
 
-    def __init__(self, code, objects=None):
+    # Upper bound for statements compiled on demand, e.g. ones containing dumped runtime values
+    _MAX_COMPILED_STATEMENTS = 10000
+
+    def __init__(self, code, objects=None, compiled=False):
         self.code, self._functions = code, {}
         self._objects = {} if objects is None else objects
         self._undefined_varnames = set()
+        # (stmt, _is_var_declaration) -> compiled statement; None when interpreting
+        self._compiled = {} if compiled else None
 
     class Exception(ExtractorError):  # noqa: A001
         def __init__(self, msg, expr=None, *args, **kwargs):
@@ -391,6 +426,15 @@ def _dump(self, obj, namespace):
 
     @Debugger.wrap_interpreter
     def interpret_statement(self, stmt, local_vars, allow_recursion=100, _is_var_declaration=False):
+        if self._compiled is not None:
+            compiled = self._compiled.get((stmt, _is_var_declaration))
+            if compiled is None and self._should_compile(stmt):
+                compiled = self._compile_statement(stmt, _is_var_declaration)
+            if compiled is not None:
+                return compiled(local_vars, allow_recursion)
+        return self._interpret_statement(stmt, local_vars, allow_recursion, _is_var_declaration)
+
+    def _interpret_statement(self, stmt, local_vars, allow_recursion, _is_var_declaration=False):
         if allow_recursion < 0:
             raise self.Exception('Recursion limit reached')
         allow_recursion -= 1
@@ -404,7 +448,7 @@ def interpret_statement(self, stmt, local_vars, allow_recursion=100, _is_var_dec
             if should_return:
                 return ret, should_return
 
-        m = re.match(r'(?P<var>(?:var|const|let)\s)|return(?:\s+|(?=["\'])|$)|(?P<throw>throw\s+)', stmt)
+        m = re.match(_STATEMENT_RE, stmt)
         if m:
             expr = stmt[len(m.group(0)):].strip()
             if m.group('throw'):
@@ -478,12 +522,7 @@ def dict_item(key, val):
                 for item in self._separate(inner)])
             expr = name + outer
 
-        m = re.match(r'''(?x)
-                (?P<try>try)\s*\{|
-                (?P<if>if)\s*\(|
-                (?P<switch>switch)\s*\(|
-                (?P<for>for)\s*\(
-                ''', expr)
+        m = re.match(_CONTROL_RE, expr)
         md = m.groupdict() if m else {}
         if md.get('if'):
             cndn, expr = self._separate_at_paren(expr[m.end() - 1:])
@@ -601,11 +640,7 @@ def dict_item(key, val):
                     return ret, True
             return ret, False
 
-        m = re.match(fr'''(?x)
-                (?P<out>{_NAME_RE})(?:\[(?P<index>{_NESTED_BRACKETS})\])?\s*
-                (?P<op>{"|".join(map(re.escape, set(_OPERATORS) - _COMP_OPERATORS))})?
-                =(?!=)(?P<expr>.*)$
-            ''', expr)
+        m = re.match(_ASSIGNMENT_RE, expr)
         if m:  # We are assigning a value to a variable
             left_val = local_vars.get(m.group('out'))
 
@@ -628,9 +663,7 @@ def dict_item(key, val):
                 m.group('op'), self._index(left_val, idx), m.group('expr'), expr, local_vars, allow_recursion)
             return left_val[idx], should_return
 
-        for m in re.finditer(rf'''(?x)
-                (?P<pre_sign>\+\+|--)(?P<var1>{_NAME_RE})|
-                (?P<var2>{_NAME_RE})(?P<post_sign>\+\+|--)''', expr):
+        for m in re.finditer(_INCREMENT_RE, expr):
             var = m.group('var1') or m.group('var2')
             start, end = m.span()
             sign = m.group('pre_sign') or m.group('post_sign')
@@ -643,19 +676,7 @@ def dict_item(key, val):
         if not expr:
             return None, should_return
 
-        m = re.match(fr'''(?x)
-            (?P<return>
-                (?!if|return|true|false|null|undefined|NaN)(?P<name>{_NAME_RE})$
-            )|(?P<attribute>
-                (?P<var>{_NAME_RE})(?:
-                    (?P<nullish>\?)?\.(?P<member>[^(]+)|
-                    \[(?P<member2>{_NESTED_BRACKETS})\]
-                )\s*
-            )|(?P<indexing>
-                (?P<in>{_NAME_RE})\[(?P<idx>.+)\]$
-            )|(?P<function>
-                (?P<fname>{_NAME_RE})\((?P<args>.*)\)$
-            )''', expr)
+        m = re.match(_EXPRESSION_RE, expr)
         if expr.isdigit():
             return int(expr), should_return
 
@@ -717,140 +738,12 @@ def dict_item(key, val):
             else:
                 arg_str, remaining = None, arg_str
 
-            def assertion(cndn, msg):
-                """ assert, but without risk of getting optimized out """
-                if not cndn:
-                    raise self.Exception(f'{member} {msg}', expr)
-
             def eval_method():
-                nonlocal member
-
-                if (variable, member) == ('console', 'debug'):
-                    if Debugger.ENABLED:
-                        Debugger.write(self.interpret_expression(f'[{arg_str}]', local_vars, allow_recursion))
-                    return
-
-                types = {
-                    'String': str,
-                    'Math': float,
-                    'Array': list,
-                }
-                obj = local_vars.get(variable, types.get(variable, NO_DEFAULT))
-                if obj is NO_DEFAULT:
-                    if variable not in self._objects:
-                        try:
-                            self._objects[variable] = self.extract_object(variable, local_vars)
-                        except self.Exception:
-                            if not nullish:
-                                raise
-                    obj = self._objects.get(variable, JS_Undefined)
-
-                if nullish and obj is JS_Undefined:
-                    return JS_Undefined
-
-                # Member access
-                if arg_str is None:
-                    return self._index(obj, member, nullish)
-
-                # Function call
-                argvals = [
-                    self.interpret_expression(v, local_vars, allow_recursion)
-                    for v in self._separate(arg_str)]
-
-                # Fixup prototype call
-                if isinstance(obj, type) and member.startswith('prototype.'):
-                    new_member, _, func_prototype = member.partition('.')[2].partition('.')
-                    assertion(argvals, 'takes one or more arguments')
-                    assertion(isinstance(argvals[0], obj), f'needs binding to type {obj}')
-                    if func_prototype == 'call':
-                        obj, *argvals = argvals
-                    elif func_prototype == 'apply':
-                        assertion(len(argvals) == 2, 'takes two arguments')
-                        obj, argvals = argvals
-                        assertion(isinstance(argvals, list), 'second argument needs to be a list')
-                    else:
-                        raise self.Exception(f'Unsupported Function method {func_prototype}', expr)
-                    member = new_member
-
-                if obj is str:
-                    if member == 'fromCharCode':
-                        assertion(argvals, 'takes one or more arguments')
-                        return ''.join(map(chr, argvals))
-                    raise self.Exception(f'Unsupported String method {member}', expr)
-                elif obj is float:
-                    if member == 'pow':
-                        assertion(len(argvals) == 2, 'takes two arguments')
-                        return argvals[0] ** argvals[1]
-                    raise self.Exception(f'Unsupported Math method {member}', expr)
-
-                if member == 'split':
-                    assertion(argvals, 'takes one or more arguments')
-                    assertion(len(argvals) == 1, 'with limit argument is not implemented')
-                    return obj.split(argvals[0]) if argvals[0] else list(obj)
-                elif member == 'join':
-                    assertion(isinstance(obj, list), 'must be applied on a list')
-                    assertion(len(argvals) == 1, 'takes exactly one argument')
-                    return argvals[0].join(obj)
-                elif member == 'reverse':
-                    assertion(not argvals, 'does not take any arguments')
-                    obj.reverse()
-                    return obj
-                elif member == 'slice':
-                    assertion(isinstance(obj, (list, str)), 'must be applied on a list or string')
-                    assertion(len(argvals) <= 2, 'takes between 0 and 2 arguments')
-                    return obj[slice(*argvals, None)]
-                elif member == 'splice':
-                    assertion(isinstance(obj, list), 'must be applied on a list')
-                    assertion(argvals, 'takes one or more arguments')
-                    index, how_many = map(int, ([*argvals, len(obj)])[:2])
-                    if index < 0:
-                        index += len(obj)
-                    add_items = argvals[2:]
-                    res = []
-                    for _ in range(index, min(index + how_many, len(obj))):
-                        res.append(obj.pop(index))
-                    for i, item in enumerate(add_items):
-                        obj.insert(index + i, item)
-                    return res
-                elif member == 'unshift':
-                    assertion(isinstance(obj, list), 'must be applied on a list')
-                    assertion(argvals, 'takes one or more arguments')
-                    for item in reversed(argvals):
-                        obj.insert(0, item)
-                    return obj
-                elif member == 'pop':
-                    assertion(isinstance(obj, list), 'must be applied on a list')
-                    assertion(not argvals, 'does not take any arguments')
-                    if not obj:
-                        return
-                    return obj.pop()
-                elif member == 'push':
-                    assertion(argvals, 'takes one or more arguments')
-                    obj.extend(argvals)
-                    return obj
-                elif member == 'forEach':
-                    assertion(argvals, 'takes one or more arguments')
-                    assertion(len(argvals) <= 2, 'takes at-most 2 arguments')
-                    f, this = ([*argvals, ''])[:2]
-                    return [f((item, idx, obj), {'this': this}, allow_recursion) for idx, item in enumerate(obj)]
-                elif member == 'indexOf':
-                    assertion(argvals, 'takes one or more arguments')
-                    assertion(len(argvals) <= 2, 'takes at-most 2 arguments')
-                    idx, start = ([*argvals, 0])[:2]
-                    try:
-                        return obj.index(idx, start)
-                    except ValueError:
-                        return -1
-                elif member == 'charCodeAt':
-                    assertion(isinstance(obj, str), 'must be applied on a string')
-                    assertion(len(argvals) == 1, 'takes exactly one argument')
-                    idx = argvals[0] if isinstance(argvals[0], int) else 0
-                    if idx >= len(obj):
-                        return None
-                    return ord(obj[idx])
-
-                idx = int(member) if isinstance(obj, list) else member
-                return obj[idx](argvals, allow_recursion=allow_recursion)
+                return self._eval_method(
+                    variable, member, nullish, arg_str, lambda: [
+                        self.interpret_expression(v, local_vars, allow_recursion)
+                        for v in self._separate(arg_str)],
+                    expr, local_vars, allow_recursion)
 
             if remaining:
                 ret, should_abort = self.interpret_statement(
@@ -873,12 +766,625 @@ def eval_method():
         raise self.Exception(
             f'Unsupported JS expression {truncate_string(expr, 20, 20) if expr != stmt else ""}', stmt)
 
+    def _eval_method(self, variable, member, nullish, arg_str, get_argvals, expr, local_vars, allow_recursion):
+        def assertion(cndn, msg):
+            """ assert, but without risk of getting optimized out """
+            if not cndn:
+                raise self.Exception(f'{member} {msg}', expr)
+
+        if (variable, member) == ('console', 'debug'):
+            if Debugger.ENABLED:
+                Debugger.write(self.interpret_expression(f'[{arg_str}]', local_vars, allow_recursion))
+            return
+
+        types = {
+            'String': str,
+            'Math': float,
+            'Array': list,
+        }
+        obj = local_vars.get(variable, types.get(variable, NO_DEFAULT))
+        if obj is NO_DEFAULT:
+            if variable not in self._objects:
+                try:
+                    self._objects[variable] = self.extract_object(variable, local_vars)
+                except self.Exception:
+                    if not nullish:
+                        raise
+            obj = self._objects.get(variable, JS_Undefined)
+
+        if nullish and obj is JS_Undefined:
+            return JS_Undefined
+
+        # Member access
+        if arg_str is None:
+            return self._index(obj, member, nullish)
+
+        # Function call
+        argvals = get_argvals()
+
+        # Fixup prototype call
+        if isinstance(obj, type) and member.startswith('prototype.'):
+            new_member, _, func_prototype = member.partition('.')[2].partition('.')
+            assertion(argvals, 'takes one or more arguments')
+            assertion(isinstance(argvals[0], obj), f'needs binding to type {obj}')
+            if func_prototype == 'call':
+                obj, *argvals = argvals
+            elif func_prototype == 'apply':
+                assertion(len(argvals) == 2, 'takes two arguments')
+                obj, argvals = argvals
+                assertion(isinstance(argvals, list), 'second argument needs to be a list')
+            else:
+                raise self.Exception(f'Unsupported Function method {func_prototype}', expr)
+            member = new_member
+
+        if obj is str:
+            if member == 'fromCharCode':
+                assertion(argvals, 'takes one or more arguments')
+                return ''.join(map(chr, argvals))
+            raise self.Exception(f'Unsupported String method {member}', expr)
+        elif obj is float:
+            if member == 'pow':
+                assertion(len(argvals) == 2, 'takes two arguments')
+                return argvals[0] ** argvals[1]
+            raise self.Exception(f'Unsupported Math method {member}', expr)
+
+        if member == 'split':
+            assertion(argvals, 'takes one or more arguments')
+            assertion(len(argvals) == 1, 'with limit argument is not implemented')
+            return obj.split(argvals[0]) if argvals[0] else list(obj)
+        elif member == 'join':
+            assertion(isinstance(obj, list), 'must be applied on a list')
+            assertion(len(argvals) == 1, 'takes exactly one argument')
+            return argvals[0].join(obj)
+        elif member == 'reverse':
+            assertion(not argvals, 'does not take any arguments')
+            obj.reverse()
+            return obj
+        elif member == 'slice':
+            assertion(isinstance(obj, (list, str)), 'must be applied on a list or string')
+            assertion(len(argvals) <= 2, 'takes between 0 and 2 arguments')
+            return obj[slice(*argvals, None)]
+        elif member == 'splice':
+            assertion(isinstance(obj, list), 'must be applied on a list')
+            assertion(argvals, 'takes one or more arguments')
+            index, how_many = map(int, ([*argvals, len(obj)])[:2])
+            if index < 0:
+                index += len(obj)
+            add_items = argvals[2:]
+            res = []
+            for _ in range(index, min(index + how_many, len(obj))):
+                res.append(obj.pop(index))
+            for i, item in enumerate(add_items):
+                obj.insert(index + i, item)
+            return res
+        elif member == 'unshift':
+            assertion(isinstance(obj, list), 'must be applied on a list')
+            assertion(argvals, 'takes one or more arguments')
+            for item in reversed(argvals):
+                obj.insert(0, item)
+            return obj
+        elif member == 'pop':
+            assertion(isinstance(obj, list), 'must be applied on a list')
+            assertion(not argvals, 'does not take any arguments')
+            if not obj:
+                return
+            return obj.pop()
+        elif member == 'push':
+            assertion(argvals, 'takes one or more arguments')
+            obj.extend(argvals)
+            return obj
+        elif member == 'forEach':
+            assertion(argvals, 'takes one or more arguments')
+            assertion(len(argvals) <= 2, 'takes at-most 2 arguments')
+            f, this = ([*argvals, ''])[:2]
+            return [f((item, idx, obj), {'this': this}, allow_recursion) for idx, item in enumerate(obj)]
+        elif member == 'indexOf':
+            assertion(argvals, 'takes one or more arguments')
+            assertion(len(argvals) <= 2, 'takes at-most 2 arguments')
+            idx, start = ([*argvals, 0])[:2]
+            try:
+                return obj.index(idx, start)
+            except ValueError:
+                return -1
+        elif member == 'charCodeAt':
+            assertion(isinstance(obj, str), 'must be applied on a string')
+            assertion(len(argvals) == 1, 'takes exactly one argument')
+            idx = argvals[0] if isinstance(argvals[0], int) else 0
+            if idx >= len(obj):
+                return None
+            return ord(obj[idx])
+
+        idx = int(member) if isinstance(obj, list) else member
+        return obj[idx](argvals, allow_recursion=allow_recursion)
+
     def interpret_expression(self, expr, local_vars, allow_recursion):
         ret, should_return = self.interpret_statement(expr, local_vars, allow_recursion)
         if should_return:
             raise self.Exception('Cannot return from an expression', expr)
         return ret
 
+    def _should_compile(self, stmt):
+        # Objects named at runtime get a fresh name every time, so such statements are never seen again
+        return (isinstance(stmt, str) and '__yt_dlp_jsinterp_obj' not in stmt
+                and len(self._compiled) < self._MAX_COMPILED_STATEMENTS)
+
+    def _compile_statement(self, stmt, _is_var_declaration=False):
+        """
+        Compile a statement into a closure with the signature and result of interpret_statement
+
+        The closures make exactly the same decisions as the interpreter, but all parsing is done once up front.
+        Statements whose parsing depends on runtime values are left to the interpreter
+        """
+        key = (stmt, _is_var_declaration)
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            return compiled
+        try:
+            compiled = self._compile(stmt, _is_var_declaration)
+        except Exception:
+            # Let the interpreter raise the error when (and if) the statement is executed
+            compiled = None
+        if compiled is None:
+            def compiled(local_vars, allow_recursion):
+                return self._interpret_statement(stmt, local_vars, allow_recursion, _is_var_declaration)
+        self._compiled[key] = compiled
+        return compiled
+
+    def _compile_expression(self, expr):
+        compiled = self._compile_statement(expr)
+
+        def expression(local_vars, allow_recursion):
+            ret, should_return = compiled(local_vars, allow_recursion)
+            if should_return:
+                raise self.Exception('Cannot return from an expression', expr)
+            return ret
+        return expression
+
+    def _compile_operator(self, op, right_expr, expr):
+        if op == '?':
+            branches = [*self._separate(right_expr, ':', 1)]
+            right = [*map(self._compile_expression, [*branches, *(True, False)[len(branches):]])]
+        else:
+            right = self._compile_expression(right_expr)
+        func = _OPERATORS.get(op)
+
+        def apply_operator(left_val, local_vars, allow_recursion):
+            if op in ('||', '&&'):
+                if (op == '&&') ^ _js_ternary(left_val):
+                    return left_val  # short circuiting
+            elif op == '??':
+                if left_val not in (None, JS_Undefined):
+                    return left_val
+            elif op == '?':
+                return _js_ternary(left_val, *right)(local_vars, allow_recursion)
+
+            right_val = right(local_vars, allow_recursion)
+            if not func:
+                return right_val
+            try:
+                return func(left_val, right_val)
+            except Exception as e:
+                raise self.Exception(f'Failed to evaluate {left_val!r} {op} {right_val!r}', expr, cause=e)
+        return apply_operator
+
+    def _compile(self, stmt, _is_var_declaration):
+        sub_statements = list(self._separate(stmt, ';')) or ['']
+        expr = stmt = sub_statements.pop().strip()
+        sub_statements = [self._compile_statement(sub_stmt) for sub_stmt in sub_statements]
+
+        should_return = False
+        m = re.match(_STATEMENT_RE, stmt)
+        if m:
+            expr = stmt[len(m.group(0)):].strip()
+            should_return = not m.group('var')
+            _is_var_declaration = _is_var_declaration or bool(m.group('var'))
+        if m and m.group('throw'):
+            thrown = self._compile_expression(expr)
+
+            def body(local_vars, allow_recursion):
+                raise JS_Throw(thrown(local_vars, allow_recursion))
+        elif not expr:
+            def body(local_vars, allow_recursion):
+                return None, should_return
+        else:
+            body = self._compile_expr(expr, stmt, should_return, _is_var_declaration)
+            if body is None:
+                return None
+
+        def statement(local_vars, allow_recursion):
+            if allow_recursion < 0:
+                raise self.Exception('Recursion limit reached')
+            allow_recursion -= 1
+            for sub_stmt in sub_statements:
+                ret, should_abort = sub_stmt(local_vars, allow_recursion)
+                if should_abort:
+                    return ret, should_abort
+            return body(local_vars, allow_recursion)
+        return statement
+
+    def _compile_expr(self, expr, stmt, should_return, _is_var_declaration):
+        """Mirrors _interpret_statement after the statement prefix; returns None to fall back to it"""
+        if expr[0] in _QUOTES:
+            inner, outer = self._separate(expr, expr[0], 1)
+            if expr[0] == '/':
+                flags, outer = self._regex_flags(outer)
+            else:
+                inner = js_to_json(f'{inner}{expr[0]}', strict=True)
+                json.loads(inner)
+            if outer:
+                return None
+
+            # NB: Values are recreated on each evaluation since `===` compares identity
+            def literal(local_vars, allow_recursion):
+                return (f'{inner}/{flags}' if expr[0] == '/' else json.loads(inner)), should_return
+            return literal
+
+        if expr.startswith('new '):
+            return None
+
+        if expr.startswith('void '):
+            void = self._compile_expression(expr[5:])
+
+            def void_expr(local_vars, allow_recursion):
+                void(local_vars, allow_recursion)
+                return None, should_return
+            return void_expr
+
+        if expr.startswith('{'):
+            inner, outer = self._separate_at_paren(expr)
+            # try for object expression (Map)
+            sub_expressions = [list(self._separate(sub_expr.strip(), ':', 1)) for sub_expr in self._separate(inner)]
+            if all(len(sub_expr) == 2 for sub_expr in sub_expressions):
+                items = [(
+                    key, None if re.match(_NAME_RE, key) else self._compile_expression(key),
+                    self._compile_expression(val)) for key, val in sub_expressions]
+
+                def object_expr(local_vars, allow_recursion):
+                    obj = {}
+                    for key, key_expr, val_expr in items:
+                        val = val_expr(local_vars, allow_recursion)
+                        obj[key if key_expr is None else key_expr(local_vars, allow_recursion)] = val
+                    return obj, should_return
+                return object_expr
+
+        if expr[0] in '{(':
+            inner, outer = self._separate_at_paren(expr)
+            block = self._compile_statement(inner)
+            if outer:
+                return None
+
+            def block_expr(local_vars, allow_recursion):
+                ret, should_abort = block(local_vars, allow_recursion)
+                return ret, should_abort or should_return
+            return block_expr
+
+        if expr.startswith('['):
+            inner, outer = self._separate_at_paren(expr)
+            items = [self._compile_expression(item) for item in self._separate(inner)]
+            if outer:
+                return None
+
+            def array_expr(local_vars, allow_recursion):
+                ret = [item(local_vars, allow_recursion) for item in items]
+                name = self._named_object(local_vars, ret)
+                if _is_var_declaration:
+                    local_vars.set_local(name, local_vars.get_local(name))
+                return ret, should_return
+            return array_expr
+
+        m = re.match(_CONTROL_RE, expr)
+        if m:
+            control, expr = self._compile_control(m, expr)
+            rest = self._compile_statement(expr)
+
+            def control_expr(local_vars, allow_recursion):
+                aborted, ret = control(local_vars, allow_recursion)
+                if aborted:
+                    return ret
+                ret, should_abort = rest(local_vars, allow_recursion)
+                return ret, should_abort or should_return
+            return control_expr
+
+        # Comma separated statements
+        sub_expressions = list(self._separate(expr))
+        if len(sub_expressions) > 1:
+            sub_expressions = [
+                self._compile_statement(sub_expr, _is_var_declaration) for sub_expr in sub_expressions]
+
+            def comma_expr(local_vars, allow_recursion):
+                for sub_expr in sub_expressions:
+                    ret, should_abort = sub_expr(local_vars, allow_recursion)
+                    if should_abort:
+                        return ret, True
+                return ret, False
+            return comma_expr
+
+        m = re.match(_ASSIGNMENT_RE, expr)
+        if m:  # We are assigning a value to a variable
+            out = m.group('out')
+            assign_op = self._compile_operator(m.group('op'), m.group('expr'), expr)
+
+            if not m.group('index'):
+                def assignment(local_vars, allow_recursion):
+                    eval_result = assign_op(local_vars.get(out), local_vars, allow_recursion)
+                    if _is_var_declaration:
+                        local_vars.set_local(out, eval_result)
+                    else:
+                        local_vars[out] = eval_result
+                    return local_vars[out], should_return
+                return assignment
+
+            index = self._compile_expression(m.group('index'))
+
+            def indexed_assignment(local_vars, allow_recursion):
+                left_val = local_vars.get(out)
+                if left_val in (None, JS_Undefined):
+                    raise self.Exception(f'Cannot index undefined variable {out}', expr)
+                idx = index(local_vars, allow_recursion)
+                if not isinstance(idx, (int, float)):
+                    raise self.Exception(f'List index {idx} must be integer', expr)
+                idx = int(idx)
+                left_val[idx] = assign_op(self._index(left_val, idx), local_vars, allow_recursion)
+                return left_val[idx], should_return
+            return indexed_assignment
+
+        increments = [
+            (m.group('var1') or m.group('var2'), *m.span(), m.group('pre_sign'), m.group('pre_sign') or m.group('post_sign'))
+            for m in re.finditer(_INCREMENT_RE, expr)]
+        if not increments:
+            return self._compile_value(expr, stmt, should_return, _is_var_declaration)
+
+        def increment_expr(local_vars, allow_recursion):
+            # The results are substituted into the expression, so the rest of it can only be compiled now
+            new_expr = expr
+            for var, start, end, pre_sign, sign in increments:
+                ret = local_vars[var]
+                local_vars[var] += 1 if sign[0] == '+' else -1
+                if pre_sign:
+                    ret = local_vars[var]
+                new_expr = new_expr[:start] + self._dump(ret, local_vars) + new_expr[end:]
+            key = (new_expr, stmt, should_return, _is_var_declaration)
+            compiled = self._compiled.get(key)
+            if compiled is None:
+                compiled = self._compile_value(new_expr, stmt, should_return, _is_var_declaration)
+                if self._should_compile(new_expr):
+                    self._compiled[key] = compiled
+            return compiled(local_vars, allow_recursion)
+        return increment_expr
+
+    def _compile_value(self, expr, stmt, should_return, _is_var_declaration):
+        m = re.match(_EXPRESSION_RE, expr)
+        if expr.isdigit():
+            return lambda local_vars, allow_recursion: (int(expr), should_return)
+
+        elif expr in ('break', 'continue'):
+            exception = JS_Break if expr == 'break' else JS_Continue
+
+            def jump(local_vars, allow_recursion):
+                raise exception
+            return jump
+        elif expr == 'undefined':
+            return lambda local_vars, allow_recursion: (JS_Undefined, should_return)
+        elif expr == 'NaN':
+            return lambda local_vars, allow_recursion: (float('NaN'), should_return)
+
+        elif m and m.group('return'):
+            var = m.group('name')
+
+            def name_expr(local_vars, allow_recursion):
+                # Declared variables
+                if _is_var_declaration:
+                    ret = local_vars.get_local(var)
+                    local_vars.set_local(var, ret)
+                else:
+                    ret = local_vars.get(var, NO_DEFAULT)
+                    if ret is NO_DEFAULT:
+                        ret = JS_Undefined
+                        self._undefined_varnames.add(var)
+                return ret, should_return
+            return name_expr
+
+        with contextlib.suppress(ValueError):
+            json_expr = js_to_json(expr, strict=True)
+            json.loads(json_expr)
+            return lambda local_vars, allow_recursion: (json.loads(json_expr), should_return)
+
+        if m and m.group('indexing'):
+            name, idx = m.group('in'), self._compile_expression(m.group('idx'))
+
+            def indexing(local_vars, allow_recursion):
+                val = local_vars[name]
+                return self._index(val, idx(local_vars, allow_recursion)), should_return
+            return indexing
+
+        for op in _OPERATORS:
+            separated = list(self._separate(expr, op))
+            right_expr = separated.pop()
+            while True:
+                if op in '?<>*-' and len(separated) > 1 and not separated[-1].strip():
+                    separated.pop()
+                elif not (separated and op == '?' and right_expr.startswith('.')):
+                    break
+                right_expr = f'{op}{right_expr}'
+                if op != '-':
+                    right_expr = f'{separated.pop()}{op}{right_expr}'
+            if not separated:
+                continue
+            left, apply_op = self._compile_expression(op.join(separated)), self._compile_operator(op, right_expr, expr)
+
+            def operation(local_vars, allow_recursion):
+                left_val = left(local_vars, allow_recursion)
+                return apply_op(left_val, local_vars, allow_recursion), should_return
+            return operation
+
+        if m and m.group('attribute'):
+            variable, member, nullish = m.group('var', 'member', 'nullish')
+            member_expr = None if member else self._compile_expression(m.group('member2'))
+            arg_str = expr[m.end():]
+            if arg_str.startswith('('):
+                arg_str, remaining = self._separate_at_paren(arg_str)
+                args = [self._compile_expression(v) for v in self._separate(arg_str)]
+            else:
+                arg_str, remaining, args = None, arg_str, None
+
+            def attribute(local_vars, allow_recursion):
+                ret = self._eval_method(
+                    variable, member if member_expr is None else member_expr(local_vars, allow_recursion),
+                    nullish, arg_str, lambda: [arg(local_vars, allow_recursion) for arg in args],
+                    expr, local_vars, allow_recursion)
+                if remaining:
+                    ret, should_abort = self.interpret_statement(
+                        self._named_object(local_vars, ret) + remaining, local_vars, allow_recursion)
+                    return ret, should_return or should_abort
+                return ret, should_return
+            return attribute
+
+        elif m and m.group('function'):
+            fname = m.group('fname')
+            args = [self._compile_expression(v) for v in self._separate(m.group('args'))]
+
+            def function(local_vars, allow_recursion):
+                argvals = [arg(local_vars, allow_recursion) for arg in args]
+                if fname in local_vars:
+                    return local_vars[fname](argvals, allow_recursion=allow_recursion), should_return
+                elif fname not in self._functions:
+                    self._functions[fname] = self.extract_function(fname)
+                return self._functions[fname](argvals, allow_recursion=allow_recursion), should_return
+            return function
+
+        def unsupported(local_vars, allow_recursion):
+            raise self.Exception(
+                f'Unsupported JS expression {truncate_string(expr, 20, 20) if expr != stmt else ""}', stmt)
+        return unsupported
+
+    def _compile_control(self, m, expr):
+        """Compile an if/try/for/switch statement; returns the statement and the code following it"""
+        md = m.groupdict()
+        if md['if']:
+            cndn, expr = self._separate_at_paren(expr[m.end() - 1:])
+            if_expr, expr = self._separate_at_paren(expr.lstrip())
+            # TODO: "else if" is not handled
+            else_expr = None
+            m = re.match(r'else\s*{', expr)
+            if m:
+                else_expr, expr = self._separate_at_paren(expr[m.end() - 1:])
+            cndn = self._compile_expression(cndn)
+            if_stmt, else_stmt = self._compile_statement(if_expr), self._compile_statement(else_expr)
+
+            def if_statement(local_vars, allow_recursion):
+                ret, should_abort = (if_stmt if _js_ternary(cndn(local_vars, allow_recursion)) else else_stmt)(
+                    local_vars, allow_recursion)
+                return should_abort, (ret, True)
+            return if_statement, expr
+
+        elif md['try']:
+            try_expr, expr = self._separate_at_paren(expr[m.end() - 1:])
+            try_stmt = self._compile_statement(try_expr)
+            catch_stmt = finally_stmt = None
+            m = re.match(fr'catch\s*(?P<err>\(\s*{_NAME_RE}\s*\))?\{{', expr)
+            if m:
+                sub_expr, expr = self._separate_at_paren(expr[m.end() - 1:])
+                catch_stmt, err_name = self._compile_statement(sub_expr), m.group('err')
+            m = re.match(r'finally\s*\{', expr)
+            if m:
+                sub_expr, expr = self._separate_at_paren(expr[m.end() - 1:])
+                finally_stmt = self._compile_statement(sub_expr)
+
+            def try_statement(local_vars, allow_recursion):
+                err = None
+                try:
+                    ret, should_abort = try_stmt(local_vars, allow_recursion)
+                    if should_abort:
+                        return True, (ret, True)
+                except Exception as e:
+                    err = e
+
+                pending = (None, False)
+                if catch_stmt and err:
+                    catch_vars = {}
+                    if err_name:
+                        catch_vars[err_name] = err.error if isinstance(err, JS_Throw) else err
+                    catch_vars = local_vars.new_child(catch_vars)
+                    err, pending = None, catch_stmt(catch_vars, allow_recursion)
+
+                if finally_stmt:
+                    ret, should_abort = finally_stmt(local_vars, allow_recursion)
+                    if should_abort:
+                        return True, (ret, True)
+
+                ret, should_abort = pending
+                if should_abort:
+                    return True, (ret, True)
+
+                if err:
+                    raise err
+                return False, None
+            return try_statement, expr
+
+        elif md['for']:
+            constructor, remaining = self._separate_at_paren(expr[m.end() - 1:])
+            if remaining.startswith('{'):
+                body, expr = self._separate_at_paren(remaining)
+            else:
+                switch_m = re.match(r'switch\s*\(', remaining)  # FIXME: ?
+                if switch_m:
+                    switch_val, remaining = self._separate_at_paren(remaining[switch_m.end() - 1:])
+                    body, expr = self._separate_at_paren(remaining, '}')
+                    body = 'switch(%s){%s}' % (switch_val, body)
+                else:
+                    body, expr = remaining, ''
+            start, cndn, increment = map(self._compile_expression, self._separate(constructor, ';'))
+            body = self._compile_statement(body)
+
+            def for_statement(local_vars, allow_recursion):
+                start(local_vars, allow_recursion)
+                while True:
+                    if not _js_ternary(cndn(local_vars, allow_recursion)):
+                        break
+                    try:
+                        ret, should_abort = body(local_vars, allow_recursion)
+                        if should_abort:
+                            return True, (ret, True)
+                    except JS_Break:
+                        break
+                    except JS_Continue:
+                        pass
+                    increment(local_vars, allow_recursion)
+                return False, None
+            return for_statement, expr
+
+        switch_val, remaining = self._separate_at_paren(expr[m.end() - 1:])
+        switch_val = self._compile_expression(switch_val)
+        body, expr = self._separate_at_paren(remaining, '}')
+        items = []
+        for item in body.replace('default:', 'case default:').split('case ')[1:]:
+            case, stmt = (i.strip() for i in self._separate(item, ':', 1))
+            items.append((case, None if case == 'default' else self._compile_expression(case),
+                          self._compile_statement(stmt)))
+
+        def switch_statement(local_vars, allow_recursion):
+            val = switch_val(local_vars, allow_recursion)
+            for default in (False, True):
+                matched = False
+                for case, case_expr, stmt in items:
+                    if default:
+                        matched = matched or case == 'default'
+                    elif not matched:
+                        matched = case != 'default' and val == case_expr(local_vars, allow_recursion)
+                    if not matched:
+                        continue
+                    try:
+                        ret, should_abort = stmt(local_vars, allow_recursion)
+                        if should_abort:
+                            # NB: The interpreter returns a bare value here
+                            return True, ret
+                    except JS_Break:
+                        break
+                if matched:
+                    break
+            return False, None
+        return switch_statement, expr
+
     def extract_object(self, objname, *global_stack):
         _FUNC_NAME_RE = r'''(?:[a-zA-Z$0-9]+|"[a-zA-Z$0-9]+"|'[a-zA-Z$0-9]+')'''
         obj = {}
@@ -948,12 +1454,15 @@ def call_function(self, funcname, *args):
     def build_function(self, argnames, code, *global_stack):
         global_stack = list(global_stack) or [{}]
         argnames = tuple(argnames)
+        code = code.replace('\n', ' ')
+        if self._compiled is not None:
+            self._compile_statement(code)
 
         def resf(args, kwargs={}, allow_recursion=100):
             global_stack[0].update(itertools.zip_longest(argnames, args, fillvalue=None))
             global_stack[0].update(kwargs)
             var_stack = LocalNameSpace(*global_stack)
-            ret, should_abort = self.interpret_statement(code.replace('\n', ' '), var_stack, allow_recursion - 1)
+            ret, should_abort = self.interpret_statement(code, var_stack, allow_recursion - 1)
             if should_abort:
                 return ret
         return resf
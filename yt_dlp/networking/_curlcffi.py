@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import contextlib
 import io
 import itertools
 import math
@@ -77,6 +78,33 @@ def read(self, size=None):
             if exception_raised:
                 self.close()
 
+    def readinto(self, b):
+        # Copy the chunks straight into b instead of joining them first
+        exception_raised = True
+        try:
+            view = memoryview(b).cast('B')
+            filled = 0
+            while filled < len(view):
+                if not self._buffer:
+                    chunk = self._iterator and next(self._iterator, None)
+                    if chunk is None:
+                        self._iterator = None
+                        break
+                    self._buffer = chunk
+                    self.bytes_read += len(chunk)
+                size = min(len(self._buffer), len(view) - filled)
+                view[filled:filled + size] = self._buffer[:size]
+                self._buffer = self._buffer[size:]
+                filled += size
+
+            if not self._iterator and not self._buffer:
+                self.close()
+            exception_raised = False
+            return filled
+        finally:
+            if exception_raised:
+                self.close()
+
     def close(self):
         if not self.closed:
             self._response.close()
@@ -95,8 +123,17 @@ def __init__(self, response: curl_cffi.requests.Response):
             status=response.status_code)
 
     def read(self, amt=None):
-        try:
+        with self._handle_read_errors():
             return self.fp.read(amt)
+
+    def readinto(self, b):
+        with self._handle_read_errors():
+            return self.fp.readinto(b)
+
+    @contextlib.contextmanager
+    def _handle_read_errors(self):
+        try:
+            yield
         except curl_cffi.requests.errors.RequestsError as e:
             if e.code == CurlECode.PARTIAL_FILE:
                 content_length = e.response and int_or_none(e.response.headers.get('Content-Length'))
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import collections
 import contextlib
 import functools
 import http.client
@@ -291,12 +292,28 @@ def __init__(self, *args, **kwargs):
             logger.setLevel(logging.DEBUG)
         # this is expected if we are using --no-check-certificate
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        self._pool_stats = collections.Counter()
 
     def close(self):
         self._clear_instances()
         # Remove the logging handler that contains a reference to our logger
         # See: https://github.com/yt-dlp/yt-dlp/issues/8922
         logging.getLogger('urllib3').removeHandler(self.__logging_handler)
+        if self._pool_stats['connections']:
+            self._logger.debug(
+                f'{self.RH_NAME}: {self._pool_stats["requests"]} requests over '
+                f'{self._pool_stats["connections"]} connections')
+
+    def _close_instance(self, session):
+        for adapter in set(session.adapters.values()):
+            for manager in (adapter.poolmanager, *adapter.proxy_manager.values()):
+                # The container of the pools can not be iterated over, so each of its keys is looked up
+                # and the pools that were evicted in the meantime are skipped
+                pools = manager.pools
+                for pool in filter(None, map(pools.get, pools.keys())):
+                    self._pool_stats['requests'] += pool.num_requests
+                    self._pool_stats['connections'] += pool.num_connections
+        session.close()
 
     def _check_extensions(self, extensions):
         super()._check_extensions(extensions)
@@ -311,6 +328,7 @@ def _create_instance(self, cookiejar, legacy_ssl_support=None):
             ssl_context=self._make_sslcontext(legacy_ssl_support=legacy_ssl_support),
             source_address=self.source_address,
             max_retries=urllib3.util.retry.Retry(False),
+            pool_maxsize=self.pool_size,
         )
         session.adapters.clear()
         session.headers = requests.models.CaseInsensitiveDict()
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import collections
 import functools
 import http.client
 import io
+import select
 import ssl
+import threading
 import urllib.error
 import urllib.parse
 import urllib.request
@@ -44,6 +47,8 @@
 
 SUPPORTED_ENCODINGS = ['gzip', 'deflate']
 CONTENT_DECODE_ERRORS = [zlib.error, OSError]
+# https://datatracker.ietf.org/doc/html/rfc9110#section-9.2.2
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE', 'PUT', 'DELETE')
 
 if brotli:
     SUPPORTED_ENCODINGS.append('br')
@@ -62,6 +67,110 @@ def _create_http_connection(http_class, source_address, *args, **kwargs):
     return hc
 
 
+def _is_connection_dropped(sock):
+    # An idle keep-alive connection has nothing to read, unless the server has closed it
+    if sock is None:
+        return True
+    try:
+        if hasattr(select, 'poll'):
+            poller = select.poll()
+            poller.register(sock, select.POLLIN)
+            return bool(poller.poll(0))
+        return bool(select.select([sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+
+class _HTTPSConnection(http.client.HTTPSConnection):
+    """HTTPSConnection that resumes `tls_session` when connecting"""
+    tls_session = None
+
+    def connect(self):
+        http.client.HTTPConnection.connect(self)
+        self.sock = self._context.wrap_socket(
+            self.sock, server_hostname=self._tunnel_host or self.host, session=self.tls_session)
+
+
+class _PooledHTTPResponse(http.client.HTTPResponse):
+    """HTTPResponse that hands its connection back to the pool once the body has been read"""
+    _release = None
+    _chunked_complete = False
+
+    def _read_and_discard_trailer(self):
+        super()._read_and_discard_trailer()
+        self._chunked_complete = True
+
+    def _close_conn(self):
+        super()._close_conn()
+        release, self._release = self._release, None
+        if release:
+            # A response that was closed early leaves the rest of its body on the connection
+            release(reusable=self.length == 0 or self._chunked_complete)
+
+
+class _ConnectionPool:
+    """Idle keep-alive connections and TLS sessions shared by all threads using a handler
+
+    Connections are keyed by the host they connect to; a connection is taken by the thread
+    sending a request and handed back once its response has been read. At most `maxsize`
+    idle connections are kept per host.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.stats = collections.Counter()
+        self._lock = threading.Lock()
+        self._idle = collections.defaultdict(collections.deque)
+        self._tls_sessions = {}
+        self._closed = False
+
+    def count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get(self, key):
+        """Return an idle connection to key, or None if there is none"""
+        with self._lock:
+            idle = self._idle.get(key)
+            while idle:
+                conn = idle.pop()
+                if not _is_connection_dropped(conn.sock):
+                    self.stats['reused'] += 1
+                    return conn
+                conn.close()
+                self.stats['dropped'] += 1
+        return None
+
+    def new(self, key, http_class, *args, **kwargs):
+        """Create a connection to key, resuming the last TLS session with it"""
+        conn = http_class(*args, **kwargs)
+        with self._lock:
+            self.stats['connections'] += 1
+            if isinstance(conn, _HTTPSConnection):
+                conn.tls_session = self._tls_sessions.get(key)
+        return conn
+
+    def put(self, key, conn, reusable=True):
+        """Hand back a connection once its response is complete"""
+        with self._lock:
+            if isinstance(conn.sock, ssl.SSLSocket) and conn.sock.session:
+                self._tls_sessions[key] = conn.sock.session
+            idle = self._idle[key]
+            if reusable and conn.sock and not self._closed and len(idle) < self.maxsize:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle = [conn for conns in self._idle.values() for conn in conns]
+            self._idle.clear()
+            self._tls_sessions.clear()
+        for conn in idle:
+            conn.close()
+
+
 class HTTPHandler(urllib.request.AbstractHTTPHandler):
     """Handler for HTTP requests and responses.
 
@@ -77,10 +186,11 @@ class HTTPHandler(urllib.request.AbstractHTTPHandler):
     public domain.
     """
 
-    def __init__(self, context=None, source_address=None, *args, **kwargs):
+    def __init__(self, context=None, source_address=None, pool=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._source_address = source_address
         self._context = context
+        self._pool = pool
 
     @staticmethod
     def _make_conn_class(base, req):
@@ -90,17 +200,77 @@ def _make_conn_class(base, req):
             conn_class = make_socks_conn_class(conn_class, socks_proxy)
         return conn_class
 
+    def _pool_key(self, req):
+        # Connections tunnelled through a proxy are not reused
+        if self._pool is None or req._tunnel_host:
+            return None
+        return req.type, req.host, req.headers.get('Ytdl-socks-proxy'), self._context
+
     def http_open(self, req):
+        pool_key = self._pool_key(req)
         conn_class = self._make_conn_class(http.client.HTTPConnection, req)
         return self.do_open(functools.partial(
-            _create_http_connection, conn_class, self._source_address), req)
+            _create_http_connection, conn_class, self._source_address), req, pool_key=pool_key)
 
     def https_open(self, req):
-        conn_class = self._make_conn_class(http.client.HTTPSConnection, req)
+        pool_key = self._pool_key(req)
+        conn_class = self._make_conn_class(_HTTPSConnection, req)
         return self.do_open(
             functools.partial(
                 _create_http_connection, conn_class, self._source_address),
-            req, context=self._context)
+            req, pool_key=pool_key, context=self._context)
+
+    def do_open(self, http_class, req, pool_key=None, **http_conn_args):
+        if pool_key is None:
+            return super().do_open(http_class, req, **http_conn_args)
+
+        # Same as urllib's do_open, but without "Connection: close"
+        # so that the connection can be handed back to the pool
+        if not req.host:
+            raise urllib.error.URLError('no host given')
+        headers = dict(req.unredirected_hdrs)
+        headers.update({k: v for k, v in req.headers.items() if k not in headers})
+        headers = {name.title(): val for name, val in headers.items()}
+
+        self._pool.count('requests')
+        conn = self._pool.get(pool_key)
+        while True:
+            reused = conn is not None
+            if reused:
+                conn.timeout = req.timeout
+                conn.sock.settimeout(req.timeout)
+            else:
+                conn = self._pool.new(pool_key, http_class, req.host, timeout=req.timeout, **http_conn_args)
+            conn.set_debuglevel(self._debuglevel)
+            conn.response_class = _PooledHTTPResponse
+            try:
+                try:
+                    conn.request(req.get_method(), req.selector, req.data, headers,
+                                 encode_chunked=req.has_header('Transfer-encoding'))
+                except OSError as err:
+                    raise urllib.error.URLError(err)
+                if not reused and getattr(conn.sock, 'session_reused', False):
+                    self._pool.count('resumed')
+                r = conn.getresponse()
+            except Exception as e:
+                conn.close()
+                # The server may close an idle connection just as it is reused.
+                # Like browsers, resend the request on a new connection if it got no response at all.
+                # The server may still have processed it, so only idempotent requests are resent
+                if reused and isinstance(getattr(e, 'reason', e), ConnectionError) and (
+                        req.get_method() in IDEMPOTENT_METHODS
+                        and (req.data is None or isinstance(req.data, bytes))):
+                    self._pool.count('dropped')
+                    conn = None
+                    continue
+                raise
+            break
+
+        if not r.will_close:
+            r._release = functools.partial(self._pool.put, pool_key, conn)
+        r.url = req.get_full_url()
+        r.msg = r.reason
+        return r
 
     @staticmethod
     def deflate(data):
@@ -311,6 +481,16 @@ def read(self, amt=None):
             handle_response_read_exceptions(e)
             raise e
 
+    def readinto(self, b):
+        # http.client.HTTPResponse reads straight from the socket into b
+        if not hasattr(self.fp, 'readinto'):
+            return super().readinto(b)
+        try:
+            return self.fp.readinto(b)
+        except Exception as e:
+            handle_response_read_exceptions(e)
+            raise e
+
 
 def handle_sslerror(e: ssl.SSLError):
     if not isinstance(e, ssl.SSLError):
@@ -342,6 +522,17 @@ def __init__(self, *, enable_file_urls: bool = False, **kwargs):
         self.enable_file_urls = enable_file_urls
         if self.enable_file_urls:
             self._SUPPORTED_URL_SCHEMES = (*self._SUPPORTED_URL_SCHEMES, 'file')
+        self._pool = _ConnectionPool(self.pool_size)
+
+    def close(self):
+        self._clear_instances()
+        self._pool.close()
+        stats = self._pool.stats
+        if stats['connections']:
+            self._logger.debug(
+                f'{self.RH_NAME}: {stats["requests"]} requests over {stats["connections"]} '
+                f'connections ({stats["reused"]} reused, {stats["resumed"]} TLS sessions resumed, '
+                f'{stats["dropped"]} dropped by the server)')
 
     def _check_extensions(self, extensions):
         super()._check_extensions(extensions)
@@ -356,7 +547,8 @@ def _create_instance(self, proxies, cookiejar, legacy_ssl_support=None):
             HTTPHandler(
                 debuglevel=int(bool(self.verbose)),
                 context=self._make_sslcontext(legacy_ssl_support=legacy_ssl_support),
-                source_address=self.source_address),
+                source_address=self.source_address,
+                pool=self._pool),
             HTTPCookieProcessor(cookiejar),
             DataHandler(),
             UnknownHandler(),
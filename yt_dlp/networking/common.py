@@ -32,6 +32,7 @@
 from ..utils.networking import HTTPHeaderDict, normalize_url
 
 DEFAULT_TIMEOUT = 20
+DEFAULT_POOL_SIZE = 10
 
 
 def register_preference(*handlers: type[RequestHandler]):
@@ -191,6 +192,8 @@ class RequestHandler(abc.ABC):
             dict with {client_certificate, client_certificate_key, client_certificate_password}
     @param verify: Verify SSL certificates
     @param legacy_ssl_support: Enable legacy SSL options such as legacy server connect and older cipher support.
+    @param pool_size: Maximum number of idle connections to keep alive per host,
+            for handlers that reuse connections. Defaults to DEFAULT_POOL_SIZE.
 
     Some configuration options may be available for individual Requests too. In this case,
     either the Request configuration option takes precedence or they are merged.
@@ -233,6 +236,7 @@ def __init__(
         client_cert: dict[str, str | None] | None = None,
         verify: bool = True,
         legacy_ssl_support: bool = False,
+        pool_size: int | None = None,
         **_,
     ):
 
@@ -247,6 +251,7 @@ def __init__(
         self._client_cert = client_cert or {}
         self.verify = verify
         self.legacy_ssl_support = legacy_ssl_support
+        self.pool_size = pool_size or DEFAULT_POOL_SIZE
         super().__init__()
 
     def _make_sslcontext(self, legacy_ssl_support=None):
@@ -558,6 +563,15 @@ def read(self, amt: int | None = None) -> bytes:
         except Exception as e:
             raise TransportError(cause=e) from e
 
+    def readinto(self, b) -> int:
+        """
+        Read up to len(b) bytes into the writable buffer b and return the number of bytes read.
+        Subclasses may redefine this method to read without creating intermediate bytes objects.
+        """
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
     def close(self):
         self.fp.close()
         return super().close()
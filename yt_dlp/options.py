@@ -745,6 +745,16 @@ def _preset_alias_callback(option, opt_str, value, parser):
         '--download-archive', metavar='FILE',
         dest='download_archive',
         help='Download only videos not listed in the archive file. Record the IDs of all downloaded videos in it')
+    selection.add_option(
+        '--download-archive-backend',
+        metavar='BACKEND', dest='download_archive_backend', default='text',
+        choices=('text', 'index', 'sqlite'),
+        help=(
+            'How to look up IDs in the --download-archive file. One of "text" (default; the whole file is loaded into memory), '
+            '"index" (a sorted index of hashed IDs is kept in FILE.idx and memory-mapped; '
+            'new IDs are appended to the archive in batches) or '
+            '"sqlite" (IDs are kept in the SQLite database FILE.sqlite3, which can be shared by many concurrent processes; '
+            'each video is claimed before downloading so that no two processes download it at the same time)'))
     selection.add_option(
         '--no-download-archive',
         dest='download_archive', action='store_const', const=None,
@@ -927,6 +937,17 @@ def _preset_alias_callback(option, opt_str, value, parser):
             'Containers that may be used when merging formats, separated by "/", e.g. "mp4/mkv". '
             'Ignored if no merge is required. '
             f'(currently supported: {", ".join(sorted(FFmpegMergerPP.SUPPORTED_EXTS))})'))
+    video_format.add_option(
+        '--native-merge',
+        action='store_true', dest='native_merge', default=None,
+        help=(
+            'Merge MP4 video with M4A audio and WebM video with WebM audio without ffmpeg when possible, '
+            'even if ffmpeg is installed. By default, these formats are only merged natively, '
+            'and preferred over a single file, when ffmpeg is not installed'))
+    video_format.add_option(
+        '--no-native-merge',
+        action='store_false', dest='native_merge',
+        help='Never merge formats without ffmpeg')
     video_format.add_option(
         '--allow-unplayable-formats',
         action='store_true', dest='allow_unplayable_formats', default=False,
@@ -980,6 +1001,12 @@ def _preset_alias_callback(option, opt_str, value, parser):
         '-N', '--concurrent-fragments',
         dest='concurrent_fragment_downloads', metavar='N', default=1, type=int,
         help='Number of fragments of a dash/hlsnative video that should be downloaded concurrently (default is %default)')
+    downloader.add_option(
+        '--concurrent-entries',
+        dest='concurrent_entries', metavar='N', default=1, type=int,
+        help=(
+            'Number of playlist entries that should be extracted and downloaded concurrently (default is %default). '
+            'Entries are still reported in playlist order'))
     downloader.add_option(
         '-r', '--limit-rate', '--rate-limit',
         dest='ratelimit', metavar='RATE',
@@ -1047,6 +1074,13 @@ def _preset_alias_callback(option, opt_str, value, parser):
         help=(
             'Size of a chunk for chunk-based HTTP downloading, e.g. 10485760 or 10M (default is disabled). '
             'May be useful for bypassing bandwidth throttling imposed by a webserver (experimental)'))
+    downloader.add_option(
+        '--http-connections',
+        dest='http_connections', metavar='N', default=1, type=int,
+        help=(
+            'Number of parallel connections to download a single file over HTTP with (default is %default). '
+            'Each connection downloads a separate range of the file. '
+            'May be useful for bypassing per-connection throttling imposed by a webserver'))
     downloader.add_option(
         '--test',
         action='store_true', dest='test', default=False,
@@ -1766,6 +1800,23 @@ def _preset_alias_callback(option, opt_str, value, parser):
         '--ffmpeg-location', '--avconv-location', metavar='PATH',
         dest='ffmpeg_location',
         help='Location of the ffmpeg binary; either the path to the binary or its containing directory')
+    postproc.add_option(
+        '--fuse-postprocessors',
+        action='store_true', dest='fuse_postprocessors', default=True,
+        help=(
+            'Run consecutive ffmpeg postprocessors that do not re-encode (remux, embedding subtitles, '
+            'metadata and thumbnails) as a single ffmpeg invocation (default)'))
+    postproc.add_option(
+        '--no-fuse-postprocessors',
+        action='store_false', dest='fuse_postprocessors',
+        help='Run each ffmpeg postprocessor separately')
+    postproc.add_option(
+        '--background-postprocessing',
+        dest='background_postprocessing', metavar='N', default=0, type=int,
+        help=(
+            'Post-process up to N videos in the background while the next ones are downloaded '
+            '(default is %default: post-process each video before downloading the next). '
+            'Files are still moved, --exec is run and the download archive is written in download order'))
     postproc.add_option(
         '--exec',
         metavar='[WHEN:]CMD', dest='exec_cmd', **when_prefix('after_move'),
@@ -1813,6 +1864,21 @@ def _preset_alias_callback(option, opt_str, value, parser):
         '--no-split-chapters', '--no-split-tracks',
         dest='split_chapters', action='store_false',
         help='Do not split video based on chapters (default)')
+    postproc.add_option(
+        '--split-chapters-single-pass',
+        dest='split_chapters_single_pass', action='store_true', default=False,
+        help=(
+            'Write all the chapter files of --split-chapters with a single ffmpeg invocation. '
+            'The input is only read once, but without --force-keyframes-at-cuts, the video of a chapter '
+            'starts at the first keyframe after its start instead of the one before it'))
+    postproc.add_option(
+        '--no-split-chapters-single-pass',
+        dest='split_chapters_single_pass', action='store_false',
+        help='Run ffmpeg separately for each chapter (default)')
+    postproc.add_option(
+        '--split-chapters-jobs',
+        dest='split_chapters_jobs', metavar='N', default=1, type=int,
+        help='Number of ffmpeg processes that split chapters in parallel (default is %default)')
     postproc.add_option(
         '--remove-chapters',
         metavar='REGEX', dest='remove_chapters', action='append',
@@ -1827,7 +1893,9 @@ def _preset_alias_callback(option, opt_str, value, parser):
         action='store_true', dest='force_keyframes_at_cuts', default=False,
         help=(
             'Force keyframes at cuts when downloading/splitting/removing sections. '
-            'This is slow due to needing a re-encode, but the resulting video may have fewer artifacts around the cuts'))
+            'This is slow due to needing a re-encode, but the resulting video may have fewer artifacts around the cuts. '
+            'With it, sections are removed from the video and its subtitles in a single ffmpeg run (needs ffmpeg 5.1+). '
+            'Otherwise, the kept parts of each file are concatenated, with one ffmpeg run per file (default)'))
     postproc.add_option(
         '--no-force-keyframes-at-cuts',
         action='store_false', dest='force_keyframes_at_cuts',
@@ -28,6 +28,7 @@
     MetadataFromTitlePP,
     MetadataParserPP,
 )
+from .merger import NativeMergerPP
 from .modify_chapters import ModifyChaptersPP
 from .movefilesafterdownload import MoveFilesAfterDownloadPP
 from .sponskrub import SponSkrubPP
@@ -1,4 +1,5 @@
 import base64
+import functools
 import os
 import re
 import subprocess
@@ -53,35 +54,74 @@ def guess():
     def _report_run(self, exe, filename):
         self.to_screen(f'{exe}: Adding thumbnail to "{filename}"')
 
-    @PostProcessor._restrict_to(images=False)
-    def run(self, info):
-        filename = info['filepath']
-        temp_filename = prepend_extension(filename, 'temp')
-
+    def _get_thumbnail(self, info):
+        """Return the index and path of the thumbnail to embed, or None if there is none"""
         if not info.get('thumbnails'):
             self.to_screen('There aren\'t any thumbnails to embed')
-            return [], info
+            return None
 
         idx = next((-i for i, t in enumerate(info['thumbnails'][::-1], 1) if t.get('filepath')), None)
         if idx is None:
             self.to_screen('There are no thumbnails on disk')
-            return [], info
+            return None
         thumbnail_filename = info['thumbnails'][idx]['filepath']
         if not os.path.exists(thumbnail_filename):
             self.report_warning('Skipping embedding the thumbnail because the file is missing.')
-            return [], info
+            return None
 
         # Correct extension for WebP file with wrong extension (see #25687, #25717)
-        convertor = FFmpegThumbnailsConvertorPP(self._downloader)
-        convertor.fixup_webp(info, idx)
+        FFmpegThumbnailsConvertorPP(self._downloader).fixup_webp(info, idx)
+        return idx, info['thumbnails'][idx]['filepath']
+
+    def _delete_thumbnails(self, original_thumbnail, thumbnail_filename, info):
+        converted = original_thumbnail != thumbnail_filename
+        self._delete_downloaded_files(
+            thumbnail_filename if converted or not self._already_have_thumbnail else None,
+            original_thumbnail if converted and not self._already_have_thumbnail else None,
+            info=info)
 
-        original_thumbnail = thumbnail_filename = info['thumbnails'][idx]['filepath']
+    def _plan(self, info, plan):
+        # Only mkv/mka use ffmpeg without converting the thumbnail first
+        if info['ext'] not in ('mkv', 'mka'):
+            return None
+        thumbnail = self._get_thumbnail(info)
+        if not thumbnail:
+            return [], info
+
+        _, thumbnail_filename = thumbnail
+        thumbnail_ext = os.path.splitext(thumbnail_filename)[1][1:]
+        mimetype = f'image/{thumbnail_ext.replace("jpg", "jpeg")}'
+        old_stream = plan.find_stream(('tags', 'mimetype'), mimetype)
+        if old_stream is not None:
+            plan.drop_stream(old_stream)
+        plan.attach(thumbnail_filename, {'mimetype': mimetype, 'filename': f'cover.{thumbnail_ext}'})
+
+        self._report_run('ffmpeg', info['filepath'])
+        mtime = os.stat(plan.filepath).st_mtime
+        plan.after(functools.partial(self.try_utime, plan.outpath, mtime, mtime))
+        plan.after(functools.partial(self._delete_thumbnails, thumbnail_filename, thumbnail_filename, info))
+        return [], info
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+        if info['ext'] in ('mkv', 'mka'):
+            return self._run_planned(info)
+
+        filename = info['filepath']
+        temp_filename = prepend_extension(filename, 'temp')
+
+        thumbnail = self._get_thumbnail(info)
+        if not thumbnail:
+            return [], info
+        idx, original_thumbnail = thumbnail
+        thumbnail_filename = original_thumbnail
 
         # Convert unsupported thumbnail formats (see #25687, #25717)
         # PNG is preferred since JPEG is lossy
         thumbnail_ext = os.path.splitext(thumbnail_filename)[1][1:]
-        if info['ext'] not in ('mkv', 'mka') and thumbnail_ext not in ('jpg', 'jpeg', 'png'):
-            thumbnail_filename = convertor.convert_thumbnail(thumbnail_filename, 'png')
+        if thumbnail_ext not in ('jpg', 'jpeg', 'png'):
+            thumbnail_filename = FFmpegThumbnailsConvertorPP(self._downloader).convert_thumbnail(
+                thumbnail_filename, 'png')
             thumbnail_ext = 'png'
 
         mtime = os.stat(filename).st_mtime
@@ -95,23 +135,6 @@ def run(self, info):
             self._report_run('ffmpeg', filename)
             self.run_ffmpeg_multiple_files([filename, thumbnail_filename], temp_filename, options)
 
-        elif info['ext'] in ['mkv', 'mka']:
-            options = list(self.stream_copy_opts())
-
-            mimetype = f'image/{thumbnail_ext.replace("jpg", "jpeg")}'
-            old_stream, new_stream = self.get_stream_number(
-                filename, ('tags', 'mimetype'), mimetype)
-            if old_stream is not None:
-                options.extend(['-map', f'-0:{old_stream}'])
-                new_stream -= 1
-            options.extend([
-                '-attach', self._ffmpeg_filename_argument(thumbnail_filename),
-                f'-metadata:s:{new_stream}', f'mimetype={mimetype}',
-                f'-metadata:s:{new_stream}', f'filename=cover.{thumbnail_ext}'])
-
-            self._report_run('ffmpeg', filename)
-            self.run_ffmpeg(filename, temp_filename, options)
-
         elif info['ext'] in ['m4a', 'mp4', 'm4v', 'mov']:
             prefer_atomicparsley = 'embed-thumbnail-atomicparsley' in self.get_param('compat_opts', [])
             # Method 1: Use mutagen
@@ -225,9 +248,5 @@ def run(self, info):
             os.replace(temp_filename, filename)
 
         self.try_utime(filename, mtime, mtime)
-        converted = original_thumbnail != thumbnail_filename
-        self._delete_downloaded_files(
-            thumbnail_filename if converted or not self._already_have_thumbnail else None,
-            original_thumbnail if converted and not self._already_have_thumbnail else None,
-            info=info)
+        self._delete_thumbnails(original_thumbnail, thumbnail_filename, info)
         return [], info
@@ -1,11 +1,16 @@
 import collections
+import concurrent.futures
+import contextlib
 import contextvars
 import functools
+import hashlib
 import itertools
 import json
 import os
 import re
+import shutil
 import subprocess
+import threading
 import time
 
 from .common import PostProcessor
@@ -138,6 +143,39 @@ def _get_ffmpeg_version(self, prog):
         path = self._paths.get(prog)
         if path in self._version_cache:
             return self._version_cache[path], self._features_cache.get(path, {})
+
+        # Running the executable is slow, so its capabilities are also kept in the cache dir
+        signature, cache_key, cached = self._executable_signature(path), None, None
+        if signature and self._downloader:
+            cache_key = hashlib.sha256(signature[0].encode()).hexdigest()[:32]
+            cached = self._downloader.cache.load('ffmpeg-capabilities', cache_key)
+        if signature and traverse_obj(cached, 'signature') == signature:
+            ver, features = cached['version'], cached['features']
+        else:
+            ver, features = self._detect_ffmpeg_version(prog, path)
+            if cache_key and ver:
+                self._downloader.cache.store('ffmpeg-capabilities', cache_key, {
+                    'signature': signature,
+                    'version': ver,
+                    'features': features,
+                })
+        self._version_cache[path] = ver
+        if features:
+            self._features_cache[path] = features
+        return ver, features
+
+    @staticmethod
+    def _executable_signature(path):
+        """The real path, size and modification time of an executable; None if it is not found"""
+        with contextlib.suppress(OSError, TypeError):
+            exe = shutil.which(path)
+            if exe:
+                stat = os.stat(exe)
+                return [os.path.realpath(exe), stat.st_size, stat.st_mtime_ns]
+        return None
+
+    @staticmethod
+    def _detect_ffmpeg_version(prog, path):
         out = _get_exe_version_output(path, ['-bsfs'])
         ver = detect_exe_version(out) if out else False
         if ver:
@@ -150,18 +188,16 @@ def _get_ffmpeg_version(self, prog):
                 mobj = re.match(regex, ver)
                 if mobj:
                     ver = mobj.group(1)
-        self._version_cache[path] = ver
         if prog != 'ffmpeg' or not out:
             return ver, {}
 
         mobj = re.search(r'(?m)^\s+libavformat\s+(?:[0-9. ]+)\s+/\s+(?P<runtime>[0-9. ]+)', out)
         lavf_runtime_version = mobj.group('runtime').replace(' ', '') if mobj else None
-        self._features_cache[path] = features = {
+        return ver, {
             'fdk': '--enable-libfdk-aac' in out,
             'setts': 'setts' in out.splitlines(),
             'needs_adtstoasc': is_outdated_version(lavf_runtime_version, '57.56.100', False),
         }
-        return ver, features
 
     @property
     def _versions(self):
@@ -217,8 +253,8 @@ def probe_executable(self):
         return self._paths.get(self.probe_basename)
 
     @staticmethod
-    def stream_copy_opts(copy=True, *, ext=None):
-        yield from ('-map', '0')
+    def stream_copy_opts(copy=True, *, ext=None, input_index=0):
+        yield from ('-map', str(input_index))
         # Don't copy Apple TV chapters track, bin_data
         # See https://github.com/yt-dlp/yt-dlp/issues/2, #19042, #19024, https://trac.ffmpeg.org/ticket/6016
         yield from ('-dn', '-ignore_unknown')
@@ -236,6 +272,38 @@ def check_version(self):
             self.report_warning(f'Your copy of {self.basename} is outdated, update {self.basename} '
                                 f'to version {required_version} or newer if you encounter any errors')
 
+    # (command line, file identity) -> output of the probe; shared by all instances
+    _probe_cache = collections.OrderedDict()
+    _probe_cache_lock = threading.Lock()
+    _PROBE_CACHE_SIZE = 100
+
+    def _run_probe(self, cmd, path):
+        """Run a command that only reads path and return (stdout, stderr, returncode)
+
+        The result is reused for as long as the file is not replaced or modified
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            key = None
+        else:
+            key = (tuple(cmd), stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            with self._probe_cache_lock:
+                result = self._probe_cache.get(key)
+                if result is not None:
+                    self._probe_cache.move_to_end(key)
+                    self.write_debug(f'Using the cached result of probing "{path}"')
+                    return result
+
+        self.write_debug(f'{os.path.basename(cmd[0])} command line: {shell_quote(cmd)}')
+        result = Popen.run(cmd, text=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if key:
+            with self._probe_cache_lock:
+                self._probe_cache[key] = result
+                while len(self._probe_cache) > self._PROBE_CACHE_SIZE:
+                    self._probe_cache.popitem(last=False)
+        return result
+
     def get_audio_codec(self, path):
         if not self.probe_available and not self.available:
             raise PostProcessingError('ffprobe and ffmpeg not found. Please install or provide the path using --ffmpeg-location')
@@ -249,9 +317,7 @@ def get_audio_codec(self, path):
                     self.executable,
                     encodeArgument('-i')]
             cmd.append(self._ffmpeg_filename_argument(path))
-            self.write_debug(f'{self.basename} command line: {shell_quote(cmd)}')
-            stdout, stderr, returncode = Popen.run(
-                cmd, text=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            stdout, stderr, returncode = self._run_probe(cmd, path)
             if returncode != (0 if self.probe_available else 1):
                 return None
         except OSError:
@@ -291,8 +357,7 @@ def get_metadata_object(self, path, opts=[]):
 
         cmd += opts
         cmd.append(self._ffmpeg_filename_argument(path))
-        self.write_debug(f'ffprobe command line: {shell_quote(cmd)}')
-        stdout, _, _ = Popen.run(cmd, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.PIPE)
+        stdout, _, _ = self._run_probe(cmd, path)
         return json.loads(stdout)
 
     def get_stream_number(self, path, keys, value):
@@ -302,10 +367,10 @@ def get_stream_number(self, path, keys, value):
             None)
         return num, len(streams)
 
-    def _fixup_chapters(self, info):
+    def _fixup_chapters(self, info, filepath=None):
         last_chapter = traverse_obj(info, ('chapters', -1))
         if last_chapter and not last_chapter.get('end_time'):
-            last_chapter['end_time'] = self._get_real_video_duration(info['filepath'])
+            last_chapter['end_time'] = self._get_real_video_duration(filepath or info['filepath'])
 
     def _get_real_video_duration(self, filepath, fatal=True):
         try:
@@ -373,6 +438,20 @@ def make_args(file, args, name, number):
     def run_ffmpeg(self, path, out_path, opts, **kwargs):
         return self.run_ffmpeg_multiple_files([path], out_path, opts, **kwargs)
 
+    def _plan(self, info, plan):
+        """Add the work of the postprocessor to an FFmpegPlan
+
+        Returns the same as run, or None if the postprocessor can not be part of the plan.
+        Nothing must be added to the plan when returning None.
+        """
+        return None
+
+    def _run_planned(self, info):
+        plan = FFmpegPlan(self, info)
+        files_to_delete, info = self._plan(dict(info), plan)
+        plan.run()
+        return files_to_delete, info
+
     @staticmethod
     def _ffmpeg_filename_argument(fn):
         # Always use 'file:' because the filename may contain ':' (ffmpeg
@@ -436,6 +515,106 @@ def _concat_spec(cls, in_files, concat_opts=None):
                     yield f'{directive} {opts[directive]}\n'
 
 
+class FFmpegPlan:
+    """A single stream-copying ffmpeg run that several postprocessors contribute to
+
+    Input 0 is the file being post-processed. The output has the streams of input 0 that
+    were not dropped, followed by the streams mapped from the other inputs, followed by
+    the attachments. The output replaces input 0 unless it is remuxed to another file.
+    """
+
+    def __init__(self, pp, info):
+        self._pp = pp
+        self.filepath = self.outpath = info['filepath']
+        self.ext = info['ext']
+        # Copy only the audio, as needed for metadata in m4a
+        self.audio_only = False
+        # Convert the subtitles to a codec supported by the container
+        self.convert_subtitles = False
+        self._inputs = [self.filepath]
+        self._options = []
+        self._dropped = []
+        self._mapped = 0
+        self._attachments = []
+        self._callbacks = []
+
+    @functools.cached_property
+    def _streams(self):
+        return self._pp.get_metadata_object(self.filepath)['streams']
+
+    def find_stream(self, keys, value):
+        """Return the index of the first stream of input 0 with the value at keys, or None"""
+        return next((
+            i for i, stream in enumerate(self._streams)
+            if traverse_obj(stream, keys, casesense=False) == value), None)
+
+    def add_input(self, path):
+        """Add an input file and return its index"""
+        self._inputs.append(path)
+        return len(self._inputs) - 1
+
+    def add_options(self, *options):
+        self._options.extend(options)
+
+    def map_stream(self, path, stream=0):
+        """Add a stream of another file to the output"""
+        self.add_options('-map', f'{self.add_input(path)}:{stream}')
+        self._mapped += 1
+
+    def drop_streams(self, specifier, test):
+        """Do not copy the streams of input 0 that match specifier; test(index, stream) must agree with it"""
+        self.add_options('-map', f'-0:{specifier}')
+        self._dropped.append(test)
+
+    def drop_stream(self, index):
+        self.drop_streams(index, lambda i, _: i == index)
+
+    def attach(self, path, metadata):
+        """Attach a file to the output, with a dict of stream metadata"""
+        self.add_options('-attach', FFmpegPostProcessor._ffmpeg_filename_argument(path))
+        self._attachments.append(metadata)
+
+    def _attachment_options(self):
+        # The output index of the attachments is only known once nothing more is dropped or mapped.
+        # Streams of input 0 are copied with "-dn"
+        first = self._mapped + sum(
+            1 for i, stream in enumerate(self._streams)
+            if stream.get('codec_type') != 'data' and not any(test(i, stream) for test in self._dropped))
+        for index, metadata in enumerate(self._attachments, first):
+            for key, value in metadata.items():
+                yield f'-metadata:s:{index}', f'{key}={value}'
+
+    def remux(self, outpath, ext):
+        """Write the output to outpath instead of replacing input 0"""
+        self.outpath, self.ext = outpath, ext
+
+    def after(self, func):
+        """Call func once the output is in place"""
+        self._callbacks.append(func)
+
+    @property
+    def empty(self):
+        return not self._options and self.outpath == self.filepath
+
+    def run(self):
+        if self.empty:
+            return
+        out_path = self.outpath
+        if out_path == self.filepath:
+            out_path = prepend_extension(self.filepath, 'temp')
+        self._pp.run_ffmpeg_multiple_files(self._inputs, out_path, [
+            *FFmpegPostProcessor.stream_copy_opts(
+                not self.audio_only, ext=self.ext if self.convert_subtitles else None),
+            *(('-vn', '-acodec', 'copy') if self.audio_only else ()),
+            *self._options,
+            *itertools.chain.from_iterable(self._attachment_options()),
+        ])
+        if out_path != self.outpath:
+            os.replace(out_path, self.outpath)
+        for func in self._callbacks:
+            func()
+
+
 class FFmpegExtractAudioPP(FFmpegPostProcessor):
     COMMON_AUDIO_EXTS = (*MEDIA_EXTENSIONS.common_audio, 'wma')
     SUPPORTED_EXTS = tuple(ACODECS.keys())
@@ -560,16 +739,25 @@ def _options(target_ext):
         if target_ext == 'avi':
             yield from ('-c:v', 'libxvid', '-vtag', 'XVID')
 
-    @PostProcessor._restrict_to(images=False)
-    def run(self, info):
+    def _destination(self, info):
+        """Return the path and extension to convert to, or None if the file is not to be converted"""
         filename, source_ext = info['filepath'], info['ext'].lower()
         target_ext, _skip_msg = resolve_mapping(source_ext, self.mapping)
         if _skip_msg:
             self.to_screen(f'Not {self._ACTION} media file "{filename}"; {_skip_msg}')
-            return [], info
+            return None
 
         outpath = replace_extension(filename, target_ext, source_ext)
         self.to_screen(f'{self._ACTION.title()} video from {source_ext} to {target_ext}; Destination: {outpath}')
+        return outpath, target_ext
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+        destination = self._destination(info)
+        if not destination:
+            return [], info
+
+        filename, (outpath, target_ext) = info['filepath'], destination
         self.run_ffmpeg(filename, outpath, self._options(target_ext))
 
         info['filepath'] = outpath
@@ -580,9 +768,23 @@ def run(self, info):
 class FFmpegVideoRemuxerPP(FFmpegVideoConvertorPP):
     _ACTION = 'remuxing'
 
-    @staticmethod
-    def _options(target_ext):
-        return FFmpegPostProcessor.stream_copy_opts()
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+        return self._run_planned(info)
+
+    def _plan(self, info, plan):
+        # The rest of the plan works on the remuxed file
+        if not plan.empty:
+            return None
+        destination = self._destination(info)
+        if not destination:
+            return [], info
+
+        filename, (outpath, target_ext) = info['filepath'], destination
+        plan.remux(outpath, target_ext)
+        info['filepath'] = outpath
+        info['format'] = info['ext'] = target_ext
+        return [filename], info
 
 
 class FFmpegEmbedSubtitlePP(FFmpegPostProcessor):
@@ -594,6 +796,9 @@ def __init__(self, downloader=None, already_have_subtitle=False):
 
     @PostProcessor._restrict_to(images=False)
     def run(self, info):
+        return self._run_planned(info)
+
+    def _plan(self, info, plan):
         if info['ext'] not in self.SUPPORTED_EXTS:
             self.to_screen(f'Subtitles can only be embedded in {", ".join(self.SUPPORTED_EXTS)} files')
             return [], info
@@ -641,27 +846,19 @@ def run(self, info):
         if not sub_langs:
             return [], info
 
-        input_files = [filename, *sub_filenames]
-
-        opts = [
-            *self.stream_copy_opts(ext=info['ext']),
-            # Don't copy the existing subtitles, we may be running the
-            # postprocessor a second time
-            '-map', '-0:s',
-        ]
-        for i, (lang, name) in enumerate(zip(sub_langs, sub_names)):
-            opts.extend(['-map', f'{i + 1}:0'])
+        plan.convert_subtitles = True
+        # Don't copy the existing subtitles, we may be running the
+        # postprocessor a second time
+        plan.drop_streams('s', lambda _, stream: stream.get('codec_type') == 'subtitle')
+        for i, (lang, name, sub_filename) in enumerate(zip(sub_langs, sub_names, sub_filenames)):
+            plan.map_stream(sub_filename)
             lang_code = ISO639Utils.short2long(lang) or lang
-            opts.extend([f'-metadata:s:s:{i}', f'language={lang_code}'])
+            plan.add_options(f'-metadata:s:s:{i}', f'language={lang_code}')
             if name:
-                opts.extend([f'-metadata:s:s:{i}', f'handler_name={name}',
-                             f'-metadata:s:s:{i}', f'title={name}'])
+                plan.add_options(f'-metadata:s:s:{i}', f'handler_name={name}',
+                                 f'-metadata:s:s:{i}', f'title={name}')
 
-        temp_filename = prepend_extension(filename, 'temp')
         self.to_screen(f'Embedding subtitles in "{filename}"')
-        self.run_ffmpeg_multiple_files(input_files, temp_filename, opts)
-        os.replace(temp_filename, filename)
-
         files_to_delete = [] if self._already_have_subtitle else sub_filenames
         return files_to_delete, info
 
@@ -674,49 +871,51 @@ def __init__(self, downloader, add_metadata=True, add_chapters=True, add_infojso
         self._add_chapters = add_chapters
         self._add_infojson = add_infojson
 
-    @staticmethod
-    def _options(target_ext):
-        audio_only = target_ext == 'm4a'
-        yield from FFmpegPostProcessor.stream_copy_opts(not audio_only)
-        if audio_only:
-            yield from ('-vn', '-acodec', 'copy')
-
     @PostProcessor._restrict_to(images=False)
     def run(self, info):
-        self._fixup_chapters(info)
-        filename, metadata_filename = info['filepath'], None
+        return self._run_planned(info)
+
+    def _plan(self, info, plan):
+        self._fixup_chapters(info, plan.filepath)
+        filename = info['filepath']
         files_to_delete, options = [], []
+        # Work out all the options before changing the plan, since the metadata may be empty
         if self._add_chapters and info.get('chapters'):
             metadata_filename = replace_extension(filename, 'meta')
-            options.extend(self._get_chapter_opts(info['chapters'], metadata_filename))
+            self._write_chapters(info['chapters'], metadata_filename)
+            options.append(('-map_metadata', str(plan.add_input(metadata_filename))))
             files_to_delete.append(metadata_filename)
         if self._add_metadata:
             options.extend(self._get_metadata_opts(info))
 
+        infojson = None
         if self._add_infojson:
             if info['ext'] in ('mkv', 'mka'):
                 infojson_filename = info.get('infojson_filename')
-                options.extend(self._get_infojson_opts(info, infojson_filename))
+                infojson = self._get_infojson(info, infojson_filename)
                 if not infojson_filename:
                     files_to_delete.append(info.get('infojson_filename'))
             elif self._add_infojson is True:
                 self.to_screen('The info-json can only be attached to mkv/mka files')
 
-        if not options:
+        if not options and not infojson:
             self.to_screen('There isn\'t any metadata to add')
             return [], info
 
-        temp_filename = prepend_extension(filename, 'temp')
+        if info['ext'] == 'm4a':
+            plan.audio_only = True
+        plan.add_options(*itertools.chain.from_iterable(options))
+        if infojson:
+            old_stream = plan.find_stream(('tags', 'mimetype'), 'application/json')
+            if old_stream is not None:
+                plan.drop_stream(old_stream)
+            plan.attach(infojson, {'mimetype': 'application/json', 'filename': 'info.json'})
         self.to_screen(f'Adding metadata to "{filename}"')
-        self.run_ffmpeg_multiple_files(
-            (filename, metadata_filename), temp_filename,
-            itertools.chain(self._options(info['ext']), *options))
-        self._delete_downloaded_files(*files_to_delete)
-        os.replace(temp_filename, filename)
+        plan.after(functools.partial(self._delete_downloaded_files, *files_to_delete))
         return [], info
 
     @staticmethod
-    def _get_chapter_opts(chapters, metadata_filename):
+    def _write_chapters(chapters, metadata_filename):
         with open(metadata_filename, 'w', encoding='utf-8') as f:
             def ffmpeg_escape(text):
                 return re.sub(r'([\\=;#\n])', r'\\\1', text)
@@ -730,7 +929,6 @@ def ffmpeg_escape(text):
                 if chapter_title:
                     metadata_file_content += f'title={ffmpeg_escape(chapter_title)}\n'
             f.write(metadata_file_content)
-        yield ('-map_metadata', '1')
 
     def _get_metadata_opts(self, info):
         meta_prefix = 'meta'
@@ -792,29 +990,20 @@ def add(meta_list, info_list=None):
                     yield (f'-metadata:s:{i}', f'{name}={value}')
             stream_idx += stream_count
 
-    def _get_infojson_opts(self, info, infofn):
+    def _get_infojson(self, info, infofn):
+        """Return the path of the info-json to attach, writing it if needed"""
         if not infofn or not os.path.exists(infofn):
             if self._add_infojson is not True:
-                return
+                return None
             infofn = infofn or '%s.temp' % (
                 self._downloader.prepare_filename(info, 'infojson')
                 or replace_extension(self._downloader.prepare_filename(info), 'info.json', info['ext']))
             if not self._downloader._ensure_dir_exists(infofn):
-                return
+                return None
             self.write_debug(f'Writing info-json to: {infofn}')
             write_json_file(self._downloader.sanitize_info(info, self.get_param('clean_infojson', True)), infofn)
             info['infojson_filename'] = infofn
-
-        old_stream, new_stream = self.get_stream_number(info['filepath'], ('tags', 'mimetype'), 'application/json')
-        if old_stream is not None:
-            yield ('-map', f'-0:{old_stream}')
-            new_stream -= 1
-
-        yield (
-            '-attach', self._ffmpeg_filename_argument(infofn),
-            f'-metadata:s:{new_stream}', 'mimetype=application/json',
-            f'-metadata:s:{new_stream}', 'filename=info.json',
-        )
+        return infofn
 
 
 class FFmpegMergerPP(FFmpegPostProcessor):
@@ -1022,9 +1211,14 @@ def run(self, info):
 
 
 class FFmpegSplitChaptersPP(FFmpegPostProcessor):
-    def __init__(self, downloader, force_keyframes=False):
+    # Maximum number of chapters written by a single ffmpeg invocation in single pass mode
+    SINGLE_PASS_BATCH_SIZE = 100
+
+    def __init__(self, downloader, force_keyframes=False, single_pass=False, jobs=1):
         FFmpegPostProcessor.__init__(self, downloader)
         self._force_keyframes = force_keyframes
+        self._single_pass = single_pass
+        self._jobs = max(jobs or 1, 1)
 
     def _prepare_filename(self, number, chapter, info):
         info = info.copy()
@@ -1048,6 +1242,21 @@ def _ffmpeg_args_for_chapter(self, number, chapter, info):
             ['-ss', str(chapter['start_time']),
              '-t', str(chapter['end_time'] - chapter['start_time'])])
 
+    def _run_ffmpeg_commands(self, commands):
+        if self._jobs == 1 or len(commands) == 1:
+            for command in commands:
+                self.real_run_ffmpeg(*command)
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(self._jobs) as executor:
+            futures = [executor.submit(self.real_run_ffmpeg, *command) for command in commands]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                executor.shutdown(cancel_futures=True)
+                raise
+
     @PostProcessor._restrict_to(images=False)
     def run(self, info):
         self._fixup_chapters(info)
@@ -1060,9 +1269,20 @@ def run(self, info):
         if self._force_keyframes and len(chapters) > 1:
             in_file = self.force_keyframes(in_file, (c['start_time'] for c in chapters))
         self.to_screen(f'Splitting video by chapters; {len(chapters)} chapters found')
-        for idx, chapter in enumerate(chapters):
-            destination, opts = self._ffmpeg_args_for_chapter(idx + 1, chapter, info)
-            self.real_run_ffmpeg([(in_file, opts)], [(destination, self.stream_copy_opts())])
+        outputs = [self._ffmpeg_args_for_chapter(idx + 1, chapter, info) for idx, chapter in enumerate(chapters)]
+        if self._single_pass:
+            # The chapters are cut on the output side, so that the input is read only once per batch.
+            # real_run_ffmpeg adds the default postprocessor args only to the first output
+            self.check_version()
+            default_args = self._configuration_args(self.basename, [''])
+            commands = [
+                ([(in_file, [])], [
+                    (destination, [*self.stream_copy_opts(), *opts, *(default_args if i else [])])
+                    for i, (destination, opts) in enumerate(outputs[start:start + self.SINGLE_PASS_BATCH_SIZE])])
+                for start in range(0, len(outputs), self.SINGLE_PASS_BATCH_SIZE)]
+        else:
+            commands = [([(in_file, opts)], [(destination, self.stream_copy_opts())]) for destination, opts in outputs]
+        self._run_ffmpeg_commands(commands)
         if in_file != info['filepath']:
             self._delete_downloaded_files(in_file, msg=None)
         return [], info
@@ -1189,3 +1409,73 @@ def run(self, info):
             'ext': ie_copy['ext'],
         }]
         return files_to_delete, info
+
+
+class FFmpegFusedPP(FFmpegPostProcessor):
+    """Run consecutive stream-copying postprocessors as a single ffmpeg invocation
+
+    Each postprocessor adds its work to an FFmpegPlan instead of rewriting the file itself.
+    A postprocessor that can not be part of the plan runs the plan so far, then runs on its own.
+    """
+
+    def __init__(self, downloader=None, postprocessors=()):
+        FFmpegPostProcessor.__init__(self, downloader)
+        self.postprocessors = list(postprocessors)
+
+    @staticmethod
+    def can_fuse(pp):
+        if not isinstance(pp, FFmpegPostProcessor):
+            return False
+        # A subclass that changes run must not be bypassed
+        owner = next(cls for cls in type(pp).__mro__ if '_plan' in vars(cls))
+        if owner is FFmpegPostProcessor or type(pp).run is not owner.run:
+            return False
+        # The arguments given to a specific postprocessor can not be applied to a fused run
+        pp_key = pp.pp_key().lower()
+        return not any(
+            isinstance(key, str) and key.split('+')[0] == pp_key
+            for key in pp.get_param('postprocessor_args') or {})
+
+    @classmethod
+    def fuse(cls, downloader, postprocessors):
+        """Replace each run of two or more postprocessors that can be fused with a FFmpegFusedPP"""
+        fused = []
+        for can_fuse, group in itertools.groupby(postprocessors, cls.can_fuse):
+            group = list(group)
+            if can_fuse and len(group) > 1:
+                fused.append(cls(downloader, group))
+            else:
+                fused.extend(group)
+        return fused
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+        info = dict(info)
+        files_to_delete, planned = [], []
+        plan = FFmpegPlan(self, info)
+
+        def run_plan():
+            nonlocal plan
+            if not plan.empty:
+                self.write_debug(
+                    f'Running {", ".join(pp.pp_key() for pp, _ in planned)} as a single ffmpeg invocation')
+            plan.run()
+            for pp, info_copy in planned:
+                pp._hook_progress({'status': 'finished'}, info_copy)
+            planned.clear()
+            plan = FFmpegPlan(self, info)
+
+        for pp in self.postprocessors:
+            ret = pp._plan(info, plan)
+            if ret is None and planned:
+                run_plan()
+                ret = pp._plan(info, plan)
+            if ret is None:
+                ret = pp.run(info)
+            else:
+                planned.append((pp, self._copy_infodict(info)))
+                pp._hook_progress({'status': 'started'}, planned[-1][1])
+            files, info = ret
+            files_to_delete.extend(files)
+        run_plan()
+        return files_to_delete, info
@@ -0,0 +1,696 @@
+import contextlib
+import heapq
+import os
+import struct
+
+from .common import PostProcessor
+from .ffmpeg import FFmpegMergerPP
+from ..utils import PostProcessingError, prepend_extension
+
+u32 = struct.Struct('>I')
+u64 = struct.Struct('>Q')
+
+_COPY_SIZE = 1024 * 1024
+
+
+class UnsupportedMergeError(Exception):
+    """The files can not be merged natively"""
+    pass
+
+
+def _copy_range(src, dst, offset, length):
+    src.seek(offset)
+    while length > 0:
+        data = src.read(min(length, _COPY_SIZE))
+        if not data:
+            raise UnsupportedMergeError('The file is truncated')
+        dst.write(data)
+        length -= len(data)
+
+
+def _read_at(f, offset, length):
+    f.seek(offset)
+    data = f.read(length)
+    if len(data) != length:
+        raise UnsupportedMergeError('The file is truncated')
+    return data
+
+
+# MP4
+
+_MP4_CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl', b'mvex', b'moof', b'traf', b'edts', b'dinf'}
+
+
+def _iter_boxes(f):
+    """Yield the type, offset, header size and size of the top-level boxes of a file"""
+    file_size = f.seek(0, os.SEEK_END)
+    offset = 0
+    while offset < file_size:
+        header = _read_at(f, offset, 8)
+        size, box_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if size == 1:
+            size, header_size = u64.unpack(_read_at(f, offset + 8, 8))[0], 16
+        elif size == 0:
+            size = file_size - offset
+        if size < header_size or offset + size > file_size:
+            raise UnsupportedMergeError(f'Invalid size of {box_type!r} box')
+        yield box_type, offset, header_size, size
+        offset += size
+
+
+def _parse_boxes(data):
+    """Parse boxes into [type, content] lists; content is a list of boxes for containers, else bytes"""
+    boxes, offset = [], 0
+    while offset < len(data):
+        if offset + 8 > len(data):
+            raise UnsupportedMergeError('Truncated box')
+        size, box_type = struct.unpack_from('>I4s', data, offset)
+        header_size = 8
+        if size == 1:
+            size, header_size = u64.unpack_from(data, offset + 8)[0], 16
+        elif size == 0:
+            size = len(data) - offset
+        if size < header_size or offset + size > len(data):
+            raise UnsupportedMergeError(f'Invalid size of {box_type!r} box')
+        payload = data[offset + header_size:offset + size]
+        boxes.append([box_type, _parse_boxes(payload) if box_type in _MP4_CONTAINERS else payload])
+        offset += size
+    return boxes
+
+
+def _serialize_boxes(boxes):
+    out = []
+    for box_type, content in boxes:
+        payload = _serialize_boxes(content) if isinstance(content, list) else content
+        out.append(u32.pack(8 + len(payload)) + box_type + payload)
+    return b''.join(out)
+
+
+def _find_box(boxes, *path):
+    for box_type in path:
+        boxes = next((content for child_type, content in boxes if child_type == box_type), None)
+        if boxes is None:
+            return None
+    return boxes
+
+
+def _set_box(boxes, box_type, content):
+    for box in boxes:
+        if box[0] == box_type:
+            box[1] = content
+            return
+
+
+# Offsets of the timescale (track_ID in tkhd) and the duration in the headers for each version
+_TIMES = {
+    b'mvhd': {0: (12, 16, 'I'), 1: (20, 24, 'Q')},
+    b'mdhd': {0: (12, 16, 'I'), 1: (20, 24, 'Q')},
+    b'tkhd': {0: (12, 20, 'I'), 1: (20, 28, 'Q')},
+}
+
+
+def _header_layout(payload, box_type):
+    layout = _TIMES[box_type].get(payload[0]) if payload else None
+    if layout is None:
+        raise UnsupportedMergeError(f'Unsupported {box_type!r} box')
+    return layout
+
+
+def _header_field(payload, box_type, field):
+    first, duration, fmt = _header_layout(payload, box_type)
+    if field == 'duration':
+        return struct.unpack_from(f'>{fmt}', payload, duration)[0]
+    return u32.unpack_from(payload, first)[0]
+
+
+def _set_header_field(payload, box_type, field, value):
+    first, duration, fmt = _header_layout(payload, box_type)
+    payload = bytearray(payload)
+    if field == 'duration':
+        struct.pack_into(f'>{fmt}', payload, duration, min(value, (1 << (8 * struct.calcsize(fmt))) - 1))
+    else:
+        u32.pack_into(payload, first, value)
+    return bytes(payload)
+
+
+class _MP4Input:
+    def __init__(self, f):
+        self.file = f
+        self.ftyp = moov = None
+        # [offset of the moof, size of the moof, end of the mdat that follows it]
+        self.fragments = []
+        # (offset, size) of the payload of each mdat
+        self.mdats = []
+        for box_type, offset, header_size, size in _iter_boxes(f):
+            if box_type == b'ftyp':
+                self.ftyp = _read_at(f, offset, size)
+            elif box_type == b'moov':
+                if moov is not None:
+                    raise UnsupportedMergeError('Multiple moov boxes')
+                moov = _parse_boxes(_read_at(f, offset + header_size, size - header_size))
+            elif box_type == b'moof':
+                if header_size != 8:
+                    raise UnsupportedMergeError('Unsupported moof box')
+                self.fragments.append([offset, size, offset + size])
+            elif box_type == b'mdat':
+                self.mdats.append((offset + header_size, size - header_size))
+                if self.fragments and self.fragments[-1][2] == offset:
+                    self.fragments[-1][2] = offset + size
+
+        if moov is None:
+            raise UnsupportedMergeError('No moov box')
+        traks = [content for box_type, content in moov if box_type == b'trak']
+        if len(traks) != 1:
+            raise UnsupportedMergeError(f'Expected a single track, but found {len(traks)}')
+        self.moov, self.trak = moov, traks[0]
+        self.fragmented = _find_box(moov, b'mvex') is not None
+        if self.fragmented != bool(self.fragments):
+            raise UnsupportedMergeError('Mixed fragmented and unfragmented media')
+
+        mvhd = _find_box(moov, b'mvhd')
+        mdhd = _find_box(self.trak, b'mdia', b'mdhd')
+        if not mvhd or not mdhd or _find_box(self.trak, b'tkhd') is None:
+            raise UnsupportedMergeError('Missing track headers')
+        self.timescale = _header_field(mvhd, b'mvhd', 'timescale')
+        self.duration = _header_field(mvhd, b'mvhd', 'duration')
+        self.media_timescale = _header_field(mdhd, b'mdhd', 'timescale')
+
+    def fragment_times(self):
+        """Decode time of each fragment in seconds, or None if it is not known"""
+        times = []
+        for offset, size, _ in self.fragments:
+            tfdt = _find_box(_parse_boxes(_read_at(self.file, offset + 8, size - 8)), b'traf', b'tfdt')
+            if not tfdt or not self.media_timescale:
+                return None
+            fmt = '>Q' if tfdt[0] == 1 else '>I'
+            times.append(struct.unpack_from(fmt, tfdt, 4)[0] / self.media_timescale)
+        return times
+
+
+def _rescale(value, source, target):
+    return value if source == target or not source else value * target // source
+
+
+def _build_trak(inp, track_id, timescale, map_offset=None, use_co64=False):
+    """Copy the trak of an input with a new track ID, movie timescale and chunk offsets"""
+    trak = _parse_boxes(_serialize_boxes(inp.trak))
+    tkhd = _find_box(trak, b'tkhd')
+    tkhd = _set_header_field(tkhd, b'tkhd', 'track_id', track_id)
+    tkhd = _set_header_field(
+        tkhd, b'tkhd', 'duration', _rescale(_header_field(tkhd, b'tkhd', 'duration'), inp.timescale, timescale))
+    _set_box(trak, b'tkhd', tkhd)
+
+    # The segment durations of the edit list are in the movie timescale
+    elst = _find_box(trak, b'edts', b'elst')
+    if elst and inp.timescale != timescale:
+        elst = bytearray(elst)
+        version, (count,) = elst[0], u32.unpack_from(elst, 4)
+        entry_size, fmt = (20, '>Q') if version == 1 else (12, '>I')
+        for i in range(count):
+            pos = 8 + i * entry_size
+            value = struct.unpack_from(fmt, elst, pos)[0]
+            struct.pack_into(fmt, elst, pos, _rescale(value, inp.timescale, timescale))
+        _set_box(_find_box(trak, b'edts'), b'elst', bytes(elst))
+
+    if map_offset:
+        stbl = _find_box(trak, b'mdia', b'minf', b'stbl')
+        if stbl is None:
+            raise UnsupportedMergeError('No sample table')
+        for box in stbl:
+            if box[0] not in (b'stco', b'co64'):
+                continue
+            fmt = '>I' if box[0] == b'stco' else '>Q'
+            (count,) = u32.unpack_from(box[1], 4)
+            offsets = struct.unpack_from(f'>{count}{fmt[1]}', box[1], 8)
+            fmt = '>Q' if use_co64 else '>I'
+            box[0] = b'co64' if use_co64 else b'stco'
+            box[1] = box[1][:8] + struct.pack(f'>{count}{fmt[1]}', *map(map_offset, offsets))
+            break
+        else:
+            raise UnsupportedMergeError('No chunk offsets')
+    return trak
+
+
+def _build_moov(video, audio, offset_maps=(None, None), use_co64=False):
+    timescale = video.timescale
+    mvhd = _find_box(video.moov, b'mvhd')
+    mvhd = _set_header_field(mvhd, b'mvhd', 'duration', max(
+        video.duration, _rescale(audio.duration, audio.timescale, timescale)))
+    mvhd = mvhd[:-4] + u32.pack(3)  # next_track_ID
+
+    moov = [[b'mvhd', mvhd]]
+    for track_id, (inp, map_offset) in enumerate(zip((video, audio), offset_maps), 1):
+        moov.append([b'trak', _build_trak(inp, track_id, timescale, map_offset, use_co64)])
+    if video.fragmented:
+        mvex = []
+        for track_id, inp in enumerate((video, audio), 1):
+            trex = _find_box(inp.moov, b'mvex', b'trex')
+            if not trex:
+                raise UnsupportedMergeError('No trex box')
+            mvex.append([b'trex', trex[:4] + u32.pack(track_id) + trex[8:]])
+        moov.append([b'mvex', mvex])
+    moov.extend(box for box in video.moov if box[0] not in (b'mvhd', b'trak', b'mvex'))
+    return [[b'moov', moov]]
+
+
+def _write_fragment(inp, out, track_id, sequence, offset, moof_size, end):
+    moof = _parse_boxes(_read_at(inp.file, offset + 8, moof_size - 8))
+    mfhd = _find_box(moof, b'mfhd')
+    if not mfhd:
+        raise UnsupportedMergeError('No mfhd box')
+    _set_box(moof, b'mfhd', mfhd[:4] + u32.pack(sequence))
+    shift = out.tell() - offset
+    for box in moof:
+        if box[0] != b'traf':
+            continue
+        tfhd = _find_box(box[1], b'tfhd')
+        if not tfhd:
+            raise UnsupportedMergeError('No tfhd box')
+        tfhd = bytearray(tfhd)
+        u32.pack_into(tfhd, 4, track_id)
+        if tfhd[3] & 0x1:  # base-data-offset-present: an offset in the file
+            u64.pack_into(tfhd, 8, u64.unpack_from(tfhd, 8)[0] + shift)
+        _set_box(box[1], b'tfhd', bytes(tfhd))
+    data = _serialize_boxes([[b'moof', moof]])
+    # The sample data offsets are relative to the moof
+    if len(data) != moof_size:
+        raise UnsupportedMergeError('Unsupported moof box')
+    out.write(data)
+    _copy_range(inp.file, out, offset + moof_size, end - offset - moof_size)
+
+
+def _merge_mp4(video, audio, out):
+    video, audio = _MP4Input(video), _MP4Input(audio)
+    if video.fragmented != audio.fragmented:
+        raise UnsupportedMergeError('Mixed fragmented and unfragmented media')
+    ftyp = video.ftyp or b''
+
+    if video.fragmented:
+        out.write(ftyp + _serialize_boxes(_build_moov(video, audio)))
+        fragments = [
+            [(time, track_id, fragment) for time, fragment in zip(times, inp.fragments)]
+            for track_id, inp, times in ((1, video, video.fragment_times()), (2, audio, audio.fragment_times()))
+            if times is not None]
+        if len(fragments) == 2:
+            # Interleave the fragments in decode order
+            order = heapq.merge(*fragments, key=lambda x: x[:2])
+        else:
+            order = [(None, 1, f) for f in video.fragments] + [(None, 2, f) for f in audio.fragments]
+        for sequence, (_, track_id, fragment) in enumerate(order, 1):
+            _write_fragment((video, audio)[track_id - 1], out, track_id, sequence, *fragment)
+        return
+
+    # The media data of both inputs is copied to a single mdat after the moov
+    data_size = sum(size for inp in (video, audio) for _, size in inp.mdats)
+    mdat_header = (
+        u32.pack(1) + b'mdat' + u64.pack(data_size + 16) if data_size + 8 > 0xFFFFFFFF
+        else u32.pack(data_size + 8) + b'mdat')
+
+    def offset_mapper(inp, data_start):
+        bases, position = [], data_start
+        for offset, size in inp.mdats:
+            bases.append((offset, size, position))
+            position += size
+
+        def map_offset(offset):
+            for start, size, base in bases:
+                if start <= offset < start + size:
+                    return base + offset - start
+            raise UnsupportedMergeError('Media data outside of the mdat boxes')
+        return map_offset
+
+    def build_moov(use_co64, data_start):
+        video_start = data_start
+        audio_start = video_start + sum(size for _, size in video.mdats)
+        return _serialize_boxes(_build_moov(
+            video, audio, (offset_mapper(video, video_start), offset_mapper(audio, audio_start)), use_co64))
+
+    # The size of the moov does not depend on the offsets, only on their width
+    moov_size = len(build_moov(True, 0))
+    use_co64 = len(ftyp) + moov_size + len(mdat_header) + data_size > 0xFFFFFFFF
+    if not use_co64:
+        moov_size = len(build_moov(False, 0))
+    out.write(ftyp + build_moov(use_co64, len(ftyp) + moov_size + len(mdat_header)) + mdat_header)
+    for inp in (video, audio):
+        for offset, size in inp.mdats:
+            _copy_range(inp.file, out, offset, size)
+
+
+# WebM/Matroska
+
+class _ID:
+    EBML = 0x1A45DFA3
+    DOC_TYPE = 0x4282
+    DOC_TYPE_VERSION = 0x4287
+    DOC_TYPE_READ_VERSION = 0x4285
+    SEGMENT = 0x18538067
+    SEEK_HEAD = 0x114D9B74
+    SEEK = 0x4DBB
+    SEEK_ID = 0x53AB
+    SEEK_POSITION = 0x53AC
+    INFO = 0x1549A966
+    TIMESTAMP_SCALE = 0x2AD7B1
+    DURATION = 0x4489
+    TRACKS = 0x1654AE6B
+    TRACK_ENTRY = 0xAE
+    TRACK_NUMBER = 0xD7
+    TRACK_UID = 0x73C5
+    TRACK_TYPE = 0x83
+    CLUSTER = 0x1F43B675
+    TIMESTAMP = 0xE7
+    SIMPLE_BLOCK = 0xA3
+    BLOCK_GROUP = 0xA0
+    BLOCK = 0xA1
+    REFERENCE_BLOCK = 0xFB
+    POSITION = 0xA7
+    PREV_SIZE = 0xAB
+    SILENT_TRACKS = 0x5854
+    CUES = 0x1C53BB6B
+    CUE_POINT = 0xBB
+    CUE_TIME = 0xB3
+    CUE_TRACK_POSITIONS = 0xB7
+    CUE_TRACK = 0xF7
+    CUE_CLUSTER_POSITION = 0xF1
+    CRC32 = 0xBF
+    VOID = 0xEC
+
+
+# Elements that are dropped from the rebuilt master elements, since a checksum would not match anymore
+_DROPPED_ELEMENTS = {_ID.CRC32, _ID.VOID}
+
+
+# Elements that may follow a Cluster of unknown size in a Segment
+_SEGMENT_CHILDREN = {
+    _ID.SEEK_HEAD, _ID.INFO, _ID.TRACKS, _ID.CUES, _ID.CLUSTER,
+    0x1043A770, 0x1254C367, 0x1941A469,  # Chapters, Tags, Attachments
+}
+
+
+def _read_vint(data, offset, keep_marker=False):
+    """Return the value and length of the variable size integer at offset; an unknown size is None"""
+    if offset >= len(data) or not data[offset]:
+        raise UnsupportedMergeError('Invalid EBML data')
+    length = 9 - data[offset].bit_length()
+    if offset + length > len(data):
+        raise UnsupportedMergeError('Truncated EBML data')
+    value = int.from_bytes(data[offset:offset + length], 'big')
+    if keep_marker:
+        return value, length
+    value &= (1 << (7 * length)) - 1
+    return (None if value == (1 << (7 * length)) - 1 else value), length
+
+
+def _encode_vint(value, length=None):
+    if length is None:
+        length = next(n for n in range(1, 9) if value < (1 << (7 * n)) - 1)
+    return ((1 << (7 * length)) | value).to_bytes(length, 'big')
+
+
+def _encode_uint(value):
+    return value.to_bytes(max(1, (value.bit_length() + 7) // 8), 'big')
+
+
+def _element(element_id, payload):
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big') + _encode_vint(len(payload)) + payload
+
+
+def _parse_elements(data):
+    """Parse the children of a master element into (ID, payload) pairs, without CRC-32 and Void elements"""
+    elements, offset = [], 0
+    while offset < len(data):
+        element_id, id_length = _read_vint(data, offset, keep_marker=True)
+        size, size_length = _read_vint(data, offset + id_length)
+        start = offset + id_length + size_length
+        if size is None or start + size > len(data):
+            raise UnsupportedMergeError('Invalid EBML element size')
+        if element_id not in _DROPPED_ELEMENTS:
+            elements.append((element_id, data[start:start + size]))
+        offset = start + size
+    return elements
+
+
+def _child(elements, element_id, default=None):
+    return next((payload for child_id, payload in elements if child_id == element_id), default)
+
+
+def _read_element_header(f, offset):
+    header = _read_at(f, offset, min(12, f.seek(0, os.SEEK_END) - offset))
+    element_id, id_length = _read_vint(header, 0, keep_marker=True)
+    size, size_length = _read_vint(header, id_length)
+    return element_id, id_length + size_length, size
+
+
+class _WebMInput:
+    def __init__(self, f):
+        self.file = f
+        file_size = f.seek(0, os.SEEK_END)
+        element_id, header_size, size = _read_element_header(f, 0)
+        if element_id != _ID.EBML or size is None:
+            raise UnsupportedMergeError('Not a WebM file')
+        self.ebml = _parse_elements(_read_at(f, header_size, size))
+
+        offset = header_size + size
+        element_id, header_size, size = _read_element_header(f, offset)
+        if element_id != _ID.SEGMENT:
+            raise UnsupportedMergeError('No Segment')
+        offset += header_size
+        end = file_size if size is None else min(offset + size, file_size)
+
+        self.info = self.track = None
+        # (timestamp, offset, header size, size) of each Cluster
+        self.clusters = []
+        while offset < end:
+            element_id, header_size, size = _read_element_header(f, offset)
+            if element_id == _ID.CLUSTER:
+                if size is None:
+                    size = self._cluster_size(offset + header_size, end)
+                self.clusters.append((self._cluster_timestamp(offset + header_size, size), offset, header_size, size))
+            elif size is None:
+                raise UnsupportedMergeError('Element of unknown size')
+            elif element_id == _ID.INFO:
+                self.info = _parse_elements(_read_at(f, offset + header_size, size))
+            elif element_id == _ID.TRACKS:
+                tracks = [_parse_elements(payload) for child_id, payload in
+                          _parse_elements(_read_at(f, offset + header_size, size)) if child_id == _ID.TRACK_ENTRY]
+                if len(tracks) != 1:
+                    raise UnsupportedMergeError(f'Expected a single track, but found {len(tracks)}')
+                self.track = tracks[0]
+            offset += header_size + size
+
+        if self.info is None or self.track is None:
+            raise UnsupportedMergeError('Missing Info or Tracks')
+        self.track_number = int.from_bytes(_child(self.track, _ID.TRACK_NUMBER, b''), 'big')
+        self.track_type = int.from_bytes(_child(self.track, _ID.TRACK_TYPE, b''), 'big')
+        self.timestamp_scale = int.from_bytes(_child(self.info, _ID.TIMESTAMP_SCALE, b''), 'big') or 1000000
+        duration = _child(self.info, _ID.DURATION)
+        self.duration = struct.unpack('>f' if len(duration) == 4 else '>d', duration)[0] if duration else None
+
+    def _cluster_size(self, offset, end):
+        start = offset
+        while offset < end:
+            element_id, header_size, size = _read_element_header(self.file, offset)
+            if element_id in _SEGMENT_CHILDREN:
+                break
+            if size is None:
+                raise UnsupportedMergeError('Element of unknown size')
+            offset += header_size + size
+        return offset - start
+
+    def _cluster_timestamp(self, offset, size):
+        end = offset + size
+        while offset < end:
+            element_id, header_size, child_size = _read_element_header(self.file, offset)
+            if element_id == _ID.TIMESTAMP:
+                return int.from_bytes(_read_at(self.file, offset + header_size, child_size), 'big')
+            offset += header_size + child_size
+        raise UnsupportedMergeError('Cluster without a timestamp')
+
+    def read_cluster(self, offset, header_size, size, track_number):
+        """Return the children of a Cluster with the blocks moved to a new track number,
+        and the relative timestamp of its first block if it is a keyframe"""
+        children, keyframe = [], None
+        for element_id, payload in _parse_elements(_read_at(self.file, offset + header_size, size)):
+            if element_id in (_ID.POSITION, _ID.PREV_SIZE, _ID.SILENT_TRACKS):
+                continue
+            if element_id == _ID.SIMPLE_BLOCK:
+                payload = self._renumber(payload, track_number)
+                if keyframe is None:
+                    keyframe = self._block_time(payload) if self._is_simple_keyframe(payload) else False
+            elif element_id == _ID.BLOCK_GROUP:
+                group = [
+                    (child_id, self._renumber(child, track_number) if child_id == _ID.BLOCK else child)
+                    for child_id, child in _parse_elements(payload)]
+                block = _child(group, _ID.BLOCK)
+                if keyframe is None and block is not None:
+                    keyframe = self._block_time(block) if _child(group, _ID.REFERENCE_BLOCK) is None else False
+                payload = b''.join(_element(child_id, child) for child_id, child in group)
+            children.append((element_id, payload))
+        return children, keyframe if keyframe is not False else None
+
+    def _renumber(self, block, track_number):
+        number, length = _read_vint(block, 0)
+        if number != self.track_number:
+            raise UnsupportedMergeError('Block of an unknown track')
+        return _encode_vint(track_number, length) + block[length:]
+
+    @staticmethod
+    def _is_simple_keyframe(block):
+        return bool(block[_read_vint(block, 0)[1] + 2] & 0x80)
+
+    @staticmethod
+    def _block_time(block):
+        return struct.unpack_from('>h', block, _read_vint(block, 0)[1])[0]
+
+
+def _merge_webm(video, audio, out, doc_type):
+    video, audio = _WebMInput(video), _WebMInput(audio)
+    if video.timestamp_scale != audio.timestamp_scale:
+        raise UnsupportedMergeError('The timestamp scales differ')
+    if (video.track_type, audio.track_type) != (1, 2):
+        raise UnsupportedMergeError('Expected a video and an audio track')
+
+    ebml = []
+    for element_id, payload in video.ebml:
+        if element_id == _ID.DOC_TYPE:
+            payload = doc_type.encode()
+        elif element_id in (_ID.DOC_TYPE_VERSION, _ID.DOC_TYPE_READ_VERSION):
+            payload = _encode_uint(max(
+                int.from_bytes(payload, 'big'), int.from_bytes(_child(audio.ebml, element_id, b''), 'big')))
+        ebml.append(_element(element_id, payload))
+    out.write(_element(_ID.EBML, b''.join(ebml)))
+
+    # The size of the Segment and the positions in the SeekHead are filled in at the end
+    out.write(_ID.SEGMENT.to_bytes(4, 'big'))
+    segment_size_offset = out.tell()
+    out.write(_encode_vint(0, 8))
+    segment_start = out.tell()
+
+    def seek_head(positions):
+        # The positions are always 8 bytes, so that the SeekHead can be overwritten in place
+        return _element(_ID.SEEK_HEAD, b''.join(
+            _element(_ID.SEEK, _element(_ID.SEEK_ID, element_id.to_bytes(4, 'big'))
+                     + _element(_ID.SEEK_POSITION, positions.get(element_id, 0).to_bytes(8, 'big')))
+            for element_id in (_ID.INFO, _ID.TRACKS, _ID.CUES)))
+
+    out.write(seek_head({}))
+    positions = {}
+
+    positions[_ID.INFO] = out.tell() - segment_start
+    durations = [d for d in (video.duration, audio.duration) if d is not None]
+    info = [(element_id, payload) for element_id, payload in video.info if element_id != _ID.DURATION]
+    if durations:
+        info.append((_ID.DURATION, struct.pack('>d', max(durations))))
+    out.write(_element(_ID.INFO, b''.join(_element(element_id, payload) for element_id, payload in info)))
+
+    positions[_ID.TRACKS] = out.tell() - segment_start
+    tracks = []
+    for track_number, inp in enumerate((video, audio), 1):
+        track = []
+        for element_id, payload in inp.track:
+            if element_id == _ID.TRACK_NUMBER:
+                payload = _encode_uint(track_number)
+            elif element_id == _ID.TRACK_UID and inp is audio and payload == _child(video.track, _ID.TRACK_UID):
+                payload = _encode_uint(int.from_bytes(payload, 'big') + 1)
+            track.append(_element(element_id, payload))
+        tracks.append(_element(_ID.TRACK_ENTRY, b''.join(track)))
+    out.write(_element(_ID.TRACKS, b''.join(tracks)))
+
+    cues = []
+    clusters = heapq.merge(
+        *([(timestamp, track_number, cluster) for timestamp, *cluster in inp.clusters]
+          for track_number, inp in enumerate((video, audio), 1)),
+        key=lambda x: x[:2])
+    for timestamp, track_number, cluster in clusters:
+        children, keyframe = (video, audio)[track_number - 1].read_cluster(*cluster, track_number)
+        if track_number == 1 and keyframe is not None:
+            cues.append(_element(_ID.CUE_POINT, (
+                _element(_ID.CUE_TIME, _encode_uint(max(timestamp + keyframe, 0)))
+                + _element(_ID.CUE_TRACK_POSITIONS, (
+                    _element(_ID.CUE_TRACK, b'\x01')
+                    + _element(_ID.CUE_CLUSTER_POSITION, _encode_uint(out.tell() - segment_start)))))))
+        out.write(_element(_ID.CLUSTER, b''.join(_element(element_id, payload) for element_id, payload in children)))
+
+    positions[_ID.CUES] = out.tell() - segment_start
+    out.write(_element(_ID.CUES, b''.join(cues)))
+
+    end = out.tell()
+    out.seek(segment_size_offset)
+    out.write(_encode_vint(end - segment_start, 8))
+    out.write(seek_head(positions))
+    out.seek(end)
+
+
+def merge_files(video_path, audio_path, out_path, ext):
+    """Merge a video-only and an audio-only file into out_path without re-encoding
+
+    Raises UnsupportedMergeError if the files can not be merged natively
+    """
+    with open(video_path, 'rb') as video, open(audio_path, 'rb') as audio, open(out_path, 'wb') as out:
+        try:
+            if ext in ('webm', 'mkv'):
+                _merge_webm(video, audio, out, 'webm' if ext == 'webm' else 'matroska')
+            elif ext == 'mp4':
+                _merge_mp4(video, audio, out)
+            else:
+                raise UnsupportedMergeError(f'Merging into {ext} is not supported')
+        except (struct.error, IndexError, KeyError, StopIteration, OverflowError) as err:
+            # Malformed input that the parsers do not check for
+            raise UnsupportedMergeError(f'Invalid data: {err}') from err
+
+
+class NativeMergerPP(PostProcessor):
+    """Merge a video-only and an audio-only format without ffmpeg
+
+    MP4 video is merged with MP4/M4A audio, and WebM video with WebM audio. Files that
+    can not be merged natively are merged with ffmpeg instead, if it is available.
+    """
+
+    _EXTS = {
+        'mp4': ({'mp4', 'm4v'}, {'m4a', 'mp4'}),
+        'webm': ({'webm'}, {'webm'}),
+        'mkv': ({'webm'}, {'webm'}),
+    }
+    # The formats that are merged natively, for when ffmpeg is not available
+    FORMAT_SPEC = 'bv[ext=mp4][protocol!*=m3u8]+ba[ext=m4a][protocol!*=m3u8]/bv[ext=webm]+ba[ext=webm]'
+
+    available = True
+
+    @classmethod
+    def can_merge_formats(cls, info):
+        formats = info.get('requested_formats') or []
+        if len(formats) != 2 or info.get('ext') not in cls._EXTS:
+            return False
+        video, audio = cls._split_formats(formats)
+        if not video or not audio:
+            return False
+        # HLS formats are downloaded as MPEG-TS
+        if any((f.get('protocol') or '').startswith('m3u8') for f in formats):
+            return False
+        video_exts, audio_exts = cls._EXTS[info['ext']]
+        return video.get('ext') in video_exts and audio.get('ext') in audio_exts
+
+    @staticmethod
+    def _split_formats(formats):
+        video = next((f for f in formats if f.get('vcodec') != 'none' and f.get('acodec') == 'none'), None)
+        audio = next((f for f in formats if f.get('acodec') != 'none' and f.get('vcodec') == 'none'), None)
+        return video, audio
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+        filename = info['filepath']
+        temp_filename = prepend_extension(filename, 'temp')
+        video, audio = self._split_formats(info['requested_formats'])
+        self.to_screen(f'Merging formats into "{filename}"')
+        try:
+            merge_files(video['filepath'], audio['filepath'], temp_filename, info['ext'])
+        except UnsupportedMergeError as err:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp_filename)
+            merger = FFmpegMergerPP(self._downloader)
+            if not merger.available:
+                raise PostProcessingError(f'Unable to merge the formats without ffmpeg: {err}')
+            self.to_screen(f'Unable to merge the formats natively: {err}. Merging with ffmpeg instead')
+            return merger.run(info)
+        os.replace(temp_filename, filename)
+        return info['__files_to_merge'], info
@@ -3,9 +3,17 @@
 import os
 
 from .common import PostProcessor
-from .ffmpeg import FFmpegPostProcessor, FFmpegSubtitlesConvertorPP
+from .ffmpeg import FFmpegPostProcessor, FFmpegPostProcessorError, FFmpegSubtitlesConvertorPP
 from .sponsorblock import SponsorBlockPP
-from ..utils import PostProcessingError, orderedSet, prepend_extension
+from ..utils import (
+    PostProcessingError,
+    determine_ext,
+    float_or_none,
+    is_outdated_version,
+    orderedSet,
+    prepend_extension,
+    traverse_obj,
+)
 
 _TINY_CHAPTER_DURATION = 1
 DEFAULT_SPONSORBLOCK_CHAPTER_TITLE = '[SponsorBlock]: %(category_names)l'
@@ -53,14 +61,30 @@ def run(self, info):
             else:
                 self.write_debug('Expected and actual durations mismatch')
 
-        concat_opts = self._make_concat_opts(cuts, real_duration)
-        self.write_debug('Concat spec = {}'.format(', '.join(f'{c.get("inpoint", 0.0)}-{c.get("outpoint", "inf")}' for c in concat_opts)))
+        files = [info['filepath'], *self._get_supported_subs(info)]
+        in_out_files = keyframe_file = None
+        try:
+            # Packets are dropped by their timestamps, so the video only decodes cleanly with keyframes at the cuts
+            if self._force_keyframes and self._can_cut_in_one_pass():
+                keyframe_file = self.force_keyframes(
+                    files[0], (t for c in cuts for t in (c['start_time'], c['end_time'])))
+                try:
+                    in_out_files = self.cut_files(files, cuts, keyframe_file)
+                except FFmpegPostProcessorError as e:
+                    self.report_warning(f'Unable to remove the chapters in a single pass: {e}. Trying another way')
 
-        def remove_chapters(file, is_sub):
-            return file, self.remove_chapters(file, cuts, concat_opts, self._force_keyframes and not is_sub)
-
-        in_out_files = [remove_chapters(info['filepath'], False)]
-        in_out_files.extend(remove_chapters(in_file, True) for in_file in self._get_supported_subs(info))
+            if in_out_files is None:
+                concat_opts = self._make_concat_opts(cuts, real_duration)
+                self.write_debug('Concat spec = {}'.format(', '.join(f'{c.get("inpoint", 0.0)}-{c.get("outpoint", "inf")}' for c in concat_opts)))
+                # The video is only re-encoded once, even when it is cut again after a failed single pass
+                in_out_files = [
+                    (file, self.remove_chapters(
+                        file, cuts, concat_opts, self._force_keyframes and i == 0,
+                        keyframe_file=keyframe_file if i == 0 else None))
+                    for i, file in enumerate(files)]
+        finally:
+            if keyframe_file:
+                self._delete_downloaded_files(keyframe_file, msg=None)
 
         # Renaming should only happen after all files are processed
         files_to_remove = []
@@ -310,17 +334,59 @@ def _remove_tiny_rename_sponsors(self, chapters):
             new_chapters.append(c)
         return new_chapters
 
-    def remove_chapters(self, filename, ranges_to_cut, concat_opts, force_keyframes=False):
-        in_file = filename
-        out_file = prepend_extension(in_file, 'temp')
-        if force_keyframes:
+    def remove_chapters(self, filename, ranges_to_cut, concat_opts, force_keyframes=False, *, keyframe_file=None):
+        """@param keyframe_file  A copy of filename that already has keyframes at the cuts; it is not deleted"""
+        in_file = keyframe_file or filename
+        out_file = prepend_extension(filename, 'temp')
+        if force_keyframes and not keyframe_file:
             in_file = self.force_keyframes(in_file, (t for c in ranges_to_cut for t in (c['start_time'], c['end_time'])))
         self.to_screen(f'Removing chapters from {filename}')
         self.concat_files([in_file] * len(concat_opts), out_file, concat_opts)
-        if in_file != filename:
+        if in_file not in (filename, keyframe_file):
             self._delete_downloaded_files(in_file, msg=None)
         return out_file
 
+    def _can_cut_in_one_pass(self):
+        # Dropping packets with an expression needs the noise bsf of ffmpeg 5.1
+        return (self.basename == 'ffmpeg' and self._features.get('setts')
+                and not is_outdated_version(self._version, '5.1'))
+
+    def cut_files(self, filenames, ranges_to_cut, keyframe_file):
+        """
+        Remove ranges_to_cut from a video and its subtitles with a single ffmpeg invocation
+
+        The first file is the video, which is read from keyframe_file, its copy with keyframes at the cuts.
+        Every input is read once and its packets are stream copied, except those within the ranges.
+        Returns a list of (input file, output file)
+        """
+        in_files = [keyframe_file, *filenames[1:]]
+        out_files = [prepend_extension(filename, 'temp') for filename in filenames]
+        for filename in filenames:
+            self.to_screen(f'Removing chapters from {filename}')
+
+        # The ranges are relative to the start of the video, but the filters see the timestamps of the packets
+        start_time = traverse_obj(self.get_metadata_object(in_files[0]), ('format', 'start_time', {float_or_none})) or 0
+        output_path_opts = []
+        for i, out_file in enumerate(out_files):
+            output_path_opts.append((out_file, [
+                *self.stream_copy_opts(ext=determine_ext(out_file), input_index=i),
+                '-map_chapters', '-1', '-bsf', self._cut_bsf(ranges_to_cut, start_time if i == 0 else 0)]))
+        try:
+            self.real_run_ffmpeg([(in_file, []) for in_file in in_files], output_path_opts)
+        except FFmpegPostProcessorError:
+            self._delete_downloaded_files(*filter(os.path.exists, out_files), msg=None)
+            raise
+        return list(zip(filenames, out_files))
+
+    @staticmethod
+    def _cut_bsf(ranges_to_cut, start_time=0):
+        """Bitstream filters that drop the packets within the ranges and move the later ones back"""
+        ranges = [(c['start_time'] + start_time, c['end_time'] + start_time) for c in ranges_to_cut]
+        # Commas within the expressions must be escaped from the list of filters
+        drop = '+'.join(f'gte(pts*tb\\,{start:.6f})*lt(pts*tb\\,{end:.6f})' for start, end in ranges)
+        shift = '+'.join(f'gte(PTS*TB\\,{end:.6f})*{end - start:.6f}' for start, end in ranges)
+        return f'noise=drop={drop},setts=ts=TS-({shift})/TB'
+
     @staticmethod
     def _make_concat_opts(chapters_to_remove, duration):
         opts = [{}]
@@ -0,0 +1,291 @@
+"""Batch mode: serve extract/download jobs from a single long-lived YoutubeDL
+
+Start with ``python -m yt_dlp.server [--socket PATH] [OPTIONS]``, where OPTIONS are
+the usual yt-dlp options applied to every job. Jobs are read as JSON lines from
+stdin (or from each connection to the local socket) and answered in order:
+
+    {"id": 1, "action": "extract", "url": "https://...", "params": {"format": "best"}}
+    {"id": 1, "status": "ok", "result": {...}}
+
+``action`` is one of "extract", "download" or "ping"; ``url`` may also be given
+as a list in ``urls``. Per-job overrides are either YoutubeDL ``params`` or
+command-line ``args``; they only apply to that job. The YoutubeDL instance, its
+request handlers and its extractor instances are kept warm between jobs.
+"""
+
+import argparse
+import contextlib
+import functools
+import io
+import json
+import optparse
+import os
+import socket
+import socketserver
+import sys
+
+from . import parse_options
+from .globals import IN_CLI, plugin_dirs
+from .plugins import load_all_plugins
+from .postprocessor import FFmpegPostProcessor
+from .utils import (
+    DownloadCancelled,
+    YoutubeDLError,
+    setproctitle,
+    variadic,
+)
+from .YoutubeDL import YoutubeDL
+
+
+class JobError(YoutubeDLError):
+    """Raised for malformed jobs"""
+    pass
+
+
+class BatchServer:
+    """Run jobs against a single YoutubeDL instance
+
+    Jobs are run one at a time; a job's param overrides are removed once it finishes.
+    """
+
+    # Params that are consumed when YoutubeDL is created and can not be changed per job
+    UNSUPPORTED_PARAMS = {
+        'cookiefile', 'cookiesfrombrowser', 'download_archive', 'download_archive_backend',
+        'logger', 'logtostderr', 'post_hooks', 'postprocessor_hooks', 'postprocessors',
+        'progress_hooks', 'cache_store',
+    }
+    # Params that are baked into the request handlers
+    NETWORK_PARAMS = {
+        'client_certificate', 'client_certificate_key', 'client_certificate_password', 'compat_opts',
+        'concurrent_fragment_downloads', 'debug_printtraffic', 'enable_file_urls', 'http_headers', 'impersonate', 'legacyserverconnect',
+        'nocheckcertificate', 'proxy', 'socket_timeout', 'source_address',
+    }
+
+    def __init__(self, ydl, base_args=()):
+        self.ydl = ydl
+        self._base_args = list(base_args)
+        self._socket_server = None
+
+    @functools.cached_property
+    def _default_opts(self):
+        return parse_options(self._base_args).ydl_opts
+
+    def _args_to_params(self, args):
+        if not isinstance(args, list) or not all(isinstance(arg, str) for arg in args):
+            raise JobError('"args" must be a list of strings')
+        try:
+            _, _, urls, ydl_opts = parse_options([*self._base_args, *args])
+        except optparse.OptParseError as e:
+            raise JobError(f'Invalid arguments: {str(e).strip().splitlines()[-1]}')
+        if urls:
+            raise JobError('URLs must be passed in "url" or "urls", not in "args"')
+        defaults = self._default_opts
+        return {k: v for k, v in ydl_opts.items() if not k.startswith('_') and v != defaults.get(k)}
+
+    def _reset_network(self):
+        for attr in ('_request_director', 'proxies'):
+            if attr in self.ydl.__dict__:
+                if attr == '_request_director':
+                    self.ydl._request_director.close()
+                delattr(self.ydl, attr)
+
+    def _apply_params(self, overrides):
+        """Apply param overrides and return a function that undoes them"""
+        unsupported = self.UNSUPPORTED_PARAMS.intersection(overrides)
+        if unsupported:
+            raise JobError(f'These params can not be changed per job: {", ".join(sorted(unsupported))}')
+
+        ydl, params = self.ydl, self.ydl.params
+        saved = {k: params[k] for k in overrides if k in params}
+        saved_outtmpl, saved_selector = dict(params['outtmpl']), ydl.format_selector
+
+        def restore():
+            for key in overrides:
+                if key in saved:
+                    params[key] = saved[key]
+                else:
+                    params.pop(key, None)
+            params['outtmpl'] = saved_outtmpl
+            ydl.format_selector = saved_selector
+            if self.NETWORK_PARAMS.intersection(overrides):
+                self._reset_network()
+
+        params.update(overrides)
+        try:
+            if 'outtmpl' in overrides or 'restrictfilenames' in overrides:
+                if 'outtmpl' not in overrides:
+                    params['outtmpl'] = dict(saved_outtmpl)
+                ydl._parse_outtmpl()
+            if 'format' in overrides:
+                fmt = params['format']
+                ydl.format_selector = (
+                    fmt if fmt in (None, '-') or callable(fmt) else ydl.build_format_selector(fmt))
+            if self.NETWORK_PARAMS.intersection(overrides):
+                self._reset_network()
+        except Exception:
+            restore()
+            raise
+        return restore
+
+    def run_job(self, job):
+        """Run a single job and return its result; raises YoutubeDLError on failure"""
+        if not isinstance(job, dict):
+            raise JobError('Job must be a JSON object')
+        action = job.get('action', 'extract')
+        if action == 'ping':
+            return 'pong'
+        elif action not in ('extract', 'download'):
+            raise JobError(f'Unknown action {action!r}')
+
+        urls = job.get('urls') or job.get('url')
+        if not urls:
+            raise JobError('Job has no URL')
+        urls = list(variadic(urls))
+        if not all(isinstance(url, str) for url in urls):
+            raise JobError('URLs must be strings')
+
+        overrides = job.get('params') or {}
+        if not isinstance(overrides, dict):
+            raise JobError('"params" must be a JSON object')
+        if job.get('args'):
+            overrides = {**self._args_to_params(job['args']), **overrides}
+
+        ydl = self.ydl
+        restore = self._apply_params(overrides)
+        ydl._download_retcode = 0
+        ydl._num_downloads = 0
+        try:
+            if action == 'download' and '-' in ydl.params['outtmpl'].values():
+                raise JobError('Downloads can not be written to stdout')
+            infos = []
+            for url in urls:
+                try:
+                    info = ydl.extract_info(
+                        url, download=action == 'download',
+                        force_generic_extractor=ydl.params.get('force_generic_extractor', False))
+                except DownloadCancelled as e:
+                    ydl.to_screen(f'Aborting remaining downloads: {e.msg}')
+                    break
+                if info is None and len(urls) == 1:
+                    # The error was reported, but not raised because of "ignoreerrors"
+                    raise JobError(f'Unable to process {url}; see the log for details')
+                infos.append(ydl.sanitize_info(info, ydl.params.get('clean_infojson', True)))
+            # The job's params apply to its post-processing
+            ydl._wait_for_postprocessing()
+        finally:
+            restore()
+
+        result = infos if isinstance(job.get('urls'), list) else infos[0] if infos else None
+        if action == 'download':
+            return {'retcode': ydl._download_retcode, 'info': result}
+        return result
+
+    def handle(self, line):
+        """Handle one line of the protocol and return the response object"""
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            return {'id': None, 'status': 'error', 'error': f'Invalid JSON: {e}'}
+
+        job_id = job.get('id') if isinstance(job, dict) else None
+        try:
+            result = self.run_job(job)
+        except Exception as e:
+            return {'id': job_id, 'status': 'error', 'error': str(e) or type(e).__name__}
+        return {'id': job_id, 'status': 'ok', 'result': result}
+
+    @contextlib.contextmanager
+    def _reserve(self, outfile):
+        """Send the output of the jobs that would go to outfile, like --print, to stderr instead"""
+        out_files = self.ydl._out_files
+        saved = {name: stream for name, stream in out_files.items_ if name != 'error' and stream is outfile}
+        for name in saved:
+            setattr(out_files, name, out_files.error)
+        try:
+            yield
+        finally:
+            for name, stream in saved.items():
+                setattr(out_files, name, stream)
+
+    def serve(self, infile, outfile):
+        """Answer jobs read from infile until it is exhausted"""
+        with self._reserve(outfile):
+            for line in infile:
+                if not line.strip():
+                    continue
+                outfile.write(json.dumps(self.handle(line), default=repr) + '\n')
+                outfile.flush()
+
+    def serve_socket(self, path):
+        """Answer jobs from connections to a unix socket at path, one connection at a time"""
+        if not hasattr(socket, 'AF_UNIX'):
+            raise YoutubeDLError('Local sockets are not supported on this platform')
+
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                infile = io.TextIOWrapper(self.rfile, encoding='utf-8', errors='replace')
+                outfile = io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True)
+                try:
+                    server.serve(infile, outfile)
+                finally:
+                    infile.detach()
+                    outfile.detach()
+
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        with socketserver.UnixStreamServer(path, Handler) as self._socket_server:
+            try:
+                self._socket_server.serve_forever()
+            finally:
+                self._socket_server = None
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+
+    def shutdown(self):
+        """Stop serve_socket; must be called from another thread"""
+        if self._socket_server:
+            self._socket_server.shutdown()
+
+
+def main(argv=None):
+    IN_CLI.value = True
+    setproctitle('yt-dlp-server')
+
+    parser = argparse.ArgumentParser(
+        prog='python -m yt_dlp.server', allow_abbrev=False,
+        description='Run extract/download jobs read as JSON lines, reusing a single YoutubeDL. '
+                    'Any other options are passed to yt-dlp and apply to every job')
+    parser.add_argument(
+        '--socket', metavar='PATH', help='Listen on a unix socket at PATH instead of stdin/stdout')
+    args, base_args = parser.parse_known_args(argv)
+
+    _, opts, urls, ydl_opts = parse_options(base_args)
+    if urls:
+        parser.error('URLs must be sent as jobs')
+    if opts.ffmpeg_location:
+        FFmpegPostProcessor._ffmpeg_location.set(opts.ffmpeg_location)
+    plugin_dirs.value = opts.plugin_dirs
+    if plugin_dirs.value:
+        load_all_plugins()
+
+    if not args.socket:
+        # stdout is reserved for responses
+        ydl_opts['logtostderr'] = True
+    with YoutubeDL(ydl_opts) as ydl:
+        server = BatchServer(ydl, base_args)
+        try:
+            if args.socket:
+                server.serve_socket(args.socket)
+            else:
+                server.serve(sys.stdin, sys.stdout)
+        except KeyboardInterrupt:
+            pass
+
+
+__all__ = ['BatchServer']
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
+import array
 import base64
 import binascii
+import bisect
 import calendar
 import codecs
 import collections
@@ -1602,7 +1604,7 @@ class locked_file:
     locked = False
 
     def __init__(self, filename, mode, block=True, encoding=None):
-        if mode not in {'r', 'rb', 'a', 'ab', 'w', 'wb'}:
+        if mode not in {'r', 'rb', 'r+b', 'a', 'ab', 'w', 'wb'}:
             raise NotImplementedError(mode)
         self.mode, self.block = mode, block
 
@@ -1621,7 +1623,7 @@ def __init__(self, filename, mode, block=True, encoding=None):
         self.f = os.fdopen(os.open(filename, flags, 0o666), mode, encoding=encoding)
 
     def __enter__(self):
-        exclusive = 'r' not in self.mode
+        exclusive = 'r' not in self.mode or '+' in self.mode
         try:
             _lock_file(self.f, exclusive, self.block)
             self.locked = True
@@ -2289,6 +2291,255 @@ def __str__(self):
         return repr(self.exhaust())
 
 
+class FragmentList(collections.abc.Sequence):
+    """Compact immutable list of the fragments of a format
+
+    The fragment dicts are only built when they are accessed. Fragments that follow
+    a DASH media template, a segment timeline or a list of segment URLs are stored as
+    the template and arrays, instead of one dict per fragment.
+    Slices of a FragmentList are lists. It is serialized to info JSON with to_json()
+    and restored from it with from_json()
+    """
+
+    def __init__(self, *parts):
+        """@param parts  FragmentLists or lists of fragment dicts, which are concatenated"""
+        self._runs = []
+        for part in parts:
+            if isinstance(part, FragmentList):
+                self._runs.extend(part._runs)
+            elif part:
+                self._runs.append(_FragmentDicts(list(part)))
+        self._ends = list(itertools.accumulate(len(run) for run in self._runs))
+
+    @classmethod
+    def from_template(cls, template, start_number, count, *, duration=None, bandwidth=None):
+        """Fragments numbered from start_number, in a media template with %(Number)d fields"""
+        return cls._of(_TemplateFragments(template, start_number, count, duration, bandwidth))
+
+    @classmethod
+    def from_timeline(cls, template, start_number, timeline, timescale, *, bandwidth=None):
+        """Fragments of a SegmentTimeline, whose S elements are {'t', 'd', 'r'} dicts"""
+        return cls._of(_TimelineFragments(template, start_number, timeline, timescale, bandwidth))
+
+    @classmethod
+    def from_urls(cls, urls, *, timeline=None, timescale=None, duration=None):
+        """Fragments with the given URLs or paths, whose durations are those of a timeline or duration"""
+        return cls._of(_UrlFragments(urls, timeline, timescale, duration))
+
+    @classmethod
+    def _of(cls, run):
+        fragment_list = cls()
+        if len(run):
+            fragment_list._runs, fragment_list._ends = [run], [len(run)]
+        return fragment_list
+
+    def __len__(self):
+        return self._ends[-1] if self._ends else 0
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        elif not isinstance(idx, int):
+            raise TypeError('indices must be integers or slices')
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError('FragmentList index out of range')
+        run_idx = bisect.bisect_right(self._ends, idx)
+        return self._runs[run_idx][idx - (self._ends[run_idx - 1] if run_idx else 0)]
+
+    def __iter__(self):
+        for run in self._runs:
+            yield from run
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, tuple, FragmentList)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self):
+        # The fragments may be many, so they are not listed
+        return f'<{type(self).__name__} of {len(self)} fragments>'
+
+    def to_json(self):
+        return {'_type': 'fragment_list', 'runs': [run.to_json() for run in self._runs]}
+
+    @classmethod
+    def from_json(cls, obj):
+        fragment_list = cls()
+        fragment_list._runs = [_FRAGMENT_RUNS[run['type']].from_json(run) for run in obj['runs']]
+        fragment_list._ends = list(itertools.accumulate(len(run) for run in fragment_list._runs))
+        return fragment_list
+
+
+def _fragment_location_key(location):
+    return 'url' if re.match(r'https?://', location) else 'path'
+
+
+class _FragmentDicts:
+    def __init__(self, fragments):
+        self._fragments = fragments
+
+    def __len__(self):
+        return len(self._fragments)
+
+    def __getitem__(self, idx):
+        return self._fragments[idx]
+
+    def __iter__(self):
+        return iter(self._fragments)
+
+    def to_json(self):
+        return {'type': 'list', 'fragments': self._fragments}
+
+    @classmethod
+    def from_json(cls, obj):
+        return cls(obj['fragments'])
+
+
+class _TemplateFragments:
+    def __init__(self, template, start_number, count, duration, bandwidth):
+        self._template, self._start_number, self._count = template, start_number, count
+        self._duration, self._bandwidth = duration, bandwidth
+        self._key = _fragment_location_key(template)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, idx):
+        return {
+            self._key: self._template % {'Number': self._start_number + idx, 'Bandwidth': self._bandwidth},
+            'duration': self._duration,
+        }
+
+    def __iter__(self):
+        return map(self.__getitem__, range(self._count))
+
+    def to_json(self):
+        return {
+            'type': 'template', 'template': self._template, 'start_number': self._start_number,
+            'count': self._count, 'duration': self._duration, 'bandwidth': self._bandwidth,
+        }
+
+    @classmethod
+    def from_json(cls, obj):
+        return cls(obj['template'], obj['start_number'], obj['count'], obj.get('duration'), obj.get('bandwidth'))
+
+
+class _Timeline:
+    """Run-length encoded durations (and start times) of the S elements of a SegmentTimeline"""
+
+    def __init__(self, timeline):
+        # Flat arrays with one item per S element
+        self._times, self._durations, self._ends = array.array('q'), array.array('q'), array.array('q')
+        time = count = 0
+        for s in timeline:
+            time = s.get('t') or time
+            repeat = max(s.get('r', 0), 0)
+            self._times.append(time)
+            self._durations.append(s['d'])
+            count += repeat + 1
+            self._ends.append(count)
+            time += s['d'] * (repeat + 1)
+
+    def __len__(self):
+        return self._ends[-1] if self._ends else 0
+
+    def locate(self, idx):
+        """Return the (time, duration) of the fragment at idx"""
+        s_idx = bisect.bisect_right(self._ends, idx)
+        repeat = idx - (self._ends[s_idx - 1] if s_idx else 0)
+        return self._times[s_idx] + repeat * self._durations[s_idx], self._durations[s_idx]
+
+    def to_json(self):
+        return [
+            [time, duration, end - start - 1] for time, duration, start, end
+            in zip(self._times, self._durations, [0, *self._ends], self._ends)]
+
+    @classmethod
+    def from_json(cls, obj):
+        return cls({'t': time, 'd': duration, 'r': repeat} for time, duration, repeat in obj)
+
+
+class _TimelineFragments:
+    def __init__(self, template, start_number, timeline, timescale, bandwidth):
+        self._template, self._start_number, self._timescale, self._bandwidth = (
+            template, start_number, timescale, bandwidth)
+        self._timeline = timeline if isinstance(timeline, _Timeline) else _Timeline(timeline)
+        self._key = _fragment_location_key(template)
+
+    def __len__(self):
+        return len(self._timeline)
+
+    def __getitem__(self, idx):
+        time, duration = self._timeline.locate(idx)
+        return {
+            self._key: self._template % {
+                'Time': time,
+                'Bandwidth': self._bandwidth,
+                'Number': self._start_number + idx,
+            },
+            'duration': float_or_none(duration, self._timescale),
+        }
+
+    def __iter__(self):
+        return map(self.__getitem__, range(len(self)))
+
+    def to_json(self):
+        return {
+            'type': 'timeline', 'template': self._template, 'start_number': self._start_number,
+            'timescale': self._timescale, 'bandwidth': self._bandwidth, 'timeline': self._timeline.to_json(),
+        }
+
+    @classmethod
+    def from_json(cls, obj):
+        return cls(
+            obj['template'], obj['start_number'], _Timeline.from_json(obj['timeline']),
+            obj.get('timescale'), obj.get('bandwidth'))
+
+
+class _UrlFragments:
+    def __init__(self, urls, timeline, timescale, duration):
+        self._timeline = timeline if timeline is None or isinstance(timeline, _Timeline) else _Timeline(timeline)
+        self._urls = list(urls)[:len(self._timeline)] if self._timeline is not None else list(urls)
+        self._timescale, self._duration = timescale, duration
+
+    def __len__(self):
+        return len(self._urls)
+
+    def __getitem__(self, idx):
+        url = self._urls[idx]
+        fragment = {_fragment_location_key(url): url}
+        if self._timeline is not None:
+            fragment['duration'] = float_or_none(self._timeline.locate(idx)[1], self._timescale)
+        elif self._duration:
+            fragment['duration'] = self._duration
+        return fragment
+
+    def __iter__(self):
+        return map(self.__getitem__, range(len(self)))
+
+    def to_json(self):
+        return {
+            'type': 'urls', 'urls': self._urls, 'duration': self._duration, 'timescale': self._timescale,
+            'timeline': self._timeline and self._timeline.to_json(),
+        }
+
+    @classmethod
+    def from_json(cls, obj):
+        timeline = obj.get('timeline')
+        return cls(
+            obj['urls'], timeline and _Timeline.from_json(timeline), obj.get('timescale'), obj.get('duration'))
+
+
+_FRAGMENT_RUNS = {
+    'list': _FragmentDicts,
+    'template': _TemplateFragments,
+    'timeline': _TimelineFragments,
+    'urls': _UrlFragments,
+}
+
+
 class PagedList:
 
     class IndexError(IndexError):  # noqa: A001
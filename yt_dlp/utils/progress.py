@@ -107,3 +107,32 @@ def set(self, value: float):
 
     def reset(self):
         self.value = self.smooth = self._initial
+
+
+class ProgressThrottle:
+    """Let through at most one progress update per interval for each key"""
+
+    def __init__(self, interval: float | None):
+        self.interval = interval or 0
+        self._lock = threading.Lock()
+        self._next: dict = {}
+
+    def due(self, key=None) -> bool:
+        """Whether an update for key would be let through now, without reserving it"""
+        return not self.interval or time.monotonic() >= self._next.get(key, 0)
+
+    def consume(self, key=None) -> bool:
+        """Let an update for key through if it is due"""
+        if not self.interval:
+            return True
+        current_time = time.monotonic()
+        with self._lock:
+            if current_time < self._next.get(key, 0):
+                return False
+            self._next[key] = current_time + self.interval
+            return True
+
+    def reset(self, key=None):
+        """Let the next update for key through"""
+        with self._lock:
+            self._next.pop(key, None)